@@ -81,6 +81,12 @@ def pytest_addoption(parser) -> None:
         default="10",
         help="Duration for AP response perf tests in seconds",
     )
+    parser.addoption(
+        "--ap-repetitions",
+        action="store",
+        default="3",
+        help="No. of runs of every scenario of the AP compile benchmark",
+    )
 
 
 # import fixtures into pytest global namespace
@@ -3,11 +3,21 @@ import pytest, json
 import os, re, yaml, subprocess
 from datetime import datetime
 from settings import TEST_DATA, DEPLOYMENTS
-from suite.custom_resources_utils import (
+from suite.ap_resources_utils import (
     create_ap_logconf_from_yaml,
     create_ap_policy_from_yaml,
+    create_ap_usersig_from_yaml,
     delete_ap_policy,
     delete_ap_logconf,
+    delete_ap_usersig,
+    patch_ap_custom_resource,
+)
+from suite.ap_benchmark_utils import (
+    ApScenario,
+    is_request_allowed,
+    is_request_blocked,
+    run_ap_benchmark,
+    wait_for_probe,
 )
 from kubernetes.client import V1ContainerPort
 from suite.resources_utils import (
@@ -29,7 +39,6 @@ from suite.resources_utils import (
     wait_for_event_increment,
     get_file_contents,
 )
-from suite.custom_resources_utils import read_ap_crd
 from suite.yaml_utils import get_first_ingress_host_from_yaml
 
 ap_policy = "dataguard-alarm"
@@ -122,6 +131,54 @@ def appprotect_setup(
     return AppProtectSetup(req_url)
 
 
+@pytest.fixture(scope="class")
+def appprotect_benchmark_setup(
+    request, kube_apis, ingress_controller_endpoint, test_namespace
+) -> AppProtectSetup:
+    """
+    Deploy simple application, the Secret and the logconf, the scenarios of the benchmark create the policies.
+
+    :param request: pytest fixture
+    :param kube_apis: client apis
+    :param ingress_controller_endpoint: public endpoint
+    :param test_namespace:
+    :return: AppProtectSetup
+    """
+
+    print("------------------------- Deploy simple backend application -------------------------")
+    create_example_app(kube_apis, "simple", test_namespace)
+    req_url = f"https://{ingress_controller_endpoint.public_ip}:{ingress_controller_endpoint.port_ssl}/backend1"
+    wait_until_all_pods_are_ready(kube_apis.v1, test_namespace)
+    ensure_connection_to_public_endpoint(
+        ingress_controller_endpoint.public_ip,
+        ingress_controller_endpoint.port,
+        ingress_controller_endpoint.port_ssl,
+    )
+
+    print("------------------------- Deploy Secret -----------------------------")
+    src_sec_yaml = f"{TEST_DATA}/appprotect/appprotect-secret.yaml"
+    create_items_from_yaml(kube_apis, src_sec_yaml, test_namespace)
+
+    print("------------------------- Deploy logconf -----------------------------")
+    src_log_yaml = f"{TEST_DATA}/appprotect/logconf.yaml"
+    log_name = create_ap_logconf_from_yaml(kube_apis.custom_objects, src_log_yaml, test_namespace)
+
+    def fin():
+        print("Clean up:")
+        delete_ap_logconf(kube_apis.custom_objects, log_name, test_namespace)
+        delete_common_app(kube_apis, "simple", test_namespace)
+        delete_items_from_yaml(kube_apis, src_sec_yaml, test_namespace)
+
+    request.addfinalizer(fin)
+
+    return AppProtectSetup(req_url)
+
+
+@pytest.fixture
+def setup_repetitions(request):
+    return int(request.config.getoption("--ap-repetitions"))
+
+
 @pytest.fixture
 def setup_users(request):
     return request.config.getoption("--users")
@@ -199,7 +256,7 @@ class TestAppProtectPerf:
 
         print("--------- Run test while AppProtect module is enabled with correct policy ---------")
         ensure_response_from_backend(appprotect_setup.req_url, ingress_host)
-        wait_before_test(40)
+        wait_for_probe(lambda: is_request_blocked(appprotect_setup.req_url + "/<script>", ingress_host))
         response = requests.get(
             appprotect_setup.req_url + "/<script>", headers={"host": ingress_host}, verify=False
         )
@@ -238,7 +295,7 @@ class TestAppProtectPerf:
 
         print("--------- Run test while AppProtect module is enabled with correct policy ---------")
         ensure_response_from_backend(appprotect_setup.req_url, ingress_host)
-        wait_before_test(30)
+        wait_for_probe(lambda: is_request_blocked(appprotect_setup.req_url + "/<script>", ingress_host))
         replace_ingress_with_ap_annotations(
             kube_apis,
             src2_ing_yaml,
@@ -250,8 +307,7 @@ class TestAppProtectPerf:
             "127.0.0.1:514",
         )
         ensure_response_from_backend(appprotect_setup.req_url, ingress_host)
-        wait_before_test(30)
-        response = ""
+        wait_for_probe(lambda: is_request_blocked(appprotect_setup.req_url + "/v1/<script>", ingress_host))
         response = requests.get(
             appprotect_setup.req_url + "/v1/<script>", headers={"host": ingress_host}, verify=False
         )
@@ -297,7 +353,7 @@ class TestAppProtectPerf:
 
         print("--------- Run test while AppProtect module is enabled with correct policy ---------")
         ensure_response_from_backend(appprotect_setup.req_url, ingress_host)
-        wait_before_test(30)
+        wait_for_probe(lambda: is_request_blocked(appprotect_setup.req_url + "/<script>", ingress_host))
         response = requests.get(
             appprotect_setup.req_url + "/<script>", headers={"host": ingress_host}, verify=False
         )
@@ -341,7 +397,7 @@ class TestAppProtectPerf:
 
         print("--------- Run test while AppProtect module is enabled with correct policy ---------")
         ensure_response_from_backend(appprotect_setup.req_url, ingress_host)
-        wait_before_test(30)
+        wait_for_probe(lambda: is_request_blocked(appprotect_setup.req_url + "/<script>", ingress_host))
         response = ""
         response = requests.get(
             appprotect_setup.req_url + "/<script>", headers={"host": ingress_host}, verify=False
@@ -370,3 +426,124 @@ class TestAppProtectPerf:
         )
         delete_items_from_yaml(kube_apis, src_ing_yaml, test_namespace)
         assert_invalid_responses(response)
+
+
+@pytest.mark.ap_perf
+@pytest.mark.parametrize(
+    "crd_ingress_controller_with_ap",
+    [
+        {
+            "extra_args": [
+                f"-enable-custom-resources",
+                f"-enable-app-protect",
+                f"-enable-prometheus-metrics",
+            ]
+        }
+    ],
+    indirect=["crd_ingress_controller_with_ap"],
+)
+class TestAppProtectCompileBenchmark:
+    def test_ap_compile_benchmark(
+        self,
+        kube_apis,
+        ingress_controller_prerequisites,
+        ingress_controller_endpoint,
+        crd_ingress_controller_with_ap,
+        appprotect_benchmark_setup,
+        enable_prometheus_port,
+        test_namespace,
+        setup_repetitions,
+    ):
+        """
+        Measure the time from an AppProtect resource change until it is enforced, for every kind of change.
+        """
+        src_ing_yaml = f"{TEST_DATA}/appprotect/appprotect-ingress.yaml"
+        src_pol_yaml = f"{TEST_DATA}/appprotect/{ap_policy}.yaml"
+        src_uds_pol_yaml = f"{TEST_DATA}/appprotect/dataguard-alarm-uds.yaml"
+        src_uds_yaml = f"{TEST_DATA}/appprotect/ap-ic-uds.yaml"
+        ingress_host = get_first_ingress_host_from_yaml(src_ing_yaml)
+        req_url = appprotect_benchmark_setup.req_url
+        metrics_url = (
+            f"http://{ingress_controller_endpoint.public_ip}:{ingress_controller_endpoint.metrics_port}/metrics"
+        )
+        custom_objects = kube_apis.custom_objects
+        usersigs = []
+
+        def blocked():
+            return is_request_blocked(req_url + "/<script>", ingress_host)
+
+        def create_ingress_only():
+            create_ingress_with_ap_annotations(
+                kube_apis, src_ing_yaml, test_namespace, ap_policy, "True", "True", "127.0.0.1:514"
+            )
+            ensure_response_from_backend(req_url, ingress_host)
+
+        def create_ingress_and_policy(policy_yaml):
+            create_ap_policy_from_yaml(custom_objects, policy_yaml, test_namespace)
+            create_ingress_only()
+
+        def create_blocking_ingress():
+            create_ingress_and_policy(src_pol_yaml)
+            assert wait_for_probe(blocked) is not None
+
+        def set_enforcement_mode(mode):
+            patch_ap_custom_resource(
+                custom_objects, test_namespace, "appolicies", ap_policy,
+                {"spec": {"policy": {"enforcementMode": mode}}},
+            )
+
+        def set_request_types(request_types):
+            patch_ap_custom_resource(
+                custom_objects, test_namespace, "aplogconfs", "logconf",
+                {"spec": {"filter": {"request_types": request_types}}},
+            )
+
+        def create_usersig():
+            usersigs.append(create_ap_usersig_from_yaml(custom_objects, src_uds_yaml, test_namespace))
+
+        def clean_up():
+            delete_items_from_yaml(kube_apis, src_ing_yaml, test_namespace)
+            delete_ap_policy(custom_objects, ap_policy, test_namespace)
+            while usersigs:
+                delete_ap_usersig(custom_objects, usersigs.pop(), test_namespace)
+
+        def clean_up_logconf():
+            set_request_types("all")
+            clean_up()
+
+        scenarios = [
+            ApScenario(
+                "policy create",
+                create_ingress_only,
+                lambda: create_ap_policy_from_yaml(custom_objects, src_pol_yaml, test_namespace),
+                blocked,
+                clean_up,
+            ),
+            ApScenario(
+                "policy update transparent",
+                create_blocking_ingress,
+                lambda: set_enforcement_mode("transparent"),
+                lambda: is_request_allowed(req_url + "/<script>", ingress_host),
+                clean_up,
+            ),
+            ApScenario(
+                "logconf change",
+                create_blocking_ingress,
+                lambda: set_request_types("illegal"),
+                None,
+                clean_up_logconf,
+            ),
+            ApScenario(
+                "usersig create",
+                lambda: create_ingress_and_policy(src_uds_pol_yaml),
+                create_usersig,
+                lambda: is_request_blocked(req_url, ingress_host, data="kic"),
+                clean_up,
+            ),
+        ]
+        report = run_ap_benchmark(scenarios, metrics_url, setup_repetitions)
+        report.write_json("ap_compile_benchmark.json")
+
+        assert not report.timed_out, f"AppProtect changes not in effect: {report.timed_out}"
+        for result in report.scenario_results("logconf change"):
+            assert result.reloads > 0
@@ -4,9 +4,10 @@ import os
 
 import pytest
 from kubernetes.config.kube_config import KUBE_CONFIG_DEFAULT_LOCATION
-from settings import (BATCH_RESOURCES, BATCH_START, DEFAULT_DEPLOYMENT_TYPE,
+from settings import (AP_SCALE_POLICIES, BATCH_RESOURCES, BATCH_START, DEFAULT_DEPLOYMENT_TYPE,
                       DEFAULT_IC_TYPE, DEFAULT_IMAGE, DEFAULT_PULL_POLICY,
-                      DEFAULT_SERVICE, NUM_REPLICAS)
+                      DEFAULT_SERVICE, NUM_REPLICAS, PERF_TESTS, REORDER_BY_IC_CONFIG)
+from suite.ordering_utils import reorder_items_by_ic_config
 from suite.resources_utils import get_first_pod_name
 
 
@@ -75,6 +76,19 @@ def pytest_addoption(parser) -> None:
         default="no",
         help="Show IC logs in stdout on test failure",
     )
+    parser.addoption(
+        "--time-profile",
+        action="store",
+        default="no",
+        help="Show where the wall-clock time of the tests goes and save a Chrome trace: yes/no",
+    )
+    parser.addoption(
+        "--api-stats",
+        action="store",
+        default="no",
+        help="Count Kubernetes API calls, latency and response sizes per group/verb/resource "
+        "and report top offenders: yes/no",
+    )
     parser.addoption(
         "--batch-start",
         action="store",
@@ -87,41 +101,71 @@ def pytest_addoption(parser) -> None:
         default=BATCH_RESOURCES,
         help="Number of VS/Ingress resources to deploy",
     )
+    parser.addoption(
+        "--perf-tests",
+        action="store",
+        default=PERF_TESTS,
+        help="Run the performance benchmarks: True/False",
+    )
+    parser.addoption(
+        "--ap-scale-policies",
+        action="store",
+        default=AP_SCALE_POLICIES,
+        help="Number of distinct AppProtect WAF policies the AP scale benchmark ends with",
+    )
+    parser.addoption(
+        "--reorder-by-ic-config",
+        action="store",
+        default=REORDER_BY_IC_CONFIG,
+        help="Run the test classes of a module with the same IC configuration back to back: True/False",
+    )
 
 
 # import fixtures into pytest global namespace
-pytest_plugins = ["suite.fixtures"]
+pytest_plugins = ["suite.fixtures", "suite.time_profiler", "suite.api_stats"]
+
+
+def skip_marked(items, keyword, reason) -> None:
+    """
+    Skip the test-items marked with a keyword.
+
+    :param items: pytest collected test-items
+    :param keyword: the marker, e.g. 'perf'
+    :param reason: the reason of the skip
+    :return:
+    """
+    skip = pytest.mark.skip(reason=reason)
+    for item in items:
+        if keyword in item.keywords:
+            item.add_marker(skip)
 
 
 def pytest_collection_modifyitems(config, items) -> None:
     """
     Skip tests marked with '@pytest.mark.skip_for_nginx_oss' for Nginx OSS runs.
     Skip tests marked with '@pytest.mark.appprotect' for non AP images.
+    Skip tests marked with '@pytest.mark.perf' unless the benchmarks are enabled.
+    Reorder test classes to minimize the number of IC restarts.
 
     :param config: pytest config
     :param items: pytest collected test-items
     :return:
     """
     if config.getoption("--ic-type") == "nginx-ingress":
-        skip_for_nginx_oss = pytest.mark.skip(reason="Skip a test for Nginx OSS")
-        for item in items:
-            if "skip_for_nginx_oss" in item.keywords:
-                item.add_marker(skip_for_nginx_oss)
+        skip_marked(items, "skip_for_nginx_oss", "Skip a test for Nginx OSS")
     if config.getoption("--ic-type") == "nginx-plus-ingress":
-        skip_for_nginx_plus = pytest.mark.skip(reason="Skip a test for Nginx Plus")
-        for item in items:
-            if "skip_for_nginx_plus" in item.keywords:
-                item.add_marker(skip_for_nginx_plus)
+        skip_marked(items, "skip_for_nginx_plus", "Skip a test for Nginx Plus")
     if "-ap" not in config.getoption("--image"):
-        appprotect = pytest.mark.skip(reason="Skip AppProtect test in non-AP image")
-        for item in items:
-            if "appprotect" in item.keywords:
-                item.add_marker(appprotect)
+        skip_marked(items, "appprotect", "Skip AppProtect test in non-AP image")
     if str(config.getoption("--batch-start")) != "True":
-        batch_start = pytest.mark.skip(reason="Skipping pod restart test with multiple resources")
-        for item in items:
-            if "batch_start" in item.keywords:
-                item.add_marker(batch_start)
+        skip_marked(items, "batch_start", "Skipping pod restart test with multiple resources")
+    if str(config.getoption("--perf-tests")) != "True":
+        skip_marked(items, "perf", "Skipping performance benchmark")
+    if str(config.getoption("--reorder-by-ic-config")) == "True":
+        before, after = reorder_items_by_ic_config(items)
+        reporter = config.pluginmanager.get_plugin("terminalreporter")
+        if reporter is not None:
+            reporter.write_line(f"Predicted IC restarts: {before} in the file order, {after} after reordering")
 
 
 @pytest.hookimpl(tryfirst=True, hookwrapper=True)
@@ -15,9 +15,20 @@ DEFAULT_SERVICE = "nodeport"
 ALLOWED_SERVICE_TYPES = ["nodeport", "loadbalancer"]
 DEFAULT_DEPLOYMENT_TYPE = "deployment"
 ALLOWED_DEPLOYMENT_TYPES = ["deployment", "daemon-set"]
+# API groups of the CRDs in deployments/common/crds
+CRD_GROUP = "k8s.nginx.org"
+AP_CRD_GROUP = "appprotect.f5.com"
 BATCH_START = "False"
+# Run the performance benchmarks marked with @pytest.mark.perf
+PERF_TESTS = "False"
+# Order test classes to minimize the number of IC restarts
+REORDER_BY_IC_CONFIG = "True"
 # Number of Ingress/VS resources to deploy based on BATCH_START value, ref. line #264 in rresource_utils.py
 BATCH_RESOURCES = 1
+# Number of distinct AppProtect WAF policies the scale benchmark ends with
+AP_SCALE_POLICIES = 100
+# Number of test namespaces to create in advance
+NAMESPACE_POOL_SIZE = 2
 # Time in seconds to ensure reconfiguration changes in cluster
 RECONFIGURATION_DELAY = 3
 NGINX_API_VERSION = 4
@@ -0,0 +1,183 @@
+"""Describe methods to measure how long AppProtect changes take to compile, reload and be enforced."""
+
+import json
+import time
+
+import requests
+
+from suite.resources_utils import get_reload_metrics
+
+invalid_resp_title = "Request Rejected"
+
+
+def is_request_blocked(req_url, host, data=None) -> bool:
+    """
+    Send a request and check that AppProtect rejected it.
+
+    :param req_url: url
+    :param host: the host header
+    :param data: the request body, e.g. a user-defined signature string
+    :return: bool
+    """
+    try:
+        resp = requests.get(req_url, headers={"host": host}, data=data, verify=False, timeout=5)
+    except requests.RequestException:
+        return False
+    return resp.status_code == 200 and invalid_resp_title in resp.text
+
+
+def is_request_allowed(req_url, host, data=None) -> bool:
+    """
+    Send a request and check that the backend responded, AppProtect did not reject it.
+
+    :param req_url: url
+    :param host: the host header
+    :param data: the request body, e.g. a user-defined signature string
+    :return: bool
+    """
+    try:
+        resp = requests.get(req_url, headers={"host": host}, data=data, verify=False, timeout=5)
+    except requests.RequestException:
+        return False
+    return resp.status_code == 200 and "Server address:" in resp.text
+
+
+def wait_for_probe(probe, timeout=180, interval=0.5) -> float:
+    """
+    Poll a probe until it passes.
+
+    :param probe: a function without arguments that returns bool
+    :param timeout: seconds
+    :param interval: seconds between the probes
+    :return: seconds it took, None after the timeout
+    """
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if probe():
+            return time.perf_counter() - start
+        time.sleep(interval)
+    return None
+
+
+def wait_for_reload(metrics_url, count, timeout=180, interval=0.5) -> float:
+    """
+    Wait until the reload count is above the one read before a change.
+
+    :param metrics_url: IC /metrics url
+    :param count: the reload count before the change
+    :param timeout: seconds
+    :param interval: seconds between the reads
+    :return: seconds it took, None after the timeout
+    """
+    return wait_for_probe(lambda: get_reload_metrics(metrics_url)[0] > count, timeout, interval)
+
+
+class ApScenario:
+    """
+    Encapsulate a change of the AppProtect resources and how its effect is detected.
+
+    Attributes:
+        name (str):
+        prepare (function): creates the resources before the change and waits for them, no arguments
+        change (function): the measured change, no arguments
+        probe (function): returns True once the change is in effect, None to wait for the reload only
+        cleanup (function): deletes the resources of the scenario, no arguments
+    """
+
+    def __init__(self, name, prepare, change, probe, cleanup):
+        self.name = name
+        self.prepare = prepare
+        self.change = change
+        self.probe = probe
+        self.cleanup = cleanup
+
+
+class ApScenarioResult:
+    """
+    Encapsulate a repetition of a scenario.
+
+    Attributes:
+        scenario (str):
+        repetition (int):
+        enforced_s (float): seconds from the change until the probe passed or the reload, None after the timeout
+        reloads (int): the reloads from the change until it was in effect
+        reload_ms (float): the duration of the last reload
+    """
+
+    def __init__(self, scenario, repetition, enforced_s, reloads, reload_ms):
+        self.scenario = scenario
+        self.repetition = repetition
+        self.enforced_s = enforced_s
+        self.reloads = reloads
+        self.reload_ms = reload_ms
+
+
+class ApBenchmarkReport:
+    """
+    Encapsulate the results of all the repetitions of the scenarios.
+
+    Attributes:
+        results ([ApScenarioResult]):
+    """
+
+    def __init__(self, results):
+        self.results = results
+
+    @property
+    def timed_out(self) -> [str]:
+        return [f"{r.scenario} #{r.repetition}" for r in self.results if r.enforced_s is None]
+
+    def scenario_results(self, scenario) -> [ApScenarioResult]:
+        return [r for r in self.results if r.scenario == scenario]
+
+    def summary(self) -> str:
+        lines = [f"{'scenario':<24} {'runs':>4} {'enforced min/median/max':>25} {'reloads':>7} {'reload median':>13}"]
+        for scenario in dict.fromkeys(r.scenario for r in self.results):
+            results = self.scenario_results(scenario)
+            times = sorted(r.enforced_s for r in results if r.enforced_s is not None) or [0.0]
+            reload_ms = sorted(r.reload_ms for r in results)
+            lines.append(
+                f"{scenario:<24} {len(results):>4} "
+                f"{f'{times[0]:.1f}s/{times[len(times) // 2]:.1f}s/{times[-1]:.1f}s':>25} "
+                f"{sum(r.reloads for r in results) / len(results):>7.1f} {reload_ms[len(reload_ms) // 2]:>11.0f}ms"
+            )
+        return "\n".join(lines)
+
+    def write_json(self, file_name) -> None:
+        with open(file_name, "w+") as f:
+            json.dump([r.__dict__ for r in self.results], f, ensure_ascii=False, indent=4)
+
+
+def run_ap_benchmark(scenarios, metrics_url, repetitions=3, timeout=180) -> ApBenchmarkReport:
+    """
+    Run every scenario several times and measure the time from the change until it is in effect.
+
+    :param scenarios: [ApScenario]
+    :param metrics_url: IC /metrics url
+    :param repetitions: runs of every scenario
+    :param timeout: seconds to wait for a change to be in effect
+    :return: ApBenchmarkReport
+    """
+    results = []
+    for scenario in scenarios:
+        for repetition in range(1, repetitions + 1):
+            print(f"------------------------- {scenario.name} #{repetition} -----------------------------------")
+            try:
+                scenario.prepare()
+                count, _ = get_reload_metrics(metrics_url)
+                start = time.perf_counter()
+                scenario.change()
+                if scenario.probe is not None:
+                    enforced_s = wait_for_probe(scenario.probe, timeout)
+                else:
+                    enforced_s = wait_for_reload(metrics_url, count, timeout)
+                if enforced_s is not None:
+                    enforced_s = time.perf_counter() - start
+                current, reload_ms = get_reload_metrics(metrics_url)
+                results.append(ApScenarioResult(scenario.name, repetition, enforced_s, current - count, reload_ms))
+                print(f"{scenario.name} #{repetition}: in effect after {enforced_s}s, {current - count} reloads")
+            finally:
+                scenario.cleanup()
+    report = ApBenchmarkReport(results)
+    print(report.summary())
+    return report
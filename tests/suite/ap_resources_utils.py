@@ -31,6 +31,25 @@ def read_ap_custom_resource(custom_objects: CustomObjectsApi, namespace, plural,
         raise
 
 
+def patch_ap_custom_resource(custom_objects: CustomObjectsApi, namespace, plural, name, body) -> None:
+    """
+    Patch an AppProtect custom resource, e.g. the enforcement mode of a policy or the filter of a logconf.
+    :param custom_objects: CustomObjectsApi
+    :param namespace: The custom resource's namespace
+    :param plural: the custom resource's plural name
+    :param name: the custom object's name
+    :param body: a merge patch dict
+    :return:
+    """
+    print(f"Patch {plural} {name} in namespace {namespace}")
+    try:
+        custom_objects.patch_namespaced_custom_object(
+            "appprotect.f5.com", "v1beta1", namespace, plural, name, body
+        )
+    except ApiException:
+        logging.exception(f"Exception occurred while patching {plural} {name}")
+        raise
+
 
 def create_ap_waf_policy_from_yaml(
     custom_objects: CustomObjectsApi,
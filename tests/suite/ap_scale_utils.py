@@ -0,0 +1,455 @@
+"""Describe methods to measure how the AppProtect handling of the IC scales with many distinct WAF policies."""
+
+import copy
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+from kubernetes.client import CustomObjectsApi
+from kubernetes.client.rest import ApiException
+
+from suite.ap_benchmark_utils import is_request_blocked
+from suite.resources_utils import get_first_pod_name, get_reload_metrics, restart_ingress_controller
+from suite.stats_utils import PeriodicSampler, get_percentile
+from suite.worker_utils import isolate_manifest
+
+# the standard signature sets of AppProtect, every policy blocks a different combination of them
+SIGNATURE_SETS = [
+    "High Accuracy Signatures",
+    "Generic Detection Signatures (High/Medium Accuracy)",
+    "SQL Injection Signatures",
+    "Cross Site Scripting Signatures",
+    "Command Execution Signatures",
+    "Path Traversal Signatures",
+    "OS Command Injection Signatures",
+    "Server Side Code Injection Signatures",
+]
+
+
+def signature_sets_for(index) -> [str]:
+    """
+    Pick a combination of the standard signature sets, the same index gives the same combination.
+
+    :param index: the index of the policy
+    :return: [str]
+    """
+    combinations = [c for size in (1, 2, 3) for c in itertools.combinations(SIGNATURE_SETS, size)]
+    return list(combinations[index % len(combinations)])
+
+
+def build_ap_policy(template, index) -> dict:
+    """
+    Build a distinct APPolicy from a template, the user-defined signature sets of the template are kept.
+
+    :param template: an APPolicy dict
+    :param index: the index of the policy
+    :return: dict
+    """
+    doc = copy.deepcopy(template)
+    name = f"ap-scale-{index}"
+    doc["metadata"]["name"] = name
+    policy = doc["spec"]["policy"]
+    policy["name"] = name
+    policy["signature-sets"] = policy.get("signature-sets", []) + [
+        {"name": sig_set, "block": True, "alarm": True} for sig_set in signature_sets_for(index)
+    ]
+    return doc
+
+
+def build_waf_policy(template, index, ap_namespace, aplogconf, logdest) -> dict:
+    """
+    Build a WAF Policy that references the APPolicy of the index.
+
+    :param template: a Policy dict
+    :param index: the index of the policy
+    :param ap_namespace: namespace of the AppProtect resources
+    :param aplogconf: Logconf name
+    :param logdest: AP log destination (syslog)
+    :return: dict
+    """
+    doc = copy.deepcopy(template)
+    doc["metadata"]["name"] = f"waf-scale-{index}"
+    doc["spec"]["waf"]["enable"] = True
+    doc["spec"]["waf"]["apPolicy"] = f"{ap_namespace}/ap-scale-{index}"
+    doc["spec"]["waf"]["securityLog"] = {
+        "enable": True,
+        "apLogConf": f"{ap_namespace}/{aplogconf}",
+        "logDest": logdest,
+    }
+    return doc
+
+
+def build_waf_virtual_server(template, index) -> dict:
+    """
+    Build a VS with its own host that applies the WAF Policy of the index.
+
+    :param template: a VirtualServer dict
+    :param index: the index of the policy
+    :return: dict
+    """
+    doc = copy.deepcopy(template)
+    doc["metadata"]["name"] = f"ap-scale-vs-{index}"
+    doc["spec"]["host"] = f"ap-scale-{index}.example.com"
+    doc["spec"]["policies"] = [{"name": f"waf-scale-{index}"}]
+    return doc
+
+
+class ApScaleTemplates:
+    """
+    Encapsulate the manifests the scale resources are derived from.
+
+    Attributes:
+        ap_policy (dict): APPolicy
+        waf_policy (dict): Policy
+        virtual_server (dict): VirtualServer
+        ap_namespace (str): namespace of the AppProtect resources
+        aplogconf (str): Logconf name
+        logdest (str): AP log destination (syslog)
+    """
+
+    def __init__(self, ap_policy_yaml, waf_policy_yaml, virtual_server_yaml, ap_namespace, aplogconf, logdest):
+        self.ap_policy = load_manifest(ap_policy_yaml)
+        self.waf_policy = load_manifest(waf_policy_yaml)
+        self.virtual_server = load_manifest(virtual_server_yaml)
+        self.ap_namespace = ap_namespace
+        self.aplogconf = aplogconf
+        self.logdest = logdest
+
+
+def load_manifest(yaml_manifest) -> dict:
+    with open(yaml_manifest) as f:
+        return yaml.safe_load(f)
+
+
+def create_ap_scale_resources(custom_objects: CustomObjectsApi, templates, indices, namespace, workers=16) -> float:
+    """
+    Create the APPolicy, the WAF Policy and the VS of every index concurrently.
+
+    :param custom_objects: CustomObjectsApi
+    :param templates: ApScaleTemplates
+    :param indices: the indices of the policies
+    :param namespace:
+    :param workers: number of the concurrent API clients
+    :return: seconds it took to submit all the resources
+    """
+
+    def create(index):
+        custom_objects.create_namespaced_custom_object(
+            "appprotect.f5.com", "v1beta1", templates.ap_namespace, "appolicies",
+            build_ap_policy(templates.ap_policy, index),
+        )
+        custom_objects.create_namespaced_custom_object(
+            "k8s.nginx.org", "v1", namespace, "policies",
+            isolate_manifest(build_waf_policy(
+                templates.waf_policy, index, templates.ap_namespace, templates.aplogconf, templates.logdest
+            )),
+        )
+        custom_objects.create_namespaced_custom_object(
+            "k8s.nginx.org", "v1", namespace, "virtualservers",
+            isolate_manifest(build_waf_virtual_server(templates.virtual_server, index)),
+        )
+
+    print(f"Create {len(indices)} APPolicies with their WAF Policies and VirtualServers")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(create, indices))
+    return time.perf_counter() - start
+
+
+def delete_ap_scale_resources(custom_objects: CustomObjectsApi, indices, ap_namespace, namespace, workers=16) -> None:
+    """
+    Delete the resources of every index concurrently, the ones that do not exist are skipped.
+
+    :param custom_objects: CustomObjectsApi
+    :param indices: the indices of the policies
+    :param ap_namespace: namespace of the AppProtect resources
+    :param namespace:
+    :param workers: number of the concurrent API clients
+    :return:
+    """
+
+    def delete(index):
+        for group, version, ns, plural, name in [
+            ("k8s.nginx.org", "v1", namespace, "virtualservers", f"ap-scale-vs-{index}"),
+            ("k8s.nginx.org", "v1", namespace, "policies", f"waf-scale-{index}"),
+            ("appprotect.f5.com", "v1beta1", ap_namespace, "appolicies", f"ap-scale-{index}"),
+        ]:
+            try:
+                custom_objects.delete_namespaced_custom_object(group, version, ns, plural, name)
+            except ApiException as ex:
+                if ex.status != 404:
+                    raise
+
+    print(f"Delete {len(indices)} APPolicies with their WAF Policies and VirtualServers")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(delete, indices))
+
+
+def get_pod_memory_mib(custom_objects: CustomObjectsApi, name, namespace) -> float:
+    """
+    Get the memory of all the containers of a pod from the metrics API (kubectl top).
+
+    :param custom_objects: CustomObjectsApi
+    :param name: pod name
+    :param namespace:
+    :return: MiB, None if the metrics-server is not installed
+    """
+    try:
+        metrics = custom_objects.get_namespaced_custom_object("metrics.k8s.io", "v1beta1", namespace, "pods", name)
+    except ApiException:
+        return None
+    units = {"Ki": 1 / 1024, "Mi": 1, "Gi": 1024, "": 1 / 1024 / 1024}
+    total = 0.0
+    for container in metrics["containers"]:
+        memory = container["usage"]["memory"]
+        unit = memory[-2:] if memory[-2:] in units else ""
+        total += float(memory[: len(memory) - len(unit)]) * units[unit]
+    return total
+
+
+class PodMemorySampler(PeriodicSampler):
+    """
+    Sample the memory of the IC pod in a background thread.
+
+    Attributes:
+        custom_objects (CustomObjectsApi):
+        pod_name (str):
+        namespace (str):
+        interval (float): seconds between the samples
+        samples ([float]): MiB
+    """
+
+    def __init__(self, custom_objects, pod_name, namespace, interval=5.0):
+        super().__init__(interval)
+        self.custom_objects = custom_objects
+        self.pod_name = pod_name
+        self.namespace = namespace
+        self.samples = []
+
+    def sample(self) -> None:
+        memory = get_pod_memory_mib(self.custom_objects, self.pod_name, self.namespace)
+        if memory is not None:
+            self.samples.append(memory)
+
+    @property
+    def peak(self) -> float:
+        return max(self.samples) if self.samples else None
+
+
+def wait_for_enforcement(url, indices, start, timeout=600, interval=1.0, workers=16) -> {int: float}:
+    """
+    Probe the host of every index with a blocked request until each one is rejected.
+
+    :param url: the url of a blocked request, e.g. https://<ip>:<port>/backend1/<script>
+    :param indices: the indices of the policies
+    :param start: time.perf_counter() of the change
+    :param timeout: seconds
+    :param interval: seconds between the rounds of the probes
+    :param workers: number of the concurrent probes
+    :return: index -> seconds from the change until it was enforced, the ones not enforced are missing
+    """
+    enforced = {}
+    pending = list(indices)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending and time.perf_counter() - start < timeout:
+            blocked = executor.map(lambda i: is_request_blocked(url, f"ap-scale-{i}.example.com"), pending)
+            now = time.perf_counter()
+            for index, is_blocked in zip(list(pending), blocked):
+                if is_blocked:
+                    enforced[index] = now - start
+                    pending.remove(index)
+            if pending:
+                time.sleep(interval)
+    if pending:
+        print(f"{len(pending)} policies not enforced after {timeout}s")
+    return enforced
+
+
+class ApScaleStep:
+    """
+    Encapsulate the measurements after the policies of a step were added.
+
+    Attributes:
+        total (int): the policies present after the step
+        added (int): the policies the step added
+        submit_s (float): seconds to submit the resources
+        compile_s ([float]): seconds from the submit until every added policy was enforced
+        missing (int): the added policies that were not enforced
+        reloads (int):
+        reload_ms (float): the duration of the last reload
+        memory_mib (float): IC pod memory after the step, None without the metrics-server
+        peak_memory_mib (float): the most IC pod memory during the step, None without the metrics-server
+    """
+
+    def __init__(self, total, added, submit_s, compile_s, missing, reloads, reload_ms, memory_mib,
+                 peak_memory_mib):
+        self.total = total
+        self.added = added
+        self.submit_s = submit_s
+        self.compile_s = compile_s
+        self.missing = missing
+        self.reloads = reloads
+        self.reload_ms = reload_ms
+        self.memory_mib = memory_mib
+        self.peak_memory_mib = peak_memory_mib
+
+    @property
+    def enforced_s(self) -> float:
+        return max(self.compile_s) if self.compile_s else 0.0
+
+    @property
+    def per_policy_s(self) -> float:
+        return self.enforced_s / self.added if self.added else 0.0
+
+    def compile_percentile(self, percentile) -> float:
+        return get_percentile(self.compile_s, percentile)
+
+
+class ApScaleReport:
+    """
+    Encapsulate the steps of a scale run and the startup with all the policies present.
+
+    Attributes:
+        steps ([ApScaleStep]):
+        baseline_memory_mib (float): IC pod memory before the first step, None without the metrics-server
+        startup_ready_s (float): seconds until the IC pod was ready after scaling up
+        startup_enforced_s (float): seconds until every policy was enforced after scaling up
+        startup_missing (int): the policies not enforced after the startup
+    """
+
+    def __init__(self, steps, baseline_memory_mib=None, startup_ready_s=None, startup_enforced_s=None,
+                 startup_missing=0):
+        self.steps = steps
+        self.baseline_memory_mib = baseline_memory_mib
+        self.startup_ready_s = startup_ready_s
+        self.startup_enforced_s = startup_enforced_s
+        self.startup_missing = startup_missing
+
+    def nonlinear_steps(self, factor=2.0) -> [ApScaleStep]:
+        """
+        Get the steps where the time or the memory per added policy grew more than a factor over the first step.
+
+        :param factor: the growth that counts as non-linear
+        :return: [ApScaleStep]
+        """
+        if not self.steps:
+            return []
+        first = self.steps[0]
+        first_memory = self.memory_per_policy(0)
+        found = []
+        for i, step in enumerate(self.steps[1:], 1):
+            slower = first.per_policy_s and step.per_policy_s > first.per_policy_s * factor
+            memory = self.memory_per_policy(i)
+            heavier = first_memory and memory is not None and memory > first_memory * factor
+            if slower or heavier:
+                found.append(step)
+        return found
+
+    def memory_per_policy(self, i) -> float:
+        """
+        Get the memory growth per policy the step added.
+
+        :param i: the index of the step
+        :return: MiB, None without the metrics-server
+        """
+        before = self.baseline_memory_mib if i == 0 else self.steps[i - 1].memory_mib
+        after = self.steps[i].memory_mib
+        if before is None or after is None or not self.steps[i].added:
+            return None
+        return (after - before) / self.steps[i].added
+
+    def summary(self) -> str:
+        lines = [
+            f"{'total':>6} {'added':>6} {'submit':>8} {'enforced':>9} {'per policy':>10} {'p50':>7} {'p95':>7} "
+            f"{'missing':>7} {'reloads':>7} {'reload':>9} {'memory':>9} {'peak':>9}"
+        ]
+        for s in self.steps:
+            memory = f"{s.memory_mib:.0f}MiB" if s.memory_mib is not None else "n/a"
+            peak = f"{s.peak_memory_mib:.0f}MiB" if s.peak_memory_mib is not None else "n/a"
+            lines.append(
+                f"{s.total:>6} {s.added:>6} {s.submit_s:>7.1f}s {s.enforced_s:>8.1f}s {s.per_policy_s:>9.2f}s "
+                f"{s.compile_percentile(50):>6.1f}s {s.compile_percentile(95):>6.1f}s {s.missing:>7} "
+                f"{s.reloads:>7} {s.reload_ms:>7.0f}ms {memory:>9} {peak:>9}"
+            )
+        if self.startup_ready_s is not None:
+            lines.append(
+                f"startup with {self.steps[-1].total} policies: ready in {self.startup_ready_s:.1f}s, "
+                f"all enforced in {self.startup_enforced_s:.1f}s, {self.startup_missing} not enforced"
+            )
+        nonlinear = self.nonlinear_steps()
+        if nonlinear:
+            lines.append(f"non-linear from {nonlinear[0].total} policies")
+        return "\n".join(lines)
+
+
+def scale_steps(total) -> [int]:
+    """
+    Get the totals of the steps up to a number of policies: 1, 2, 5, 10, 20, 50, ... and the number itself.
+
+    :param total: the policies present after the last step
+    :return: [int]
+    """
+    steps = []
+    base = 1
+    while base < total:
+        steps.extend(value for value in (base, base * 2, base * 5) if value < total)
+        base *= 10
+    return steps + [total]
+
+
+def run_ap_scale(kube_apis, templates, steps, namespace, ic_namespace, ic_name, url, metrics_url, timeout=600,
+                 startup=True) -> ApScaleReport:
+    """
+    Add distinct WAF policies in steps and measure the compile time, the reloads and the memory of the IC.
+
+    The resources are left in place, delete them with delete_ap_scale_resources.
+
+    :param kube_apis: client apis
+    :param templates: ApScaleTemplates
+    :param steps: the totals of the policies after every step, ascending
+    :param namespace: namespace of the WAF Policies and the VSes
+    :param ic_namespace: namespace of the IC
+    :param ic_name: name of the IC deployment
+    :param url: the url of a blocked request
+    :param metrics_url: IC /metrics url
+    :param timeout: seconds to wait for the policies of a step
+    :param startup: restart the IC with all the policies present at the end
+    :return: ApScaleReport
+    """
+    pod_name = get_first_pod_name(kube_apis.v1, ic_namespace)
+    baseline_memory_mib = get_pod_memory_mib(kube_apis.custom_objects, pod_name, ic_namespace)
+    results = []
+    previous = 0
+    for total in steps:
+        print(f"------------------------- Step: {total} policies -----------------------------------")
+        indices = list(range(previous + 1, total + 1))
+        count, _ = get_reload_metrics(metrics_url)
+        sampler = PodMemorySampler(kube_apis.custom_objects, pod_name, ic_namespace)
+        sampler.start()
+        try:
+            start = time.perf_counter()
+            submit_s = create_ap_scale_resources(kube_apis.custom_objects, templates, indices, namespace)
+            enforced = wait_for_enforcement(url, indices, start, timeout)
+        finally:
+            sampler.stop()
+        current, reload_ms = get_reload_metrics(metrics_url)
+        results.append(ApScaleStep(
+            total, len(indices), submit_s, list(enforced.values()), len(indices) - len(enforced),
+            current - count, reload_ms, get_pod_memory_mib(kube_apis.custom_objects, pod_name, ic_namespace),
+            sampler.peak,
+        ))
+        previous = total
+    report = ApScaleReport(results, baseline_memory_mib)
+    if startup and steps:
+        print(f"------------------------- Startup with {steps[-1]} policies -----------------------------------")
+        report.startup_ready_s = restart_ingress_controller(
+            kube_apis.v1, kube_apis.apps_v1_api, ic_namespace, ic_name
+        )
+        # the enforcement counts from the scale up, like the readiness
+        start = time.perf_counter() - report.startup_ready_s
+        enforced = wait_for_enforcement(url, range(1, steps[-1] + 1), start, timeout)
+        report.startup_enforced_s = max(enforced.values()) if enforced else 0.0
+        report.startup_missing = steps[-1] - len(enforced)
+    print(report.summary())
+    return report
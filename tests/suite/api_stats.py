@@ -0,0 +1,219 @@
+"""Describe a pytest plugin that counts the Kubernetes API calls made by the tests."""
+
+import bisect
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from settings import PROJECT_ROOT
+
+# upper bounds of the latency histogram buckets in milliseconds
+LATENCY_BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf")]
+OUTPUT_DIR = f"{PROJECT_ROOT}/api_stats"
+TOP_OFFENDERS = 15
+
+
+def parse_api_call(method, url, query_params=None) -> (str, str, str):
+    """
+    Get the API group, the verb and the resource of a Kubernetes API request.
+
+    :param method: HTTP method
+    :param url: request url
+    :param query_params: a list of (name, value) query params the client sends separately from the url
+    :return: (group, verb, resource), e.g. ('core', 'list', 'pods') or ('apps', 'patch', 'deployments/scale')
+    """
+    parsed = urlparse(url)
+    parts = [part for part in parsed.path.split("/") if part]
+    if parts[:1] == ["api"]:
+        group, rest = "core", parts[2:]
+    elif parts[:1] == ["apis"] and len(parts) >= 3:
+        group, rest = parts[1], parts[3:]
+    else:
+        return "other", method.lower(), parsed.path
+    if rest[:1] == ["namespaces"] and len(rest) > 2:
+        rest = rest[2:]
+    resource = rest[0] if rest else ""
+    has_name = len(rest) > 1
+    if len(rest) > 2:
+        resource = f"{resource}/{rest[2]}"
+    query = parse_qs(parsed.query)
+    query.update({name: [str(value).lower()] for name, value in query_params or []})
+    if method == "GET":
+        if query.get("watch", ["false"])[0] in ["true", "1"]:
+            verb = "watch"
+        else:
+            verb = "get" if has_name else "list"
+    elif method == "DELETE":
+        verb = "delete" if has_name else "deletecollection"
+    else:
+        verb = {"POST": "create", "PUT": "update", "PATCH": "patch"}.get(method, method.lower())
+    return group, verb, resource
+
+
+class CallStats:
+    """
+    Encapsulate the stats of one kind of API calls.
+
+    Attributes:
+        count (int): number of calls
+        seconds (float): total latency
+        bytes (int): total size of the response bodies
+        histogram ([]): number of calls per LATENCY_BUCKETS bucket
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        self.histogram = [0] * len(LATENCY_BUCKETS)
+
+    def add(self, seconds, size) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.bytes += size
+        self.histogram[bisect.bisect_left(LATENCY_BUCKETS, seconds * 1000)] += 1
+
+    def percentile(self, p) -> float:
+        """
+        Estimate a latency percentile as the upper bound of the histogram bucket it falls into.
+
+        :param p: percentile, 0-100
+        :return: milliseconds
+        """
+        rank = self.count * p / 100
+        seen = 0
+        for bound, calls in zip(LATENCY_BUCKETS, self.histogram):
+            seen += calls
+            if seen >= rank and calls:
+                return bound
+        return 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "seconds": round(self.seconds, 3),
+            "bytes": self.bytes,
+            "histogram_ms": {str(bound): calls for bound, calls in zip(LATENCY_BUCKETS, self.histogram)},
+        }
+
+
+class ApiStats:
+    """
+    Record every request the kubernetes-client sends, keyed by API group, verb and resource.
+
+    Attributes:
+        totals (dict): (group, verb, resource) -> CallStats for the session
+        tests (dict): nodeid -> (group, verb, resource) -> CallStats
+        current (str): the nodeid of the running test or a fixture scope outside of tests
+    """
+
+    def __init__(self):
+        self.totals = {}
+        self.tests = {}
+        self.current = "session setup"
+        self.lock = threading.Lock()
+
+    def instrument(self, api_client) -> None:
+        """
+        Wrap the REST layer of an ApiClient to record the requests.
+
+        :param api_client: kubernetes.client.ApiClient
+        :return:
+        """
+        rest_client = api_client.rest_client
+        if getattr(rest_client, "api_stats_instrumented", False):
+            return
+        request = rest_client.request
+        stats = self
+
+        def recorded_request(method, url, *args, **kwargs):
+            start = time.perf_counter()
+            resp = request(method, url, *args, **kwargs)
+            seconds = time.perf_counter() - start
+            if kwargs.get("_preload_content", True) and hasattr(resp, "data"):
+                size = len(resp.data or b"")
+            else:
+                size = int(resp.getheader("Content-Length") or 0) if hasattr(resp, "getheader") else 0
+            stats.record(parse_api_call(method, url, kwargs.get("query_params")), seconds, size)
+            return resp
+
+        rest_client.request = recorded_request
+        rest_client.api_stats_instrumented = True
+
+    def record(self, key, seconds, size) -> None:
+        with self.lock:
+            self.totals.setdefault(key, CallStats()).add(seconds, size)
+            self.tests.setdefault(self.current, {}).setdefault(key, CallStats()).add(seconds, size)
+
+    def pytest_runtest_logstart(self, nodeid, location) -> None:
+        self.current = nodeid
+
+    def pytest_runtest_logfinish(self, nodeid, location) -> None:
+        self.current = "session teardown"
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        outcome = yield
+        if call.when != "teardown":
+            return
+        calls = self.tests.get(item.nodeid, {})
+        if calls:
+            lines = [format_row(key, stats) for key, stats in sorted(calls.items(), key=lambda c: -c[1].count)]
+            outcome.get_result().sections.append(("Kubernetes API calls", "\n".join([HEADER] + lines)))
+
+    def pytest_sessionfinish(self, session) -> None:
+        worker = os.environ.get("PYTEST_XDIST_WORKER", "")
+        suffix = f"-{worker}" if worker else ""
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        with open(f"{OUTPUT_DIR}/api-calls{suffix}.json", "w") as f:
+            json.dump(
+                {
+                    "totals": {"/".join(key): stats.to_dict() for key, stats in self.totals.items()},
+                    "tests": {
+                        nodeid: {"/".join(key): stats.to_dict() for key, stats in calls.items()}
+                        for nodeid, calls in self.tests.items()
+                    },
+                },
+                f,
+                indent=4,
+            )
+
+    def pytest_terminal_summary(self, terminalreporter) -> None:
+        terminalreporter.section("Kubernetes API calls: top offenders")
+        terminalreporter.write_line(f"By total latency, {sum(s.count for s in self.totals.values())} calls in total:")
+        terminalreporter.write_line(HEADER)
+        for key, stats in sorted(self.totals.items(), key=lambda c: -c[1].seconds)[:TOP_OFFENDERS]:
+            terminalreporter.write_line(format_row(key, stats))
+        terminalreporter.write_line("Tests by number of calls:")
+        per_test = [
+            (sum(s.count for s in calls.values()), sum(s.seconds for s in calls.values()), nodeid)
+            for nodeid, calls in self.tests.items()
+        ]
+        for count, seconds, nodeid in sorted(per_test, reverse=True)[:TOP_OFFENDERS]:
+            terminalreporter.write_line(f"{count:>7} {seconds:>9.1f}s  {nodeid}")
+        terminalreporter.write_line(f"Per-test stats with latency histograms are in {OUTPUT_DIR}")
+
+
+HEADER = f"{'calls':>7} {'seconds':>9} {'p50ms':>7} {'p90ms':>7} {'p99ms':>7} {'KiB':>9}  group/verb/resource"
+
+
+def format_row(key, stats) -> str:
+    return (
+        f"{stats.count:>7} {stats.seconds:>9.1f} {stats.percentile(50):>7} {stats.percentile(90):>7} "
+        f"{stats.percentile(99):>7} {stats.bytes / 1024:>9.1f}  {'/'.join(key)}"
+    )
+
+
+def pytest_configure(config) -> None:
+    """
+    Register the API stats recorder if it is enabled with the '--api-stats' cli argument.
+
+    :param config: pytest config
+    :return:
+    """
+    if config.getoption("--api-stats", "no") == "yes":
+        config.pluginmanager.register(ApiStats(), "api_stats")
@@ -0,0 +1,207 @@
+"""Describe methods to measure how the changes of the ConfigMap keys propagate to the NGINX config."""
+
+import time
+
+import requests
+from kubernetes.client import CoreV1Api
+
+from suite.resources_utils import get_file_contents, get_reload_metrics, patch_configmap_data
+from suite.vs_vsr_resources_utils import get_vs_nginx_template_conf
+
+
+class ConfigMapKeyCase:
+    """
+    Encapsulate a change of one ConfigMap key.
+
+    Attributes:
+        key (str):
+        value (str):
+        expected (str): the line the change makes in the config
+        config (str): 'main' for /etc/nginx/nginx.conf, 'vs' for the config of the VS
+    """
+
+    def __init__(self, key, value, expected, config):
+        self.key = key
+        self.value = value
+        self.expected = expected
+        self.config = config
+
+
+# the defaults do not make the expected lines, see the templates in internal/configs
+CONFIGMAP_KEY_CASES = [
+    ConfigMapKeyCase("worker-processes", "3", "worker_processes  3;", "main"),
+    ConfigMapKeyCase("worker-connections", "2048", "worker_connections  2048;", "main"),
+    ConfigMapKeyCase("worker-shutdown-timeout", "5m", "worker_shutdown_timeout 5m;", "main"),
+    ConfigMapKeyCase("keepalive-timeout", "75s", "keepalive_timeout 75s;", "main"),
+    ConfigMapKeyCase("keepalive-requests", "500", "keepalive_requests 500;", "main"),
+    ConfigMapKeyCase("server-names-hash-max-size", "2048", "server_names_hash_max_size 2048;", "main"),
+    ConfigMapKeyCase("variables-hash-bucket-size", "512", "variables_hash_bucket_size 512;", "main"),
+    ConfigMapKeyCase("ssl-protocols", "TLSv1.2", "ssl_protocols TLSv1.2;", "main"),
+    ConfigMapKeyCase("ssl-prefer-server-ciphers", "True", "ssl_prefer_server_ciphers on;", "main"),
+    ConfigMapKeyCase("proxy-connect-timeout", "33s", "proxy_connect_timeout 33s;", "vs"),
+    ConfigMapKeyCase("proxy-read-timeout", "33s", "proxy_read_timeout 33s;", "vs"),
+    ConfigMapKeyCase("client-max-body-size", "3m", "client_max_body_size 3m;", "vs"),
+    ConfigMapKeyCase("proxy-buffering", "False", "proxy_buffering off;", "vs"),
+    ConfigMapKeyCase("proxy-buffers", "8 8k", "proxy_buffers 8 8k;", "vs"),
+    ConfigMapKeyCase("proxy-buffer-size", "8k", "proxy_buffer_size 8k;", "vs"),
+    ConfigMapKeyCase("keepalive", "32", "keepalive 32;", "vs"),
+    ConfigMapKeyCase("max-fails", "5", "max_fails=5", "vs"),
+    ConfigMapKeyCase("fail-timeout", "15s", "fail_timeout=15s", "vs"),
+]
+
+
+class ConfigMapKeyResult:
+    """
+    Encapsulate the measurements of a ConfigMap key case.
+
+    Attributes:
+        case (ConfigMapKeyCase):
+        propagation_s (float): seconds from the patch until the config has the change, None if it never did
+        reloads (int): the reloads of the change
+        reload_ms (float): the duration of the last reload of the change
+        restore_s (float): seconds from the patch that removes the key until the change is gone
+        restore_reloads (int): the reloads of the restore
+    """
+
+    def __init__(self, case, propagation_s, reloads, reload_ms, restore_s, restore_reloads):
+        self.case = case
+        self.propagation_s = propagation_s
+        self.reloads = reloads
+        self.reload_ms = reload_ms
+        self.restore_s = restore_s
+        self.restore_reloads = restore_reloads
+
+
+class ConfigMapBenchmarkReport:
+    """
+    Encapsulate the results of the ConfigMap key cases.
+
+    Attributes:
+        results ([ConfigMapKeyResult]):
+    """
+
+    def __init__(self, results):
+        self.results = results
+
+    @property
+    def not_propagated(self) -> [str]:
+        return [r.case.key for r in self.results if r.propagation_s is None or r.restore_s is None]
+
+    def summary(self) -> str:
+        lines = [
+            f"{'key':<30} {'config':<6} {'propagation':>11} {'reloads':>7} {'reload':>8} {'restore':>8} {'reloads':>7}"
+        ]
+        for r in self.results:
+            propagation = f"{r.propagation_s:.2f}s" if r.propagation_s is not None else "timeout"
+            restore = f"{r.restore_s:.2f}s" if r.restore_s is not None else "timeout"
+            lines.append(
+                f"{r.case.key:<30} {r.case.config:<6} {propagation:>11} {r.reloads:>7} "
+                f"{r.reload_ms:>6.0f}ms {restore:>8} {r.restore_reloads:>7}"
+            )
+        return "\n".join(lines)
+
+
+def config_reader(v1: CoreV1Api, ic_pod_name, ic_namespace, vs_namespace, vs_name):
+    """
+    Read the config a ConfigMap key case changes.
+
+    :param v1: CoreV1Api
+    :param ic_pod_name:
+    :param ic_namespace:
+    :param vs_namespace:
+    :param vs_name:
+    :return: a function that takes 'main' or 'vs' and returns the config
+    """
+
+    def read(config):
+        if config == "main":
+            return get_file_contents(v1, "/etc/nginx/nginx.conf", ic_pod_name, ic_namespace)
+        return get_vs_nginx_template_conf(v1, vs_namespace, vs_name, ic_pod_name, ic_namespace)
+
+    return read
+
+
+def wait_for_config(read_config, case, present, timeout=60, interval=0.2) -> float:
+    """
+    Wait until the config has or does not have the line of a case.
+
+    :param read_config: see config_reader
+    :param case: ConfigMapKeyCase
+    :param present: wait for the line to appear or to disappear
+    :param timeout: seconds
+    :param interval: seconds between the reads
+    :return: seconds it took, None after the timeout
+    """
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if (case.expected in read_config(case.config)) == present:
+            return time.perf_counter() - start
+        time.sleep(interval)
+    return None
+
+
+def measure_key_change(v1: CoreV1Api, name, namespace, case, value, read_config, metrics_url, session, timeout,
+                       settle) -> (float, int, float):
+    """
+    Patch one key and measure the propagation and the reloads.
+
+    :param v1: CoreV1Api
+    :param name: ConfigMap name
+    :param namespace: ConfigMap namespace
+    :param case: ConfigMapKeyCase
+    :param value: the value to set, None to remove the key
+    :param read_config: see config_reader
+    :param metrics_url: IC /metrics url
+    :param session: requests.Session to read the metrics
+    :param timeout: seconds to wait for the config and the reload
+    :param settle: seconds to count the late reloads after the first one
+    :return: (propagation seconds or None, reloads, duration of the last reload in ms)
+    """
+    count, _ = get_reload_metrics(metrics_url, session)
+    patch_configmap_data(v1, name, namespace, {case.key: value})
+    propagation_s = wait_for_config(read_config, case, value is not None, timeout)
+    # the config file is written before the reload, wait for the reload to be counted
+    deadline = time.perf_counter() + timeout
+    current, reload_ms = get_reload_metrics(metrics_url, session)
+    while current == count and time.perf_counter() < deadline:
+        time.sleep(0.2)
+        current, reload_ms = get_reload_metrics(metrics_url, session)
+    time.sleep(settle)
+    current, reload_ms = get_reload_metrics(metrics_url, session)
+    return propagation_s, current - count, reload_ms
+
+
+def run_configmap_key_benchmark(v1: CoreV1Api, name, namespace, read_config, metrics_url, cases=None, timeout=60,
+                                settle=3.0) -> ConfigMapBenchmarkReport:
+    """
+    Change every ConfigMap key alone, measure the propagation and the reloads, then remove the key the same way.
+
+    :param v1: CoreV1Api
+    :param name: ConfigMap name
+    :param namespace: ConfigMap namespace
+    :param read_config: see config_reader
+    :param metrics_url: IC /metrics url
+    :param cases: [ConfigMapKeyCase], CONFIGMAP_KEY_CASES by default
+    :param timeout: seconds to wait for a change in the config
+    :param settle: seconds to count the late reloads of a change
+    :return: ConfigMapBenchmarkReport
+    """
+    cases = cases or CONFIGMAP_KEY_CASES
+    print(f"Measure the propagation of {len(cases)} ConfigMap keys")
+    session = requests.Session()
+    results = []
+    try:
+        for case in cases:
+            print(f"Change the ConfigMap key {case.key}: {case.value}")
+            propagation_s, reloads, reload_ms = measure_key_change(
+                v1, name, namespace, case, case.value, read_config, metrics_url, session, timeout, settle
+            )
+            restore_s, restore_reloads, _ = measure_key_change(
+                v1, name, namespace, case, None, read_config, metrics_url, session, timeout, settle
+            )
+            results.append(ConfigMapKeyResult(case, propagation_s, reloads, reload_ms, restore_s, restore_reloads))
+    finally:
+        session.close()
+    report = ConfigMapBenchmarkReport(results)
+    print(report.summary())
+    return report
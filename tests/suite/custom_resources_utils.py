@@ -1,4 +1,7 @@
 """Describe methods to utilize the kubernetes-client."""
+import copy
+import hashlib
+import json
 import pytest
 import time
 import yaml
@@ -9,6 +12,7 @@ from kubernetes.client import CustomObjectsApi, ApiextensionsV1Api, CoreV1Api
 from kubernetes.client.rest import ApiException
 
 from suite.resources_utils import ensure_item_removal, get_file_contents
+from suite.worker_utils import isolate_manifest
 
 
 def create_crd(api_extensions_v1: ApiextensionsV1Api, body) -> None:
@@ -63,6 +67,145 @@ def delete_crd(api_extensions_v1: ApiextensionsV1Api, name) -> None:
     print(f"CRD was removed with name '{name}'")
 
 
+# the annotation keeps the hash of the manifest a CRD was registered from
+CRD_HASH_ANNOTATION = "nginx.org/e2e-content-hash"
+
+
+def get_crd_content_hash(body) -> str:
+    """
+    Get a hash of a CRD manifest.
+
+    :param body: a dict
+    :return: str
+    """
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def read_crd_as_dict(api_extensions_v1: ApiextensionsV1Api, name) -> dict:
+    """
+    Get a CRD as a plain dict.
+
+    The raw response is used to avoid the deserialization issue with empty conditions:
+    https://github.com/kubernetes-client/python/issues/376
+
+    :param api_extensions_v1: ApiextensionsV1Api
+    :param name: CRD name
+    :return: dict
+    """
+    resp = api_extensions_v1.read_custom_resource_definition(name, _preload_content=False)
+    return json.loads(resp.data)
+
+
+def apply_crd(api_extensions_v1: ApiextensionsV1Api, body) -> bool:
+    """
+    Create a CRD or replace it if the cluster has a CRD registered from a different manifest.
+
+    :param api_extensions_v1: ApiextensionsV1Api
+    :param body: a dict
+    :return: True if the CRD was created or replaced, False if it was up to date
+    """
+    name = body["metadata"]["name"]
+    content_hash = get_crd_content_hash(body)
+    body = copy.deepcopy(body)
+    body["metadata"].setdefault("annotations", {})[CRD_HASH_ANNOTATION] = content_hash
+    try:
+        existing = read_crd_as_dict(api_extensions_v1, name)
+    except ApiException as ex:
+        if ex.status != 404:
+            raise ex
+        print(f"Create a CRD with name: {name}")
+        create_crd(api_extensions_v1, body)
+        return True
+    if existing["metadata"].get("deletionTimestamp") is not None:
+        print(f"CRD {name} is being removed, wait and create it again")
+        ensure_item_removal(api_extensions_v1.read_custom_resource_definition, name)
+        create_crd(api_extensions_v1, body)
+        return True
+    if (existing["metadata"].get("annotations") or {}).get(CRD_HASH_ANNOTATION) == content_hash:
+        print(f"CRD {name} is up to date")
+        return False
+    print(f"Replace a CRD with name: {name}")
+    body["metadata"]["resourceVersion"] = existing["metadata"]["resourceVersion"]
+    api_extensions_v1.replace_custom_resource_definition(name, body, _preload_content=False)
+    return True
+
+
+def is_crd_established(api_extensions_v1: ApiextensionsV1Api, name) -> bool:
+    """
+    Check if a CRD has the Established condition.
+
+    :param api_extensions_v1: ApiextensionsV1Api
+    :param name: CRD name
+    :return: bool
+    """
+    conditions = read_crd_as_dict(api_extensions_v1, name).get("status", {}).get("conditions") or []
+    return any(c["type"] == "Established" and c["status"] == "True" for c in conditions)
+
+
+def wait_until_crd_established(api_extensions_v1: ApiextensionsV1Api, name) -> None:
+    """
+    Wait for a CRD to be served by the API server.
+
+    :param api_extensions_v1: ApiextensionsV1Api
+    :param name: CRD name
+    :return:
+    """
+    counter = 0
+    while not is_crd_established(api_extensions_v1, name) and counter < 60:
+        time.sleep(1)
+        counter = counter + 1
+    if counter >= 60:
+        pytest.fail(f"CRD {name} was not established after 60 seconds")
+    print(f"CRD {name} is established")
+
+
+def delete_custom_objects(
+    custom_objects: CustomObjectsApi, api_extensions_v1: ApiextensionsV1Api, name, namespace_filter=None
+) -> None:
+    """
+    Delete all the custom objects of a CRD in all namespaces and wait for their removal.
+
+    :param custom_objects: CustomObjectsApi
+    :param api_extensions_v1: ApiextensionsV1Api
+    :param name: CRD name
+    :param namespace_filter: a function to select the namespaces to clean, all of them if None
+    :return:
+    """
+    spec = read_crd_as_dict(api_extensions_v1, name)["spec"]
+    group = spec["group"]
+    plural = spec["names"]["plural"]
+    version = next(v["name"] for v in spec["versions"] if v.get("storage"))
+
+    def list_items():
+        return [
+            item
+            for item in custom_objects.list_cluster_custom_object(group, version, plural)["items"]
+            if namespace_filter is None or namespace_filter(item["metadata"].get("namespace", ""))
+        ]
+
+    items = list_items()
+    for item in items:
+        metadata = item["metadata"]
+        print(f"Delete {plural} {metadata.get('namespace', '')}/{metadata['name']}")
+        try:
+            if spec["scope"] == "Namespaced":
+                custom_objects.delete_namespaced_custom_object(
+                    group, version, metadata["namespace"], plural, metadata["name"]
+                )
+            else:
+                custom_objects.delete_cluster_custom_object(group, version, plural, metadata["name"])
+        except ApiException as ex:
+            if ex.status != 404:
+                raise ex
+    counter = 0
+    while items and counter < 120:
+        time.sleep(1)
+        items = list_items()
+        counter = counter + 1
+    if items:
+        pytest.fail(f"Failed to remove {plural} after 120 seconds")
+
+
 def read_custom_resource(custom_objects: CustomObjectsApi, namespace, plural, name) -> object:
     """
     Get CRD information (kubectl describe output)
@@ -157,7 +300,7 @@ def create_resource_from_yaml(custom_objects: CustomObjectsApi, yaml_manifest, n
         print("Create a Custom Resource: " + body["kind"])
         group, version = body["apiVersion"].split("/")
         custom_objects.create_namespaced_custom_object(
-             group, version, namespace, plural, body
+             group, version, namespace, plural, isolate_manifest(body)
         )
         print(f"Custom resource {body['kind']} created with name '{body['metadata']['name']}'")
         return body
@@ -245,7 +388,7 @@ def patch_custom_resource_v1alpha1(custom_objects: CustomObjectsApi, name, yaml_
 
     try:
         custom_objects.patch_namespaced_custom_object(
-            "k8s.nginx.org", "v1alpha1", namespace, plural, name, dep
+            "k8s.nginx.org", "v1alpha1", namespace, plural, name, isolate_manifest(dep)
         )
     except ApiException:
         logging.exception(f"Failed with exception while patching custom resource: {name}")
@@ -261,7 +404,7 @@ def patch_ts(custom_objects: CustomObjectsApi, namespace, body) -> None:
 
     try:
         custom_objects.patch_namespaced_custom_object(
-            "k8s.nginx.org", "v1alpha1", namespace, "transportservers", name, body
+            "k8s.nginx.org", "v1alpha1", namespace, "transportservers", name, isolate_manifest(body)
         )
     except ApiException:
         logging.exception(f"Failed with exception while patching custom resource: {name}")
@@ -0,0 +1,269 @@
+"""Describe methods to churn the endpoints of a backend and measure how the IC propagates them to NGINX."""
+
+import re
+import time
+from datetime import datetime, timezone
+
+from kubernetes.client import AppsV1Api, CoreV1Api
+from kubernetes.client.rest import ApiException
+
+from suite.resources_utils import get_file_contents, get_first_pod_name, get_reload_count_by_reason
+from suite.stats_utils import PeriodicSampler, get_percentile
+
+
+class EndpointsChange:
+    """
+    Encapsulate a set of endpoints that appeared in the Endpoints of the service.
+
+    Attributes:
+        endpoints (frozenset): 'ip:port'
+        seen_at (float): time the sampler saw the endpoints first
+        applied_at (float): time the sampler saw the same peers in NGINX or None
+    """
+
+    def __init__(self, endpoints, seen_at):
+        self.endpoints = endpoints
+        self.seen_at = seen_at
+        self.applied_at = None
+
+    @property
+    def propagation_s(self) -> float:
+        return self.applied_at - self.seen_at if self.applied_at is not None else None
+
+
+class EndpointChurnReport:
+    """
+    Encapsulate the results of an endpoint churn run.
+
+    Attributes:
+        changes ([EndpointsChange]): every distinct set of endpoints in the order they appeared
+        endpoint_reloads (int): increase of nginx_reloads_total{reason="endpoints"}
+        other_reloads (int): increase of the other reloads
+        generations (int): increase of the Plus generation or None for NGINX
+        samples (int): number of the samples of the Endpoints and the peers
+        duration (float): seconds
+    """
+
+    def __init__(self, changes, endpoint_reloads, other_reloads, generations, samples, duration):
+        self.changes = changes
+        self.endpoint_reloads = endpoint_reloads
+        self.other_reloads = other_reloads
+        self.generations = generations
+        self.samples = samples
+        self.duration = duration
+
+    @property
+    def applied(self) -> []:
+        return [change for change in self.changes if change.applied_at is not None]
+
+    @property
+    def superseded(self) -> int:
+        """
+        The number of the endpoint sets that changed again before NGINX got them.
+        """
+        return len(self.changes) - len(self.applied)
+
+    def propagation_s(self, percentile) -> float:
+        """
+        Get a percentile of the time from an Endpoints change until NGINX has the same peers.
+
+        :param percentile: 0-100
+        :return: float
+        """
+        return get_percentile([change.propagation_s for change in self.applied], percentile)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.changes)} endpoint changes in {self.duration:.1f}s ({self.samples} samples), "
+            f"{len(self.applied)} applied, {self.superseded} superseded, "
+            f"propagation p50={self.propagation_s(50):.2f}s p99={self.propagation_s(99):.2f}s "
+            f"max={self.propagation_s(100):.2f}s, reloads: {self.endpoint_reloads} endpoints "
+            f"{self.other_reloads} other, generations: {self.generations}"
+        )
+
+
+def get_ready_endpoints(v1: CoreV1Api, service, namespace) -> frozenset:
+    """
+    Get the ready addresses of a service.
+
+    :param v1: CoreV1Api
+    :param service: service name
+    :param namespace:
+    :return: frozenset of 'ip:port'
+    """
+    try:
+        endpoints = v1.read_namespaced_endpoints(service, namespace)
+    except ApiException as ex:
+        if ex.status == 404:
+            return frozenset()
+        raise
+    return frozenset(
+        f"{address.ip}:{port.port}"
+        for subset in endpoints.subsets or []
+        for address in subset.addresses or []
+        for port in subset.ports or []
+    )
+
+
+def plus_peers_reader(api, upstream):
+    """
+    Read the peers of an upstream from the NGINX Plus API.
+
+    :param api: NginxPlusApi
+    :param upstream: upstream name
+    :return: a function that returns a frozenset of 'ip:port'
+    """
+    # the IC points an upstream without endpoints to a unix socket that returns 502
+    return lambda: frozenset(
+        server.server for server in api.upstream_servers(upstream) if not server.server.startswith("unix:")
+    )
+
+
+def config_peers_reader(v1: CoreV1Api, ic_namespace, config_path, upstream):
+    """
+    Read the servers of an upstream from the NGINX config in the IC pod, for NGINX that has no API.
+
+    The config file is written right before the reload, so the time is a bit earlier than the one
+    NGINX starts using the new peers.
+
+    :param v1: CoreV1Api
+    :param ic_namespace: IC namespace
+    :param config_path: e.g. /etc/nginx/conf.d/vs_<namespace>_<name>.conf
+    :param upstream: upstream name
+    :return: a function that returns a frozenset of 'ip:port'
+    """
+    pod_name = get_first_pod_name(v1, ic_namespace)
+    block = re.compile(r"upstream %s \{(.*?)\}" % re.escape(upstream), re.S)
+
+    def read():
+        match = block.search(get_file_contents(v1, config_path, pod_name, ic_namespace))
+        if match is None:
+            return frozenset()
+        # the unix socket of an upstream without endpoints does not match
+        return frozenset(re.findall(r"server ([\d.]+:\d+)", match.group(1)))
+
+    return read
+
+
+class EndpointChurnSampler(PeriodicSampler):
+    """
+    Sample the Endpoints of a service and the peers of the NGINX upstream in a background thread.
+
+    Attributes:
+        read_endpoints (function): returns a frozenset of 'ip:port'
+        read_peers (function): returns a frozenset of 'ip:port'
+        interval (float): seconds between the samples
+        changes ([EndpointsChange]):
+        samples (int):
+    """
+
+    def __init__(self, read_endpoints, read_peers, interval=0.2):
+        super().__init__(interval)
+        self.read_endpoints = read_endpoints
+        self.read_peers = read_peers
+        self.changes = []
+        self.samples = 0
+
+    def sample(self) -> None:
+        try:
+            self.compare()
+        except Exception as ex:
+            print(f"Endpoint churn sample failed: {ex}")
+
+    def compare(self) -> None:
+        endpoints = self.read_endpoints()
+        now = time.perf_counter()
+        if not self.changes or self.changes[-1].endpoints != endpoints:
+            self.changes.append(EndpointsChange(endpoints, now))
+        peers = self.read_peers()
+        now = time.perf_counter()
+        self.samples += 1
+        for change in reversed(self.changes):
+            if change.applied_at is None and change.endpoints == peers:
+                change.applied_at = now
+                break
+
+    def settled(self) -> bool:
+        return bool(self.changes) and self.changes[-1].applied_at is not None
+
+
+def set_replicas(apps_v1_api: AppsV1Api, name, namespace, value) -> None:
+    """
+    Scale a deployment without waiting for the pods, unlike scale_deployment.
+
+    :param apps_v1_api: AppsV1Api
+    :param name: deployment name
+    :param namespace:
+    :param value: number of replicas
+    :return:
+    """
+    apps_v1_api.patch_namespaced_deployment_scale(name, namespace, {"spec": {"replicas": value}})
+
+
+def restart_deployment(apps_v1_api: AppsV1Api, name, namespace) -> None:
+    """
+    Roll the pods of a deployment like `kubectl rollout restart` does.
+
+    :param apps_v1_api: AppsV1Api
+    :param name: deployment name
+    :param namespace:
+    :return:
+    """
+    restarted_at = datetime.now(timezone.utc).isoformat()
+    body = {"spec": {"template": {"metadata": {"annotations": {"kubectl.kubernetes.io/restartedAt": restarted_at}}}}}
+    apps_v1_api.patch_namespaced_deployment(name, namespace, body)
+
+
+def run_endpoint_churn(kube_apis, namespace, deployment, service, read_peers, mode="scale", replicas=(1, 3),
+                       steps=10, interval=5.0, metrics_url=None, api=None, sample_interval=0.2,
+                       settle_timeout=60) -> EndpointChurnReport:
+    """
+    Scale or roll a deployment at a fixed rate and measure when NGINX gets every set of endpoints.
+
+    :param kube_apis: client apis
+    :param namespace: namespace of the backend
+    :param deployment: deployment name
+    :param service: the service of the deployment
+    :param read_peers: a function that returns the NGINX peers, see plus_peers_reader and config_peers_reader
+    :param mode: 'scale' to alternate between the replicas, 'rollout' to restart the pods
+    :param replicas: (low, high) number of replicas for the scale mode
+    :param steps: number of changes of the deployment
+    :param interval: seconds between the changes
+    :param metrics_url: IC /metrics url to count the reloads
+    :param api: NginxPlusApi to count the generations
+    :param sample_interval: seconds between the samples
+    :param settle_timeout: seconds to wait for NGINX to catch up after the last change
+    :return: EndpointChurnReport
+    """
+    print(f"Churn the endpoints of {namespace}/{deployment}: {steps} {mode} steps every {interval}s")
+    endpoint_reloads = get_reload_count_by_reason(metrics_url, "endpoints") if metrics_url else None
+    other_reloads = get_reload_count_by_reason(metrics_url, "other") if metrics_url else None
+    generation = api.generation() if api else None
+    sampler = EndpointChurnSampler(
+        lambda: get_ready_endpoints(kube_apis.v1, service, namespace), read_peers, sample_interval
+    )
+    start = time.perf_counter()
+    sampler.start()
+    try:
+        for step in range(steps):
+            time.sleep(max(0.0, start + step * interval - time.perf_counter()))
+            if mode == "scale":
+                set_replicas(kube_apis.apps_v1_api, deployment, namespace, replicas[(step + 1) % 2])
+            else:
+                restart_deployment(kube_apis.apps_v1_api, deployment, namespace)
+        time.sleep(max(0.0, start + steps * interval - time.perf_counter()))
+        deadline = time.perf_counter() + settle_timeout
+        while not sampler.settled() and time.perf_counter() < deadline:
+            time.sleep(sample_interval)
+    finally:
+        sampler.stop()
+    duration = time.perf_counter() - start
+    if metrics_url:
+        endpoint_reloads = get_reload_count_by_reason(metrics_url, "endpoints") - endpoint_reloads
+        other_reloads = get_reload_count_by_reason(metrics_url, "other") - other_reloads
+    generations = api.generation() - generation if api else None
+    report = EndpointChurnReport(
+        sampler.changes, endpoint_reloads, other_reloads, generations, sampler.samples, duration
+    )
+    print(report.summary())
+    return report
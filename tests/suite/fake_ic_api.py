@@ -0,0 +1,494 @@
+"""Describe a local stand-in for the IC Prometheus metrics and the NGINX Plus API with scripted reloads.
+
+Only the stdlib is used. Run it with `python -m suite.fake_ic_api --timeline timeline.json` from the tests folder,
+or start it in-process with FakeIcApi(...).start().
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+NGINX_VERSION = "1.21.6"
+NGINX_BUILD = "nginx-plus-r27"
+API_VERSIONS = [1, 2, 3, 4, 5, 6, 7, 8]
+RELOAD_REASONS = ["endpoints", "other"]
+INGRESS_TYPES = ["master", "minion", "regular"]
+TS_TYPES = ["passthrough", "tcp", "udp"]
+LATENCY_BUCKETS_MS = [1, 2, 3, 4, 5, 10, 20, 30, 40, 50, 100, 200, 300, 400, 500, 1000, 2000, 3000, 4000, 5000]
+QUEUE_BUCKETS_SECONDS = [0.1, 0.5, 1, 5, 10, 50]
+DEFAULT_SERVER = {
+    "weight": 1,
+    "max_conns": 0,
+    "max_fails": 1,
+    "fail_timeout": "10s",
+    "slow_start": "0s",
+    "route": "",
+    "backup": False,
+    "down": False,
+}
+
+
+class FakeIcApi:
+    """
+    Keep the state of a fake IC and serve it as /metrics and as the NGINX Plus API.
+
+    The state changes by the steps of a timeline, every step has the 'at' offset in seconds from the start and
+    one or more actions:
+        'reload': 'endpoints'|'other', with optional 'duration_ms' and 'status' (1 or 0 for a failed reload)
+        'totals': {'virtualservers': 3, 'virtualserverroutes': 1, 'ingresses': {'regular': 2},
+                   'transportservers': {'tcp': 1}}
+        'upstream': name, 'peers': ['10.0.0.1:8080', ...] or [{'server': ..., 'max_fails': 25}, ...],
+                    'stream': True for a stream upstream, peers None removes the upstream
+        'server_zone': name
+        'fail': {'path': '/metrics', 'count': 3, 'code': 503}
+    An upstream change reloads NGINX unless 'reload' is set to False in the step, like the IC does for
+    endpoints changes when the Plus API is not used. The steps are applied lazily when a request comes in.
+
+    Attributes:
+        ingress_class (str): the class label of the metrics
+        jitter (float): max random seconds added to the 'at' of every step
+        failure_rate (float): probability of a 503 response to any request
+        latency (float): seconds every request is delayed by
+        generation (int): NGINX configuration generation
+        reloads (dict): reason -> number of reloads
+        reload_errors (int): number of failed reloads
+        last_reload_ms (int): duration of the last reload
+        last_reload_status (int): 1 if the last reload succeeded
+        totals (dict): resource totals
+        upstreams (dict): name -> [server dict], HTTP upstreams
+        stream_upstreams (dict): name -> [server dict]
+        server_zones ([]): names of the HTTP server zones
+        failures ([]): injected failures [path prefix, remaining count, status code]
+    """
+
+    def __init__(self, ingress_class="nginx", timeline=None, jitter=0.0, failure_rate=0.0, latency=0.0, seed=None):
+        self.ingress_class = ingress_class
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.latency = latency
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.generation = 1
+        self.reloads = dict.fromkeys(RELOAD_REASONS, 0)
+        self.reload_errors = 0
+        self.last_reload_ms = 0
+        self.last_reload_status = 1
+        self.load_timestamp = time.time()
+        self.totals = {
+            "ingresses": dict.fromkeys(INGRESS_TYPES, 0),
+            "virtualservers": 0,
+            "virtualserverroutes": 0,
+            "transportservers": dict.fromkeys(TS_TYPES, 0),
+        }
+        self.upstreams = {}
+        self.stream_upstreams = {}
+        self.server_zones = []
+        self.failures = []
+        self.queue_depth = 0
+        self.requests = 0
+        self.started = time.monotonic()
+        self.pending = []
+        self.server = None
+        self.thread = None
+        for step in timeline or []:
+            self.schedule(step)
+
+    # scripting
+
+    def schedule(self, step) -> None:
+        """
+        Add a timeline step.
+
+        :param step: dict with the 'at' offset in seconds and the actions
+        :return:
+        """
+        with self.lock:
+            at = step.get("at", 0.0) + self.random.uniform(0, self.jitter)
+            self.pending.append((at, len(self.pending), step))
+            self.pending.sort(key=lambda pending: pending[:2])
+
+    def apply(self, step) -> None:
+        """
+        Apply the actions of a step right away.
+
+        :param step: dict
+        :return:
+        """
+        with self.lock:
+            self.apply_step(step)
+
+    def advance(self) -> None:
+        """
+        Apply the steps that are due. The lock must be held.
+
+        :return:
+        """
+        elapsed = time.monotonic() - self.started
+        while self.pending and self.pending[0][0] <= elapsed:
+            self.apply_step(self.pending.pop(0)[2])
+
+    def apply_step(self, step) -> None:
+        if "totals" in step:
+            self.apply_totals(step["totals"])
+        if "server_zone" in step:
+            self.server_zones.append(step["server_zone"])
+        if "upstream" in step:
+            self.apply_upstream(step)
+        if step.get("reload"):
+            self.reload(step["reload"], step.get("duration_ms", 100), step.get("status", 1))
+        if "queue_depth" in step:
+            self.queue_depth = step["queue_depth"]
+        if "fail" in step:
+            fail = step["fail"]
+            self.failures.append([fail.get("path", "/"), fail.get("count", 1), fail.get("code", 503)])
+
+    def apply_totals(self, totals) -> None:
+        for name, value in totals.items():
+            if isinstance(value, dict):
+                self.totals[name].update(value)
+            else:
+                self.totals[name] = value
+
+    def apply_upstream(self, step) -> None:
+        """
+        Replace or remove the peers of an upstream, reload for the endpoints unless the step sets the reload.
+
+        :param step: dict with the 'upstream' action
+        :return:
+        """
+        upstreams = self.stream_upstreams if step.get("stream") else self.upstreams
+        if step.get("peers") is None:
+            upstreams.pop(step["upstream"], None)
+        else:
+            upstreams[step["upstream"]] = [
+                dict(DEFAULT_SERVER, id=index, **({"server": peer} if isinstance(peer, str) else peer))
+                for index, peer in enumerate(step["peers"])
+            ]
+        if "reload" not in step:
+            self.reload("endpoints", step.get("duration_ms", 100), 1)
+
+    def reload(self, reason, duration_ms, status) -> None:
+        self.last_reload_ms = duration_ms
+        self.last_reload_status = status
+        if status:
+            self.reloads[reason] += 1
+            self.generation += 1
+            self.load_timestamp = time.time()
+        else:
+            self.reload_errors += 1
+
+    def add_upstreams(self, count, peers_per_upstream, prefix="vs_default_cafe") -> None:
+        """
+        Add many upstreams at once to make a large metrics page or API response, without reloads.
+
+        :param count: number of upstreams
+        :param peers_per_upstream: number of peers in every upstream
+        :param prefix: the start of the upstream names
+        :return:
+        """
+        with self.lock:
+            for i in range(count):
+                self.upstreams[f"{prefix}_{i}"] = [
+                    dict(DEFAULT_SERVER, id=j, server=f"10.{i // 250 % 250}.{i % 250}.{j + 1}:8080")
+                    for j in range(peers_per_upstream)
+                ]
+
+    # rendering
+
+    def render_metrics(self) -> str:
+        """
+        Render the metrics in the Prometheus text format.
+
+        :return: str
+        """
+        label = f'class="{self.ingress_class}"'
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP nginx_ingress_controller_{name} {help_text}")
+            lines.append(f"# TYPE nginx_ingress_controller_{name} {kind}")
+            lines.extend(f"nginx_ingress_controller_{sample}" for sample in samples)
+
+        family(
+            "ingress_resources_total",
+            "gauge",
+            "Number of handled ingress resources",
+            [f'ingress_resources_total{{{label},type="{t}"}} {self.totals["ingresses"][t]}' for t in INGRESS_TYPES],
+        )
+        family(
+            "nginx_last_reload_milliseconds",
+            "gauge",
+            "Duration in milliseconds of the last NGINX reload",
+            [f"nginx_last_reload_milliseconds{{{label}}} {self.last_reload_ms}"],
+        )
+        family(
+            "nginx_last_reload_status",
+            "gauge",
+            "Status of the last NGINX reload",
+            [f"nginx_last_reload_status{{{label}}} {self.last_reload_status}"],
+        )
+        family(
+            "nginx_reload_errors_total",
+            "counter",
+            "Number of unsuccessful NGINX reloads",
+            [f"nginx_reload_errors_total{{{label}}} {self.reload_errors}"],
+        )
+        family(
+            "nginx_reloads_total",
+            "counter",
+            "Number of successful NGINX reloads",
+            [f'nginx_reloads_total{{{label},reason="{r}"}} {self.reloads[r]}' for r in RELOAD_REASONS],
+        )
+        family(
+            "transportserver_resources_total",
+            "gauge",
+            "Number of handled TransportServer resources",
+            [
+                f'transportserver_resources_total{{{label},type="{t}"}} {self.totals["transportservers"][t]}'
+                for t in TS_TYPES
+            ],
+        )
+        family(
+            "virtualserver_resources_total",
+            "gauge",
+            "Number of handled VirtualServer resources",
+            [f"virtualserver_resources_total{{{label}}} {self.totals['virtualservers']}"],
+        )
+        family(
+            "virtualserverroute_resources_total",
+            "gauge",
+            "Number of handled VirtualServerRoute resources",
+            [f"virtualserverroute_resources_total{{{label}}} {self.totals['virtualserverroutes']}"],
+        )
+        queue = f'{label},name="taskQueue"'
+        family(
+            "workqueue_depth", "gauge", "Current depth of workqueue", [f"workqueue_depth{{{queue}}} {self.queue_depth}"]
+        )
+        family(
+            "workqueue_queue_duration_seconds",
+            "histogram",
+            "How long in seconds an item stays in workqueue before being requested",
+            [f'workqueue_queue_duration_seconds_bucket{{{queue},le="{le}"}} 0' for le in QUEUE_BUCKETS_SECONDS]
+            + [
+                f'workqueue_queue_duration_seconds_bucket{{{queue},le="+Inf"}} 0',
+                f"workqueue_queue_duration_seconds_sum{{{queue}}} 0",
+                f"workqueue_queue_duration_seconds_count{{{queue}}} 0",
+            ],
+        )
+        samples = []
+        for upstream, servers in sorted(self.upstreams.items()):
+            service = upstream.split("_")[-1]
+            for server in servers:
+                peer = (
+                    f'{label},code="200",pod_name="{service}-{server["id"]}",server="{server["server"]}",'
+                    f'service="{service}",upstream="{upstream}"'
+                )
+                samples.extend(
+                    f'upstream_server_response_latency_ms_bucket{{{peer},le="{le}"}} 1' for le in LATENCY_BUCKETS_MS
+                )
+                samples.append(f'upstream_server_response_latency_ms_bucket{{{peer},le="+Inf"}} 1')
+                samples.append(f"upstream_server_response_latency_ms_sum{{{peer}}} 1")
+                samples.append(f"upstream_server_response_latency_ms_count{{{peer}}} 1")
+        family(
+            "upstream_server_response_latency_ms",
+            "histogram",
+            "Bucketed response times from when NGINX establishes a connection to an upstream server",
+            samples,
+        )
+        return "\n".join(lines) + "\n"
+
+    def nginx_info(self) -> dict:
+        return {
+            "version": NGINX_VERSION,
+            "build": NGINX_BUILD,
+            "address": "127.0.0.1",
+            "generation": self.generation,
+            "load_timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(self.load_timestamp)),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+            "pid": 1,
+            "ppid": 0,
+        }
+
+    @staticmethod
+    def upstream(name, servers) -> dict:
+        return {
+            "peers": [
+                {
+                    "id": server["id"],
+                    "server": server["server"],
+                    "name": server["server"],
+                    "backup": server["backup"],
+                    "weight": server["weight"],
+                    "state": "down" if server["down"] else "up",
+                    "active": 0,
+                    "requests": 0,
+                    "max_conns": server["max_conns"],
+                    "fails": 0,
+                    "unavail": 0,
+                }
+                for server in servers
+            ],
+            "keepalive": 0,
+            "zombies": 0,
+            "zone": name,
+        }
+
+    def route(self, path):
+        """
+        Serve a GET request.
+
+        :param path: url path
+        :return: (status code, content type, str)
+        """
+        if path == "/metrics":
+            return 200, "text/plain; version=0.0.4", self.render_metrics()
+        parts = [part for part in path.split("/") if part]
+        if parts == ["api"]:
+            return 200, "application/json", json.dumps(API_VERSIONS)
+        if len(parts) < 3 or parts[0] != "api" or not parts[1].isdigit():
+            return api_error(404, "PathNotFound", "path not found")
+        endpoint = parts[2:]
+        if endpoint == ["nginx"]:
+            return 200, "application/json", json.dumps(self.nginx_info())
+        if endpoint[0] in ["http", "stream"] and endpoint[1:2] == ["upstreams"]:
+            return self.route_upstreams(endpoint)
+        if endpoint == ["http", "server_zones"]:
+            zones = {
+                zone: {"processing": 0, "requests": 0, "discarded": 0, "received": 0, "sent": 0}
+                for zone in self.server_zones
+            }
+            return 200, "application/json", json.dumps(zones)
+        return api_error(404, "PathNotFound", "path not found")
+
+    def route_upstreams(self, endpoint):
+        """
+        Serve a GET request for the upstreams, an upstream or its servers.
+
+        :param endpoint: the path parts after the API version, e.g. ['http', 'upstreams', 'name', 'servers']
+        :return: (status code, content type, str)
+        """
+        upstreams = self.upstreams if endpoint[0] == "http" else self.stream_upstreams
+        if len(endpoint) == 2:
+            return 200, "application/json", json.dumps({n: self.upstream(n, s) for n, s in upstreams.items()})
+        if endpoint[2] not in upstreams:
+            return api_error(404, "UpstreamNotFound", "upstream not found")
+        servers = upstreams[endpoint[2]]
+        if len(endpoint) == 3:
+            return 200, "application/json", json.dumps(self.upstream(endpoint[2], servers))
+        if endpoint[3:] == ["servers"]:
+            return 200, "application/json", json.dumps(servers, separators=(",", ":"))
+        return api_error(404, "PathNotFound", "path not found")
+
+    def handle(self, path):
+        """
+        Advance the timeline, inject the failures and serve a GET request.
+
+        :param path: url path
+        :return: (status code, content type, str)
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.requests += 1
+            self.advance()
+            for failure in self.failures:
+                if path.startswith(failure[0]) and failure[1] > 0:
+                    failure[1] -= 1
+                    return failure[2], "text/plain", "injected failure\n"
+            if self.failure_rate and self.random.random() < self.failure_rate:
+                return 503, "text/plain", "injected failure\n"
+            return self.route(path)
+
+    # server
+
+    def start(self, host="127.0.0.1", port=0):
+        """
+        Start serving in a background thread, the timeline starts now.
+
+        :param host: address to listen on
+        :param port: port to listen on, 0 picks a free one
+        :return: self
+        """
+        self.started = time.monotonic()
+        self.server = ThreadingHTTPServer((host, port), FakeIcApiHandler)
+        self.server.daemon_threads = True
+        self.server.api = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join(timeout=5)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def api_error(code, error_code, text) -> (int, str, str):
+    body = {
+        "error": {"status": code, "text": text, "code": error_code},
+        "request_id": "00000000000000000000000000000000",
+        "href": "https://nginx.org/en/docs/http/ngx_http_api_module.html",
+    }
+    return code, "application/json", json.dumps(body)
+
+
+class FakeIcApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        code, content_type, text = self.server.api.handle(urlparse(self.path).path)
+        data = text.encode()
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve fake IC metrics and NGINX Plus API following a timeline.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=9113, help="port to listen on")
+    parser.add_argument("--ingress-class", default="nginx", help="the class label of the metrics")
+    parser.add_argument("--timeline", default="", help="a json file with a list of timeline steps")
+    parser.add_argument("--jitter", type=float, default=0.0, help="max random seconds added to every step")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="probability of a 503 response")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every request is delayed by")
+    parser.add_argument(
+        "--upstreams",
+        default="",
+        help="add many upstreams without reloads as COUNTxPEERS, e.g. 2200x1 gives a 50k-line metrics page",
+    )
+    args = parser.parse_args()
+    timeline = []
+    if args.timeline:
+        with open(args.timeline) as f:
+            timeline = json.load(f)
+    api = FakeIcApi(args.ingress_class, timeline, args.jitter, args.failure_rate, args.latency)
+    if args.upstreams:
+        count, _, peers = args.upstreams.partition("x")
+        api.add_upstreams(int(count), int(peers or 1))
+    api.start(args.host, args.port)
+    print(f"Fake IC metrics are on {api.url}/metrics and the NGINX Plus API is on {api.url}/api")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        api.stop()
+
+
+if __name__ == "__main__":
+    main()
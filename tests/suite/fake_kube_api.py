@@ -0,0 +1,1194 @@
+"""Describe an in-memory fake of the Kubernetes API server to exercise the suite utilities without a cluster.
+
+Only the stdlib is used. Run it with `python -m suite.fake_kube_api --kubeconfig /tmp/fake-kubeconfig`
+from the tests folder, or start it in-process with FakeKubeApi(...).start().
+"""
+
+import argparse
+import copy
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# (group, plural) -> (kind, namespaced), the core group is an empty string
+BUILTIN_RESOURCES = {
+    ("", "namespaces"): ("Namespace", False),
+    ("", "nodes"): ("Node", False),
+    ("", "pods"): ("Pod", True),
+    ("", "services"): ("Service", True),
+    ("", "endpoints"): ("Endpoints", True),
+    ("", "secrets"): ("Secret", True),
+    ("", "configmaps"): ("ConfigMap", True),
+    ("", "serviceaccounts"): ("ServiceAccount", True),
+    ("", "events"): ("Event", True),
+    ("apps", "deployments"): ("Deployment", True),
+    ("apps", "daemonsets"): ("DaemonSet", True),
+    ("networking.k8s.io", "ingresses"): ("Ingress", True),
+    ("networking.k8s.io", "ingressclasses"): ("IngressClass", False),
+    ("rbac.authorization.k8s.io", "clusterroles"): ("ClusterRole", False),
+    ("rbac.authorization.k8s.io", "clusterrolebindings"): ("ClusterRoleBinding", False),
+    ("rbac.authorization.k8s.io", "roles"): ("Role", True),
+    ("rbac.authorization.k8s.io", "rolebindings"): ("RoleBinding", True),
+    ("apiextensions.k8s.io", "customresourcedefinitions"): ("CustomResourceDefinition", False),
+}
+WORKLOADS = [("apps", "deployments"), ("apps", "daemonsets")]
+INITIAL_NAMESPACES = ["default", "kube-system", "kube-public"]
+NODE_NAME = "fake-node"
+NODE_IP = "172.18.0.2"
+# how many watch events are kept to serve a watch from an older resourceVersion, older ones get 410 Gone
+HISTORY_SIZE = 10000
+CHURN_ANNOTATION = "fake.nginx.org/churn"
+# the responses of the paths that are not resource paths
+DISCOVERY = {
+    "/healthz": "ok",
+    "/readyz": "ok",
+    "/livez": "ok",
+    "/version": {"major": "1", "minor": "23", "gitVersion": "v1.23.0-fake", "platform": "linux/amd64"},
+    "/api": {"kind": "APIVersions", "versions": ["v1"], "serverAddressByClientCIDRs": []},
+}
+
+
+def now_timestamp() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def api_version(group, version) -> str:
+    return f"{group}/{version}" if group else version
+
+
+class ApiError(Exception):
+    """
+    Encapsulate an error response of the API server.
+
+    Attributes:
+        code (int): HTTP status code
+        reason (str): Status reason, e.g. 'NotFound'
+        message (str): a human-readable message
+        details (dict): name and kind of the object
+    """
+
+    def __init__(self, code, reason, message, details=None):
+        super().__init__(message)
+        self.code = code
+        self.reason = reason
+        self.message = message
+        self.details = details or {}
+
+    def to_status(self) -> dict:
+        return {
+            "kind": "Status",
+            "apiVersion": "v1",
+            "metadata": {},
+            "status": "Failure",
+            "message": self.message,
+            "reason": self.reason,
+            "details": self.details,
+            "code": self.code,
+        }
+
+
+def not_found(kind, name) -> ApiError:
+    return ApiError(404, "NotFound", f'{kind.lower()}s "{name}" not found', {"name": name, "kind": kind.lower()})
+
+
+class Route:
+    """
+    Encapsulate a parsed API path.
+
+    Attributes:
+        group (str): API group, an empty string for the core group
+        version (str): API version
+        namespace (str): namespace or None for cluster-scoped calls
+        plural (str): resource name
+        name (str): object name or None for collection calls
+        subresource (str): e.g. 'status', 'scale', 'log' or None
+    """
+
+    def __init__(self, group, version, namespace, plural, name, subresource):
+        self.group = group
+        self.version = version
+        self.namespace = namespace
+        self.plural = plural
+        self.name = name
+        self.subresource = subresource
+
+
+def parse_path(path):
+    """
+    Parse an API path like /apis/apps/v1/namespaces/ns/deployments/name/scale.
+
+    :param path: url path
+    :return: Route or None if the path is not a resource path
+    """
+    parts = [part for part in path.split("/") if part]
+    if parts[:1] == ["api"] and len(parts) >= 3:
+        group, version, rest = "", parts[1], parts[2:]
+    elif parts[:1] == ["apis"] and len(parts) >= 4:
+        group, version, rest = parts[1], parts[2], parts[3:]
+    else:
+        return None
+    namespace = None
+    if rest[0] == "namespaces" and len(rest) >= 3 and rest[2] not in ["status", "finalize"]:
+        namespace, rest = rest[1], rest[2:]
+    if len(rest) > 3:
+        return None
+    rest = rest + [None] * (3 - len(rest))
+    return Route(group, version, namespace, rest[0], rest[1], rest[2])
+
+
+def parse_selector(selector) -> []:
+    """
+    Parse a label or a field selector, the equality-based and the existence requirements are supported.
+
+    :param selector: e.g. 'app=backend1,tier!=db,canary'
+    :return: [(key, operator, value)]
+    """
+    requirements = []
+    for term in filter(None, (term.strip() for term in (selector or "").split(","))):
+        if "!=" in term:
+            key, value = term.split("!=", 1)
+            requirements.append((key.strip(), "!=", value.strip()))
+        elif "=" in term:
+            key, value = term.replace("==", "=").split("=", 1)
+            requirements.append((key.strip(), "=", value.strip()))
+        elif term.startswith("!"):
+            requirements.append((term[1:].strip(), "!", None))
+        else:
+            requirements.append((term, "exists", None))
+    return requirements
+
+
+def get_field(obj, path):
+    for part in path.split("."):
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(part)
+    return obj
+
+
+def matches(obj, label_requirements, field_requirements) -> bool:
+    labels = obj["metadata"].get("labels") or {}
+    for key, operator, value in label_requirements:
+        if operator == "=" and labels.get(key) != value:
+            return False
+        if operator == "!=" and labels.get(key) == value:
+            return False
+        if operator == "exists" and key not in labels:
+            return False
+        if operator == "!" and key in labels:
+            return False
+    for key, operator, value in field_requirements:
+        actual = get_field(obj, key)
+        actual = "" if actual is None else str(actual)
+        if (operator == "=" and actual != value) or (operator == "!=" and actual == value):
+            return False
+    return True
+
+
+def merge_patch(target, patch):
+    """
+    Apply a JSON merge patch (RFC 7386). Strategic merge patches are applied the same way, lists are replaced.
+
+    :param target: the object
+    :param patch: the patch
+    :return: the patched object
+    """
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = copy.deepcopy(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def resolve_pointer(target, path):
+    """
+    Find the container a JSON pointer points into, the missing objects on the way are created.
+
+    :param target: the object
+    :param path: JSON pointer, e.g. '/metadata/labels/app'
+    :return: (the parent list or dict, the last token)
+    """
+    tokens = [token.replace("~1", "/").replace("~0", "~") for token in path.split("/")[1:]]
+    parent = target
+    for token in tokens[:-1]:
+        parent = parent[int(token)] if isinstance(parent, list) else parent.setdefault(token, {})
+    return parent, tokens[-1]
+
+
+def apply_list_operation(parent, last, operation) -> None:
+    index = len(parent) if last == "-" else int(last)
+    op = operation["op"]
+    if op == "add":
+        parent.insert(index, operation["value"])
+    elif op == "replace":
+        parent[index] = operation["value"]
+    elif op == "remove":
+        del parent[index]
+    elif op == "test" and parent[index] != operation["value"]:
+        raise ApiError(422, "Invalid", f"test operation failed at {operation['path']}")
+
+
+def apply_dict_operation(parent, last, operation) -> None:
+    op = operation["op"]
+    if op in ["add", "replace"]:
+        parent[last] = operation["value"]
+    elif op == "remove":
+        if last not in parent:
+            raise ApiError(422, "Invalid", f"path {operation['path']} does not exist")
+        del parent[last]
+    elif op == "test" and parent.get(last) != operation["value"]:
+        raise ApiError(422, "Invalid", f"test operation failed at {operation['path']}")
+
+
+def json_patch(target, operations):
+    """
+    Apply a JSON patch (RFC 6902), the add, replace, remove and test operations are supported.
+
+    :param target: the object
+    :param operations: [dict]
+    :return: the patched object
+    """
+    result = copy.deepcopy(target)
+    for operation in operations:
+        parent, last = resolve_pointer(result, operation["path"])
+        if isinstance(parent, list):
+            apply_list_operation(parent, last, operation)
+        else:
+            apply_dict_operation(parent, last, operation)
+    return result
+
+
+class FakeKubeApi:
+    """
+    Keep the objects of a fake cluster in memory and run a tiny controller that brings workload pods up.
+
+    The pods of Deployments and DaemonSets become Ready after pod_ready_delay seconds or after the delay
+    scripted for their name prefix with script_pods. Services with a selector get Endpoints of their ready pods.
+    Deleted namespaces and pods stay Terminating for a while, like in a real cluster.
+
+    Attributes:
+        latency (float): seconds every request is delayed by
+        latency_jitter (float): max random seconds added to the latency
+        latency_by_verb (dict): verb -> latency overrides, e.g. {'list': 0.1}
+        pod_ready_delay (float): seconds a new pod takes to become Ready
+        pod_termination_delay (float): seconds a deleted pod stays Terminating
+        namespace_deletion_delay (float): seconds a deleted namespace stays Terminating
+        churn_interval (float): seconds between two churn updates, 0 disables the churn
+        churn_resources ([]): plurals of the objects the churn updates, e.g. ['configmaps', 'pods']
+        objects (dict): (group, plural, namespace, name) -> object
+        resource_version (int): the last resourceVersion
+        history (deque): (resourceVersion, event type, key, object) for the watches
+        requests (dict): (method, path) -> number of requests served, for the benchmarks
+    """
+
+    def __init__(
+        self,
+        latency=0.0,
+        latency_jitter=0.0,
+        latency_by_verb=None,
+        pod_ready_delay=0.5,
+        pod_termination_delay=0.5,
+        namespace_deletion_delay=1.0,
+        churn_interval=0.0,
+        churn_resources=None,
+        tick=0.05,
+        verbose=False,
+    ):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.latency_by_verb = latency_by_verb or {}
+        self.pod_ready_delay = pod_ready_delay
+        self.pod_termination_delay = pod_termination_delay
+        self.namespace_deletion_delay = namespace_deletion_delay
+        self.churn_interval = churn_interval
+        self.churn_resources = churn_resources or []
+        self.tick = tick
+        self.verbose = verbose
+        self.cond = threading.Condition()
+        self.objects = {}
+        self.resource_version = 0
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self.crds = {}
+        self.pod_scripts = []
+        self.pod_logs = []
+        self.deadlines = {}
+        self.dirty = True
+        self.requests = {}
+        self.ip_counter = itertools.count(2)
+        self.node_port_counter = itertools.count(30000)
+        self.stopped = threading.Event()
+        self.server = None
+        self.threads = []
+        with self.cond:
+            for name in INITIAL_NAMESPACES:
+                self.add_object("", "namespaces", None, {"metadata": {"name": name}})
+            self.add_object(
+                "",
+                "nodes",
+                None,
+                {
+                    "metadata": {"name": NODE_NAME},
+                    "status": {"addresses": [{"type": "InternalIP", "address": NODE_IP}]},
+                },
+            )
+
+    # scripting
+
+    def script_pods(self, name_prefix, ready_after=None) -> None:
+        """
+        Set how long the pods with a name prefix take to become Ready, the latest rule for a prefix wins.
+
+        :param name_prefix: the start of the pod names, e.g. 'nginx-ingress'
+        :param ready_after: seconds or None for the pods that never become Ready
+        :return:
+        """
+        with self.cond:
+            self.pod_scripts.insert(0, (name_prefix, ready_after))
+
+    def script_pod_log(self, name_prefix, log) -> None:
+        """
+        Set the log the pods with a name prefix return.
+
+        :param name_prefix: the start of the pod names
+        :param log: str
+        :return:
+        """
+        with self.cond:
+            self.pod_logs.insert(0, (name_prefix, log))
+
+    def get_pod_ready_delay(self, name):
+        for prefix, ready_after in self.pod_scripts:
+            if name.startswith(prefix):
+                return ready_after
+        return self.pod_ready_delay
+
+    def count_requests(self) -> int:
+        with self.cond:
+            return sum(self.requests.values())
+
+    # storage
+
+    def get_kind(self, group, plural):
+        """
+        Get the kind of a resource and whether it is namespaced.
+
+        :param group: API group
+        :param plural: resource name
+        :return: (kind, namespaced)
+        """
+        if (group, plural) in BUILTIN_RESOURCES:
+            return BUILTIN_RESOURCES[(group, plural)]
+        if (group, plural) in self.crds:
+            return self.crds[(group, plural)]
+        raise ApiError(404, "NotFound", f"the server could not find the requested resource ({plural}.{group})")
+
+    def next_resource_version(self) -> str:
+        self.resource_version += 1
+        return str(self.resource_version)
+
+    def emit(self, event_type, key, obj) -> None:
+        self.history.append((self.resource_version, event_type, key, copy.deepcopy(obj)))
+        self.dirty = True
+        self.cond.notify_all()
+
+    def add_object(self, group, plural, namespace, body, version="v1") -> dict:
+        """
+        Store a new object, fill in the server-side metadata and notify the watches. The lock must be held.
+
+        :param group: API group
+        :param plural: resource name
+        :param namespace: namespace or None
+        :param body: dict
+        :param version: API version of the object
+        :return: the stored object
+        """
+        kind, namespaced = self.get_kind(group, plural)
+        obj = copy.deepcopy(body)
+        metadata = obj.setdefault("metadata", {})
+        if not metadata.get("name") and metadata.get("generateName"):
+            metadata["name"] = metadata["generateName"] + uuid.uuid4().hex[:5]
+        name = metadata.get("name")
+        if not name:
+            raise ApiError(422, "Invalid", f"{kind}.{group or 'core'} is invalid: metadata.name: Required value")
+        key = (group, plural, namespace if namespaced else "", name)
+        if key in self.objects:
+            raise ApiError(
+                409, "AlreadyExists", f'{plural}.{group} "{name}" already exists', {"name": name, "kind": plural}
+            )
+        if namespaced:
+            ns = self.objects.get(("", "namespaces", "", namespace))
+            if ns is None:
+                raise not_found("Namespace", namespace)
+            if ns["metadata"].get("deletionTimestamp"):
+                raise ApiError(
+                    403,
+                    "Forbidden",
+                    f"unable to create new content in namespace {namespace} because it is being terminated",
+                )
+            metadata["namespace"] = namespace
+        obj["kind"] = kind
+        obj["apiVersion"] = obj.get("apiVersion") or api_version(group, version)
+        metadata["uid"] = str(uuid.uuid4())
+        metadata["creationTimestamp"] = now_timestamp()
+        metadata["generation"] = 1
+        metadata["resourceVersion"] = self.next_resource_version()
+        self.on_create(group, plural, obj)
+        self.objects[key] = obj
+        self.emit("ADDED", key, obj)
+        return obj
+
+    def on_create(self, group, plural, obj) -> None:
+        if plural == "namespaces":
+            obj["status"] = {"phase": "Active"}
+        elif plural == "services":
+            spec = obj.setdefault("spec", {})
+            if spec.get("clusterIP") != "None":
+                spec["clusterIP"] = self.allocate_ip("10.96")
+            spec.setdefault("type", "ClusterIP")
+            for port in spec.get("ports", []):
+                port.setdefault("protocol", "TCP")
+                port.setdefault("targetPort", port.get("port"))
+                if spec["type"] in ["NodePort", "LoadBalancer"] and not port.get("nodePort"):
+                    port["nodePort"] = next(self.node_port_counter)
+            obj["status"] = {"loadBalancer": {}}
+        elif group == "apiextensions.k8s.io":
+            names = obj["spec"]["names"]
+            namespaced = obj["spec"].get("scope") == "Namespaced"
+            self.crds[(obj["spec"]["group"], names["plural"])] = (names["kind"], namespaced)
+            obj["status"] = {
+                "conditions": [
+                    {"type": "NamesAccepted", "status": "True", "reason": "NoConflicts", "message": ""},
+                    {"type": "Established", "status": "True", "reason": "InitialNamesAccepted", "message": ""},
+                ],
+                "acceptedNames": names,
+                "storedVersions": [v["name"] for v in obj["spec"].get("versions", []) if v.get("storage")],
+            }
+        elif (group, plural) in WORKLOADS:
+            obj.setdefault("spec", {})
+            if plural == "deployments":
+                obj["spec"].setdefault("replicas", 1)
+            obj["status"] = {}
+
+    def allocate_ip(self, prefix) -> str:
+        value = next(self.ip_counter)
+        return f"{prefix}.{value // 250 % 250}.{value % 250 + 1}"
+
+    def get_object(self, group, plural, namespace, name) -> dict:
+        kind, namespaced = self.get_kind(group, plural)
+        obj = self.objects.get((group, plural, namespace if namespaced else "", name))
+        if obj is None:
+            raise not_found(kind, name)
+        return obj
+
+    def store_object(self, group, plural, obj, old) -> dict:
+        """
+        Save a changed object, bump its generation if anything but the metadata and the status changed.
+
+        :param group: API group
+        :param plural: resource name
+        :param obj: the new object
+        :param old: the stored object
+        :return: the stored object
+        """
+        metadata = obj["metadata"]
+        for field in ["uid", "creationTimestamp", "namespace", "name", "generation", "deletionTimestamp"]:
+            if field in old["metadata"]:
+                metadata[field] = old["metadata"][field]
+        obj["kind"] = old["kind"]
+        obj["apiVersion"] = old["apiVersion"]
+        spec_keys = set(obj) | set(old)
+        if any(obj.get(k) != old.get(k) for k in spec_keys - {"metadata", "status", "kind", "apiVersion"}):
+            metadata["generation"] = old["metadata"].get("generation", 1) + 1
+        metadata["resourceVersion"] = self.next_resource_version()
+        key = (group, plural, metadata.get("namespace", ""), metadata["name"])
+        self.objects[key] = obj
+        self.emit("MODIFIED", key, obj)
+        return obj
+
+    def remove_object(self, key) -> None:
+        obj = self.objects.pop(key)
+        obj["metadata"]["resourceVersion"] = self.next_resource_version()
+        self.deadlines.pop(key, None)
+        if key[1] == "customresourcedefinitions":
+            crd_key = (obj["spec"]["group"], obj["spec"]["names"]["plural"])
+            self.crds.pop(crd_key, None)
+            for other in [k for k in self.objects if k[:2] == crd_key]:
+                self.remove_object(other)
+        self.emit("DELETED", key, obj)
+
+    def select(self, group, plural, namespace, query) -> []:
+        labels = parse_selector(query.get("labelSelector"))
+        fields = parse_selector(query.get("fieldSelector"))
+        return [
+            obj
+            for key, obj in sorted(self.objects.items())
+            if key[:2] == (group, plural)
+            and (namespace is None or key[2] == namespace)
+            and matches(obj, labels, fields)
+        ]
+
+    # verbs
+
+    def list(self, route, query) -> dict:
+        kind, _ = self.get_kind(route.group, route.plural)
+        items = self.select(route.group, route.plural, route.namespace, query)
+        start = int(query.get("continue") or 0)
+        limit = int(query.get("limit") or 0)
+        end = start + limit if limit else len(items)
+        page = items[start:end]
+        metadata = {"resourceVersion": str(self.resource_version)}
+        if limit and start + limit < len(items):
+            metadata["continue"] = str(start + limit)
+            metadata["remainingItemCount"] = len(items) - start - limit
+        return {
+            "kind": f"{kind}List",
+            "apiVersion": api_version(route.group, route.version),
+            "metadata": metadata,
+            "items": copy.deepcopy(page),
+        }
+
+    def watch(self, route, query):
+        """
+        Stream the watch events of a collection.
+
+        :param route: Route
+        :param query: query params
+        :return: a generator of watch events
+        """
+        labels = parse_selector(query.get("labelSelector"))
+        fields = parse_selector(query.get("fieldSelector"))
+        deadline = time.monotonic() + float(query.get("timeoutSeconds") or 1800)
+        resource_version = query.get("resourceVersion")
+
+        def wanted(key, obj):
+            return (
+                key[:2] == (route.group, route.plural)
+                and (route.namespace is None or key[2] == route.namespace)
+                and matches(obj, labels, fields)
+            )
+
+        with self.cond:
+            self.get_kind(route.group, route.plural)
+            initial = []
+            if resource_version in [None, "", "0"]:
+                since = self.resource_version
+                initial = [
+                    {"type": "ADDED", "object": copy.deepcopy(obj)}
+                    for obj in self.select(route.group, route.plural, route.namespace, query)
+                ]
+            else:
+                since = int(resource_version)
+                if self.history and since < self.history[0][0] - 1 and len(self.history) == HISTORY_SIZE:
+                    initial = [
+                        {
+                            "type": "ERROR",
+                            "object": ApiError(410, "Expired", f"too old resource version: {since}").to_status(),
+                        }
+                    ]
+                    deadline = 0
+        yield from initial
+        while not self.stopped.is_set():
+            with self.cond:
+                events = [
+                    (rv, event_type, obj)
+                    for rv, event_type, key, obj in self.history
+                    if rv > since and wanted(key, obj)
+                ]
+                if not events:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    self.cond.wait(min(remaining, 1.0))
+                    continue
+            for rv, event_type, obj in events:
+                since = max(since, rv)
+                yield {"type": event_type, "object": obj}
+
+    def create(self, route, body) -> dict:
+        if route.plural == "namespaces" or not self.get_kind(route.group, route.plural)[1]:
+            return copy.deepcopy(self.add_object(route.group, route.plural, None, body, route.version))
+        return copy.deepcopy(self.add_object(route.group, route.plural, route.namespace, body, route.version))
+
+    def read(self, route):
+        obj = self.get_object(route.group, route.plural, route.namespace, route.name)
+        if route.subresource == "scale":
+            return self.get_scale(obj)
+        if route.subresource == "log":
+            for prefix, log in self.pod_logs:
+                if route.name.startswith(prefix):
+                    return log
+            return ""
+        if route.subresource not in [None, "status"]:
+            raise ApiError(400, "BadRequest", f"the subresource {route.subresource} is not supported by the fake")
+        return copy.deepcopy(obj)
+
+    def update(self, route, body) -> dict:
+        old = self.get_object(route.group, route.plural, route.namespace, route.name)
+        expected = (body.get("metadata") or {}).get("resourceVersion")
+        if expected and expected != old["metadata"]["resourceVersion"]:
+            raise ApiError(
+                409,
+                "Conflict",
+                f'Operation cannot be fulfilled on {route.plural} "{route.name}": the object has been modified; '
+                "please apply your changes to the latest version and try again",
+            )
+        return self.write(route, old, copy.deepcopy(body))
+
+    def patch(self, route, body, content_type) -> dict:
+        old = self.get_object(route.group, route.plural, route.namespace, route.name)
+        current = self.get_scale(old) if route.subresource == "scale" else old
+        if "json-patch" in content_type or isinstance(body, list):
+            patched = json_patch(current, body)
+        else:
+            patched = merge_patch(current, body)
+        return self.write(route, old, patched)
+
+    def write(self, route, old, new) -> dict:
+        """
+        Store the result of an update or a patch of an object or of its subresource.
+
+        :param route: Route
+        :param old: the stored object
+        :param new: the new object or the new subresource
+        :return: the response
+        """
+        if route.subresource == "scale":
+            obj = copy.deepcopy(old)
+            obj["spec"]["replicas"] = (new.get("spec") or {}).get("replicas") or 0
+            return self.get_scale(self.store_object(route.group, route.plural, obj, old))
+        if route.subresource == "status":
+            obj = copy.deepcopy(old)
+            obj["status"] = new.get("status")
+            obj["metadata"] = merge_patch(old["metadata"], {"resourceVersion": None})
+        else:
+            obj = new
+            obj.setdefault("metadata", {})
+            if "status" in old:
+                obj["status"] = old["status"]
+        return copy.deepcopy(self.store_object(route.group, route.plural, obj, old))
+
+    def get_scale(self, obj) -> dict:
+        replicas = obj["spec"].get("replicas") or 0
+        match_labels = (obj["spec"].get("selector") or {}).get("matchLabels") or {}
+        selector = ",".join(f"{k}={v}" for k, v in match_labels.items())
+        # a zero is omitted from the json like the real API server does
+        return {
+            "kind": "Scale",
+            "apiVersion": "autoscaling/v1",
+            "metadata": {
+                "name": obj["metadata"]["name"],
+                "namespace": obj["metadata"]["namespace"],
+                "resourceVersion": obj["metadata"]["resourceVersion"],
+                "uid": obj["metadata"]["uid"],
+            },
+            "spec": {"replicas": replicas} if replicas else {},
+            "status": {"replicas": obj.get("status", {}).get("replicas") or 0, "selector": selector},
+        }
+
+    def delete(self, route) -> dict:
+        kind, namespaced = self.get_kind(route.group, route.plural)
+        obj = self.get_object(route.group, route.plural, route.namespace, route.name)
+        key = (route.group, route.plural, route.namespace if namespaced else "", route.name)
+        self.start_deletion(key, obj)
+        return {
+            "kind": "Status",
+            "apiVersion": "v1",
+            "metadata": {},
+            "status": "Success",
+            "details": {"name": route.name, "kind": route.plural, "uid": obj["metadata"]["uid"]},
+        }
+
+    def delete_collection(self, route, query) -> dict:
+        for obj in self.select(route.group, route.plural, route.namespace, query):
+            key = (route.group, route.plural, obj["metadata"].get("namespace", ""), obj["metadata"]["name"])
+            self.start_deletion(key, obj)
+        return {"kind": "Status", "apiVersion": "v1", "metadata": {}, "status": "Success"}
+
+    def start_deletion(self, key, obj) -> None:
+        """
+        Delete an object: namespaces and pods are Terminating for a while, the rest goes away at once.
+
+        :param key: the object key
+        :param obj: the stored object
+        :return:
+        """
+        if key[1] not in ["namespaces", "pods"]:
+            self.remove_object(key)
+            return
+        if obj["metadata"].get("deletionTimestamp"):
+            return
+        new = copy.deepcopy(obj)
+        new["metadata"]["deletionTimestamp"] = now_timestamp()
+        if key[1] == "namespaces":
+            new["status"]["phase"] = "Terminating"
+            self.deadlines[key] = time.monotonic() + self.namespace_deletion_delay
+            for other in [k for k in self.objects if k[2] == key[3]]:
+                self.start_deletion(other, self.objects[other])
+        else:
+            self.deadlines[key] = time.monotonic() + self.pod_termination_delay
+        self.store_object(key[0], key[1], new, obj)
+
+    # controller
+
+    def reconcile(self) -> None:
+        """
+        Move the pods, the workloads, the endpoints and the terminating objects one step forward.
+
+        :return:
+        """
+        with self.cond:
+            now = time.monotonic()
+            due = [key for key, deadline in self.deadlines.items() if deadline <= now]
+            if not self.dirty and not due:
+                return
+            self.dirty = False
+            for key in due:
+                obj = self.objects.get(key)
+                if obj is None:
+                    self.deadlines.pop(key, None)
+                elif obj["metadata"].get("deletionTimestamp"):
+                    if key[1] == "namespaces" and any(k[2] == key[3] for k in self.objects):
+                        continue
+                    self.remove_object(key)
+                elif key[1] == "pods":
+                    self.deadlines.pop(key)
+                    self.set_pod_ready(key, obj, True)
+            for key in [k for k in self.objects if k[:2] in WORKLOADS]:
+                if key in self.objects:
+                    self.reconcile_workload(key, self.objects[key])
+            for key in [k for k in self.objects if k[:2] == ("", "services")]:
+                self.reconcile_endpoints(key, self.objects[key])
+
+    def reconcile_workload(self, key, workload) -> None:
+        spec = workload["spec"]
+        if workload["metadata"].get("deletionTimestamp"):
+            return
+        desired = 1 if key[1] == "daemonsets" else spec.get("replicas", 1) or 0
+        template = spec.get("template") or {}
+        template_hash = hashlib.sha1(json.dumps(template, sort_keys=True).encode()).hexdigest()[:10]
+        owned = [
+            (k, pod)
+            for k, pod in self.objects.items()
+            if k[:3] == ("", "pods", key[2])
+            and any(ref.get("uid") == workload["metadata"]["uid"] for ref in pod["metadata"].get("ownerReferences", []))
+            and not pod["metadata"].get("deletionTimestamp")
+        ]
+        new = [(k, pod) for k, pod in owned if pod["metadata"]["labels"].get("pod-template-hash") == template_hash]
+        old = [(k, pod) for k, pod in owned if pod["metadata"]["labels"].get("pod-template-hash") != template_hash]
+        for _ in range(desired - len(new)):
+            self.create_pod(key, workload, template, template_hash)
+        for k, pod in new[desired:]:
+            self.start_deletion(k, pod)
+        new = new[:desired]
+        ready_new = sum(1 for _, pod in new if is_pod_ready(pod))
+        if ready_new == desired:
+            for k, pod in old:
+                self.start_deletion(k, pod)
+            old = []
+        ready = ready_new + sum(1 for _, pod in old if is_pod_ready(pod))
+        if key[1] == "deployments":
+            status = {
+                "observedGeneration": workload["metadata"]["generation"],
+                "replicas": len(new) + len(old),
+                "updatedReplicas": len(new),
+                "readyReplicas": ready,
+                "availableReplicas": ready,
+                "unavailableReplicas": max(desired - ready, 0),
+            }
+        else:
+            status = {
+                "observedGeneration": workload["metadata"]["generation"],
+                "desiredNumberScheduled": desired,
+                "currentNumberScheduled": len(new) + len(old),
+                "updatedNumberScheduled": len(new),
+                "numberReady": ready,
+                "numberAvailable": ready,
+                "numberMisscheduled": 0,
+            }
+        status = {field: value for field, value in status.items() if value}
+        if workload.get("status") != status:
+            obj = copy.deepcopy(workload)
+            obj["status"] = status
+            self.store_object(key[0], key[1], obj, workload)
+
+    def create_pod(self, key, workload, template, template_hash) -> None:
+        metadata = template.get("metadata") or {}
+        spec = copy.deepcopy(template.get("spec") or {})
+        spec["nodeName"] = NODE_NAME
+        pod = {
+            "metadata": {
+                "name": f"{key[3]}-{template_hash[:5]}-{uuid.uuid4().hex[:5]}",
+                "labels": dict(metadata.get("labels") or {}, **{"pod-template-hash": template_hash}),
+                "annotations": metadata.get("annotations") or {},
+                "ownerReferences": [
+                    {
+                        "apiVersion": workload["apiVersion"],
+                        "kind": workload["kind"],
+                        "name": key[3],
+                        "uid": workload["metadata"]["uid"],
+                        "controller": True,
+                    }
+                ],
+            },
+            "spec": spec,
+            "status": {"phase": "Pending", "hostIP": NODE_IP, "podIP": self.allocate_ip("10.244")},
+        }
+        obj = self.add_object("", "pods", key[2], pod)
+        pod_key = ("", "pods", key[2], obj["metadata"]["name"])
+        self.set_pod_ready(pod_key, obj, False)
+        ready_after = self.get_pod_ready_delay(obj["metadata"]["name"])
+        if ready_after is not None:
+            self.deadlines[pod_key] = time.monotonic() + ready_after
+
+    def set_pod_ready(self, key, pod, ready) -> None:
+        obj = copy.deepcopy(pod)
+        status = "True" if ready else "False"
+        obj["status"]["phase"] = "Running" if ready else obj["status"].get("phase", "Pending")
+        obj["status"]["conditions"] = [
+            {"type": condition, "status": status, "lastTransitionTime": now_timestamp()}
+            for condition in ["Initialized", "Ready", "ContainersReady", "PodScheduled"]
+        ]
+        obj["status"]["containerStatuses"] = [
+            {
+                "name": container.get("name", "container"),
+                "image": container.get("image", ""),
+                "imageID": "",
+                "ready": ready,
+                "restartCount": 0,
+                "started": ready,
+            }
+            for container in obj["spec"].get("containers", [])
+        ]
+        self.store_object(key[0], key[1], obj, pod)
+
+    def reconcile_endpoints(self, key, service) -> None:
+        selector = (service.get("spec") or {}).get("selector")
+        if not selector:
+            return
+        requirements = [(k, "=", v) for k, v in selector.items()]
+        pods = [
+            pod
+            for k, pod in self.objects.items()
+            if k[:3] == ("", "pods", key[2])
+            and is_pod_ready(pod)
+            and not pod["metadata"].get("deletionTimestamp")
+            and matches(pod, requirements, [])
+        ]
+        ports = [
+            {"name": port.get("name"), "port": port.get("targetPort") or port["port"], "protocol": port.get("protocol")}
+            for port in service["spec"].get("ports", [])
+            if isinstance(port.get("targetPort", port["port"]), int)
+        ]
+        addresses = [
+            {
+                "ip": pod["status"]["podIP"],
+                "nodeName": NODE_NAME,
+                "targetRef": {"kind": "Pod", "name": pod["metadata"]["name"]},
+            }
+            for pod in pods
+        ]
+        subsets = [{"addresses": addresses, "ports": ports}] if addresses else []
+        endpoints_key = ("", "endpoints", key[2], key[3])
+        current = self.objects.get(endpoints_key)
+        if current is None:
+            self.add_object("", "endpoints", key[2], {"metadata": {"name": key[3]}, "subsets": subsets})
+        elif current.get("subsets") != subsets:
+            obj = copy.deepcopy(current)
+            obj["subsets"] = subsets
+            self.store_object("", "endpoints", obj, current)
+
+    def churn(self) -> None:
+        """
+        Update a random object of the churn resources: annotate it or, for a pod, make it not Ready for a while.
+
+        :return:
+        """
+        with self.cond:
+            keys = [
+                k
+                for k, obj in self.objects.items()
+                if k[1] in self.churn_resources and not obj["metadata"].get("deletionTimestamp")
+            ]
+            if not keys:
+                return
+            key = random.choice(keys)
+            obj = self.objects[key]
+            if key[1] == "pods" and is_pod_ready(obj):
+                self.set_pod_ready(key, obj, False)
+                self.deadlines[key] = time.monotonic() + (self.get_pod_ready_delay(key[3]) or self.pod_ready_delay)
+                return
+            new = copy.deepcopy(obj)
+            annotations = new["metadata"].setdefault("annotations", {})
+            annotations[CHURN_ANNOTATION] = str(int(annotations.get(CHURN_ANNOTATION, "0")) + 1)
+            self.store_object(key[0], key[1], new, obj)
+
+    # server
+
+    def dispatch(self, method, path, query, body, content_type):
+        """
+        Serve an API request.
+
+        :param method: HTTP method
+        :param path: url path
+        :param query: query params
+        :param body: the decoded request body
+        :param content_type: the request Content-Type
+        :return: dict, str or a generator of watch events
+        """
+        if path in DISCOVERY:
+            return copy.deepcopy(DISCOVERY[path])
+        route = parse_path(path)
+        if route is None:
+            raise ApiError(404, "NotFound", f"the server could not find the requested resource {path}")
+        if method == "GET" and route.name is None and query.get("watch") in ["true", "1"]:
+            return self.watch(route, query)
+        with self.cond:
+            return self.dispatch_verb(method, route, query, body or {}, content_type)
+
+    def dispatch_verb(self, method, route, query, body, content_type):
+        """
+        Serve a request to a resource path, except a watch. The lock must be held.
+
+        :param method: HTTP method
+        :param route: Route
+        :param query: query params
+        :param body: the decoded request body
+        :param content_type: the request Content-Type
+        :return: dict or str
+        """
+        if method == "GET":
+            return self.list(route, query) if route.name is None else self.read(route)
+        if method == "POST" and route.name is None:
+            return self.create(route, body)
+        if method == "PUT" and route.name is not None:
+            return self.update(route, body)
+        if method == "PATCH" and route.name is not None:
+            return self.patch(route, body, content_type)
+        if method == "DELETE":
+            return self.delete(route) if route.name is not None else self.delete_collection(route, query)
+        raise ApiError(405, "MethodNotAllowed", "the server does not allow this method on the requested resource")
+
+    def delay(self, method, query) -> None:
+        verb = {"GET": "get", "POST": "create", "PUT": "update", "PATCH": "patch", "DELETE": "delete"}.get(method, "")
+        if method == "GET" and query.get("watch") in ["true", "1"]:
+            verb = "watch"
+        seconds = self.latency_by_verb.get(verb, self.latency) + random.uniform(0, self.latency_jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def run_controller(self) -> None:
+        while not self.stopped.wait(self.tick):
+            self.reconcile()
+
+    def run_churn(self) -> None:
+        while not self.stopped.wait(self.churn_interval):
+            self.churn()
+
+    def start(self, host="127.0.0.1", port=0):
+        """
+        Start serving in background threads.
+
+        :param host: address to listen on
+        :param port: port to listen on, 0 picks a free one
+        :return: self
+        """
+        self.server = FakeKubeApiServer((host, port), FakeKubeApiHandler, self)
+        self.threads = [
+            threading.Thread(target=self.server.serve_forever, daemon=True),
+            threading.Thread(target=self.run_controller, daemon=True),
+        ]
+        if self.churn_interval > 0 and self.churn_resources:
+            self.threads.append(threading.Thread(target=self.run_churn, daemon=True))
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.stopped.set()
+        with self.cond:
+            self.cond.notify_all()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        for thread in self.threads:
+            thread.join(timeout=5)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def write_kubeconfig(self, path, context="fake") -> str:
+        """
+        Write a kubeconfig pointing to the server, json is valid yaml so the kubernetes-client can read it.
+
+        :param path: file path
+        :param context: the context name
+        :return: the path
+        """
+        kubeconfig = {
+            "apiVersion": "v1",
+            "kind": "Config",
+            "clusters": [{"name": context, "cluster": {"server": self.url}}],
+            "users": [{"name": context, "user": {"token": "fake"}}],
+            "contexts": [{"name": context, "context": {"cluster": context, "user": context}}],
+            "current-context": context,
+        }
+        with open(path, "w") as f:
+            json.dump(kubeconfig, f, indent=2)
+        return path
+
+
+def is_pod_ready(pod) -> bool:
+    return any(
+        condition["type"] == "Ready" and condition["status"] == "True"
+        for condition in (pod.get("status") or {}).get("conditions") or []
+    )
+
+
+class FakeKubeApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler, api):
+        self.api = api
+        super().__init__(address, handler)
+
+
+class FakeKubeApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.handle_api("GET")
+
+    def do_POST(self):
+        self.handle_api("POST")
+
+    def do_PUT(self):
+        self.handle_api("PUT")
+
+    def do_PATCH(self):
+        self.handle_api("PATCH")
+
+    def do_DELETE(self):
+        self.handle_api("DELETE")
+
+    def handle_api(self, method) -> None:
+        api = self.server.api
+        parsed = urlparse(self.path)
+        query = {name: values[-1] for name, values in parse_qs(parsed.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        api.delay(method, query)
+        with api.cond:
+            counter = (method, parsed.path)
+            api.requests[counter] = api.requests.get(counter, 0) + 1
+        try:
+            body = json.loads(raw) if raw else None
+            result = api.dispatch(method, parsed.path, query, body, self.headers.get("Content-Type") or "")
+            code = 201 if method == "POST" else 200
+        except ApiError as ex:
+            result, code = ex.to_status(), ex.code
+        except (ValueError, KeyError, TypeError, IndexError) as ex:
+            result, code = ApiError(400, "BadRequest", f"{type(ex).__name__}: {ex}").to_status(), 400
+        if isinstance(result, (dict, list)):
+            self.send_body(code, "application/json", json.dumps(result).encode())
+        elif isinstance(result, str):
+            self.send_body(code, "text/plain", result.encode())
+        else:
+            self.send_stream(result)
+
+    def send_body(self, code, content_type, data) -> None:
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_stream(self, events) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for event in events:
+                data = json.dumps(event).encode() + b"\n"
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except ApiError as ex:
+            data = json.dumps({"type": "ERROR", "object": ex.to_status()}).encode() + b"\n"
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def log_message(self, format, *args) -> None:
+        if self.server.api.verbose:
+            super().log_message(format, *args)
+
+
+def parse_script(value) -> (str, float):
+    name, _, delay = value.partition("=")
+    return name, None if delay == "never" else float(delay)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run an in-memory fake of the Kubernetes API server.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8001, help="port to listen on")
+    parser.add_argument("--kubeconfig", default="", help="write a kubeconfig pointing to the server to this path")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every request is delayed by")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="max random seconds added to the latency")
+    parser.add_argument(
+        "--verb-latency", action="append", default=[], help="latency of a verb, e.g. list=0.1, can be repeated"
+    )
+    parser.add_argument("--pod-ready-delay", type=float, default=0.5, help="seconds a new pod takes to become Ready")
+    parser.add_argument(
+        "--pod-ready",
+        action="append",
+        default=[],
+        help="ready delay of the pods with a name prefix, e.g. nginx-ingress=5 or backend1=never, can be repeated",
+    )
+    parser.add_argument("--pod-termination-delay", type=float, default=0.5)
+    parser.add_argument("--namespace-deletion-delay", type=float, default=1.0)
+    parser.add_argument("--churn-interval", type=float, default=0.0, help="seconds between two churn updates")
+    parser.add_argument("--churn-resources", default="", help="comma-separated plurals to churn, e.g. configmaps,pods")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+    api = FakeKubeApi(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        latency_by_verb=dict((verb, float(seconds)) for verb, seconds in (v.split("=", 1) for v in args.verb_latency)),
+        pod_ready_delay=args.pod_ready_delay,
+        pod_termination_delay=args.pod_termination_delay,
+        namespace_deletion_delay=args.namespace_deletion_delay,
+        churn_interval=args.churn_interval,
+        churn_resources=[plural for plural in args.churn_resources.split(",") if plural],
+        verbose=args.verbose,
+    )
+    for value in args.pod_ready:
+        api.script_pods(*parse_script(value))
+    api.start(args.host, args.port)
+    print(f"Fake Kubernetes API is listening on {api.url}")
+    if args.kubeconfig:
+        print(f"Kubeconfig with the context 'fake' is written to {api.write_kubeconfig(args.kubeconfig)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        api.stop()
+
+
+if __name__ == "__main__":
+    main()
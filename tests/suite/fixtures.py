@@ -1,10 +1,12 @@
 """Describe project shared pytest fixtures."""
 
+import itertools
 import time
 import os, re
 import pytest
 import yaml
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait
 
 from kubernetes import config, client
 from kubernetes.client import (
@@ -18,7 +20,9 @@ from kubernetes.client import (
 from kubernetes.client.rest import ApiException
 
 from suite.custom_resources_utils import (
-    create_crd_from_yaml,
+    apply_crd,
+    wait_until_crd_established,
+    delete_custom_objects,
     delete_crd,
     create_ts_from_yaml,
     create_gc_from_yaml,
@@ -31,6 +35,14 @@ from suite.vs_vsr_resources_utils import (
     create_v_s_route_from_yaml,
     delete_v_s_route,
 )
+from suite.worker_utils import (
+    get_worker_id,
+    get_worker_name,
+    is_worker_namespace,
+    cluster_lock,
+    acquire_cluster_item,
+    release_cluster_item,
+)
 from suite.kube_config_utils import ensure_context_in_config, get_current_context_name
 from suite.resources_utils import (
     create_namespace_with_name_from_yaml,
@@ -45,13 +57,18 @@ from suite.resources_utils import (
     create_deployment_with_name,
     delete_deployment,
     delete_service,
-    replace_configmap_from_yaml,
+    restore_configmap_from_yaml,
     delete_testing_namespaces,
     get_first_pod_name,
+    run_kubectl_with_yaml,
 )
 from suite.resources_utils import (
     create_ingress_controller,
     delete_ingress_controller,
+    replace_ingress_controller,
+    get_ingress_controller_generation,
+    normalize_ic_args,
+    generate_ingress_controller_body,
     configure_rbac,
     cleanup_rbac,
 )
@@ -73,7 +90,6 @@ from suite.yaml_utils import (
     get_paths_from_vs_yaml,
     get_paths_from_vsr_yaml,
     get_route_namespace_from_vs_yaml,
-    get_name_from_yaml,
 )
 
 from settings import (
@@ -82,6 +98,9 @@ from settings import (
     DEPLOYMENTS,
     TEST_DATA,
     ALLOWED_DEPLOYMENT_TYPES,
+    NAMESPACE_POOL_SIZE,
+    CRD_GROUP,
+    AP_CRD_GROUP,
 )
 
 
@@ -148,6 +167,296 @@ class IngressControllerPrerequisites:
         self.config_map = config_map
 
 
+class IngressControllerPool:
+    """
+    Keep an Ingress Controller running between the test classes.
+
+    The IC is keyed by its ic-type and normalized cli arguments. A class asking for the same configuration
+    reuses the running IC after a cheap reset, a class asking for another one gets the IC spec replaced
+    and rolled out instead of a delete and create.
+
+    A reused IC keeps its pod: the logs and the Prometheus counters, e.g. nginx_reloads_total, carry over
+    from the previous classes. A class that asserts absolute counter values or reads the whole log asks for
+    new pods with {"restart": True} in the param of the IC fixture.
+
+    Attributes:
+        name (str): IC name
+        namespace (str): IC namespace
+        key (tuple): the configuration of the running IC
+        generation (int): the IC generation applied by the pool
+    """
+
+    def __init__(self, kube_apis, cli_arguments, namespace):
+        self.kube_apis = kube_apis
+        self.cli_arguments = cli_arguments
+        self.namespace = namespace
+        self.name = None
+        self.key = None
+        self.generation = None
+
+    def acquire(self, extra_args, restart=False) -> str:
+        """
+        Get an IC running with the extra cli arguments.
+
+        :param extra_args: a list of IC cli arguments
+        :param restart: roll out new IC pods even if the configuration is the same
+        :return: IC name
+        """
+        key = (
+            self.cli_arguments["ic-type"],
+            self.cli_arguments["deployment-type"],
+            tuple(normalize_ic_args(extra_args)),
+        )
+        if self.name is None:
+            print("IC pool: create the IC")
+            self.name = create_ingress_controller(
+                self.kube_apis.v1, self.kube_apis.apps_v1_api, self.cli_arguments, self.namespace, extra_args
+            )
+            self.generation = get_ingress_controller_generation(
+                self.kube_apis.apps_v1_api, self.name, self.cli_arguments["deployment-type"], self.namespace
+            )
+        elif key != self.key or restart:
+            print(f"IC pool: roll out the IC with the configuration {key[2]}")
+            self.generation = replace_ingress_controller(
+                self.kube_apis.v1,
+                self.kube_apis.apps_v1_api,
+                self.cli_arguments,
+                self.name,
+                self.namespace,
+                extra_args,
+                restart=True,
+            )
+        else:
+            print("IC pool: reuse the running IC")
+            self.reset(extra_args)
+        self.key = key
+        return self.name
+
+    def reset(self, extra_args) -> None:
+        """
+        Restore the IC spec if a test changed it (scaled or patched the IC) and wait for the IC to be Ready.
+
+        :param extra_args: a list of IC cli arguments
+        :return:
+        """
+        generation = get_ingress_controller_generation(
+            self.kube_apis.apps_v1_api, self.name, self.cli_arguments["deployment-type"], self.namespace
+        )
+        if generation != self.generation:
+            print("IC pool: the IC spec was changed by a test, restore it")
+            self.generation = replace_ingress_controller(
+                self.kube_apis.v1,
+                self.kube_apis.apps_v1_api,
+                self.cli_arguments,
+                self.name,
+                self.namespace,
+                extra_args,
+            )
+        else:
+            wait_until_all_pods_are_ready(self.kube_apis.v1, self.namespace)
+
+    def invalidate(self) -> None:
+        """
+        Keep the IC running but roll it out on the next acquire, e.g. when it started under a changed ClusterRole.
+
+        :return:
+        """
+        self.key = None
+
+    def discard(self) -> None:
+        """
+        Delete the IC, e.g. when its setup failed.
+
+        :return:
+        """
+        # the create may fail after the IC was created, before its name was stored
+        name = self.name or generate_ingress_controller_body(self.cli_arguments)["metadata"]["name"]
+        delete_ingress_controller(
+            self.kube_apis.apps_v1_api, name, self.cli_arguments["deployment-type"], self.namespace
+        )
+        self.name = None
+        self.key = None
+        self.generation = None
+
+
+class CrdManager:
+    """
+    Register the CRDs once per session.
+
+    Only the CRDs of the API groups the fixtures ask for are registered,
+    the AppProtect CRDs are registered on the first AppProtect test class.
+    A CRD is re-applied only if the cluster has it registered from a different manifest,
+    the manifest hash is kept in an annotation of the CRD.
+    The pytest-xdist workers share the CRDs: the registration is done under a lock,
+    the last worker to finish removes the CRDs created by any of them.
+
+    Attributes:
+        names ([]): the CRDs registered in the session
+        groups (set): the API groups registered in the session
+    """
+
+    def __init__(self, kube_apis, crds_dir):
+        self.kube_apis = kube_apis
+        self.crds_dir = crds_dir
+        self.names = []
+        self.groups = set()
+
+    def register(self, groups=(CRD_GROUP,)) -> None:
+        """
+        Register the CRDs of the API groups and wait for them to be Established.
+
+        The groups registered earlier in the session are skipped without reading the manifests or the cluster.
+
+        :param groups: API groups, the manifests are named <group>_<plural>.yaml
+        :return:
+        """
+        groups = [group for group in groups if group not in self.groups]
+        if not groups:
+            return
+        worker = get_worker_id() or "single"
+        with cluster_lock("crds") as state:
+            created = state.setdefault("created", [])
+            names = []
+            for file_name in sorted(os.listdir(self.crds_dir)):
+                if file_name.split("_")[0] not in groups:
+                    continue
+                with open(f"{self.crds_dir}/{file_name}") as f:
+                    for body in yaml.safe_load_all(f):
+                        name = body["metadata"]["name"]
+                        if apply_crd(self.kube_apis.api_extensions_v1, body) and name not in created:
+                            created.append(name)
+                        names.append(name)
+            for name in names:
+                wait_until_crd_established(self.kube_apis.api_extensions_v1, name)
+            if worker not in state["users"]:
+                state["users"].append(worker)
+        self.names.extend(name for name in names if name not in self.names)
+        self.groups.update(groups)
+
+    def delete_custom_objects(self) -> None:
+        """
+        Delete the custom objects of all the registered CRDs, a pytest-xdist worker deletes only its own ones.
+
+        :return:
+        """
+        namespace_filter = is_worker_namespace if get_worker_id() else None
+        for name in self.names:
+            delete_custom_objects(
+                self.kube_apis.custom_objects, self.kube_apis.api_extensions_v1, name, namespace_filter
+            )
+
+    def unregister(self) -> None:
+        """
+        Delete the CRDs created by the session if no other worker uses them.
+
+        :return:
+        """
+        worker = get_worker_id() or "single"
+        with cluster_lock("crds") as state:
+            if worker in state["users"]:
+                state["users"].remove(worker)
+            if not state["users"]:
+                for name in state.get("created", []):
+                    try:
+                        delete_crd(self.kube_apis.api_extensions_v1, name)
+                    except ApiException as ex:
+                        if ex.status != 404:
+                            raise ex
+                state["created"] = []
+        self.names = []
+        self.groups = set()
+
+
+class NamespacePool:
+    """
+    Keep a few test namespaces created in advance and delete the used ones in the background.
+
+    A deletion overlaps with the teardown of the class fixtures,
+    the next class gets its namespace only after the used ones are removed.
+
+    Attributes:
+        size (int): the number of namespaces to keep created in advance
+        ready ([]): futures of the namespaces created in advance
+        pending ([]): futures of the namespaces being deleted
+    """
+
+    def __init__(self, kube_apis, size):
+        self.kube_apis = kube_apis
+        self.size = size
+        self.ready = []
+        self.pending = []
+        self.counter = itertools.count()
+        self.creator = ThreadPoolExecutor(max_workers=size)
+        self.deleter = ThreadPoolExecutor(max_workers=8)
+        self.fill()
+
+    def fill(self) -> None:
+        """
+        Start creating namespaces in the background until there are enough of them.
+
+        :return:
+        """
+        while len(self.ready) < self.size:
+            name = f"{get_worker_name('test-namespace')}-{round(time.time() * 1000)}-{next(self.counter)}"
+            self.ready.append(
+                self.creator.submit(
+                    create_namespace_with_name_from_yaml, self.kube_apis.v1, name, f"{TEST_DATA}/common/ns.yaml"
+                )
+            )
+
+    def acquire(self) -> str:
+        """
+        Get a namespace created in advance once the released namespaces are removed.
+
+        The shared IC must not serve the resources of the previous classes anymore,
+        so the deletions started by release are waited for before the namespace is returned.
+
+        :return: namespace name
+        """
+        self.fill()
+        self.wait_for_deletions()
+        namespace = self.ready.pop(0).result()
+        self.fill()
+        return namespace
+
+    def release(self, namespace) -> None:
+        """
+        Start deleting a namespace in the background, the next acquire waits for it.
+
+        :param namespace: namespace name
+        :return:
+        """
+        self.pending.append(self.deleter.submit(delete_namespace, self.kube_apis.v1, namespace))
+
+    def wait_for_deletions(self) -> None:
+        """
+        Wait for the namespaces being deleted to be removed.
+
+        :return:
+        """
+        wait(self.pending)
+        for future in self.pending:
+            if future.exception() is not None:
+                print(f"Failed to delete a namespace: {future.exception()}")
+        self.pending = []
+
+    def close(self) -> None:
+        """
+        Delete the unused namespaces and wait for all the deletions at once.
+
+        :return:
+        """
+        for future in self.ready:
+            try:
+                self.release(future.result())
+            except Exception as ex:
+                print(f"Failed to create a namespace in advance: {ex}")
+        self.ready = []
+        self.creator.shutdown()
+        self.wait_for_deletions()
+        self.deleter.shutdown()
+
+
 @pytest.fixture(autouse=True)
 def print_name() -> None:
     """Print out a current test name."""
@@ -155,19 +464,44 @@ def print_name() -> None:
     print(f"\n============================= {test_name} =============================")
 
 
+@pytest.fixture(scope="session")
+def namespace_pool(kube_apis, request) -> NamespacePool:
+    """
+    Create a pool of test namespaces.
+
+    :param kube_apis: client apis
+    :param request: pytest fixture
+    :return: NamespacePool
+    """
+    pool = NamespacePool(kube_apis, NAMESPACE_POOL_SIZE)
+
+    def fin():
+        print("------------------------- Wait For Test Namespaces Removal -----------------------------------")
+        pool.close()
+
+    request.addfinalizer(fin)
+
+    return pool
+
+
 @pytest.fixture(scope="class")
-def test_namespace(kube_apis) -> str:
+def test_namespace(kube_apis, namespace_pool, request) -> str:
     """
-    Create a test namespace.
+    Get a test namespace from the pool, it is deleted in the background after the class.
 
     :param kube_apis: client apis
+    :param namespace_pool: the pool of test namespaces
+    :param request: pytest fixture
     :return: str
     """
-    timestamp = round(time.time() * 1000)
-    print("------------------------- Create Test Namespace -----------------------------------")
-    namespace = create_namespace_with_name_from_yaml(
-        kube_apis.v1, f"test-namespace-{str(timestamp)}", f"{TEST_DATA}/common/ns.yaml"
-    )
+    print("------------------------- Get Test Namespace -----------------------------------")
+    namespace = namespace_pool.acquire()
+
+    def fin():
+        namespace_pool.release(namespace)
+
+    request.addfinalizer(fin)
+
     return namespace
 
 
@@ -193,17 +527,22 @@ def delete_test_namespaces(kube_apis, request) -> None:
 
 
 @pytest.fixture(scope="class")
-def ingress_controller(cli_arguments, kube_apis, ingress_controller_prerequisites, request) -> str:
+def ingress_controller(
+    cli_arguments, kube_apis, ingress_controller_prerequisites, ingress_controller_pool, request
+) -> str:
     """
     Create Ingress Controller according to the context.
 
     :param cli_arguments: context
     :param kube_apis: client apis
     :param ingress_controller_prerequisites
-    :param request: pytest fixture
+    :param ingress_controller_pool: the pool that keeps the IC between the classes
+    :param request: pytest fixture to parametrize this method
+        {extra_args: , restart: }
+        'extra_args' list of IC arguments
+        'restart' start new IC pods even if the pooled IC has the same configuration
     :return: IC name
     """
-    namespace = ingress_controller_prerequisites.namespace
     name = "nginx-ingress"
     print("------------------------- Create IC without CRDs -----------------------------------")
     try:
@@ -212,26 +551,60 @@ def ingress_controller(cli_arguments, kube_apis, ingress_controller_prerequisite
     except AttributeError:
         print("IC will start with CRDs disabled and without any additional cli-arguments")
         extra_args = ["-enable-custom-resources=false"]
+    restart = bool(getattr(request, "param", None) and request.param.get("restart"))
     try:
-        name = create_ingress_controller(
-            kube_apis.v1, kube_apis.apps_v1_api, cli_arguments, namespace, extra_args
-        )
+        name = ingress_controller_pool.acquire(extra_args, restart=restart)
     except ApiException as ex:
         # Finalizer doesn't start if fixture creation was incomplete, ensure clean up here
         print(f"Failed to complete IC fixture: {ex}\nClean up the cluster as much as possible.")
-        delete_ingress_controller(
-            kube_apis.apps_v1_api, name, cli_arguments["deployment-type"], namespace
-        )
+        ingress_controller_pool.discard()
+
+    return name
+
+
+@pytest.fixture(scope="session")
+def ingress_controller_pool(
+    cli_arguments, kube_apis, ingress_controller_prerequisites, request
+) -> IngressControllerPool:
+    """
+    Create a pool that keeps the IC running between the test classes.
+
+    :param cli_arguments: tests context
+    :param kube_apis: client apis
+    :param ingress_controller_prerequisites: common cluster context
+    :param request: pytest fixture
+    :return: IngressControllerPool
+    """
+    pool = IngressControllerPool(kube_apis, cli_arguments, ingress_controller_prerequisites.namespace)
 
     def fin():
-        print("Delete IC:")
-        delete_ingress_controller(
-            kube_apis.apps_v1_api, name, cli_arguments["deployment-type"], namespace
-        )
+        if pool.name is not None:
+            print("Delete the pooled IC:")
+            pool.discard()
 
     request.addfinalizer(fin)
 
-    return name
+    return pool
+
+
+@pytest.fixture(scope="session")
+def crd_manager(kube_apis, request) -> CrdManager:
+    """
+    Create a manager that registers the CRDs once per session.
+
+    :param kube_apis: client apis
+    :param request: pytest fixture
+    :return: CrdManager
+    """
+    manager = CrdManager(kube_apis, f"{DEPLOYMENTS}/common/crds")
+
+    def fin():
+        print("Delete the CRDs:")
+        manager.unregister()
+
+    request.addfinalizer(fin)
+
+    return manager
 
 
 @pytest.fixture(scope="session")
@@ -287,7 +660,9 @@ def ingress_controller_prerequisites(
     rbac = configure_rbac(kube_apis.rbac_v1)
     namespace = create_ns_and_sa_from_yaml(kube_apis.v1, f"{DEPLOYMENTS}/common/ns-and-sa.yaml")
     print("Create IngressClass resources:")
-    subprocess.run(["kubectl", "apply", "-f", f"{DEPLOYMENTS}/common/ingress-class.yaml"])
+    run_kubectl_with_yaml("apply", f"{DEPLOYMENTS}/common/ingress-class.yaml")
+    # the custom IngressClass is shared by the pytest-xdist workers
+    acquire_cluster_item("custom-ingress-class")
     subprocess.run(
         [
             "kubectl",
@@ -308,15 +683,16 @@ def ingress_controller_prerequisites(
         print("Clean up prerequisites")
         delete_namespace(kube_apis.v1, namespace)
         print("Delete IngressClass resources:")
-        subprocess.run(["kubectl", "delete", "-f", f"{DEPLOYMENTS}/common/ingress-class.yaml"])
-        subprocess.run(
-            [
-                "kubectl",
-                "delete",
-                "-f",
-                f"{TEST_DATA}/ingress-class/resource/custom-ingress-class-res.yaml",
-            ]
-        )
+        run_kubectl_with_yaml("delete", f"{DEPLOYMENTS}/common/ingress-class.yaml")
+        if release_cluster_item("custom-ingress-class"):
+            subprocess.run(
+                [
+                    "kubectl",
+                    "delete",
+                    "-f",
+                    f"{TEST_DATA}/ingress-class/resource/custom-ingress-class-res.yaml",
+                ]
+            )
         cleanup_rbac(kube_apis.rbac_v1, rbac)
 
     request.addfinalizer(fin)
@@ -325,22 +701,29 @@ def ingress_controller_prerequisites(
 
 
 @pytest.fixture(scope="session")
-def kube_apis(cli_arguments) -> KubeApis:
+def kube_apis(request, cli_arguments) -> KubeApis:
     """
     Set up kubernets-client to operate in cluster.
 
+    The APIs share one client, it is instrumented if the API stats are enabled.
+
+    :param request: pytest fixture
     :param cli_arguments: a set of command-line arguments
     :return: KubeApis
     """
     context_name = cli_arguments["context"]
     kubeconfig = cli_arguments["kubeconfig"]
     config.load_kube_config(config_file=kubeconfig, context=context_name, persist_config=False)
-    v1 = client.CoreV1Api()
-    networking_v1 = client.NetworkingV1Api()
-    apps_v1_api = client.AppsV1Api()
-    rbac_v1 = client.RbacAuthorizationV1Api()
-    api_extensions_v1 = client.ApiextensionsV1Api()
-    custom_objects = client.CustomObjectsApi()
+    api_client = client.ApiClient()
+    api_stats = request.config.pluginmanager.get_plugin("api_stats")
+    if api_stats is not None:
+        api_stats.instrument(api_client)
+    v1 = client.CoreV1Api(api_client)
+    networking_v1 = client.NetworkingV1Api(api_client)
+    apps_v1_api = client.AppsV1Api(api_client)
+    rbac_v1 = client.RbacAuthorizationV1Api(api_client)
+    api_extensions_v1 = client.ApiextensionsV1Api(api_client)
+    custom_objects = client.CustomObjectsApi(api_client)
     return KubeApis(
         v1, networking_v1, apps_v1_api, rbac_v1, api_extensions_v1, custom_objects
     )
@@ -400,7 +783,13 @@ def cli_arguments(request) -> {}:
 
 @pytest.fixture(scope="class")
 def crd_ingress_controller(
-    cli_arguments, kube_apis, ingress_controller_prerequisites, ingress_controller_endpoint, request
+    cli_arguments,
+    kube_apis,
+    ingress_controller_prerequisites,
+    ingress_controller_endpoint,
+    ingress_controller_pool,
+    crd_manager,
+    request,
 ) -> None:
     """
     Create an Ingress Controller with CRD enabled.
@@ -409,63 +798,26 @@ def crd_ingress_controller(
     :param kube_apis: client apis
     :param ingress_controller_prerequisites
     :param ingress_controller_endpoint:
+    :param ingress_controller_pool: the pool that keeps the IC between the classes
+    :param crd_manager: the manager that keeps the CRDs registered between the classes
     :param request: pytest fixture to parametrize this method
-        {type: complete|rbac-without-vs, extra_args: }
+        {type: complete|rbac-without-vs, extra_args: , restart: }
         'type' type of test pre-configuration
         'extra_args' list of IC cli arguments
+        'restart' start new IC pods even if the pooled IC has the same configuration
     :return:
     """
-    namespace = ingress_controller_prerequisites.namespace
-    name = "nginx-ingress"
-    vs_crd_name = get_name_from_yaml(f"{DEPLOYMENTS}/common/crds/k8s.nginx.org_virtualservers.yaml")
-    vsr_crd_name = get_name_from_yaml(
-        f"{DEPLOYMENTS}/common/crds/k8s.nginx.org_virtualserverroutes.yaml"
-    )
-    pol_crd_name = get_name_from_yaml(f"{DEPLOYMENTS}/common/crds/k8s.nginx.org_policies.yaml")
-    ts_crd_name = get_name_from_yaml(
-        f"{DEPLOYMENTS}/common/crds/k8s.nginx.org_transportservers.yaml"
-    )
-    gc_crd_name = get_name_from_yaml(
-        f"{DEPLOYMENTS}/common/crds/k8s.nginx.org_globalconfigurations.yaml"
-    )
-
     try:
         print("------------------------- Update ClusterRole -----------------------------------")
         if request.param["type"] == "rbac-without-vs":
             patch_rbac(kube_apis.rbac_v1, f"{TEST_DATA}/virtual-server/rbac-without-vs.yaml")
         print("------------------------- Register CRDs -----------------------------------")
-        create_crd_from_yaml(
-            kube_apis.api_extensions_v1,
-            vs_crd_name,
-            f"{DEPLOYMENTS}/common/crds/k8s.nginx.org_virtualservers.yaml",
-        )
-        create_crd_from_yaml(
-            kube_apis.api_extensions_v1,
-            vsr_crd_name,
-            f"{DEPLOYMENTS}/common/crds/k8s.nginx.org_virtualserverroutes.yaml",
-        )
-        create_crd_from_yaml(
-            kube_apis.api_extensions_v1,
-            pol_crd_name,
-            f"{DEPLOYMENTS}/common/crds/k8s.nginx.org_policies.yaml",
-        )
-        create_crd_from_yaml(
-            kube_apis.api_extensions_v1,
-            ts_crd_name,
-            f"{DEPLOYMENTS}/common/crds/k8s.nginx.org_transportservers.yaml",
-        )
-        create_crd_from_yaml(
-            kube_apis.api_extensions_v1,
-            gc_crd_name,
-            f"{DEPLOYMENTS}/common/crds/k8s.nginx.org_globalconfigurations.yaml",
-        )
+        crd_manager.register()
         print("------------------------- Create IC -----------------------------------")
-        name = create_ingress_controller(
-            kube_apis.v1,
-            kube_apis.apps_v1_api,
-            cli_arguments,
-            namespace,
+        # the IC must start with the misconfigured ClusterRole
+        ingress_controller_pool.acquire(
             request.param.get("extra_args", None),
+            restart=request.param["type"] == "rbac-without-vs" or request.param.get("restart", False),
         )
         ensure_connection_to_public_endpoint(
             ingress_controller_endpoint.public_ip,
@@ -475,38 +827,33 @@ def crd_ingress_controller(
     except ApiException as ex:
         # Finalizer method doesn't start if fixture creation was incomplete, ensure clean up here
         print(f"Failed to complete CRD IC fixture: {ex}\nClean up the cluster as much as possible.")
-        delete_crd(kube_apis.api_extensions_v1, vs_crd_name)
-        delete_crd(kube_apis.api_extensions_v1, vsr_crd_name)
-        delete_crd(kube_apis.api_extensions_v1, pol_crd_name)
-        delete_crd(kube_apis.api_extensions_v1, ts_crd_name)
-        delete_crd(kube_apis.api_extensions_v1, gc_crd_name)
         print("Restore the ClusterRole:")
         patch_rbac(kube_apis.rbac_v1, f"{DEPLOYMENTS}/rbac/rbac.yaml")
         print("Remove the IC:")
-        delete_ingress_controller(
-            kube_apis.apps_v1_api, name, cli_arguments["deployment-type"], namespace
-        )
+        ingress_controller_pool.discard()
         pytest.fail("IC setup failed")
 
     def fin():
-        delete_crd(kube_apis.api_extensions_v1, vs_crd_name)
-        delete_crd(kube_apis.api_extensions_v1, vsr_crd_name)
-        delete_crd(kube_apis.api_extensions_v1, pol_crd_name)
-        delete_crd(kube_apis.api_extensions_v1, ts_crd_name)
-        delete_crd(kube_apis.api_extensions_v1, gc_crd_name)
+        print("Delete the custom resources:")
+        crd_manager.delete_custom_objects()
         print("Restore the ClusterRole:")
         patch_rbac(kube_apis.rbac_v1, f"{DEPLOYMENTS}/rbac/rbac.yaml")
-        print("Remove the IC:")
-        delete_ingress_controller(
-            kube_apis.apps_v1_api, name, cli_arguments["deployment-type"], namespace
-        )
+        if request.param["type"] == "rbac-without-vs":
+            # the informers of the IC started without the permissions, the next class must not reuse it
+            ingress_controller_pool.invalidate()
 
     request.addfinalizer(fin)
 
 
 @pytest.fixture(scope="class")
 def crd_ingress_controller_with_ap(
-    cli_arguments, kube_apis, ingress_controller_prerequisites, ingress_controller_endpoint, request
+    cli_arguments,
+    kube_apis,
+    ingress_controller_prerequisites,
+    ingress_controller_endpoint,
+    ingress_controller_pool,
+    crd_manager,
+    request,
 ) -> None:
     """
     Create an Ingress Controller with AppProtect CRD enabled.
@@ -514,82 +861,26 @@ def crd_ingress_controller_with_ap(
     :param kube_apis: client apis
     :param ingress_controller_prerequisites
     :param ingress_controller_endpoint:
+    :param ingress_controller_pool: the pool that keeps the IC between the classes
+    :param crd_manager: the manager that keeps the CRDs registered between the classes
     :param request: pytest fixture to parametrize this method
-        {extra_args: }
+        {extra_args: , restart: }
         'extra_args' list of IC arguments
+        'restart' start new IC pods even if the pooled IC has the same configuration
     :return:
     """
-    namespace = ingress_controller_prerequisites.namespace
-    name = "nginx-ingress"
     try:
         print(
             "--------------------Create roles and bindings for AppProtect------------------------"
         )
         rbac = configure_rbac_with_ap(kube_apis.rbac_v1)
 
-        print("------------------------- Register AP CRD -----------------------------------")
-        ap_pol_crd_name = get_name_from_yaml(
-            f"{DEPLOYMENTS}/common/crds/appprotect.f5.com_appolicies.yaml"
-        )
-        ap_log_crd_name = get_name_from_yaml(
-            f"{DEPLOYMENTS}/common/crds/appprotect.f5.com_aplogconfs.yaml"
-        )
-        ap_uds_crd_name = get_name_from_yaml(
-            f"{DEPLOYMENTS}/common/crds/appprotect.f5.com_apusersigs.yaml"
-        )
-        vs_crd_name = get_name_from_yaml(
-            f"{DEPLOYMENTS}/common/crds/k8s.nginx.org_virtualservers.yaml"
-        )
-        vsr_crd_name = get_name_from_yaml(
-            f"{DEPLOYMENTS}/common/crds/k8s.nginx.org_virtualserverroutes.yaml"
-        )
-        pol_crd_name = get_name_from_yaml(f"{DEPLOYMENTS}/common/crds/k8s.nginx.org_policies.yaml")
-        ts_crd_name = get_name_from_yaml(
-            f"{DEPLOYMENTS}/common/crds/k8s.nginx.org_transportservers.yaml"
-        )
-        create_crd_from_yaml(
-            kube_apis.api_extensions_v1,
-            ap_pol_crd_name,
-            f"{DEPLOYMENTS}/common/crds/appprotect.f5.com_appolicies.yaml",
-        )
-        create_crd_from_yaml(
-            kube_apis.api_extensions_v1,
-            ap_log_crd_name,
-            f"{DEPLOYMENTS}/common/crds/appprotect.f5.com_aplogconfs.yaml",
-        )
-        create_crd_from_yaml(
-            kube_apis.api_extensions_v1,
-            ap_uds_crd_name,
-            f"{DEPLOYMENTS}/common/crds/appprotect.f5.com_apusersigs.yaml",
-        )
-        create_crd_from_yaml(
-            kube_apis.api_extensions_v1,
-            vs_crd_name,
-            f"{DEPLOYMENTS}/common/crds/k8s.nginx.org_virtualservers.yaml",
-        )
-        create_crd_from_yaml(
-            kube_apis.api_extensions_v1,
-            vsr_crd_name,
-            f"{DEPLOYMENTS}/common/crds/k8s.nginx.org_virtualserverroutes.yaml",
-        )
-        create_crd_from_yaml(
-            kube_apis.api_extensions_v1,
-            pol_crd_name,
-            f"{DEPLOYMENTS}/common/crds/k8s.nginx.org_policies.yaml",
-        )
-        create_crd_from_yaml(
-            kube_apis.api_extensions_v1,
-            ts_crd_name,
-            f"{DEPLOYMENTS}/common/crds/k8s.nginx.org_transportservers.yaml",
-        )
+        print("------------------------- Register CRDs -----------------------------------")
+        crd_manager.register([CRD_GROUP, AP_CRD_GROUP])
 
         print("------------------------- Create IC -----------------------------------")
-        name = create_ingress_controller(
-            kube_apis.v1,
-            kube_apis.apps_v1_api,
-            cli_arguments,
-            namespace,
-            request.param.get("extra_args", None),
+        ingress_controller_pool.acquire(
+            request.param.get("extra_args", None), restart=request.param.get("restart", False)
         )
         ensure_connection_to_public_endpoint(
             ingress_controller_endpoint.public_ip,
@@ -598,77 +889,17 @@ def crd_ingress_controller_with_ap(
         )
     except Exception as ex:
         print(f"Failed to complete CRD IC fixture: {ex}\nClean up the cluster as much as possible.")
-        delete_crd(
-            kube_apis.api_extensions_v1,
-            ap_pol_crd_name,
-        )
-        delete_crd(
-            kube_apis.api_extensions_v1,
-            ap_log_crd_name,
-        )
-        delete_crd(
-            kube_apis.api_extensions_v1,
-            ap_uds_crd_name,
-        )
-        delete_crd(
-            kube_apis.api_extensions_v1,
-            vs_crd_name,
-        )
-        delete_crd(
-            kube_apis.api_extensions_v1,
-            vsr_crd_name,
-        )
-        delete_crd(
-            kube_apis.api_extensions_v1,
-            pol_crd_name,
-        )
-        delete_crd(
-            kube_apis.api_extensions_v1,
-            ts_crd_name,
-        )
         print("Remove ap-rbac")
         cleanup_rbac(kube_apis.rbac_v1, rbac)
         print("Remove the IC:")
-        delete_ingress_controller(
-            kube_apis.apps_v1_api, name, cli_arguments["deployment-type"], namespace
-        )
+        ingress_controller_pool.discard()
         pytest.fail("IC setup failed")
+
     def fin():
         print("--------------Cleanup----------------")
-        delete_crd(
-            kube_apis.api_extensions_v1,
-            ap_pol_crd_name,
-        )
-        delete_crd(
-            kube_apis.api_extensions_v1,
-            ap_log_crd_name,
-        )
-        delete_crd(
-            kube_apis.api_extensions_v1,
-            ap_uds_crd_name,
-        )
-        delete_crd(
-            kube_apis.api_extensions_v1,
-            vs_crd_name,
-        )
-        delete_crd(
-            kube_apis.api_extensions_v1,
-            vsr_crd_name,
-        )
-        delete_crd(
-            kube_apis.api_extensions_v1,
-            pol_crd_name,
-        )
-        delete_crd(
-            kube_apis.api_extensions_v1,
-            ts_crd_name,
-        )
+        crd_manager.delete_custom_objects()
         print("Remove ap-rbac")
         cleanup_rbac(kube_apis.rbac_v1, rbac)
-        print("Remove the IC:")
-        delete_ingress_controller(
-            kube_apis.apps_v1_api, name, cli_arguments["deployment-type"], namespace
-        )
 
     request.addfinalizer(fin)
 
@@ -790,7 +1021,9 @@ def transport_server_setup(
     global_config_file = (
         f"{TEST_DATA}/{request.param['example']}/standard/global-configuration.yaml"
     )
-    gc_resource = create_gc_from_yaml(kube_apis.custom_objects, global_config_file, "nginx-ingress")
+    gc_resource = create_gc_from_yaml(
+        kube_apis.custom_objects, global_config_file, ingress_controller_prerequisites.namespace
+    )
 
     # deploy service_file
     service_file = f"{TEST_DATA}/{request.param['example']}/standard/service_deployment.yaml"
@@ -808,7 +1041,7 @@ def transport_server_setup(
         print("Clean up TransportServer Example:")
         delete_ts(kube_apis.custom_objects, ts_resource, test_namespace)
         delete_items_from_yaml(kube_apis, service_file, test_namespace)
-        delete_gc(kube_apis.custom_objects, gc_resource, "nginx-ingress")
+        delete_gc(kube_apis.custom_objects, gc_resource, ingress_controller_prerequisites.namespace)
 
     request.addfinalizer(fin)
 
@@ -999,7 +1232,7 @@ def v_s_route_setup(request, kube_apis, ingress_controller_endpoint) -> VirtualS
 @pytest.fixture(scope="function")
 def restore_configmap(request, kube_apis, ingress_controller_prerequisites, test_namespace) -> None:
     """
-    Return ConfigMap to the initial state after the test.
+    Return ConfigMap to the initial state after the test, only the changed keys are patched.
 
     :param request: internal pytest fixture
     :param kube_apis: client apis
@@ -1009,7 +1242,7 @@ def restore_configmap(request, kube_apis, ingress_controller_prerequisites, test
     """
 
     def fin():
-        replace_configmap_from_yaml(
+        restore_configmap_from_yaml(
             kube_apis.v1,
             ingress_controller_prerequisites.config_map["metadata"]["name"],
             ingress_controller_prerequisites.namespace,
@@ -0,0 +1,169 @@
+"""Describe methods to send concurrent gRPC calls to the helloworld backend through the Ingress Controller."""
+
+import itertools
+import threading
+import time
+from collections import Counter
+
+import grpc
+
+from suite.grpc.helloworld_pb2 import HelloRequest
+from suite.grpc.helloworld_pb2_grpc import GreeterStub
+from suite.stats_utils import get_percentile
+
+# upper bounds of the latency histogram buckets in ms, the last bucket is unbounded
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class GrpcCallResult:
+    """
+    Encapsulate the result of a SayHello call.
+
+    Attributes:
+        code (str): the name of the gRPC status code, e.g. 'OK' or 'UNAVAILABLE'
+        latency_ms (float): time from sending the request to receiving the status
+        details (str): the status details or the response message
+    """
+
+    def __init__(self, code, latency_ms, details=""):
+        self.code = code
+        self.latency_ms = latency_ms
+        self.details = details
+
+
+class GrpcLoadReport:
+    """
+    Encapsulate the results of a gRPC load run.
+
+    Attributes:
+        results ([GrpcCallResult]):
+        duration (float): seconds
+    """
+
+    def __init__(self, results, duration):
+        self.results = results
+        self.duration = duration
+
+    @property
+    def status_codes(self) -> Counter:
+        return Counter(result.code for result in self.results)
+
+    @property
+    def details(self) -> Counter:
+        return Counter(result.details for result in self.results if result.code != "OK")
+
+    @property
+    def throughput(self) -> float:
+        return len(self.results) / self.duration if self.duration else 0.0
+
+    def latency_ms(self, percentile, code="OK") -> float:
+        """
+        Get a percentile of the latency of the calls that ended with a status code.
+
+        :param percentile: 0-100
+        :param code: status code name or None for all the calls
+        :return: float
+        """
+        return get_percentile(
+            [result.latency_ms for result in self.results if code is None or result.code == code], percentile
+        )
+
+    def latency_histogram(self) -> [(float, int)]:
+        """
+        Get the number of calls per latency bucket.
+
+        :return: [(upper bound in ms, number of calls)], the last bound is inf
+        """
+        bounds = LATENCY_BUCKETS_MS + (float("inf"),)
+        counts = [0] * len(bounds)
+        for result in self.results:
+            counts[next(i for i, bound in enumerate(bounds) if result.latency_ms <= bound)] += 1
+        return list(zip(bounds, counts))
+
+    def summary(self) -> str:
+        histogram = ", ".join(f"<={bound:g}ms: {count}" for bound, count in self.latency_histogram() if count)
+        return (
+            f"{len(self.results)} calls in {self.duration:.2f}s ({self.throughput:.1f}/s), "
+            f"status codes: {dict(self.status_codes)}, latency p50={self.latency_ms(50):.1f}ms "
+            f"p99={self.latency_ms(99):.1f}ms p99.9={self.latency_ms(99.9):.1f}ms, histogram: {histogram}"
+        )
+
+
+def create_grpc_channel(target, cert, host) -> grpc.Channel:
+    """
+    Create a TLS channel with the SNI of the host, the same way the gRPC tests connect.
+
+    :param target: 'ip:port'
+    :param cert: the PEM certificate of the Ingress, e.g. from get_certificate
+    :param host: the host of the VirtualServer or the Ingress
+    :return: grpc.Channel
+    """
+    credentials = grpc.ssl_channel_credentials(root_certificates=cert.encode())
+    # the TLS cert must have the CN equal to the host
+    options = (
+        ('grpc.ssl_target_name_override', host),
+        # a new subchannel per channel, otherwise grpc shares one connection between the channels
+        ('grpc.use_local_subchannel_pool', 1),
+    )
+    return grpc.secure_channel(target, credentials, options)
+
+
+def run_grpc_load(target, cert, host, calls=1000, concurrency=50, channels=1, duration=None,
+                  name="load", timeout=10.0) -> GrpcLoadReport:
+    """
+    Send unary SayHello calls with bounded concurrency over a few long-lived channels.
+
+    The calls of a channel are multiplexed as HTTP/2 streams over one connection,
+    so a run measures the gRPC proxying of NGINX rather than the TLS handshakes.
+
+    :param target: 'ip:port'
+    :param cert: the PEM certificate of the Ingress, e.g. from get_certificate
+    :param host: the host of the VirtualServer or the Ingress
+    :param calls: number of calls, ignored if duration is set
+    :param concurrency: max number of calls in flight
+    :param channels: number of channels (connections) the calls are spread between
+    :param duration: seconds to keep sending calls for a sustained run
+    :param name: the name field of the requests
+    :param timeout: deadline of every call in seconds
+    :return: GrpcLoadReport
+    """
+    amount = f"calls for {duration}s" if duration else f"{calls} calls"
+    print(f"Send {amount} to {host} at {target} ({concurrency} at a time over {channels} channels)")
+    opened = [create_grpc_channel(target, cert, host) for _ in range(channels)]
+    stubs = itertools.cycle([GreeterStub(channel) for channel in opened])
+    request = HelloRequest(name=name)
+    semaphore = threading.BoundedSemaphore(concurrency)
+    lock = threading.Lock()
+    results = []
+
+    def record(future, start):
+        try:
+            latency_ms = (time.perf_counter() - start) * 1000
+            if future.code() == grpc.StatusCode.OK:
+                result = GrpcCallResult("OK", latency_ms, future.result().message)
+            else:
+                result = GrpcCallResult(future.code().name, latency_ms, future.details() or "")
+            with lock:
+                results.append(result)
+        finally:
+            semaphore.release()
+
+    try:
+        start = time.perf_counter()
+        deadline = start + duration if duration else None
+        sent = 0
+        while (time.perf_counter() < deadline) if deadline else sent < calls:
+            semaphore.acquire()
+            call_start = time.perf_counter()
+            future = next(stubs).SayHello.future(request, timeout=timeout)
+            future.add_done_callback(lambda f, call_start=call_start: record(f, call_start))
+            sent += 1
+        # wait for the calls in flight
+        for _ in range(concurrency):
+            semaphore.acquire()
+        report = GrpcLoadReport(results, time.perf_counter() - start)
+    finally:
+        for channel in opened:
+            channel.close()
+    print(report.summary())
+    return report
@@ -0,0 +1,121 @@
+"""Describe methods to send a fixed HTTP load profile to a backend through the Ingress Controller."""
+
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from suite.stats_utils import get_percentile
+
+
+class HttpRequestResult:
+    """
+    Encapsulate the result of an HTTP request.
+
+    Attributes:
+        status (int): the status code, 0 if there was no response
+        latency_ms (float): time from sending the request to reading the whole response
+        server (str): the backend address the simple app returned
+        error (str): the error or an empty string
+    """
+
+    def __init__(self, status, latency_ms, server="", error=""):
+        self.status = status
+        self.latency_ms = latency_ms
+        self.server = server
+        self.error = error
+
+
+class HttpLoadReport:
+    """
+    Encapsulate the results of an HTTP load run.
+
+    Attributes:
+        results ([HttpRequestResult]):
+        duration (float): seconds
+    """
+
+    def __init__(self, results, duration):
+        self.results = results
+        self.duration = duration
+
+    @property
+    def status_codes(self) -> Counter:
+        return Counter(result.status for result in self.results)
+
+    @property
+    def distribution(self) -> Counter:
+        return Counter(result.server for result in self.results if result.server)
+
+    @property
+    def failures(self) -> []:
+        return [result for result in self.results if result.error or result.status >= 500]
+
+    @property
+    def rps(self) -> float:
+        return len(self.results) / self.duration if self.duration else 0.0
+
+    def latency_ms(self, percentile) -> float:
+        """
+        Get a percentile of the latency of the successful requests.
+
+        :param percentile: 0-100
+        :return: float
+        """
+        return get_percentile([r.latency_ms for r in self.results if not r.error and r.status < 500], percentile)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.results)} requests in {self.duration:.2f}s ({self.rps:.1f} rps), "
+            f"{len(self.failures)} failed, latency p50={self.latency_ms(50):.1f}ms p95={self.latency_ms(95):.1f}ms "
+            f"p99={self.latency_ms(99):.1f}ms, status codes: {dict(self.status_codes)}"
+        )
+
+
+def run_http_load(url, host, duration=20.0, concurrency=32, keepalive=True, timeout=5.0) -> HttpLoadReport:
+    """
+    Send requests from a fixed number of clients, each one sends the next request after the response.
+
+    :param url: url
+    :param host: the host header
+    :param duration: seconds
+    :param concurrency: number of the clients
+    :param keepalive: the clients reuse their connections
+    :param timeout: seconds for every request
+    :return: HttpLoadReport
+    """
+    print(f"Send requests to {url} from {concurrency} clients for {duration}s, keepalive: {keepalive}")
+    headers = {"host": host} if keepalive else {"host": host, "connection": "close"}
+    results = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+    deadline = start + duration
+
+    def client():
+        session = requests.Session()
+        own = []
+        try:
+            while time.perf_counter() < deadline:
+                sent = time.perf_counter()
+                try:
+                    resp = session.get(url, headers=headers, timeout=timeout)
+                    match = re.search(r"Server address: (\S+)", resp.text)
+                    own.append(HttpRequestResult(
+                        resp.status_code, (time.perf_counter() - sent) * 1000, match.group(1) if match else ""
+                    ))
+                except requests.RequestException as ex:
+                    own.append(HttpRequestResult(0, (time.perf_counter() - sent) * 1000, error=type(ex).__name__))
+        finally:
+            session.close()
+            with lock:
+                results.extend(own)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(client)
+    report = HttpLoadReport(results, time.perf_counter() - start)
+    print(report.summary())
+    return report
@@ -0,0 +1,89 @@
+"""Describe methods to check how the requests are distributed between the backends."""
+
+from math import exp, lgamma, log
+
+
+def chi_square_p_value(statistic, dof) -> float:
+    """
+    Get the probability of a chi-square statistic at least that large, the survival function of the distribution.
+
+    :param statistic: chi-square statistic
+    :param dof: degrees of freedom
+    :return: float
+    """
+    if dof <= 0 or statistic <= 0:
+        return 1.0
+    a, x = dof / 2, statistic / 2
+    prefix = exp(-x + a * log(x) - lgamma(a))
+    if x < a + 1:
+        # the series of the regularized lower incomplete gamma function
+        term = total = 1 / a
+        n = a
+        while abs(term) > abs(total) * 1e-12:
+            n += 1
+            term *= x / n
+            total += term
+        return max(0.0, 1 - total * prefix)
+    # the continued fraction of the regularized upper incomplete gamma function
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-12:
+            break
+    return prefix * h
+
+
+def check_balance(distribution, endpoints=None, weights=None) -> (float, float):
+    """
+    Run the chi-square goodness-of-fit test of a distribution of requests between endpoints.
+
+    :param distribution: endpoint -> number of requests
+    :param endpoints: the expected endpoints, the ones of the distribution by default
+    :param weights: endpoint -> weight, equal weights by default
+    :return: (chi-square statistic, p-value)
+    """
+    endpoints = list(endpoints or distribution)
+    weights = weights or {}
+    total_weight = sum(weights.get(endpoint, 1) for endpoint in endpoints)
+    total = sum(distribution.get(endpoint, 0) for endpoint in endpoints)
+    statistic = 0.0
+    for endpoint in endpoints:
+        expected = total * weights.get(endpoint, 1) / total_weight
+        if expected > 0:
+            statistic += (distribution.get(endpoint, 0) - expected) ** 2 / expected
+    return statistic, chi_square_p_value(statistic, len(endpoints) - 1)
+
+
+def assert_balanced(distribution, endpoints=None, weights=None, alpha=0.001) -> None:
+    """
+    Assert that the requests went to the expected endpoints in the proportion of their weights.
+
+    The check fails if such a skew happens by chance with a probability below alpha.
+
+    :param distribution: endpoint -> number of requests
+    :param endpoints: the expected endpoints, the ones of the distribution by default
+    :param weights: endpoint -> weight, equal weights by default
+    :param alpha: significance level
+    :return:
+    """
+    endpoints = list(endpoints or distribution)
+    unexpected = set(distribution) - set(endpoints)
+    assert not unexpected, f"Requests went to unexpected endpoints {unexpected}, expected {endpoints}"
+    statistic, p_value = check_balance(distribution, endpoints, weights)
+    print(f"Distribution {dict(distribution)}: chi-square={statistic:.2f}, p-value={p_value:.3g}")
+    assert p_value >= alpha, (
+        f"The requests are not balanced between {endpoints}: {dict(distribution)}, "
+        f"chi-square={statistic:.2f}, p-value={p_value:.3g} < {alpha}"
+    )
@@ -0,0 +1,272 @@
+"""Describe micro-benchmarks of the hot paths of the suite, they run offline without a cluster.
+
+Run them from the tests folder with `python -m suite.micro_benchmarks`.
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+import yaml
+
+from settings import DEPLOYMENTS, PROJECT_ROOT, TEST_DATA
+from suite.custom_assertions import assert_event_and_get_count, get_event_count
+from suite.custom_resources_utils import generate_item_with_upstream_options
+from suite.fake_ic_api import FakeIcApi
+from suite.resources_utils import generate_ingresses_with_annotation, get_reload_count, parse_metric_data
+
+# an untracked artifact, save it on the main branch before comparing a branch with it
+BASELINE = f"{PROJECT_ROOT}/json_files/micro-benchmarks-baseline.json"
+METRICS_UPSTREAMS = 2200
+EVENTS = 10000
+CONFIG_SERVERS = 5000
+# a result is a regression if it is that much worse than the baseline
+DEFAULT_THRESHOLD = 0.2
+
+
+class Event:
+    """
+    Encapsulate the fields of a Kubernetes event the assertions read.
+
+    Attributes:
+        message (str):
+        count (int):
+    """
+
+    def __init__(self, message, count):
+        self.message = message
+        self.count = count
+
+
+class BenchmarkResult:
+    """
+    Encapsulate the result of a benchmark.
+
+    Attributes:
+        name (str):
+        ops_per_sec (float): the best rate of the repeats
+        peak_kib (float): the peak memory allocated by one call
+        retained_kib (float): the memory still allocated after one call
+    """
+
+    def __init__(self, name, ops_per_sec, peak_kib, retained_kib):
+        self.name = name
+        self.ops_per_sec = ops_per_sec
+        self.peak_kib = peak_kib
+        self.retained_kib = retained_kib
+
+    def to_dict(self) -> dict:
+        return {
+            "ops_per_sec": round(self.ops_per_sec, 2),
+            "peak_kib": round(self.peak_kib, 1),
+            "retained_kib": round(self.retained_kib, 1),
+        }
+
+
+def run_benchmark(name, func, min_time=1.0, repeat=5) -> BenchmarkResult:
+    """
+    Measure the rate of a function like timeit does and the memory one call allocates.
+
+    :param name: benchmark name
+    :param func: a function without arguments
+    :param min_time: the approximate seconds to spend
+    :param repeat: number of timed repeats, the best one is reported
+    :return: BenchmarkResult
+    """
+    func()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeat / 5:
+            break
+        number *= 2
+    number = max(1, int(number * min_time / repeat / max(elapsed, 1e-9)))
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = func()
+        after, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+    return BenchmarkResult(name, 1 / best, (peak - before) / 1024, (after - before) / 1024)
+
+
+def generate_metrics_page(upstreams) -> str:
+    """
+    Generate an IC /metrics page with a latency histogram for every upstream, 2200 upstreams make 50k lines.
+
+    :param upstreams: number of upstreams
+    :return: str
+    """
+    ic = FakeIcApi()
+    ic.add_upstreams(upstreams, 1)
+    ic.apply({"reload": "other"})
+    return ic.render_metrics()
+
+
+def generate_events(count) -> []:
+    """
+    Generate events, only the oldest one is about the VirtualServer the benchmarks look for.
+
+    :param count: number of events
+    :return: [Event]
+    """
+    events = [Event("Configuration for default/cafe was added or updated ", 1)]
+    events.extend(
+        Event(f"Configuration for test-namespace/virtual-server-{i} was added or updated", i) for i in range(1, count)
+    )
+    return events
+
+
+def generate_stream_config(servers) -> str:
+    """
+    Generate an NGINX stream config with a large upstream like the TS tests read from the IC pod.
+
+    :param servers: number of upstream servers
+    :return: str
+    """
+    lines = ["upstream ts_default_transport-server_tcp-app {", "    zone ts_default_transport-server_tcp-app 256k;"]
+    lines.extend(
+        f"    server 10.{i // 250 % 250}.{i % 250}.1:3333 max_fails=1 fail_timeout=10s max_conns=2;"
+        for i in range(servers)
+    )
+    lines.extend(["}", "server {", "    listen 3333;", "    proxy_pass ts_default_transport-server_tcp-app;", "}"])
+    return "\n".join(lines)
+
+
+def get_benchmarks(metrics_url) -> []:
+    """
+    Get the benchmarks and their inputs.
+
+    :param metrics_url: url of a fake /metrics page
+    :return: [(name, func)]
+    """
+    page = generate_metrics_page(METRICS_UPSTREAMS)
+    events = generate_events(EVENTS)
+    config = generate_stream_config(CONFIG_SERVERS)
+    crds = {}
+    for path in sorted(glob.glob(f"{DEPLOYMENTS}/common/crds/*.yaml")):
+        with open(path) as f:
+            crds[os.path.basename(path)] = f.read()
+    upstream_options = {"lb-method": "least_conn", "max-fails": 25, "fail-timeout": "15s", "connect-timeout": "30s"}
+    annotations = {"nginx.org/proxy-connect-timeout": "30s", "nginx.org/server-snippets": "location /a { return 200; }"}
+    benchmarks = [
+        (
+            "parse_metric_data[50k lines]",
+            lambda: parse_metric_data(page, 'reloads_total{class="nginx",reason="other"}'),
+        ),
+        ("get_reload_count[50k lines]", lambda: get_reload_count(metrics_url)),
+        ("get_event_count[10k events]", lambda: get_event_count("default/cafe was added", events)),
+        ("assert_event_and_get_count[10k events]", lambda: assert_event_and_get_count("default/cafe", events)),
+        ("re.findall servers[5k servers]", lambda: len(re.findall("server .*;", config))),
+        ("re.findall max_conns[5k servers]", lambda: len(re.findall("max_conns=2", config))),
+        (
+            "generate_item_with_upstream_options",
+            lambda: generate_item_with_upstream_options(
+                f"{TEST_DATA}/virtual-server-upstream-options/standard/virtual-server.yaml", upstream_options
+            ),
+        ),
+        (
+            "generate_ingresses_with_annotation",
+            lambda: generate_ingresses_with_annotation(
+                f"{TEST_DATA}/annotations/standard/annotations-ingress.yaml", annotations
+            ),
+        ),
+    ]
+    for name, content in crds.items():
+        benchmarks.append((f"yaml.safe_load[{name}]", lambda content=content: yaml.safe_load(content)))
+    return benchmarks
+
+
+def compare(results, baseline, threshold) -> ([], []):
+    """
+    Format the results as a table next to the baseline.
+
+    :param results: [BenchmarkResult]
+    :param baseline: name -> result dict
+    :param threshold: the relative slowdown or memory growth that counts as a regression
+    :return: (lines, names of the regressed benchmarks)
+    """
+    lines = [f"{'ops/sec':>12} {'us/op':>10} {'peak KiB':>10} {'kept KiB':>9} {'vs baseline':>12}  benchmark"]
+    regressions = []
+    for result in results:
+        base = baseline.get(result.name)
+        verdict = ""
+        if base:
+            speed = result.ops_per_sec / base["ops_per_sec"]
+            memory = (result.peak_kib + 1) / (base["peak_kib"] + 1)
+            verdict = f"x{speed:.2f}"
+            if speed < 1 - threshold or memory > 1 + threshold:
+                verdict += " REGRESSED"
+                regressions.append(result.name)
+        lines.append(
+            f"{result.ops_per_sec:>12.1f} {1e6 / result.ops_per_sec:>10.1f} {result.peak_kib:>10.1f} "
+            f"{result.retained_kib:>9.1f} {verdict:>12}  {result.name}"
+        )
+    return lines, regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the micro-benchmarks of the suite helpers.")
+    parser.add_argument("-k", "--filter", default="", help="run only the benchmarks with the substring in the name")
+    parser.add_argument("--min-time", type=float, default=1.0, help="approximate seconds per benchmark")
+    parser.add_argument("--baseline", default=BASELINE, help="the baseline json file")
+    parser.add_argument("--save-baseline", action="store_true", help="save the results as the new baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="relative slowdown or memory growth that fails the run",
+    )
+    args = parser.parse_args()
+    ic = FakeIcApi().start()
+    ic.add_upstreams(METRICS_UPSTREAMS, 1)
+    ic.apply({"reload": "other"})
+    try:
+        results = []
+        for name, func in get_benchmarks(f"{ic.url}/metrics"):
+            if args.filter in name:
+                print(f"Running {name}...", file=sys.stderr)
+                # some helpers print on every call
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    results.append(run_benchmark(name, func, args.min_time))
+    finally:
+        ic.stop()
+    baseline = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    lines, regressions = compare(results, baseline, args.threshold)
+    print("\n".join(lines))
+    if not baseline and not args.save_baseline:
+        print(f"No baseline in {args.baseline}, the comparison is skipped. Save one with --save-baseline first.")
+    if args.save_baseline:
+        baseline.update({result.name: result.to_dict() for result in results})
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=4, sort_keys=True)
+        print(f"The baseline is saved to {args.baseline}")
+    elif regressions:
+        print(f"Regressed against {args.baseline}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
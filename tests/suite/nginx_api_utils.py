@@ -1,53 +1,335 @@
 """Describe the methods to work with nginx api"""
+import time
+
 import pytest
 import requests
-import ast
+from requests.adapters import HTTPAdapter
 
 from settings import NGINX_API_VERSION
 
-from suite.resources_utils import wait_before_test
+
+class NginxInfo:
+    """
+    Encapsulate the response of /nginx.
+
+    Attributes:
+        version (str):
+        build (str):
+        generation (int): the number of configuration reloads
+        load_timestamp (str): time of the last reload
+    """
+
+    def __init__(self, version, build, generation, load_timestamp):
+        self.version = version
+        self.build = build
+        self.generation = generation
+        self.load_timestamp = load_timestamp
+
+    @classmethod
+    def from_dict(cls, data) -> "NginxInfo":
+        return cls(data.get("version"), data.get("build"), data["generation"], data.get("load_timestamp"))
+
+
+class UpstreamPeer:
+    """
+    Encapsulate the state of an upstream peer.
+
+    Attributes:
+        id (int):
+        server (str): address
+        state (str): 'up', 'down', 'unavail', 'checking', 'unhealthy' or 'draining'
+        weight (int):
+        backup (bool):
+        active (int): active connections
+        requests (int):
+        fails (int):
+    """
+
+    def __init__(self, id, server, state, weight=1, backup=False, active=0, requests=0, fails=0):
+        self.id = id
+        self.server = server
+        self.state = state
+        self.weight = weight
+        self.backup = backup
+        self.active = active
+        self.requests = requests
+        self.fails = fails
+
+    @classmethod
+    def from_dict(cls, data) -> "UpstreamPeer":
+        return cls(
+            data.get("id"),
+            data["server"],
+            data["state"],
+            data.get("weight", 1),
+            data.get("backup", False),
+            data.get("active", 0),
+            data.get("requests", 0),
+            data.get("fails", 0),
+        )
+
+    @property
+    def healthy(self) -> bool:
+        return self.state == "up"
+
+
+class Upstream:
+    """
+    Encapsulate the state of an HTTP or a stream upstream.
+
+    Attributes:
+        name (str):
+        peers ([UpstreamPeer]):
+        zone (str):
+        zombies (int): removed peers that still process requests
+    """
+
+    def __init__(self, name, peers, zone, zombies=0):
+        self.name = name
+        self.peers = peers
+        self.zone = zone
+        self.zombies = zombies
+
+    @classmethod
+    def from_dict(cls, name, data) -> "Upstream":
+        peers = [UpstreamPeer.from_dict(peer) for peer in data["peers"]]
+        return cls(name, peers, data.get("zone"), data.get("zombies", 0))
+
+    @property
+    def healthy_peers(self) -> []:
+        return [peer for peer in self.peers if peer.healthy]
+
+
+class UpstreamServer:
+    """
+    Encapsulate the configuration of an upstream server, the response of /upstreams/<name>/servers.
+
+    Attributes:
+        id (int):
+        server (str): address
+        weight (int):
+        max_conns (int):
+        max_fails (int):
+        fail_timeout (str):
+        slow_start (str):
+        backup (bool):
+        down (bool):
+    """
+
+    def __init__(self, id, server, weight=1, max_conns=0, max_fails=1, fail_timeout="10s", slow_start="0s",
+                 backup=False, down=False):
+        self.id = id
+        self.server = server
+        self.weight = weight
+        self.max_conns = max_conns
+        self.max_fails = max_fails
+        self.fail_timeout = fail_timeout
+        self.slow_start = slow_start
+        self.backup = backup
+        self.down = down
+
+    @classmethod
+    def from_dict(cls, data) -> "UpstreamServer":
+        return cls(
+            data.get("id"),
+            data["server"],
+            data.get("weight", 1),
+            data.get("max_conns", 0),
+            data.get("max_fails", 1),
+            data.get("fail_timeout", "10s"),
+            data.get("slow_start", "0s"),
+            data.get("backup", False),
+            data.get("down", False),
+        )
 
 
-def get_nginx_generation_value(host) -> int:
+class ServerZone:
     """
-    Send request to /api/api_version/nginx and parse the response.
+    Encapsulate the counters of an HTTP server zone.
 
-    :param host:
-    :return: 'generation' value
+    Attributes:
+        name (str):
+        processing (int): requests in progress
+        requests (int):
+        responses (dict): '2xx', '4xx', 'total', etc. -> number of responses
     """
-    resp = ast.literal_eval(requests.get(f"{host}/api/{NGINX_API_VERSION}/nginx").text)
-    return resp['generation']
 
+    def __init__(self, name, processing=0, requests=0, responses=None):
+        self.name = name
+        self.processing = processing
+        self.requests = requests
+        self.responses = responses or {}
 
-def wait_for_empty_array(request_url) -> None:
+    @classmethod
+    def from_dict(cls, name, data) -> "ServerZone":
+        return cls(name, data.get("processing", 0), data.get("requests", 0), data.get("responses"))
+
+
+def wait_for_condition(check, description, timeout=10, interval=0.2):
     """
-    Wait while the response from the API contains non-empty array.
+    Poll until a check returns a truthy value, fail the test after the deadline.
 
-    :param request_url:
-    :return:
+    The request errors count as a negative check, e.g. a 404 of an upstream that is not created yet.
+
+    :param check: a function without arguments
+    :param description: what the test waits for
+    :param timeout: seconds
+    :param interval: seconds between the checks
+    :return: the value of the successful check
     """
-    response = requests.get(f"{request_url}")
-    counter = 0
-    while response.text != "[]":
-        wait_before_test(1)
-        response = requests.get(f"{request_url}")
-        if counter == 10:
-            pytest.fail(f"After 10 seconds array is not empty, request_url: {request_url}")
-        counter = counter + 1
+    deadline = time.monotonic() + timeout
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            value = check()
+            if value:
+                return value
+        except requests.RequestException as ex:
+            print(f"{description}: {ex}")
+        if time.monotonic() >= deadline:
+            pytest.fail(f"After {timeout} seconds and {attempts} checks: not {description}")
+        time.sleep(interval)
 
 
-def wait_for_non_empty_array(request_url) -> None:
+class NginxPlusApi:
     """
-    Wait while the response from the API contains empty array.
+    Read the NGINX Plus API through one pooled HTTP session.
 
-    :param request_url:
-    :return:
+    Attributes:
+        url (str): the base url, e.g. http://host:api_port
+        api_version (int):
+        timeout (float): seconds for every request
+        session (requests.Session): keeps the connections to the API open between the requests
     """
-    response = requests.get(f"{request_url}")
-    counter = 0
-    while response.text == "[]":
-        wait_before_test(1)
-        response = requests.get(f"{request_url}")
-        if counter == 10:
-            pytest.fail(f"After 10 seconds array is empty, request_url: {request_url}")
-        counter = counter + 1
+
+    def __init__(self, url, api_version=NGINX_API_VERSION, timeout=5.0):
+        self.url = url.rstrip("/")
+        self.api_version = api_version
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=10))
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=10))
+
+    def get(self, path):
+        """
+        Get an API endpoint and decode the JSON.
+
+        :param path: the path after /api/<version>, e.g. 'http/upstreams'
+        :return: the decoded response
+        """
+        resp = self.session.get(f"{self.url}/api/{self.api_version}/{path.lstrip('/')}", timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def nginx_info(self) -> NginxInfo:
+        return NginxInfo.from_dict(self.get("nginx"))
+
+    def generation(self) -> int:
+        return self.nginx_info().generation
+
+    def upstreams(self, stream=False) -> {}:
+        """
+        Get the HTTP or the stream upstreams.
+
+        :param stream: stream upstreams instead of the HTTP ones
+        :return: name -> Upstream
+        """
+        data = self.get(f"{'stream' if stream else 'http'}/upstreams")
+        return {name: Upstream.from_dict(name, upstream) for name, upstream in data.items()}
+
+    def upstream(self, name, stream=False) -> Upstream:
+        return Upstream.from_dict(name, self.get(f"{'stream' if stream else 'http'}/upstreams/{name}"))
+
+    def upstream_servers(self, name, stream=False) -> [UpstreamServer]:
+        """
+        Get the configured servers of an upstream.
+
+        :param name: upstream name
+        :param stream: a stream upstream instead of an HTTP one
+        :return: [UpstreamServer]
+        """
+        data = self.get(f"{'stream' if stream else 'http'}/upstreams/{name}/servers")
+        return [UpstreamServer.from_dict(server) for server in data]
+
+    def server_zones(self) -> {}:
+        """
+        Get the HTTP server zones.
+
+        :return: name -> ServerZone
+        """
+        return {name: ServerZone.from_dict(name, zone) for name, zone in self.get("http/server_zones").items()}
+
+    def wait_for_upstream_servers(self, name, count, stream=False, timeout=10, interval=0.2) -> [UpstreamServer]:
+        """
+        Wait until an upstream has exactly the number of servers.
+
+        :param name: upstream name
+        :param count: number of servers, 0 for an empty upstream
+        :param stream: a stream upstream instead of an HTTP one
+        :param timeout: seconds
+        :param interval: seconds between the checks
+        :return: [UpstreamServer]
+        """
+        servers = []
+
+        def check():
+            servers[:] = self.upstream_servers(name, stream)
+            return len(servers) == count
+
+        wait_for_condition(check, f"upstream {name} has {count} servers", timeout, interval)
+        return servers
+
+    def wait_for_healthy_peers(self, name, count, stream=False, timeout=10, interval=0.2) -> Upstream:
+        """
+        Wait until an upstream has the number of peers in the 'up' state.
+
+        :param name: upstream name
+        :param count: number of healthy peers
+        :param stream: a stream upstream instead of an HTTP one
+        :param timeout: seconds
+        :param interval: seconds between the checks
+        :return: Upstream
+        """
+
+        def check():
+            upstream = self.upstream(name, stream)
+            return upstream if len(upstream.healthy_peers) == count else None
+
+        return wait_for_condition(check, f"upstream {name} has {count} healthy peers", timeout, interval)
+
+    def wait_for_generation_change(self, generation, timeout=10, interval=0.2) -> int:
+        """
+        Wait until NGINX reloads.
+
+        :param generation: the generation before the change
+        :param timeout: seconds
+        :param interval: seconds between the checks
+        :return: the new generation
+        """
+
+        def check():
+            current = self.generation()
+            return current if current != generation else None
+
+        return wait_for_condition(check, f"generation changed from {generation}", timeout, interval)
+
+    def assert_generation_unchanged(self, generation, duration=0, interval=0.2) -> None:
+        """
+        Assert that NGINX has not reloaded since the generation was read, for the duration from now on.
+
+        :param generation: the generation read before the change
+        :param duration: seconds to keep checking, 0 for one check
+        :param interval: seconds between the checks
+        :return:
+        """
+        deadline = time.monotonic() + duration
+        while True:
+            current = self.generation()
+            assert current == generation, f"Expected: no new reloads, the generation changed {generation} -> {current}"
+            if time.monotonic() >= deadline:
+                return
+            time.sleep(interval)
@@ -0,0 +1,166 @@
+"""Describe methods to order test classes by the IC configuration they need."""
+
+from collections import Counter
+
+import pytest
+
+from suite.resources_utils import normalize_ic_args
+
+IC_FIXTURES = ["ingress_controller", "crd_ingress_controller", "crd_ingress_controller_with_ap"]
+# fixture types and params that force a fresh IC start, their classes never share the IC with the other ones
+RESTART_TYPES = ["rbac-without-vs", "restart"]
+
+
+class ClassUnit:
+    """
+    Encapsulate the items of a single test class (or a single module-level test).
+
+    Attributes:
+        items ([]): collected test-items in the original order
+        keys ([]): IC configuration keys of the items in the order of execution, None items excluded
+    """
+    def __init__(self, items):
+        self.items = items
+        self.keys = [key for key in (get_ic_config_key(item) for item in items) if key is not None]
+
+    @property
+    def first_key(self):
+        return self.keys[0] if self.keys else None
+
+    @property
+    def last_key(self):
+        return self.keys[-1] if self.keys else None
+
+
+def get_ic_config_key(item):
+    """
+    Get the IC configuration a test-item runs with.
+
+    The key matches the key of the IC pool: the normalized extra cli arguments of the IC.
+    A fixture type other than 'complete' and a 'restart' param are appended, e.g. ('rbac-without-vs',),
+    so such classes are never merged with the normal ones. Fixtures that build the arguments at runtime get
+    an opaque key made of the fixture name.
+
+    :param item: pytest test-item
+    :return: tuple or None if the item doesn't need an IC
+    """
+    if item.get_closest_marker("skip") is not None:
+        return None
+    params = item.callspec.params if hasattr(item, "callspec") else {}
+    for fixture in IC_FIXTURES:
+        if fixture not in item.fixturenames:
+            continue
+        param = params.get(fixture)
+        extra_args = list(param.get("extra_args") or []) if isinstance(param, dict) else []
+        if fixture == "ingress_controller":
+            extra_args.append("-enable-custom-resources=false")
+        key = tuple(normalize_ic_args(extra_args))
+        ic_type = param.get("type") if isinstance(param, dict) else None
+        if ic_type not in (None, "complete"):
+            key += (ic_type,)
+        if isinstance(param, dict) and param.get("restart"):
+            key += ("restart",)
+        return key
+    for fixture in item.fixturenames:
+        if fixture.endswith("_ingress_controller"):
+            return (fixture,)
+    return None
+
+
+def split_into_units(items) -> []:
+    """
+    Group test-items by their test class keeping the order of the items inside of a class.
+
+    :param items: pytest collected test-items
+    :return: [ClassUnit]
+    """
+    groups = {}
+    for item in items:
+        cls = item.getparent(pytest.Class)
+        groups.setdefault(cls.nodeid if cls is not None else item.nodeid, []).append(item)
+    return [ClassUnit(group) for group in groups.values()]
+
+
+def split_into_modules(units) -> [[]]:
+    """
+    Group test classes by their module keeping the order of the modules.
+
+    :param units: [ClassUnit]
+    :return: [[ClassUnit]]
+    """
+    modules = {}
+    for unit in units:
+        modules.setdefault(unit.items[0].getparent(pytest.Module).nodeid, []).append(unit)
+    return list(modules.values())
+
+
+def count_ic_restarts(items) -> int:
+    """
+    Count how many times the IC has to be started or rolled out with a new configuration.
+
+    :param items: pytest test-items in the order of execution
+    :return: int
+    """
+    restarts = 0
+    current = None
+    current_class = None
+    for item in items:
+        key = get_ic_config_key(item)
+        if key is None:
+            continue
+        forced = any(ic_type in key for ic_type in RESTART_TYPES)
+        # a forced restart happens once per class, not per test
+        if key != current or (forced and item.getparent(pytest.Class) is not current_class):
+            restarts += 1
+        current = key
+        current_class = item.getparent(pytest.Class)
+    return restarts
+
+
+def order_units(units, current=None) -> []:
+    """
+    Order the test classes of a module so that classes with the same IC configuration run back to back.
+
+    Classes without an IC go first. Then every next class is the earliest one that starts with the current
+    configuration, preferring the classes that also end with it, so that the configuration changes only
+    when its group is exhausted. The next configuration is the one of the largest group left.
+
+    :param units: [ClassUnit] of one module
+    :param current: the IC configuration the module starts with, e.g. the last one of the previous module
+    :return: [ClassUnit]
+    """
+    ordered = [unit for unit in units if not unit.keys]
+    remaining = [unit for unit in units if unit.keys]
+    while remaining:
+        if current not in (unit.first_key for unit in remaining):
+            sizes = Counter(unit.first_key for unit in remaining)
+            current = max(sizes, key=lambda key: sizes[key])
+        candidates = [i for i, unit in enumerate(remaining) if unit.first_key == current]
+        index = next((i for i in candidates if remaining[i].last_key == current), candidates[0])
+        unit = remaining.pop(index)
+        ordered.append(unit)
+        current = unit.last_key
+    return ordered
+
+
+def reorder_items_by_ic_config(items) -> (int, int):
+    """
+    Reorder test-items in place to minimize the number of IC configuration changes.
+
+    The classes are reordered only inside of their module: the modules keep their order, so the module-scoped
+    fixtures are set up and torn down once, like without the reordering.
+
+    :param items: pytest collected test-items
+    :return: (restarts before, restarts after)
+    """
+    ordered = []
+    current = None
+    for units in split_into_modules(split_into_units(items)):
+        for unit in order_units(units, current):
+            ordered.extend(unit.items)
+            current = unit.last_key or current
+    before, after = count_ic_restarts(items), count_ic_restarts(ordered)
+    if after < before:
+        items[:] = ordered
+        return before, after
+    return before, before
@@ -0,0 +1,230 @@
+"""Describe methods to measure the data-plane performance of the combinations of the upstream and ConfigMap options."""
+
+import itertools
+import time
+
+import requests
+from kubernetes.client import CoreV1Api, CustomObjectsApi
+
+from suite.custom_resources_utils import generate_item_with_upstream_options
+from suite.http_load_utils import run_http_load
+from suite.resources_utils import get_reload_metrics, patch_configmap_data
+from suite.stats_utils import PeriodicSampler
+from suite.vs_vsr_resources_utils import patch_virtual_server
+
+
+class MatrixCase:
+    """
+    Encapsulate a combination of the options of a matrix run.
+
+    Attributes:
+        name (str):
+        upstream_options (dict): the options of every upstream of the VS
+        configmap (dict): the ConfigMap keys
+    """
+
+    def __init__(self, name, upstream_options=None, configmap=None):
+        self.name = name
+        self.upstream_options = upstream_options or {}
+        self.configmap = configmap or {}
+
+
+def option_combinations(options) -> [MatrixCase]:
+    """
+    Build a case for every combination of the upstream option values.
+
+    :param options: option -> [values], e.g. {'keepalive': [0, 32], 'buffering': [True, False]}
+    :return: [MatrixCase]
+    """
+    keys = list(options)
+    return [
+        MatrixCase(" ".join(f"{key}={value}" for key, value in zip(keys, values)), dict(zip(keys, values)))
+        for values in itertools.product(*(options[key] for key in keys))
+    ]
+
+
+class BackendConnectionSampler(PeriodicSampler):
+    """
+    Sample the active connections of the peers of an upstream through the NGINX Plus API in a background thread.
+
+    Attributes:
+        api (NginxPlusApi):
+        upstream (str):
+        interval (float): seconds between the samples
+        samples ([int]): the sum of the active connections of the peers
+    """
+
+    def __init__(self, api, upstream, interval=0.5):
+        super().__init__(interval)
+        self.api = api
+        self.upstream = upstream
+        self.samples = []
+
+    def sample(self) -> None:
+        try:
+            self.samples.append(sum(peer.active for peer in self.api.upstream(self.upstream).peers))
+        except Exception as ex:
+            print(f"Failed to sample the connections of {self.upstream}: {ex}")
+
+
+class MatrixResult:
+    """
+    Encapsulate the measurements of a case.
+
+    Attributes:
+        case (MatrixCase):
+        report (HttpLoadReport):
+        backend_peak (int): the most active backend connections, None without the NGINX Plus API
+        backend_mean (float): the mean of the active backend connections, None without the NGINX Plus API
+    """
+
+    def __init__(self, case, report, backend_peak=None, backend_mean=None):
+        self.case = case
+        self.report = report
+        self.backend_peak = backend_peak
+        self.backend_mean = backend_mean
+
+
+def wait_for_reload(metrics_url, session, count, timeout=30) -> bool:
+    """
+    Wait until the reload count is above the one read before the change.
+
+    :param metrics_url: IC /metrics url
+    :param session: requests.Session to read the metrics
+    :param count: the reload count before the change
+    :param timeout: seconds
+    :return: False after the timeout
+    """
+    deadline = time.perf_counter() + timeout
+    while get_reload_metrics(metrics_url, session)[0] <= count:
+        if time.perf_counter() >= deadline:
+            return False
+        time.sleep(0.2)
+    return True
+
+
+def apply_case(custom_objects: CustomObjectsApi, v1: CoreV1Api, vs_name, vs_namespace, yaml_manifest, cm_name,
+               cm_namespace, case, previous) -> None:
+    """
+    Patch the ConfigMap keys and the upstream options of a case over the ones of the previous case.
+
+    :param custom_objects: CustomObjectsApi
+    :param v1: CoreV1Api
+    :param vs_name:
+    :param vs_namespace:
+    :param yaml_manifest: the VS the upstream options are added to
+    :param cm_name:
+    :param cm_namespace:
+    :param case: MatrixCase
+    :param previous: the MatrixCase applied before
+    :return:
+    """
+    if case.configmap != previous.configmap:
+        data = {key: None for key in previous.configmap if key not in case.configmap}
+        data.update({key: str(value) for key, value in case.configmap.items()})
+        patch_configmap_data(v1, cm_name, cm_namespace, data)
+    if case.upstream_options != previous.upstream_options:
+        patch_virtual_server(
+            custom_objects, vs_name, vs_namespace,
+            generate_item_with_upstream_options(yaml_manifest, case.upstream_options),
+        )
+
+
+def run_options_matrix(kube_apis, vs_name, vs_namespace, yaml_manifest, cm_name, cm_namespace, cases, url, host,
+                       metrics_url, duration=20.0, concurrency=32, warmup=3.0, api=None,
+                       upstream=None) -> [MatrixResult]:
+    """
+    Apply every case to a VS and send the same load through it.
+
+    The VS and the ConfigMap are left with the last case, restore them in the test.
+
+    :param kube_apis: client apis
+    :param vs_name:
+    :param vs_namespace:
+    :param yaml_manifest: the VS the upstream options are added to
+    :param cm_name: the ConfigMap of the IC
+    :param cm_namespace:
+    :param cases: [MatrixCase]
+    :param url: the url of a path of the VS
+    :param host: the host of the VS
+    :param metrics_url: IC /metrics url to wait for the reloads
+    :param duration: seconds of load per case
+    :param concurrency: number of the clients
+    :param warmup: seconds of load before the measured one
+    :param api: NginxPlusApi to sample the backend connections
+    :param upstream: the upstream of the url for the samples
+    :return: [MatrixResult]
+    """
+    print(f"Run {len(cases)} option cases against {url}")
+    session = requests.Session()
+    previous = MatrixCase("defaults")
+    results = []
+    try:
+        for case in cases:
+            print(f"------------------------- Case: {case.name} -----------------------------------")
+            count, _ = get_reload_metrics(metrics_url, session)
+            apply_case(kube_apis.custom_objects, kube_apis.v1, vs_name, vs_namespace, yaml_manifest,
+                       cm_name, cm_namespace, case, previous)
+            if (case.configmap, case.upstream_options) != (previous.configmap, previous.upstream_options):
+                if not wait_for_reload(metrics_url, session, count):
+                    print(f"No reload after the case {case.name} was applied")
+            previous = case
+            run_http_load(url, host, warmup, concurrency)
+            connections = BackendConnectionSampler(api, upstream) if api else None
+            if connections:
+                connections.start()
+            try:
+                report = run_http_load(url, host, duration, concurrency)
+            finally:
+                if connections:
+                    connections.stop()
+            samples = connections.samples if connections else []
+            results.append(MatrixResult(
+                case, report, max(samples) if samples else None, sum(samples) / len(samples) if samples else None
+            ))
+    finally:
+        session.close()
+    print(comparison_table(results))
+    print(comparison_csv(results))
+    return results
+
+
+def comparison_table(results) -> str:
+    """
+    Format the results as a table, the throughput is compared to the first case.
+
+    :param results: [MatrixResult]
+    :return: str
+    """
+    width = max([len(r.case.name) for r in results] + [4])
+    lines = [
+        f"{'case':<{width}} {'rps':>8} {'vs 1st':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'failed':>6} {'conns':>11}"
+    ]
+    base = results[0].report.rps if results and results[0].report.rps else None
+    for r in results:
+        delta = f"{(r.report.rps / base - 1) * 100:+.0f}%" if base else "n/a"
+        conns = f"{r.backend_peak}/{r.backend_mean:.1f}" if r.backend_peak is not None else "n/a"
+        lines.append(
+            f"{r.case.name:<{width}} {r.report.rps:>8.1f} {delta:>7} {r.report.latency_ms(50):>6.1f}ms "
+            f"{r.report.latency_ms(95):>6.1f}ms {r.report.latency_ms(99):>6.1f}ms {len(r.report.failures):>6} "
+            f"{conns:>11}"
+        )
+    return "\n".join(lines)
+
+
+def comparison_csv(results) -> str:
+    """
+    Format the results as CSV for a spreadsheet.
+
+    :param results: [MatrixResult]
+    :return: str
+    """
+    lines = ["case,rps,p50_ms,p95_ms,p99_ms,failed,backend_peak,backend_mean"]
+    for r in results:
+        lines.append(
+            f"{r.case.name},{r.report.rps:.1f},{r.report.latency_ms(50):.1f},{r.report.latency_ms(95):.1f},"
+            f"{r.report.latency_ms(99):.1f},{len(r.report.failures)},"
+            f"{'' if r.backend_peak is None else r.backend_peak},"
+            f"{'' if r.backend_mean is None else round(r.backend_mean, 1)}"
+        )
+    return "\n".join(lines)
@@ -6,6 +6,7 @@ from kubernetes.client import CustomObjectsApi, ApiextensionsV1Api, CoreV1Api
 from kubernetes.client.rest import ApiException
 from suite.custom_resources_utils import read_custom_resource
 from suite.resources_utils import ensure_item_removal
+from suite.worker_utils import isolate_manifest
 
 
 def read_policy(custom_objects: CustomObjectsApi, namespace, name) -> object:
@@ -29,7 +30,7 @@ def create_policy_from_yaml(custom_objects: CustomObjectsApi, yaml_manifest, nam
         dep = yaml.safe_load(f)
     try:
         custom_objects.create_namespaced_custom_object(
-            "k8s.nginx.org", "v1", namespace, "policies", dep
+            "k8s.nginx.org", "v1", namespace, "policies", isolate_manifest(dep)
         )
         print(f"Policy created with name '{dep['metadata']['name']}'")
         return dep["metadata"]["name"]
@@ -0,0 +1,321 @@
+"""Describe methods to patch VirtualServers and VirtualServerRoutes at a fixed rate and measure the reloads."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from kubernetes.client import CustomObjectsApi
+
+from suite.stats_utils import PeriodicSampler, get_percentile
+from suite.vs_vsr_resources_utils import patch_virtual_server, patch_v_s_route
+from suite.zero_downtime_utils import ReloadSampler
+
+
+class ChurnTarget:
+    """
+    Encapsulate a VS or a VSR route that the churn patches to return a new body.
+
+    Attributes:
+        kind (str): 'virtualserver' or 'virtualserverroute'
+        name (str):
+        namespace (str):
+        host (str):
+        path (str): the route of the VS or the subroute of the VSR
+        url (str): the url of the path
+    """
+
+    def __init__(self, kind, name, namespace, host, path, url):
+        self.kind = kind
+        self.name = name
+        self.namespace = namespace
+        self.host = host
+        self.path = path
+        self.url = url
+
+    def body(self, marker) -> dict:
+        """
+        Build a patch that makes the path return the marker, the other routes are dropped.
+
+        :param marker: the response body
+        :return: dict
+        """
+        routes = [{"path": self.path, "action": {"return": {"code": 200, "type": "text/plain", "body": marker}}}]
+        if self.kind == "virtualserver":
+            return {"metadata": {"name": self.name}, "spec": {"host": self.host, "routes": routes}}
+        return {"metadata": {"name": self.name}, "spec": {"host": self.host, "subroutes": routes}}
+
+    def patch(self, custom_objects: CustomObjectsApi, marker) -> None:
+        if self.kind == "virtualserver":
+            patch_virtual_server(custom_objects, self.name, self.namespace, self.body(marker))
+        else:
+            patch_v_s_route(custom_objects, self.name, self.namespace, self.body(marker))
+
+
+def build_churn_virtual_server(name, host, path="/churn", marker="churn-0") -> dict:
+    """
+    Build a VS that returns a marker without a backend, a churn target that needs no app.
+
+    :param name:
+    :param host:
+    :param path:
+    :param marker: the response body
+    :return: dict
+    """
+    return {
+        "apiVersion": "k8s.nginx.org/v1",
+        "kind": "VirtualServer",
+        "metadata": {"name": name},
+        "spec": {
+            "host": host,
+            "routes": [{"path": path, "action": {"return": {"code": 200, "type": "text/plain", "body": marker}}}],
+        },
+    }
+
+
+class ChurnChange:
+    """
+    Encapsulate one patch of a churn target.
+
+    Attributes:
+        target (ChurnTarget):
+        marker (str): the body the patch makes the target return
+        sent_at (float): time.perf_counter() when the patch was scheduled
+        patched_at (float): when the API accepted the patch, None if it is in flight or failed
+        failed (bool): the API rejected the patch
+        served_at (float): when the marker was served first, None if it never was
+        superseded (bool): a later marker of the target was served before this one
+    """
+
+    def __init__(self, target, marker, sent_at):
+        self.target = target
+        self.marker = marker
+        self.sent_at = sent_at
+        self.patched_at = None
+        self.failed = False
+        self.served_at = None
+        self.superseded = False
+
+    @property
+    def latency_s(self) -> float:
+        return self.served_at - self.sent_at if self.served_at is not None else None
+
+
+class ChurnWatcher(PeriodicSampler):
+    """
+    Poll the url of a churn target in a background thread and mark the changes it serves.
+
+    Attributes:
+        target (ChurnTarget):
+        changes ([ChurnChange]): the changes of the target in the order they were sent
+        interval (float): seconds between the requests
+    """
+
+    def __init__(self, target, interval=0.05):
+        super().__init__(interval)
+        self.target = target
+        self.changes = []
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+
+    def add(self, change) -> None:
+        with self.lock:
+            self.changes.append(change)
+
+    def pending(self) -> bool:
+        with self.lock:
+            return any(
+                change.served_at is None and not change.superseded and not change.failed for change in self.changes
+            )
+
+    def observe(self, body, at) -> None:
+        with self.lock:
+            for index, change in enumerate(self.changes):
+                if change.marker == body and change.served_at is None:
+                    change.served_at = at
+                    for earlier in self.changes[:index]:
+                        if earlier.served_at is None:
+                            earlier.superseded = True
+                    return
+
+    def sample(self) -> None:
+        try:
+            resp = self.session.get(self.target.url, headers={"host": self.target.host}, timeout=5)
+            self.observe(resp.text.strip(), time.perf_counter())
+        except requests.RequestException as ex:
+            print(f"Failed to poll {self.target.host}{self.target.path}: {ex}")
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class ReloadChurnReport:
+    """
+    Encapsulate the results of a churn run at one rate.
+
+    Attributes:
+        rate (float): the requested patches per second
+        changes ([ChurnChange]):
+        reloads (int): the reloads seen in the metrics
+        reload_ms ([float]): the reload durations seen in the metrics
+        duration (float): seconds from the first patch until the last change was served or the timeout
+    """
+
+    def __init__(self, rate, changes, reloads, reload_ms, duration):
+        self.rate = rate
+        self.changes = changes
+        self.reloads = reloads
+        self.reload_ms = reload_ms
+        self.duration = duration
+
+    @property
+    def applied(self) -> []:
+        return [change for change in self.changes if change.patched_at is not None]
+
+    @property
+    def served(self) -> []:
+        return [change for change in self.changes if change.served_at is not None]
+
+    @property
+    def superseded(self) -> int:
+        return sum(1 for change in self.changes if change.superseded)
+
+    @property
+    def lost(self) -> []:
+        """
+        The accepted changes that were neither served nor superseded by a served change.
+        """
+        return [change for change in self.applied if change.served_at is None and not change.superseded]
+
+    @property
+    def achieved_rate(self) -> float:
+        """
+        The accepted patches per second between the first and the last accepted one.
+        """
+        applied = [change.patched_at for change in self.applied]
+        if len(applied) < 2:
+            return 0.0
+        return (len(applied) - 1) / (max(applied) - min(applied))
+
+    def latency_s(self, p) -> float:
+        return get_percentile([change.latency_s for change in self.served], p)
+
+    def summary(self) -> str:
+        return (
+            f"rate {self.rate}/s: {len(self.applied)}/{len(self.changes)} patches applied "
+            f"({self.achieved_rate:.1f}/s), {len(self.served)} served, {self.superseded} superseded, "
+            f"{len(self.lost)} lost, {self.reloads} reloads, "
+            f"reload p50={get_percentile(self.reload_ms, 50):.0f}ms p99={get_percentile(self.reload_ms, 99):.0f}ms, "
+            f"patch to served p50={self.latency_s(50):.2f}s p99={self.latency_s(99):.2f}s "
+            f"max={self.latency_s(100):.2f}s"
+        )
+
+
+def run_reload_churn(custom_objects: CustomObjectsApi, targets, rate, duration, metrics_url, settle_timeout=60,
+                     workers=8, poll_interval=0.05) -> ReloadChurnReport:
+    """
+    Patch the targets round-robin at a fixed rate and measure when NGINX serves every change.
+
+    :param custom_objects: CustomObjectsApi
+    :param targets: [ChurnTarget]
+    :param rate: patches per second, across all the targets
+    :param duration: seconds to patch
+    :param metrics_url: IC /metrics url
+    :param settle_timeout: seconds to wait for the last changes after the patching
+    :param workers: the patches in flight, a slow API does not slow down the schedule
+    :param poll_interval: seconds between the requests of a watcher
+    :return: ReloadChurnReport
+    """
+    print(f"Patch {len(targets)} targets at {rate} changes per second for {duration}s")
+    watchers = [ChurnWatcher(target, poll_interval) for target in targets]
+    sampler = ReloadSampler(metrics_url)
+    changes = []
+
+    def send(watcher, change):
+        try:
+            watcher.target.patch(custom_objects, change.marker)
+            change.patched_at = time.perf_counter()
+        except Exception as ex:
+            change.failed = True
+            print(f"Failed to patch {watcher.target.name}: {ex}")
+
+    sampler.start()
+    for watcher in watchers:
+        watcher.start()
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for step in range(int(rate * duration)):
+                time.sleep(max(0.0, start + step / rate - time.perf_counter()))
+                watcher = watchers[step % len(watchers)]
+                change = ChurnChange(watcher.target, f"churn-{rate}-{step}", time.perf_counter())
+                watcher.add(change)
+                changes.append(change)
+                executor.submit(send, watcher, change)
+        deadline = time.perf_counter() + settle_timeout
+        while any(watcher.pending() for watcher in watchers) and time.perf_counter() < deadline:
+            time.sleep(poll_interval)
+    finally:
+        for watcher in watchers:
+            watcher.stop()
+        sampler.stop()
+    report = ReloadChurnReport(
+        rate, changes, len(sampler.reloads), sampler.durations_ms, time.perf_counter() - start
+    )
+    print(report.summary())
+    return report
+
+
+def run_rate_sweep(custom_objects: CustomObjectsApi, targets, rates, duration, metrics_url,
+                   pause=5.0) -> [ReloadChurnReport]:
+    """
+    Run the churn at every rate and print the rate-vs-latency curve.
+
+    :param custom_objects: CustomObjectsApi
+    :param targets: [ChurnTarget]
+    :param rates: [float] patches per second
+    :param duration: seconds to patch at every rate
+    :param metrics_url: IC /metrics url
+    :param pause: seconds between the rates for the reloads to calm down
+    :return: [ReloadChurnReport]
+    """
+    reports = []
+    for rate in rates:
+        reports.append(run_reload_churn(custom_objects, targets, rate, duration, metrics_url))
+        time.sleep(pause)
+    print(rate_latency_csv(reports))
+    print(rate_latency_chart(reports))
+    return reports
+
+
+def rate_latency_csv(reports) -> str:
+    """
+    Format the reports as CSV for an external plot.
+
+    :param reports: [ReloadChurnReport]
+    :return: str
+    """
+    lines = ["rate,achieved_rate,applied,served,superseded,lost,reloads,reload_p50_ms,latency_p50_s,latency_p99_s"]
+    for r in reports:
+        lines.append(
+            f"{r.rate},{r.achieved_rate:.2f},{len(r.applied)},{len(r.served)},{r.superseded},{len(r.lost)},"
+            f"{r.reloads},{get_percentile(r.reload_ms, 50):.0f},{r.latency_s(50):.3f},{r.latency_s(99):.3f}"
+        )
+    return "\n".join(lines)
+
+
+def rate_latency_chart(reports, width=60) -> str:
+    """
+    Draw the p50 ('=') and the p99 ('-') patch to served latency against the rate.
+
+    :param reports: [ReloadChurnReport]
+    :param width: characters of the longest bar
+    :return: str
+    """
+    top = max([r.latency_s(99) for r in reports] + [0.001])
+    lines = [f"patch to served latency, the longest bar is {top:.2f}s"]
+    for r in reports:
+        p50 = int(r.latency_s(50) / top * width)
+        p99 = int(r.latency_s(99) / top * width)
+        lines.append(f"{r.rate:>7.1f}/s |{'=' * p50}{'-' * (p99 - p50)} {r.latency_s(50):.2f}s/{r.latency_s(99):.2f}s")
+    return "\n".join(lines)
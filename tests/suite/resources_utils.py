@@ -2,7 +2,9 @@
 import json
 import os
 import re
+import subprocess
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 import requests
@@ -14,6 +16,9 @@ from kubernetes.stream import stream
 from more_itertools import first
 from settings import (DEPLOYMENTS, PROJECT_ROOT, RECONFIGURATION_DELAY,
                       TEST_DATA)
+from suite.worker_utils import (get_worker_id, get_worker_ingress_class,
+                                get_worker_name, isolate_ic_arg,
+                                isolate_ingress_class, isolate_manifest)
 
 
 class RBACAuthorization:
@@ -41,7 +46,7 @@ def configure_rbac(rbac_v1: RbacAuthorizationV1Api) -> RBACAuthorization:
         docs = yaml.safe_load_all(f)
         role_name = ""
         binding_name = ""
-        for dep in docs:
+        for dep in map(isolate_manifest, docs):
             if dep["kind"] == "ClusterRole":
                 print("Create cluster role")
                 role_name = dep["metadata"]["name"]
@@ -65,7 +70,7 @@ def configure_rbac_with_ap(rbac_v1: RbacAuthorizationV1Api) -> RBACAuthorization
         docs = yaml.safe_load_all(f)
         role_name = ""
         binding_name = ""
-        for dep in docs:
+        for dep in map(isolate_manifest, docs):
             if dep["kind"] == "ClusterRole":
                 print("Create cluster role for AppProtect")
                 role_name = dep["metadata"]["name"]
@@ -91,7 +96,7 @@ def patch_rbac(rbac_v1: RbacAuthorizationV1Api, yaml_manifest) -> RBACAuthorizat
         docs = yaml.safe_load_all(f)
         role_name = ""
         binding_name = ""
-        for dep in docs:
+        for dep in map(isolate_manifest, docs):
             if dep["kind"] == "ClusterRole":
                 print("Patch the cluster role")
                 role_name = dep["metadata"]["name"]
@@ -234,6 +239,47 @@ def scale_deployment(v1: CoreV1Api, apps_v1_api: AppsV1Api, name, namespace, val
     return original
 
 
+def restart_ingress_controller(v1: CoreV1Api, apps_v1_api: AppsV1Api, namespace, name="nginx-ingress",
+                               timeout=300) -> float:
+    """
+    Scale the IC deployment to 0 and back to 1 and wait until a new pod is Ready.
+
+    The scale up starts only after the old pods are gone, so neither a terminating pod nor the old Ready one
+    is taken for the new pod.
+
+    :param v1: CoreV1Api
+    :param apps_v1_api: AppsV1Api
+    :param namespace: namespace of the IC
+    :param name: deployment name
+    :param timeout: seconds to wait for the old pods to go and for the new one to be Ready
+    :return: float, seconds from the scale up until the new pod was Ready
+    """
+    old_pods = [pod.metadata.name for pod in v1.list_namespaced_pod(namespace).items]
+    scale_deployment(v1, apps_v1_api, name, namespace, 0)
+    deadline = time.perf_counter() + timeout
+    while get_pods_amount(v1, namespace) > 0:
+        if time.perf_counter() >= deadline:
+            raise PodNotReadyException(f"The pods {old_pods} are still there after {timeout} seconds. Exiting!")
+        print("The old IC pods are still there, wait for 1 sec...")
+        time.sleep(1)
+    start = time.perf_counter()
+    print(f"Scaling deployment '{name}' to 1 replica(s)")
+    apps_v1_api.patch_namespaced_deployment_scale(name, namespace, {"spec": {"replicas": 1}})
+    deadline = start + timeout
+    while not any(
+        pod.metadata.name not in old_pods
+        and any(c.type == "Ready" and c.status == "True" for c in pod.status.conditions or [])
+        for pod in v1.list_namespaced_pod(namespace).items
+    ):
+        if time.perf_counter() >= deadline:
+            raise PodNotReadyException(f"The new IC pod is not Ready after {timeout} seconds. Exiting!")
+        print("The new IC pod is not Ready. Wait for 1 sec...")
+        time.sleep(1)
+    ready_s = time.perf_counter() - start
+    print(f"The new IC pod is Ready in {ready_s:.1f} seconds")
+    return ready_s
+
+
 def create_daemon_set(apps_v1_api: AppsV1Api, namespace, body) -> str:
     """
     Create a daemon-set based on a dict.
@@ -346,7 +392,7 @@ def create_service(v1: CoreV1Api, namespace, body) -> str:
     :return: str
     """
     print("Create a Service:")
-    resp = v1.create_namespaced_service(namespace, body)
+    resp = v1.create_namespaced_service(namespace, isolate_manifest(body))
     print(f"Service created with name '{body['metadata']['name']}'")
     return resp.metadata.name
 
@@ -439,7 +485,7 @@ def create_secret(v1: CoreV1Api, namespace, body) -> str:
     :return: str
     """
     print("Create a secret:")
-    v1.create_namespaced_secret(namespace, body)
+    v1.create_namespaced_secret(namespace, isolate_manifest(body))
     print(f"Secret created: {body['metadata']['name']}")
     return body["metadata"]["name"]
 
@@ -457,7 +503,7 @@ def replace_secret(v1: CoreV1Api, name, namespace, yaml_manifest) -> str:
     print(f"Replace a secret: '{name}'' in a namespace: '{namespace}'")
     with open(yaml_manifest) as f:
         dep = yaml.safe_load(f)
-        v1.replace_namespaced_secret(name, namespace, dep)
+        v1.replace_namespaced_secret(name, namespace, isolate_manifest(dep))
         print("Secret replaced")
     return name
 
@@ -552,7 +598,7 @@ def create_ingress(networking_v1: NetworkingV1Api, namespace, body) -> str:
     :return: str
     """
     print("Create an ingress:")
-    networking_v1.create_namespaced_ingress(namespace, body)
+    networking_v1.create_namespaced_ingress(namespace, isolate_manifest(body))
     print(f"Ingress created with name '{body['metadata']['name']}'")
     return body["metadata"]["name"]
 
@@ -601,7 +647,7 @@ def replace_ingress(networking_v1: NetworkingV1Api, name, namespace, body) -> st
     :return: str
     """
     print(f"Replace a Ingress: {name}")
-    resp = networking_v1.replace_namespaced_ingress(name, namespace, body)
+    resp = networking_v1.replace_namespaced_ingress(name, namespace, isolate_manifest(body))
     print(f"Ingress replaced with name '{name}'")
     return resp.metadata.name
 
@@ -692,7 +738,7 @@ def create_configmap(v1: CoreV1Api, namespace, body) -> str:
     :return: str
     """
     print("Create a configMap:")
-    v1.create_namespaced_config_map(namespace, body)
+    v1.create_namespaced_config_map(namespace, isolate_manifest(body))
     print(f"Config map created with name '{body['metadata']['name']}'")
     return body["metadata"]["name"]
 
@@ -710,7 +756,7 @@ def replace_configmap_from_yaml(v1: CoreV1Api, name, namespace, yaml_manifest) -
     print(f"Replace a configMap: '{name}'")
     with open(yaml_manifest) as f:
         dep = yaml.safe_load(f)
-        v1.replace_namespaced_config_map(name, namespace, dep)
+        v1.replace_namespaced_config_map(name, namespace, isolate_manifest(dep))
         print("ConfigMap replaced")
 
 
@@ -725,10 +771,48 @@ def replace_configmap(v1: CoreV1Api, name, namespace, body) -> None:
     :return:
     """
     print(f"Replace a configMap: '{name}'")
-    v1.replace_namespaced_config_map(name, namespace, body)
+    v1.replace_namespaced_config_map(name, namespace, isolate_manifest(body))
     print("ConfigMap replaced")
 
 
+def patch_configmap_data(v1: CoreV1Api, name, namespace, data) -> None:
+    """
+    Patch the keys of a config-map, the other keys stay as they are.
+
+    :param v1: CoreV1Api
+    :param name:
+    :param namespace:
+    :param data: key -> value, None removes the key
+    :return:
+    """
+    print(f"Patch a configMap: '{name}' with {data}")
+    v1.patch_namespaced_config_map(name, namespace, {"data": data})
+
+
+def restore_configmap_from_yaml(v1: CoreV1Api, name, namespace, yaml_manifest) -> bool:
+    """
+    Bring a config-map to the data of a yaml file with a patch of the changed keys only.
+
+    Unlike replace_configmap_from_yaml, an unchanged config-map is not updated, so the IC does not reload.
+
+    :param v1: CoreV1Api
+    :param name:
+    :param namespace:
+    :param yaml_manifest: an absolute path to file
+    :return: True if the config-map was patched
+    """
+    with open(yaml_manifest) as f:
+        expected = yaml.safe_load(f).get("data") or {}
+    current = v1.read_namespaced_config_map(name, namespace).data or {}
+    diff = {key: None for key in current if key not in expected}
+    diff.update({key: str(value) for key, value in expected.items() if current.get(key) != str(value)})
+    if not diff:
+        print(f"ConfigMap '{name}' is already restored")
+        return False
+    patch_configmap_data(v1, name, namespace, diff)
+    return True
+
+
 def delete_configmap(v1: CoreV1Api, name, namespace) -> None:
     """
     Delete a ConfigMap.
@@ -770,16 +854,30 @@ def delete_testing_namespaces(v1: CoreV1Api) -> []:
     """
     List and remove all the testing namespaces.
 
-    Testing namespaces are the ones starting with "test-namespace-"
+    Testing namespaces are the ones starting with "test-namespace-",
+    a pytest-xdist worker removes only its own ones, starting with "test-namespace-<worker>-"
 
     :param v1: CoreV1Api
     :return:
     """
+    prefix = f"{get_worker_name('test-namespace')}-"
     namespaces_list = v1.list_namespace()
-    for namespace in list(
-        filter(lambda ns: ns.metadata.name.startswith("test-namespace-"), namespaces_list.items)
-    ):
-        delete_namespace(v1, namespace.metadata.name)
+    namespaces = list(
+        filter(lambda ns: ns.metadata.name.startswith(prefix), namespaces_list.items)
+    )
+    if not namespaces:
+        return
+    # namespace termination is slow, wait for all of them at once
+    with ThreadPoolExecutor(max_workers=len(namespaces)) as executor:
+        futures = []
+        for namespace in namespaces:
+            if namespace.metadata.deletion_timestamp is None:
+                futures.append(executor.submit(delete_namespace, v1, namespace.metadata.name))
+            else:
+                print(f"Namespace {namespace.metadata.name} is already being removed")
+                futures.append(executor.submit(ensure_item_removal, v1.read_namespace, namespace.metadata.name))
+        for future in futures:
+            future.result()
 
 
 def get_file_contents(v1: CoreV1Api, file_path, pod_name, pod_namespace) -> str:
@@ -808,6 +906,31 @@ def get_file_contents(v1: CoreV1Api, file_path, pod_name, pod_namespace) -> str:
     return result_conf
 
 
+def get_config_size(v1: CoreV1Api, pod_name, pod_namespace, directory="/etc/nginx/conf.d") -> (int, int):
+    """
+    Get the total size of the config files in a directory of a pod without printing them.
+
+    :param v1: CoreV1Api
+    :param pod_name: pod name
+    :param pod_namespace: pod namespace
+    :param directory: an absolute path to a directory in the pod
+    :return: (bytes, number of files)
+    """
+    command = ["sh", "-c", f"ls {directory}/*.conf 2>/dev/null | wc -l; cat {directory}/*.conf 2>/dev/null | wc -c"]
+    resp = stream(
+        v1.connect_get_namespaced_pod_exec,
+        pod_name,
+        pod_namespace,
+        command=command,
+        stderr=True,
+        stdin=False,
+        stdout=True,
+        tty=False,
+    )
+    files, size = str(resp).split()[:2]
+    return int(size), int(files)
+
+
 def get_ingress_nginx_template_conf(
     v1: CoreV1Api, ingress_namespace, ingress_name, pod_name, pod_namespace
 ) -> str:
@@ -957,20 +1080,34 @@ def wait_for_event_increment(kube_apis, namespace, event_count, offset) -> bool:
         return False
 
 
-def create_ingress_controller(
-    v1: CoreV1Api, apps_v1_api: AppsV1Api, cli_arguments, namespace, args=None
-) -> str:
+def normalize_ic_args(args) -> []:
     """
-    Create an Ingress Controller according to the params.
+    Normalize a list of IC cli arguments.
+
+    Boolean flags are expanded ('-flag' -> '-flag=true'), a double dash is reduced to a single one
+    and only the last occurrence of a flag is kept, so equivalent lists produce the same result.
+
+    :param args: a list of IC cli arguments
+    :return: []
+    """
+    flags = {}
+    for arg in args or []:
+        arg = arg.strip()
+        if arg.startswith("--"):
+            arg = arg[1:]
+        name, sep, value = arg.partition("=")
+        flags[name] = value if sep else "true"
+    return [f"{name}={flags[name]}" for name in sorted(flags)]
+
+
+def generate_ingress_controller_body(cli_arguments, args=None) -> dict:
+    """
+    Generate an Ingress Controller Deployment/DaemonSet according to the params.
 
-    :param v1: CoreV1Api
-    :param apps_v1_api: AppsV1Api
     :param cli_arguments: context name as in kubeconfig
-    :param namespace: namespace name
     :param args: a list of any extra cli arguments to start IC with
-    :return: str
+    :return: dict
     """
-    print(f"Create an Ingress Controller as {cli_arguments['ic-type']}")
     yaml_manifest = (
         f"{DEPLOYMENTS}/{cli_arguments['deployment-type']}/{cli_arguments['ic-type']}.yaml"
     )
@@ -981,8 +1118,33 @@ def create_ingress_controller(
     dep["spec"]["template"]["spec"]["containers"][0]["imagePullPolicy"] = cli_arguments[
         "image-pull-policy"
     ]
+    if get_worker_id():
+        # every pytest-xdist worker runs its own IC, the extra args can still override the class
+        dep["spec"]["template"]["spec"]["containers"][0]["args"].append(
+            f"-ingress-class={get_worker_ingress_class()}"
+        )
     if args is not None:
-        dep["spec"]["template"]["spec"]["containers"][0]["args"].extend(args)
+        dep["spec"]["template"]["spec"]["containers"][0]["args"].extend(
+            [isolate_ic_arg(arg) for arg in args]
+        )
+    return dep
+
+
+def create_ingress_controller(
+    v1: CoreV1Api, apps_v1_api: AppsV1Api, cli_arguments, namespace, args=None
+) -> str:
+    """
+    Create an Ingress Controller according to the params.
+
+    :param v1: CoreV1Api
+    :param apps_v1_api: AppsV1Api
+    :param cli_arguments: context name as in kubeconfig
+    :param namespace: namespace name
+    :param args: a list of any extra cli arguments to start IC with
+    :return: str
+    """
+    print(f"Create an Ingress Controller as {cli_arguments['ic-type']}")
+    dep = generate_ingress_controller_body(cli_arguments, args)
     if cli_arguments["deployment-type"] == "deployment":
         name = create_deployment(apps_v1_api, namespace, dep)
     else:
@@ -995,6 +1157,119 @@ def create_ingress_controller(
     return name
 
 
+def replace_ingress_controller(
+    v1: CoreV1Api, apps_v1_api: AppsV1Api, cli_arguments, name, namespace, args=None, restart=False
+) -> int:
+    """
+    Replace the spec of a running Ingress Controller and wait for the rollout to complete.
+
+    :param v1: CoreV1Api
+    :param apps_v1_api: AppsV1Api
+    :param cli_arguments: context name as in kubeconfig
+    :param name: IC name
+    :param namespace: namespace name
+    :param args: a list of any extra cli arguments to start IC with
+    :param restart: roll out new pods even if the spec is not changed
+    :return: int the generation of the IC after the replacement
+    """
+    print(f"Replace the Ingress Controller '{name}' with args: {args}")
+    dep = generate_ingress_controller_body(cli_arguments, args)
+    if restart:
+        template_metadata = dep["spec"]["template"]["metadata"]
+        template_metadata.setdefault("annotations", {})
+        template_metadata["annotations"]["kubectl.kubernetes.io/restartedAt"] = str(time.time())
+    if cli_arguments["deployment-type"] == "deployment":
+        resp = apps_v1_api.replace_namespaced_deployment(name, namespace, dep)
+    else:
+        resp = apps_v1_api.replace_namespaced_daemon_set(name, namespace, dep)
+    before = time.time()
+    wait_until_ingress_controller_rolled_out(
+        v1, apps_v1_api, name, cli_arguments["deployment-type"], namespace
+    )
+    after = time.time()
+    print(f"The Ingress Controller rolled out in {int(after-before)} seconds")
+    return resp.metadata.generation
+
+
+def get_ingress_controller_generation(apps_v1_api: AppsV1Api, name, dep_type, namespace) -> int:
+    """
+    Get the generation of the IC Deployment/DaemonSet.
+
+    :param apps_v1_api: AppsV1Api
+    :param name: IC name
+    :param dep_type: IC deployment type 'deployment' or 'daemon-set'
+    :param namespace: namespace name
+    :return: int
+    """
+    if dep_type == "deployment":
+        return apps_v1_api.read_namespaced_deployment(name, namespace).metadata.generation
+    return apps_v1_api.read_namespaced_daemon_set(name, namespace).metadata.generation
+
+
+def is_ingress_controller_rolled_out(apps_v1_api: AppsV1Api, name, dep_type, namespace) -> bool:
+    """
+    Check if the latest IC spec is observed and all the pods are updated and available.
+
+    :param apps_v1_api: AppsV1Api
+    :param name: IC name
+    :param dep_type: IC deployment type 'deployment' or 'daemon-set'
+    :param namespace: namespace name
+    :return: bool
+    """
+    if dep_type == "deployment":
+        dep = apps_v1_api.read_namespaced_deployment_status(name, namespace)
+        desired = dep.spec.replicas
+        return (
+            (dep.status.observed_generation or 0) >= dep.metadata.generation
+            and (dep.status.updated_replicas or 0) == desired
+            and (dep.status.available_replicas or 0) == desired
+            and (dep.status.replicas or 0) == desired
+        )
+    ds = apps_v1_api.read_namespaced_daemon_set_status(name, namespace)
+    desired = ds.status.desired_number_scheduled
+    return (
+        (ds.status.observed_generation or 0) >= ds.metadata.generation
+        and (ds.status.updated_number_scheduled or 0) == desired
+        and (ds.status.number_available or 0) == desired
+    )
+
+
+def wait_until_ingress_controller_rolled_out(
+    v1: CoreV1Api, apps_v1_api: AppsV1Api, name, dep_type, namespace
+) -> None:
+    """
+    Wait for the IC rollout to complete and for the old pods to go away.
+
+    :param v1: CoreV1Api
+    :param apps_v1_api: AppsV1Api
+    :param name: IC name
+    :param dep_type: IC deployment type 'deployment' or 'daemon-set'
+    :param namespace: namespace name
+    :return:
+    """
+    print("Start waiting for the Ingress Controller rollout")
+    counter = 0
+    while not is_ingress_controller_rolled_out(apps_v1_api, name, dep_type, namespace) and counter < 200:
+        print("The Ingress Controller is not rolled out yet. Wait for 1 sec...")
+        time.sleep(1)
+        counter = counter + 1
+    if counter >= 200:
+        pytest.fail("After 200 seconds the Ingress Controller is not rolled out. Exiting...")
+    # terminating pods of the previous revision are still listed and may be picked up by get_first_pod_name
+    counter = 0
+    while (
+        any(pod.metadata.deletion_timestamp for pod in v1.list_namespaced_pod(namespace).items)
+        and counter < 120
+    ):
+        print("There are terminating pods. Wait for 1 sec...")
+        time.sleep(1)
+        counter = counter + 1
+    if counter >= 120:
+        raise PodNotReadyException("After 120 seconds the old IC pods are still terminating. Exiting!")
+    wait_until_all_pods_are_ready(v1, namespace)
+    print("The Ingress Controller is rolled out")
+
+
 def delete_ingress_controller(apps_v1_api: AppsV1Api, name, dep_type, namespace) -> None:
     """
     Delete IC according to its type.
@@ -1011,6 +1286,21 @@ def delete_ingress_controller(apps_v1_api: AppsV1Api, name, dep_type, namespace)
         delete_daemon_set(apps_v1_api, name, namespace)
 
 
+def run_kubectl_with_yaml(command, yaml_manifest) -> None:
+    """
+    Run 'kubectl <command> -f -' for the items of a yaml manifest.
+
+    The items are renamed to the ones of the current pytest-xdist worker.
+
+    :param command: kubectl command, e.g. apply or delete
+    :param yaml_manifest: an absolute path to a file
+    :return:
+    """
+    with open(yaml_manifest) as f:
+        docs = [isolate_manifest(doc) for doc in yaml.safe_load_all(f) if doc]
+    subprocess.run(["kubectl", command, "-f", "-"], input=yaml.safe_dump_all(docs), text=True)
+
+
 def create_ns_and_sa_from_yaml(v1: CoreV1Api, yaml_manifest) -> str:
     """
     Create a namespace and a service account in that namespace.
@@ -1023,7 +1313,7 @@ def create_ns_and_sa_from_yaml(v1: CoreV1Api, yaml_manifest) -> str:
     res = {}
     with open(yaml_manifest) as f:
         docs = yaml.safe_load_all(f)
-        for doc in docs:
+        for doc in map(isolate_manifest, docs):
             if doc["kind"] == "Namespace":
                 res["namespace"] = create_namespace(v1, doc)
             elif doc["kind"] == "ServiceAccount":
@@ -1313,7 +1603,7 @@ def get_last_reload_time(req_url, ingress_class) -> str:
     resp = requests.get(req_url)
     assert resp.status_code == 200, f"Expected 200 code for /metrics and got {resp.status_code}"
     resp_content = resp.content.decode("utf-8")
-    metric_string = 'last_reload_milliseconds{class="%s"}' % ingress_class
+    metric_string = 'last_reload_milliseconds{class="%s"}' % isolate_ingress_class(ingress_class)
     return parse_metric_data(resp_content, metric_string)
 
 
@@ -1322,7 +1612,9 @@ def get_total_ingresses(req_url, ingress_class) -> str:
     ensure_connection(req_url, 200)
     resp = requests.get(req_url)
     resp_content = resp.content.decode("utf-8")
-    metric_string = 'controller_ingress_resources_total{class="%s",type="regular"}' % ingress_class
+    metric_string = 'controller_ingress_resources_total{class="%s",type="regular"}' % isolate_ingress_class(
+        ingress_class
+    )
     return parse_metric_data(resp_content, metric_string)
 
 
@@ -1331,7 +1623,7 @@ def get_total_vs(req_url, ingress_class) -> str:
     ensure_connection(req_url, 200)
     resp = requests.get(req_url)
     resp_content = resp.content.decode("utf-8")
-    metric_string = 'virtualserver_resources_total{class="%s"}' % ingress_class
+    metric_string = 'virtualserver_resources_total{class="%s"}' % isolate_ingress_class(ingress_class)
     return parse_metric_data(resp_content, metric_string)
 
 
@@ -1340,7 +1632,7 @@ def get_total_vsr(req_url, ingress_class) -> str:
     ensure_connection(req_url, 200)
     resp = requests.get(req_url)
     resp_content = resp.content.decode("utf-8")
-    metric_string = 'virtualserverroute_resources_total{class="%s"}' % ingress_class
+    metric_string = 'virtualserverroute_resources_total{class="%s"}' % isolate_ingress_class(ingress_class)
     return parse_metric_data(resp_content, metric_string)
 
 
@@ -1349,7 +1641,7 @@ def get_last_reload_status(req_url, ingress_class) -> str:
     ensure_connection(req_url, 200)
     resp = requests.get(req_url)
     resp_content = resp.content.decode("utf-8")
-    metric_string = 'nginx_last_reload_status{class="%s"}' % ingress_class
+    metric_string = 'nginx_last_reload_status{class="%s"}' % isolate_ingress_class(ingress_class)
     return parse_metric_data(resp_content, metric_string)
 
 
@@ -1370,7 +1662,7 @@ def get_reload_count(req_url) -> int:
         # nginx_ingress_controller_nginx_reloads_total{class="nginx",reason="endpoints"} 0
         # nginx_ingress_controller_nginx_reloads_total{class="nginx",reason="other"} 1
         if "nginx_ingress_controller_nginx_reloads_total{class=" in line:
-            c = re.findall(r"\d+", line)[0]
+            c = line.split()[-1]
             count += int(c)
             found += 1
 
@@ -1382,6 +1674,66 @@ def get_reload_count(req_url) -> int:
     return count
 
 
+def get_reload_count_by_reason(req_url, reason) -> int:
+    """
+    Get the number of reloads of a reason.
+
+    :param req_url: IC /metrics url
+    :param reason: 'endpoints' or 'other'
+    :return: int
+    """
+    ensure_connection(req_url, 200)
+    resp = requests.get(req_url)
+    assert resp.status_code == 200, f"Expected 200 code for /metrics and got {resp.status_code}"
+    for line in resp.content.decode("utf-8").splitlines():
+        # nginx_ingress_controller_nginx_reloads_total{class="nginx",reason="endpoints"} 0
+        if line.startswith("nginx_ingress_controller_nginx_reloads_total{") and f'reason="{reason}"' in line:
+            return int(line.split()[-1])
+    pytest.fail(f"No reloads_total metric with reason {reason} at {req_url}")
+
+
+def get_reload_metrics(req_url, session=None) -> (int, float):
+    """
+    Get the number of reloads and the duration of the last reload in one request, without the prints.
+
+    :param req_url: IC /metrics url
+    :param session: requests.Session to reuse the connection or None
+    :return: (count, milliseconds)
+    """
+    resp = (session or requests).get(req_url, timeout=5)
+    count, duration = 0, 0.0
+    for line in resp.text.splitlines():
+        if line.startswith("nginx_ingress_controller_nginx_reloads_total{"):
+            count += int(float(line.split()[-1]))
+        elif line.startswith("nginx_ingress_controller_nginx_last_reload_milliseconds{"):
+            duration = float(line.split()[-1])
+    return count, duration
+
+
+def wait_for_reload_metrics(req_url, count=1, timeout=60, session=None) -> (int, float):
+    """
+    Wait until the IC metrics answer and show a number of reloads, e.g. after a restart of the IC.
+
+    :param req_url: IC /metrics url
+    :param count: the least number of reloads
+    :param timeout: seconds
+    :param session: requests.Session to reuse the connection or None
+    :return: (count, milliseconds), the last answer or (0, 0.0) after the timeout
+    """
+    deadline = time.perf_counter() + timeout
+    metrics = (0, 0.0)
+    while time.perf_counter() < deadline:
+        try:
+            metrics = get_reload_metrics(req_url, session)
+            if metrics[0] >= count:
+                return metrics
+        except requests.RequestException as ex:
+            print(f"The metrics are not available yet: {ex}")
+        time.sleep(0.5)
+    print(f"Fewer than {count} reloads in the metrics after {timeout} seconds")
+    return metrics
+
+
 def get_test_file_name(path) -> str:
     """
     :param path: full path to the test file
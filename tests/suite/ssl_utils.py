@@ -2,6 +2,7 @@
 
 import socket
 import ssl
+import time
 import OpenSSL
 import requests
 from requests.adapters import HTTPAdapter
@@ -31,6 +32,64 @@ def get_certificate(ip_address, host, port, timeout=10) -> str:
     return ssl.DER_cert_to_PEM_cert(der_cert)
 
 
+def create_client_context(tickets=True, max_version=None) -> ssl.SSLContext:
+    """
+    Create a client TLS context that accepts any certificate, like get_certificate does.
+
+    :param tickets: resume the sessions with tickets, otherwise with session IDs
+    :param max_version: ssl.TLSVersion, e.g. TLSv1_2 to test the TLS 1.2 resumption
+    :return: ssl.SSLContext
+    """
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    if not tickets:
+        context.options |= ssl.OP_NO_TICKET
+    if max_version is not None:
+        context.maximum_version = max_version
+    return context
+
+
+def tls_handshake(ip_address, host, port, context, session=None, read_ticket=False, timeout=10) -> dict:
+    """
+    Make a TLS handshake with the SNI of the host and measure it.
+
+    In TLS 1.3 the server sends the session tickets after the handshake, so read_ticket sends
+    a request and reads the response to get a session that can be resumed.
+
+    :param ip_address:
+    :param host: SNI
+    :param port:
+    :param context: ssl.SSLContext, e.g. from create_client_context
+    :param session: ssl.SSLSession to resume
+    :param read_ticket: wait for the session ticket
+    :param timeout:
+    :return: dict with connect_ms, handshake_ms, resumed, der_cert, session and version
+    """
+    start = time.perf_counter()
+    conn = socket.create_connection((ip_address, port), timeout=timeout)
+    connected = time.perf_counter()
+    sock = context.wrap_socket(conn, server_hostname=host, session=session, do_handshake_on_connect=False)
+    try:
+        sock.do_handshake()
+        handshake_done = time.perf_counter()
+        der_cert, version, resumed = sock.getpeercert(True), sock.version(), sock.session_reused
+        if read_ticket:
+            sock.sendall(f"HEAD / HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+            while sock.recv(4096):
+                pass
+        return {
+            "connect_ms": (connected - start) * 1000,
+            "handshake_ms": (handshake_done - connected) * 1000,
+            "resumed": resumed,
+            "der_cert": der_cert,
+            "session": sock.session,
+            "version": version,
+        }
+    finally:
+        sock.close()
+
+
 def get_server_certificate_subject(ip_address, host, port=443) -> dict:
     """
     Get tls certificate subject object.
@@ -0,0 +1,56 @@
+"""Describe methods and a base class shared by the performance tests to sample and summarize measurements."""
+
+import abc
+import threading
+
+
+def get_percentile(values, p) -> float:
+    """
+    Get a nearest-rank percentile of the values.
+
+    :param values: [float], in any order
+    :param p: 0-100
+    :return: float, 0 for no values
+    """
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class PeriodicSampler(abc.ABC):
+    """
+    Call sample in a background thread every interval seconds until stopped.
+
+    Attributes:
+        interval (float): seconds between the samples
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    @abc.abstractmethod
+    def sample(self) -> None:
+        """
+        Take one sample, the exceptions it does not handle stop the thread.
+
+        :return:
+        """
+
+    def close(self) -> None:
+        pass
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            self.sample()
+            self.stopped.wait(self.interval)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.thread.join()
+        self.close()
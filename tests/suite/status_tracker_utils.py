@@ -0,0 +1,284 @@
+"""Describe methods to watch the status of the custom resources and measure how fast the IC publishes it."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from kubernetes import watch
+from kubernetes.client import CustomObjectsApi
+from kubernetes.client.rest import ApiException
+
+from suite.stats_utils import get_percentile
+
+VALID = "Valid"
+INVALID = "Invalid"
+
+
+def status_matches(status, state, reason=None) -> bool:
+    return bool(status) and status.get("state") == state and (reason is None or status.get("reason") == reason)
+
+
+def wait_for_status_state(custom_objects: CustomObjectsApi, namespace, plural, name, state, reason=None,
+                          timeout=60, version="v1") -> dict:
+    """
+    Wait until the status of a custom resource has a state, without a fixed sleep.
+
+    The resource is read first and then watched from its resourceVersion, a status published before the call
+    is not missed.
+
+    :param custom_objects: CustomObjectsApi
+    :param namespace:
+    :param plural: the custom resource's plural name, e.g. virtualservers
+    :param name:
+    :param state: Valid, Invalid or Warning
+    :param reason: the reason of the status or None for any
+    :param timeout: seconds
+    :param version: the version of the k8s.nginx.org resource, v1alpha1 for TransportServers
+    :return: the last seen status, it does not match the state after the timeout
+    """
+    print(f"Wait for the status {state} of {plural} {namespace}/{name}")
+    start = time.perf_counter()
+    obj = custom_objects.get_namespaced_custom_object("k8s.nginx.org", version, namespace, plural, name)
+    status = obj.get("status") or {}
+    resource_version = obj["metadata"]["resourceVersion"]
+    w = watch.Watch()
+    while not status_matches(status, state, reason):
+        remaining = timeout - (time.perf_counter() - start)
+        if remaining <= 0:
+            print(f"The status of {plural} {namespace}/{name} is still {status} after {timeout}s")
+            return status
+        try:
+            for event in w.stream(
+                custom_objects.list_namespaced_custom_object, "k8s.nginx.org", version, namespace, plural,
+                field_selector=f"metadata.name={name}", resource_version=resource_version,
+                timeout_seconds=max(1, int(remaining)),
+            ):
+                if event["type"] == "ERROR":
+                    break
+                resource_version = event["object"]["metadata"]["resourceVersion"]
+                status = event["object"].get("status") or {}
+                if status_matches(status, state, reason):
+                    w.stop()
+                    break
+        except ApiException as ex:
+            if ex.status != 410:
+                raise
+            obj = custom_objects.get_namespaced_custom_object("k8s.nginx.org", version, namespace, plural, name)
+            status = obj.get("status") or {}
+            resource_version = obj["metadata"]["resourceVersion"]
+    print(f"{plural} {namespace}/{name} is {state} after {time.perf_counter() - start:.2f}s")
+    return status
+
+
+class StatusChange:
+    """
+    Encapsulate a change of the status of a custom resource.
+
+    Attributes:
+        state (str):
+        reason (str):
+        message (str):
+        observed_at (float): time.perf_counter() when the watch delivered the change
+    """
+
+    def __init__(self, state, reason, message, observed_at):
+        self.state = state
+        self.reason = reason
+        self.message = message
+        self.observed_at = observed_at
+
+
+class StatusTracker:
+    """
+    Watch the custom resources of a kind in all namespaces in a background thread and record every status change.
+
+    Mark an object right before it is created or patched to measure the latency until its status changes.
+
+    Attributes:
+        custom_objects (CustomObjectsApi):
+        plural (str): the custom resource's plural name, e.g. virtualservers
+        version (str): the version of the k8s.nginx.org resource
+        changes ({str: [StatusChange]}): namespace/name -> the changes in the order they were seen
+        marks ({str: float}): namespace/name -> time.perf_counter() of the last create or patch
+    """
+
+    def __init__(self, custom_objects, plural, version="v1"):
+        self.custom_objects = custom_objects
+        self.plural = plural
+        self.version = version
+        self.changes = {}
+        self.marks = {}
+        self.statuses = {}
+        self.resource_version = None
+        self.condition = threading.Condition()
+        self.stopped = threading.Event()
+        self.watch = watch.Watch()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self) -> None:
+        self.relist()
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.watch.stop()
+        self.thread.join(timeout=5)
+
+    def relist(self) -> None:
+        resp = self.custom_objects.list_cluster_custom_object("k8s.nginx.org", self.version, self.plural)
+        for obj in resp["items"]:
+            self.record(obj)
+        self.resource_version = resp["metadata"]["resourceVersion"]
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            try:
+                if self.resource_version is None:
+                    self.relist()
+                self.watch_events()
+            except ApiException as ex:
+                if ex.status != 410:
+                    print(f"Watch of {self.plural} failed: {ex.reason}")
+                    self.stopped.wait(1)
+                self.resource_version = None
+            except Exception as ex:
+                if not self.stopped.is_set():
+                    print(f"Watch of {self.plural} failed: {ex}")
+                    self.stopped.wait(1)
+
+    def watch_events(self) -> None:
+        """
+        Record the events of one watch from the last resourceVersion, an ERROR event makes the next one relist.
+
+        :return:
+        """
+        for event in self.watch.stream(
+            self.custom_objects.list_cluster_custom_object, "k8s.nginx.org", self.version, self.plural,
+            resource_version=self.resource_version, timeout_seconds=30,
+        ):
+            if event["type"] == "ERROR":
+                self.resource_version = None
+                return
+            self.resource_version = event["object"]["metadata"]["resourceVersion"]
+            if event["type"] == "DELETED":
+                self.statuses.pop(self.key(event["object"]), None)
+            else:
+                self.record(event["object"])
+
+    @staticmethod
+    def key(obj) -> str:
+        return f"{obj['metadata']['namespace']}/{obj['metadata']['name']}"
+
+    def record(self, obj) -> None:
+        key = self.key(obj)
+        status = obj.get("status") or {}
+        if self.statuses.get(key) == status:
+            return
+        self.statuses[key] = status
+        if not status:
+            return
+        change = StatusChange(status.get("state"), status.get("reason"), status.get("message"), time.perf_counter())
+        with self.condition:
+            self.changes.setdefault(key, []).append(change)
+            self.condition.notify_all()
+
+    def mark(self, namespace, name) -> None:
+        """
+        Record the time of a create or patch, call it right before the API call.
+
+        :param namespace:
+        :param name:
+        :return:
+        """
+        self.marks[f"{namespace}/{name}"] = time.perf_counter()
+
+    def first_change(self, key, state=None) -> StatusChange:
+        since = self.marks.get(key, 0.0)
+        for change in self.changes.get(key, []):
+            if change.observed_at >= since and (state is None or change.state == state):
+                return change
+        return None
+
+    def wait_for_state(self, namespace, name, state, timeout=60) -> StatusChange:
+        """
+        Wait until the status changed to a state after the last mark of the object.
+
+        :param namespace:
+        :param name:
+        :param state: Valid, Invalid or Warning
+        :param timeout: seconds
+        :return: StatusChange, None after the timeout
+        """
+        key = f"{namespace}/{name}"
+        with self.condition:
+            self.condition.wait_for(lambda: self.first_change(key, state) is not None, timeout)
+            return self.first_change(key, state)
+
+
+class StatusLatencyReport:
+    """
+    Encapsulate the status latencies of a batch of objects.
+
+    Attributes:
+        state (str): the expected state
+        latencies ({str: float}): namespace/name -> seconds from the create or patch until the state was published
+        missing ([str]): the objects without the state after the timeout
+        duration (float): seconds from the first API call until the last status
+    """
+
+    def __init__(self, state, latencies, missing, duration):
+        self.state = state
+        self.latencies = latencies
+        self.missing = missing
+        self.duration = duration
+
+    def percentile(self, percentile) -> float:
+        return get_percentile(self.latencies.values(), percentile)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.latencies)} objects {self.state} in {self.duration:.1f}s, {len(self.missing)} missing, "
+            f"status latency p50={self.percentile(50):.2f}s p90={self.percentile(90):.2f}s "
+            f"p99={self.percentile(99):.2f}s max={self.percentile(100):.2f}s"
+        )
+
+
+def run_status_batch(tracker, items, apply, state, timeout=300, workers=16) -> StatusLatencyReport:
+    """
+    Create or patch many objects concurrently and measure the latency until each one has the expected status.
+
+    The tracker records a change only when the status differs from the last one, and the status of the resources
+    has no observedGeneration. A patch that ends in the same state, reason and message as before is never seen,
+    and its object is reported as missing. Every batch must move the objects to a new status.
+
+    :param tracker: a started StatusTracker of the kind of the objects
+    :param items: [(namespace, name, body)]
+    :param apply: a function of (namespace, name, body) that creates or patches the object
+    :param state: Valid, Invalid or Warning
+    :param timeout: seconds to wait for all the statuses after the last API call
+    :param workers: number of the concurrent API clients
+    :return: StatusLatencyReport
+    """
+    print(f"Apply {len(items)} {tracker.plural} and wait until they are {state}")
+
+    def submit(item):
+        namespace, name, body = item
+        tracker.mark(namespace, name)
+        apply(namespace, name, body)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(submit, items))
+    deadline = time.perf_counter() + timeout
+    latencies = {}
+    missing = []
+    for namespace, name, _ in items:
+        change = tracker.wait_for_state(namespace, name, state, max(0.0, deadline - time.perf_counter()))
+        if change is None:
+            missing.append(f"{namespace}/{name}")
+        else:
+            latencies[f"{namespace}/{name}"] = change.observed_at - tracker.marks[f"{namespace}/{name}"]
+    done = [tracker.first_change(key, state).observed_at for key in latencies]
+    report = StatusLatencyReport(state, latencies, missing, (max(done) if done else time.perf_counter()) - start)
+    print(report.summary())
+    return report
@@ -0,0 +1,166 @@
+"""Describe methods to send concurrent TCP connections to the TCP test server behind a TransportServer."""
+
+import asyncio
+import time
+from collections import Counter
+
+from suite.stats_utils import get_percentile
+
+
+class TcpConnectionResult:
+    """
+    Encapsulate the result of a connection to the TCP test server.
+
+    Attributes:
+        endpoint (str): the address of the backend pod the test server returned
+        connect_ms (float): time to establish the connection
+        error (str): the error or an empty string
+    """
+
+    def __init__(self, endpoint="", connect_ms=0.0, error=""):
+        self.endpoint = endpoint
+        self.connect_ms = connect_ms
+        self.error = error
+
+
+class TcpLoadReport:
+    """
+    Encapsulate the results of a TCP load run.
+
+    Attributes:
+        results ([TcpConnectionResult]): short-lived connections
+        held ([TcpConnectionResult]): connections that were kept open during the run
+        duration (float): seconds
+    """
+
+    def __init__(self, results, held, duration):
+        self.results = results
+        self.held = held
+        self.duration = duration
+
+    @property
+    def distribution(self) -> Counter:
+        return Counter(result.endpoint for result in self.results if not result.error)
+
+    @property
+    def held_distribution(self) -> Counter:
+        return Counter(result.endpoint for result in self.held if not result.error)
+
+    @property
+    def failures(self) -> []:
+        return [result for result in self.results + self.held if result.error]
+
+    def connect_latency_ms(self, percentile) -> float:
+        """
+        Get a percentile of the connect latency of the successful connections.
+
+        :param percentile: 0-100
+        :return: float
+        """
+        return get_percentile(
+            [result.connect_ms for result in self.results + self.held if not result.error], percentile
+        )
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.results)} connections and {len(self.held)} held in {self.duration:.2f}s, "
+            f"{len(self.failures)} failed, connect p50={self.connect_latency_ms(50):.1f}ms "
+            f"p99={self.connect_latency_ms(99):.1f}ms, distribution: {dict(self.distribution)}, "
+            f"held: {dict(self.held_distribution)}"
+        )
+
+
+async def open_tcp_connection(host, port, payload, timeout) -> (TcpConnectionResult, asyncio.StreamWriter):
+    """
+    Connect to the test server, send an instruction and read the backend address.
+
+    :param host: host
+    :param port: port
+    :param payload: the instruction, b'connect' or b'hold'
+    :param timeout: seconds for the connect and for the response
+    :return: (TcpConnectionResult, the open writer or None)
+    """
+    start = time.perf_counter()
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        connect_ms = (time.perf_counter() - start) * 1000
+        writer.write(payload)
+        await writer.drain()
+        data = await asyncio.wait_for(reader.read(4096), timeout)
+        if not data:
+            raise ConnectionResetError("the connection was closed without a response")
+        return TcpConnectionResult(data.decode(), connect_ms), writer
+    except (OSError, asyncio.TimeoutError) as ex:
+        if writer is not None:
+            writer.close()
+        return TcpConnectionResult(error=f"{type(ex).__name__}: {ex}"), None
+
+
+async def close_writer(writer) -> None:
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+
+
+async def run_tcp_load_async(host, port, connections, concurrency, payload, hold, timeout) -> TcpLoadReport:
+    start = time.perf_counter()
+    opened = await asyncio.gather(*(open_tcp_connection(host, port, b"hold", timeout) for _ in range(hold)))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def connect_once():
+        async with semaphore:
+            result, writer = await open_tcp_connection(host, port, payload, timeout)
+            if writer is not None:
+                await close_writer(writer)
+            return result
+
+    try:
+        results = await asyncio.gather(*(connect_once() for _ in range(connections)))
+    finally:
+        await asyncio.gather(*(close_writer(writer) for _, writer in opened if writer is not None))
+    return TcpLoadReport(list(results), [result for result, _ in opened], time.perf_counter() - start)
+
+
+def run_tcp_load(host, port, connections=300, concurrency=50, payload=b"connect", hold=0, timeout=5.0) -> TcpLoadReport:
+    """
+    Open many short connections with bounded concurrency, optionally while holding other connections open.
+
+    The held connections are opened first and closed at the end of the run, so they can test
+    the least_conn method or the max_conns limit.
+
+    :param host: host
+    :param port: port, e.g. tcp_server_port of the public endpoint
+    :param connections: number of short connections
+    :param concurrency: max number of short connections in flight
+    :param payload: the instruction to the test server
+    :param hold: number of connections to keep open during the run
+    :param timeout: seconds for every connect and response
+    :return: TcpLoadReport
+    """
+    print(f"Open {connections} TCP connections to {host}:{port} ({concurrency} at a time) holding {hold}")
+    report = asyncio.run(run_tcp_load_async(host, port, connections, concurrency, payload, hold, timeout))
+    print(report.summary())
+    return report
+
+
+def run_tcp_load_until(host, port, endpoints, retries=30) -> TcpLoadReport:
+    """
+    Run the TCP load until the connections reach the number of endpoints without failures.
+
+    :param host: host
+    :param port: port, e.g. tcp_server_port of the public endpoint
+    :param endpoints: the expected number of endpoints
+    :param retries: the max number of runs after the first one, a second apart
+    :return: TcpLoadReport of the last run
+    """
+    report = run_tcp_load(host, port)
+    for retry in range(retries):
+        if len(report.distribution) == endpoints and not report.failures:
+            break
+        time.sleep(1)
+        print(f"Retry #{retry + 1}")
+        report = run_tcp_load(host, port)
+    return report
@@ -0,0 +1,122 @@
+import pytest
+
+from settings import TEST_DATA
+from suite.ap_resources_utils import (
+    create_ap_logconf_from_yaml,
+    create_ap_usersig_from_yaml,
+    delete_ap_logconf,
+    delete_ap_usersig,
+)
+from suite.ap_scale_utils import ApScaleTemplates, delete_ap_scale_resources, run_ap_scale, scale_steps
+from suite.resources_utils import (
+    create_example_app,
+    delete_common_app,
+    ensure_connection_to_public_endpoint,
+    wait_until_all_pods_are_ready,
+)
+
+
+@pytest.fixture(scope="class")
+def appprotect_scale_setup(request, kube_apis, ingress_controller_endpoint, test_namespace) -> ApScaleTemplates:
+    """
+    Deploy simple application, the logconf and the UserSig the scale policies share.
+
+    :param request: pytest fixture
+    :param kube_apis: client apis
+    :param ingress_controller_endpoint: public endpoint
+    :param test_namespace:
+    :return: ApScaleTemplates
+    """
+    print("------------------------- Deploy simple backend application -------------------------")
+    create_example_app(kube_apis, "simple", test_namespace)
+    wait_until_all_pods_are_ready(kube_apis.v1, test_namespace)
+    ensure_connection_to_public_endpoint(
+        ingress_controller_endpoint.public_ip,
+        ingress_controller_endpoint.port,
+        ingress_controller_endpoint.port_ssl,
+    )
+
+    print("------------------------- Deploy logconf and UserSig -----------------------------")
+    log_name = create_ap_logconf_from_yaml(kube_apis.custom_objects, f"{TEST_DATA}/ap-waf/logconf.yaml", test_namespace)
+    usersig_name = create_ap_usersig_from_yaml(
+        kube_apis.custom_objects, f"{TEST_DATA}/ap-waf/ap-ic-uds.yaml", test_namespace
+    )
+
+    def fin():
+        print("Clean up:")
+        delete_ap_scale_resources(
+            kube_apis.custom_objects,
+            range(1, int(request.config.getoption("--ap-scale-policies")) + 1),
+            test_namespace,
+            test_namespace,
+        )
+        delete_ap_usersig(kube_apis.custom_objects, usersig_name, test_namespace)
+        delete_ap_logconf(kube_apis.custom_objects, log_name, test_namespace)
+        delete_common_app(kube_apis, "simple", test_namespace)
+
+    request.addfinalizer(fin)
+
+    return ApScaleTemplates(
+        f"{TEST_DATA}/ap-waf/dataguard-alarm-uds.yaml",
+        f"{TEST_DATA}/ap-waf/policies/waf-dataguard.yaml",
+        f"{TEST_DATA}/ap-waf/virtual-server-waf-spec.yaml",
+        test_namespace,
+        log_name,
+        "syslog:server=127.0.0.1:514",
+    )
+
+
+@pytest.mark.perf
+@pytest.mark.skip_for_nginx_oss
+@pytest.mark.appprotect
+@pytest.mark.parametrize(
+    "crd_ingress_controller_with_ap",
+    [
+        {
+            "type": "complete",
+            "extra_args": [
+                "-enable-custom-resources",
+                "-enable-leader-election=false",
+                "-enable-app-protect",
+                "-enable-preview-policies",
+                "-enable-prometheus-metrics",
+            ],
+        }
+    ],
+    indirect=True,
+)
+class TestAppProtectWAFPolicyScale:
+    def test_ap_waf_policy_scale(
+        self,
+        request,
+        kube_apis,
+        ingress_controller_prerequisites,
+        ingress_controller_endpoint,
+        ingress_controller_pool,
+        crd_ingress_controller_with_ap,
+        appprotect_scale_setup,
+        test_namespace,
+    ):
+        """
+        Add distinct WAF policies in steps, each with its own VS,
+        and measure compile times, reloads, memory and startup.
+        """
+        total = int(request.config.getoption("--ap-scale-policies"))
+        url = f"http://{ingress_controller_endpoint.public_ip}:{ingress_controller_endpoint.port}/backend1/<script>"
+        metrics_url = (
+            f"http://{ingress_controller_endpoint.public_ip}:{ingress_controller_endpoint.metrics_port}/metrics"
+        )
+        report = run_ap_scale(
+            kube_apis,
+            appprotect_scale_setup,
+            scale_steps(total),
+            test_namespace,
+            ingress_controller_prerequisites.namespace,
+            ingress_controller_pool.name,
+            url,
+            metrics_url,
+        )
+
+        for step in report.steps:
+            assert not step.missing, f"{step.missing} of the {step.added} policies added at {step.total} not enforced"
+        assert not report.startup_missing, f"{report.startup_missing} policies not enforced after the IC startup"
@@ -9,6 +9,7 @@ from suite.ap_resources_utils import (
 )
 from suite.grpc.helloworld_pb2 import HelloRequest
 from suite.grpc.helloworld_pb2_grpc import GreeterStub
+from suite.grpc_load_utils import run_grpc_load
 
 from suite.resources_utils import (
     wait_before_test,
@@ -203,4 +204,36 @@ class TestAppProtect:
             'violations="N/A"' in log_contents and
             'severity="Informational"' in log_contents and
             'outcome="PASSED"' in log_contents
-        )
\ No newline at end of file
+        )
+
+    @pytest.mark.parametrize("backend_setup", [{"policy": "grpc-block-saygoodbye"}], indirect=True)
+    def test_responses_grpc_allow_under_load(
+        self, kube_apis, crd_ingress_controller_with_ap, backend_setup, test_namespace
+    ):
+        """
+        Test grpc-block-goodbye AppProtect policy: Blocks /saygoodbye gRPC method only
+        Client sends many concurrent requests to /sayhello over reused channels thus they should pass
+        """
+        cert = get_certificate(backend_setup.ip, backend_setup.ingress_host, backend_setup.port_ssl)
+        target = f'{backend_setup.ip}:{backend_setup.port_ssl}'
+        report = run_grpc_load(target, cert, backend_setup.ingress_host, calls=500, concurrency=50, channels=2,
+                               name=backend_setup.ip)
+
+        assert report.status_codes == {"OK": 500}, f"Unexpected statuses: {dict(report.details)}"
+        assert all(valid_resp_txt in result.details for result in report.results)
+
+    @pytest.mark.parametrize("backend_setup", [{"policy": "grpc-block-sayhello"}], indirect=True)
+    def test_responses_grpc_block_under_load(
+        self, kube_apis, crd_ingress_controller_with_ap, backend_setup, test_namespace
+    ):
+        """
+        Test grpc-block-hello AppProtect policy: Blocks /sayhello gRPC method only
+        Client sends many concurrent requests to /sayhello, every one of them must be rejected
+        """
+        cert = get_certificate(backend_setup.ip, backend_setup.ingress_host, backend_setup.port_ssl)
+        target = f'{backend_setup.ip}:{backend_setup.port_ssl}'
+        report = run_grpc_load(target, cert, backend_setup.ingress_host, calls=200, concurrency=20,
+                               name=backend_setup.ip)
+
+        assert "OK" not in report.status_codes
+        assert all(invalid_resp_text in result.details for result in report.results)
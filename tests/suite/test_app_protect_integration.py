@@ -149,7 +149,12 @@ def assert_valid_responses(response) -> None:
 )
 class TestAppProtect:
     def test_ap_nginx_config_entries(
-        self, kube_apis, crd_ingress_controller_with_ap, appprotect_setup, test_namespace
+        self,
+        kube_apis,
+        ingress_controller_prerequisites,
+        crd_ingress_controller_with_ap,
+        appprotect_setup,
+        test_namespace,
     ):
         """
         Test to verify AppProtect annotations in nginx config
@@ -168,10 +173,10 @@ class TestAppProtect:
         ingress_host = get_first_ingress_host_from_yaml(src_ing_yaml)
         ensure_response_from_backend(appprotect_setup.req_url, ingress_host, check404=True)
 
-        pod_name = get_first_pod_name(kube_apis.v1, "nginx-ingress")
+        pod_name = get_first_pod_name(kube_apis.v1, ingress_controller_prerequisites.namespace)
 
         result_conf = get_ingress_nginx_template_conf(
-            kube_apis.v1, test_namespace, "appprotect-ingress", pod_name, "nginx-ingress"
+            kube_apis.v1, test_namespace, "appprotect-ingress", pod_name, ingress_controller_prerequisites.namespace
         )
         delete_items_from_yaml(kube_apis, src_ing_yaml, test_namespace)
 
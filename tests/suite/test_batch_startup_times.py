@@ -45,6 +45,7 @@ from suite.policy_resources_utils import (
     delete_policy,
 )
 from suite.yaml_utils import get_first_ingress_host_from_yaml
+from suite.worker_utils import isolate_manifest
 from settings import TEST_DATA
 
 
@@ -338,7 +339,7 @@ class TestVirtualServer:
                 doc["metadata"]["name"] = f"virtual-server-{i}"
                 doc["spec"]["host"] = f"virtual-server-{i}.example.com"
                 kube_apis.custom_objects.create_namespaced_custom_object(
-                    "k8s.nginx.org", "v1", test_namespace, "virtualservers", doc
+                    "k8s.nginx.org", "v1", test_namespace, "virtualservers", isolate_manifest(doc)
                 )
                 print(f"VirtualServer created with name '{doc['metadata']['name']}'")
         print(f"Total resources deployed is {total_vs}")
@@ -487,7 +488,7 @@ class TestAppProtectWAFPolicyVS:
                 doc["metadata"]["name"] = f"virtual-server-{i}"
                 doc["spec"]["host"] = f"virtual-server-{i}.example.com"
                 kube_apis.custom_objects.create_namespaced_custom_object(
-                    "k8s.nginx.org", "v1", test_namespace, "virtualservers", doc
+                    "k8s.nginx.org", "v1", test_namespace, "virtualservers", isolate_manifest(doc)
                 )
                 print(f"VirtualServer created with name '{doc['metadata']['name']}'")
 
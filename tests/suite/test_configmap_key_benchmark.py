@@ -0,0 +1,36 @@
+import pytest
+
+from settings import DEPLOYMENTS
+from suite.configmap_benchmark_utils import config_reader, run_configmap_key_benchmark
+from suite.resources_utils import get_first_pod_name, restore_configmap_from_yaml
+
+
+@pytest.mark.perf
+@pytest.mark.vs
+@pytest.mark.parametrize('crd_ingress_controller, virtual_server_setup',
+                         [({"type": "complete", "extra_args": ["-enable-custom-resources",
+                                                               "-enable-prometheus-metrics"]},
+                           {"example": "virtual-server-configmap-keys", "app_type": "simple"})],
+                         indirect=True)
+class TestConfigMapKeyBenchmark:
+    def test_key_propagation(self, kube_apis, ingress_controller_prerequisites, crd_ingress_controller,
+                             virtual_server_setup, restore_configmap):
+        """
+        Change the ConfigMap keys one by one and measure the time until the config has them and the reloads.
+        """
+        cm_name = ingress_controller_prerequisites.config_map['metadata']['name']
+        ic_pod_name = get_first_pod_name(kube_apis.v1, ingress_controller_prerequisites.namespace)
+        read_config = config_reader(kube_apis.v1, ic_pod_name, ingress_controller_prerequisites.namespace,
+                                    virtual_server_setup.namespace, virtual_server_setup.vs_name)
+        restore_configmap_from_yaml(kube_apis.v1, cm_name, ingress_controller_prerequisites.namespace,
+                                    f"{DEPLOYMENTS}/common/nginx-config.yaml")
+
+        report = run_configmap_key_benchmark(kube_apis.v1, cm_name, ingress_controller_prerequisites.namespace,
+                                             read_config, virtual_server_setup.metrics_url)
+
+        assert not report.not_propagated, f"The changes of the keys were not applied: {report.not_propagated}"
+        for result in report.results:
+            assert result.reloads >= 1 and result.restore_reloads >= 1, f"{result.case.key} did not reload NGINX"
+        print("A restored ConfigMap is not updated again:")
+        assert not restore_configmap_from_yaml(kube_apis.v1, cm_name, ingress_controller_prerequisites.namespace,
+                                               f"{DEPLOYMENTS}/common/nginx-config.yaml")
@@ -5,6 +5,7 @@ import pytest
 from suite.resources_utils import create_secret_from_yaml, is_secret_present, delete_secret, wait_before_test, \
     ensure_connection, replace_secret
 from suite.ssl_utils import get_server_certificate_subject
+from suite.worker_utils import get_worker_ic_namespace
 from settings import TEST_DATA, DEPLOYMENTS
 
 
@@ -29,7 +30,7 @@ test_data_path=f"{TEST_DATA}/default-server"
 invalid_secret_path=f"{test_data_path}/invalid-tls-secret.yaml"
 new_secret_path=f"{test_data_path}/new-tls-secret.yaml"
 secret_name="default-server-secret"
-secret_namespace="nginx-ingress"
+secret_namespace=get_worker_ic_namespace()
 
 
 @pytest.fixture(scope="class")
@@ -0,0 +1,75 @@
+import pytest
+
+from suite.endpoint_churn_utils import config_peers_reader, plus_peers_reader, run_endpoint_churn
+from suite.nginx_api_utils import NginxPlusApi
+from suite.resources_utils import scale_deployment
+
+# seconds between the changes of the deployment
+CHURN_INTERVALS = [10.0, 2.0]
+CHURN_STEPS = 12
+
+
+@pytest.mark.perf
+@pytest.mark.vs
+@pytest.mark.parametrize(
+    "crd_ingress_controller, virtual_server_setup",
+    [
+        (
+            {
+                "type": "complete",
+                "extra_args": [
+                    "-enable-custom-resources",
+                    "-enable-prometheus-metrics",
+                    "-nginx-status-allow-cidrs=0.0.0.0/0",
+                ],
+            },
+            {"example": "virtual-server", "app_type": "simple"},
+        )
+    ],
+    indirect=True,
+)
+class TestEndpointChurn:
+    @pytest.mark.parametrize("interval", CHURN_INTERVALS)
+    @pytest.mark.parametrize("mode", ["scale", "rollout"])
+    def test_endpoint_churn(self, request, kube_apis, ingress_controller_prerequisites, crd_ingress_controller,
+                            virtual_server_setup, mode, interval):
+        """
+        Churn the endpoints of backend2 and measure how fast NGINX gets them and how many reloads it takes.
+        NGINX Plus applies them with the API without reloads, NGINX reloads for them.
+        """
+        upstream = f"vs_{virtual_server_setup.namespace}_{virtual_server_setup.vs_name}_backend2"
+        api = None
+        if request.config.getoption("--ic-type") == "nginx-plus-ingress":
+            endpoint = virtual_server_setup.public_endpoint
+            api = NginxPlusApi(f"http://{endpoint.public_ip}:{endpoint.api_port}")
+            read_peers = plus_peers_reader(api, upstream)
+        else:
+            read_peers = config_peers_reader(
+                kube_apis.v1,
+                ingress_controller_prerequisites.namespace,
+                f"/etc/nginx/conf.d/vs_{virtual_server_setup.namespace}_{virtual_server_setup.vs_name}.conf",
+                upstream,
+            )
+
+        try:
+            report = run_endpoint_churn(
+                kube_apis,
+                virtual_server_setup.namespace,
+                "backend2",
+                "backend2-svc",
+                read_peers,
+                mode=mode,
+                steps=CHURN_STEPS,
+                interval=interval,
+                metrics_url=virtual_server_setup.metrics_url,
+                api=api,
+            )
+        finally:
+            scale_deployment(kube_apis.v1, kube_apis.apps_v1_api, "backend2", virtual_server_setup.namespace, 1)
+            if api is not None:
+                api.close()
+
+        assert report.changes[-1].applied_at is not None, "NGINX did not get the last endpoints"
+        assert report.other_reloads == 0
+        if api is not None:
+            assert report.endpoint_reloads == 0 and report.generations == 0, "Expected: no reloads with the API"
@@ -0,0 +1,145 @@
+"""Tests of the fake IC metrics and NGINX Plus API, they do not need a cluster."""
+
+import json
+import urllib.request
+
+import pytest
+from suite.fake_ic_api import API_VERSIONS, FakeIcApi
+
+UPSTREAM = "vs_default_cafe_tea"
+
+
+def get_metric(api, sample) -> float:
+    """
+    Get a sample value from the metrics page of the fake.
+
+    :param api: FakeIcApi
+    :param sample: the sample without the prefix, e.g. 'nginx_reloads_total{class="nginx",reason="other"}'
+    :return: float
+    """
+    code, _, text = api.handle("/metrics")
+    assert code == 200
+    for line in text.splitlines():
+        name, _, value = line.rpartition(" ")
+        if name == f"nginx_ingress_controller_{sample}":
+            return float(value)
+    pytest.fail(f"{sample} is not on the metrics page")
+
+
+def get_json(api, path):
+    code, content_type, text = api.handle(path)
+    assert content_type == "application/json"
+    return code, json.loads(text)
+
+
+class TestSteps:
+    def test_reload(self):
+        api = FakeIcApi()
+        api.apply({"reload": "other", "duration_ms": 150})
+        api.apply({"reload": "other", "status": 0})
+        assert api.reloads == {"endpoints": 0, "other": 1}
+        assert api.generation == 2 and api.reload_errors == 1
+        assert api.last_reload_status == 0
+        assert get_metric(api, 'nginx_reloads_total{class="nginx",reason="other"}') == 1
+        assert get_metric(api, 'nginx_reload_errors_total{class="nginx"}') == 1
+        assert get_metric(api, 'nginx_last_reload_milliseconds{class="nginx"}') == 100
+
+    def test_totals(self):
+        api = FakeIcApi(ingress_class="nginx-gw0")
+        api.apply({"totals": {"virtualservers": 3, "ingresses": {"regular": 2}}})
+        api.apply({"totals": {"ingresses": {"master": 1}, "transportservers": {"tcp": 1}}})
+        assert api.totals["ingresses"] == {"master": 1, "minion": 0, "regular": 2}
+        assert get_metric(api, 'virtualserver_resources_total{class="nginx-gw0"}') == 3
+        assert get_metric(api, 'ingress_resources_total{class="nginx-gw0",type="regular"}') == 2
+        assert get_metric(api, 'transportserver_resources_total{class="nginx-gw0",type="tcp"}') == 1
+
+    def test_upstreams(self):
+        api = FakeIcApi()
+        api.apply({"upstream": UPSTREAM, "peers": ["10.0.0.1:8080", {"server": "10.0.0.2:8080", "max_fails": 25}]})
+        assert [server["id"] for server in api.upstreams[UPSTREAM]] == [0, 1]
+        assert api.upstreams[UPSTREAM][1]["max_fails"] == 25
+        assert api.reloads["endpoints"] == 1, "an upstream change reloads NGINX by default"
+
+        api.apply({"upstream": "ts_default_dns", "peers": ["10.0.0.3:53"], "stream": True, "reload": False})
+        assert "ts_default_dns" in api.stream_upstreams and "ts_default_dns" not in api.upstreams
+        api.apply({"upstream": UPSTREAM, "peers": None, "reload": False})
+        assert UPSTREAM not in api.upstreams
+        assert api.reloads["endpoints"] == 1 and api.generation == 2
+
+    def test_timeline(self):
+        api = FakeIcApi(
+            timeline=[
+                {"at": 3600, "reload": "other"},
+                {"at": 0, "queue_depth": 5},
+                {"at": 0, "server_zone": "cafe.example.com"},
+            ]
+        )
+        assert api.queue_depth == 0, "the steps must be applied on a request only"
+        api.handle("/api")
+        assert api.queue_depth == 5 and api.server_zones == ["cafe.example.com"]
+        assert api.reloads["other"] == 0 and len(api.pending) == 1
+
+    def test_failures(self):
+        api = FakeIcApi()
+        api.apply({"fail": {"path": "/metrics", "count": 2, "code": 500}})
+        assert [api.handle("/metrics")[0] for _ in range(3)] == [500, 500, 200]
+        assert api.handle("/api")[0] == 200
+        assert FakeIcApi(failure_rate=1.0).handle("/api")[0] == 503
+
+
+class TestRoutes:
+    def test_nginx_api(self):
+        api = FakeIcApi()
+        api.apply({"reload": "other"})
+        assert get_json(api, "/api") == (200, API_VERSIONS)
+        code, info = get_json(api, "/api/8/nginx")
+        assert code == 200 and info["generation"] == 2
+
+    def test_upstream_routes(self):
+        api = FakeIcApi()
+        api.apply({"upstream": UPSTREAM, "peers": ["10.0.0.1:8080"]})
+        api.apply({"upstream": "ts_default_dns", "peers": ["10.0.0.3:53"], "stream": True})
+
+        code, upstreams = get_json(api, "/api/8/http/upstreams")
+        assert code == 200 and list(upstreams) == [UPSTREAM]
+        assert upstreams[UPSTREAM]["peers"][0]["state"] == "up"
+        code, upstream = get_json(api, f"/api/8/http/upstreams/{UPSTREAM}")
+        assert code == 200 and upstream["zone"] == UPSTREAM
+        code, servers = get_json(api, f"/api/8/http/upstreams/{UPSTREAM}/servers")
+        assert code == 200 and servers[0]["server"] == "10.0.0.1:8080"
+        code, upstreams = get_json(api, "/api/8/stream/upstreams")
+        assert code == 200 and list(upstreams) == ["ts_default_dns"]
+
+        code, error = get_json(api, "/api/8/http/upstreams/missing")
+        assert code == 404 and error["error"]["code"] == "UpstreamNotFound"
+        code, error = get_json(api, f"/api/8/http/upstreams/{UPSTREAM}/other")
+        assert code == 404 and error["error"]["code"] == "PathNotFound"
+
+    def test_server_zones_and_unknown_paths(self):
+        api = FakeIcApi()
+        api.apply({"server_zone": "cafe.example.com"})
+        code, zones = get_json(api, "/api/8/http/server_zones")
+        assert code == 200 and list(zones) == ["cafe.example.com"]
+        for path in ["/api/x/nginx", "/other", "/api/8/http/caches"]:
+            assert get_json(api, path)[0] == 404
+
+    def test_upstream_metrics(self):
+        api = FakeIcApi()
+        api.add_upstreams(3, 2)
+        text = api.handle("/metrics")[2]
+        assert text.count("upstream_server_response_latency_ms_count{") == 6
+        assert api.reloads["endpoints"] == 0, "add_upstreams must not reload NGINX"
+
+
+class TestServer:
+    def test_http_round_trip(self):
+        api = FakeIcApi(timeline=[{"at": 0, "reload": "other"}]).start()
+        try:
+            with urllib.request.urlopen(f"{api.url}/api/8/nginx") as resp:
+                assert resp.status == 200
+                assert json.loads(resp.read())["generation"] == 2
+            with urllib.request.urlopen(f"{api.url}/metrics") as resp:
+                assert resp.headers["Content-Type"].startswith("text/plain")
+            assert api.requests == 2
+        finally:
+            api.stop()
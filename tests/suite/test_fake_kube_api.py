@@ -0,0 +1,297 @@
+"""Tests of the in-memory fake of the Kubernetes API server, they do not need a cluster."""
+
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+from suite.fake_kube_api import ApiError, FakeKubeApi, json_patch, merge_patch
+
+CONFIGMAPS = "/api/v1/namespaces/default/configmaps"
+DEPLOYMENTS = "/apis/apps/v1/namespaces/default/deployments"
+PODS = "/api/v1/namespaces/default/pods"
+JSON_PATCH = "application/json-patch+json"
+MERGE_PATCH = "application/merge-patch+json"
+
+
+@pytest.fixture
+def fake_api() -> FakeKubeApi:
+    """
+    Create a fake API server whose pods become Ready and whose deletions finish on the next reconcile.
+
+    :return: FakeKubeApi
+    """
+    api = FakeKubeApi(pod_ready_delay=0, pod_termination_delay=0, namespace_deletion_delay=0)
+    yield api
+    api.stop()
+
+
+def settle(api, steps=5) -> None:
+    """
+    Run the controller of the fake a few times, one reconcile moves every object one step forward.
+
+    :param api: FakeKubeApi
+    :param steps: number of reconciles
+    :return:
+    """
+    for _ in range(steps):
+        api.reconcile()
+
+
+def call(api, method, path, body=None, query=None, content_type=""):
+    return api.dispatch(method, path, query or {}, body, content_type)
+
+
+def get_error(api, method, path, body=None, query=None, content_type="") -> ApiError:
+    with pytest.raises(ApiError) as ex:
+        call(api, method, path, body, query, content_type)
+    return ex.value
+
+
+def deployment_body(name, replicas) -> dict:
+    labels = {"app": name}
+    return {
+        "metadata": {"name": name},
+        "spec": {
+            "replicas": replicas,
+            "selector": {"matchLabels": labels},
+            "template": {"metadata": {"labels": labels}, "spec": {"containers": [{"name": name, "image": "nginx"}]}},
+        },
+    }
+
+
+def is_ready(pod) -> bool:
+    return any(c["type"] == "Ready" and c["status"] == "True" for c in pod["status"].get("conditions", []))
+
+
+class TestPatches:
+    def test_merge_patch(self):
+        target = {"a": {"b": 1, "c": 2}, "d": [1, 2], "e": "x"}
+        patched = merge_patch(target, {"a": {"b": None, "f": 3}, "d": [3], "e": None})
+        assert patched == {"a": {"c": 2, "f": 3}, "d": [3]}
+        assert target == {"a": {"b": 1, "c": 2}, "d": [1, 2], "e": "x"}, "the target must not be changed"
+
+    def test_json_patch(self):
+        target = {"metadata": {"labels": {"app": "a"}}, "spec": {"ports": [{"port": 80}]}}
+        patched = json_patch(
+            target,
+            [
+                {"op": "test", "path": "/metadata/labels/app", "value": "a"},
+                {"op": "replace", "path": "/metadata/labels/app", "value": "b"},
+                {"op": "add", "path": "/metadata/annotations/example.com~1key", "value": "v"},
+                {"op": "add", "path": "/spec/ports/-", "value": {"port": 443}},
+                {"op": "add", "path": "/spec/ports/0", "value": {"port": 8080}},
+                {"op": "remove", "path": "/spec/ports/1"},
+                {"op": "test", "path": "/spec/ports/1/port", "value": 443},
+            ],
+        )
+        assert patched == {
+            "metadata": {"labels": {"app": "b"}, "annotations": {"example.com/key": "v"}},
+            "spec": {"ports": [{"port": 8080}, {"port": 443}]},
+        }
+        assert target["metadata"]["labels"]["app"] == "a", "the target must not be changed"
+
+    @pytest.mark.parametrize(
+        "operation",
+        [
+            {"op": "remove", "path": "/metadata/missing"},
+            {"op": "test", "path": "/metadata/name", "value": "other"},
+            {"op": "test", "path": "/items/0", "value": "other"},
+        ],
+    )
+    def test_json_patch_failures(self, operation):
+        with pytest.raises(ApiError) as ex:
+            json_patch({"metadata": {"name": "a"}, "items": ["a"]}, [operation])
+        assert ex.value.code == 422
+
+
+class TestCrud:
+    def test_create_read_list_delete(self, fake_api):
+        created = call(fake_api, "POST", CONFIGMAPS, {"metadata": {"name": "one", "labels": {"app": "a"}}})
+        call(fake_api, "POST", CONFIGMAPS, {"metadata": {"name": "two", "labels": {"app": "b"}}})
+        assert created["kind"] == "ConfigMap"
+        assert created["metadata"]["namespace"] == "default"
+        assert created["metadata"]["generation"] == 1
+        assert call(fake_api, "GET", f"{CONFIGMAPS}/one")["metadata"]["uid"] == created["metadata"]["uid"]
+        assert get_error(fake_api, "POST", CONFIGMAPS, {"metadata": {"name": "one"}}).code == 409
+
+        selected = call(fake_api, "GET", CONFIGMAPS, query={"labelSelector": "app!=b"})
+        assert [item["metadata"]["name"] for item in selected["items"]] == ["one"]
+        page = call(fake_api, "GET", CONFIGMAPS, query={"limit": "1"})
+        assert len(page["items"]) == 1 and page["metadata"]["continue"] == "1"
+        rest = call(fake_api, "GET", CONFIGMAPS, query={"limit": "1", "continue": "1"})
+        assert [item["metadata"]["name"] for item in rest["items"]] == ["two"]
+        assert "continue" not in rest["metadata"]
+
+        call(fake_api, "DELETE", f"{CONFIGMAPS}/one")
+        assert get_error(fake_api, "GET", f"{CONFIGMAPS}/one").code == 404
+        assert get_error(fake_api, "DELETE", f"{CONFIGMAPS}/one").code == 404
+
+    def test_update_and_patch(self, fake_api):
+        created = call(fake_api, "POST", CONFIGMAPS, {"metadata": {"name": "cm"}, "data": {"a": "1"}})
+        stale = created["metadata"]["resourceVersion"]
+        updated = call(fake_api, "PUT", f"{CONFIGMAPS}/cm", dict(created, data={"a": "2"}))
+        assert updated["metadata"]["generation"] == 2
+        assert int(updated["metadata"]["resourceVersion"]) > int(stale)
+        conflict = get_error(fake_api, "PUT", f"{CONFIGMAPS}/cm", dict(created, data={"a": "3"}))
+        assert conflict.code == 409
+
+        merged = call(fake_api, "PATCH", f"{CONFIGMAPS}/cm", {"data": {"b": "2"}}, content_type=MERGE_PATCH)
+        assert merged["data"] == {"a": "2", "b": "2"}
+        patched = call(
+            fake_api,
+            "PATCH",
+            f"{CONFIGMAPS}/cm",
+            [{"op": "remove", "path": "/data/a"}],
+            content_type=JSON_PATCH,
+        )
+        assert patched["data"] == {"b": "2"}
+        assert patched["metadata"]["generation"] == 4
+
+        labelled = call(
+            fake_api, "PATCH", f"{CONFIGMAPS}/cm", {"metadata": {"labels": {"x": "y"}}}, content_type=MERGE_PATCH
+        )
+        assert labelled["metadata"]["generation"] == 4, "a metadata change must not bump the generation"
+
+    def test_custom_resources(self, fake_api):
+        crd = {
+            "metadata": {"name": "virtualservers.k8s.nginx.org"},
+            "spec": {
+                "group": "k8s.nginx.org",
+                "scope": "Namespaced",
+                "names": {"plural": "virtualservers", "kind": "VirtualServer"},
+                "versions": [{"name": "v1", "storage": True}],
+            },
+        }
+        path = "/apis/k8s.nginx.org/v1/namespaces/default/virtualservers"
+        assert get_error(fake_api, "GET", path).code == 404
+        created = call(fake_api, "POST", "/apis/apiextensions.k8s.io/v1/customresourcedefinitions", crd)
+        assert {"type": "Established", "status": "True"}.items() <= created["status"]["conditions"][1].items()
+        call(fake_api, "POST", path, {"metadata": {"name": "vs"}, "spec": {"host": "a.example.com"}})
+        status = call(fake_api, "PUT", f"{path}/vs/status", {"status": {"state": "Valid"}})
+        assert status["status"] == {"state": "Valid"}
+        assert status["metadata"]["generation"] == 1, "a status update must not bump the generation"
+
+        call(fake_api, "DELETE", "/apis/apiextensions.k8s.io/v1/customresourcedefinitions/virtualservers.k8s.nginx.org")
+        assert get_error(fake_api, "GET", path).code == 404
+        assert not [key for key in fake_api.objects if key[1] == "virtualservers"]
+
+
+class TestWatch:
+    def test_watch_from_resource_version(self, fake_api):
+        since = call(fake_api, "GET", CONFIGMAPS)["metadata"]["resourceVersion"]
+        call(fake_api, "POST", CONFIGMAPS, {"metadata": {"name": "one"}})
+        call(fake_api, "POST", "/api/v1/namespaces/kube-system/configmaps", {"metadata": {"name": "other"}})
+        call(fake_api, "PATCH", f"{CONFIGMAPS}/one", {"data": {"a": "1"}}, content_type=MERGE_PATCH)
+        call(fake_api, "DELETE", f"{CONFIGMAPS}/one")
+
+        query = {"watch": "true", "resourceVersion": since, "timeoutSeconds": "0.1"}
+        events = list(call(fake_api, "GET", CONFIGMAPS, query=query))
+        assert [event["type"] for event in events] == ["ADDED", "MODIFIED", "DELETED"]
+        assert {event["object"]["metadata"]["name"] for event in events} == {"one"}
+        versions = [int(event["object"]["metadata"]["resourceVersion"]) for event in events]
+        assert versions == sorted(versions)
+
+    def test_watch_without_resource_version(self, fake_api):
+        call(fake_api, "POST", CONFIGMAPS, {"metadata": {"name": "one", "labels": {"app": "a"}}})
+        call(fake_api, "POST", CONFIGMAPS, {"metadata": {"name": "two", "labels": {"app": "b"}}})
+        query = {"watch": "1", "labelSelector": "app=a", "timeoutSeconds": "0.1"}
+        events = list(call(fake_api, "GET", CONFIGMAPS, query=query))
+        assert [(event["type"], event["object"]["metadata"]["name"]) for event in events] == [("ADDED", "one")]
+
+
+class TestController:
+    def test_deployment_pods_and_endpoints(self, fake_api):
+        call(fake_api, "POST", DEPLOYMENTS, deployment_body("backend", 2))
+        call(
+            fake_api,
+            "POST",
+            "/api/v1/namespaces/default/services",
+            {"metadata": {"name": "backend"}, "spec": {"selector": {"app": "backend"}, "ports": [{"port": 80}]}},
+        )
+        settle(fake_api)
+
+        pods = call(fake_api, "GET", PODS, query={"labelSelector": "app=backend"})["items"]
+        assert len(pods) == 2 and all(is_ready(pod) for pod in pods)
+        assert pods[0]["metadata"]["ownerReferences"][0]["kind"] == "Deployment"
+        status = call(fake_api, "GET", f"{DEPLOYMENTS}/backend")["status"]
+        assert status["readyReplicas"] == 2 and status["updatedReplicas"] == 2
+        endpoints = call(fake_api, "GET", "/api/v1/namespaces/default/endpoints/backend")
+        assert sorted(a["ip"] for a in endpoints["subsets"][0]["addresses"]) == sorted(
+            pod["status"]["podIP"] for pod in pods
+        )
+
+    def test_rollout_and_scale(self, fake_api):
+        call(fake_api, "POST", DEPLOYMENTS, deployment_body("backend", 2))
+        settle(fake_api)
+        old = {pod["metadata"]["name"] for pod in call(fake_api, "GET", PODS)["items"]}
+
+        call(
+            fake_api,
+            "PATCH",
+            f"{DEPLOYMENTS}/backend",
+            {"spec": {"template": {"metadata": {"annotations": {"restarted": "1"}}}}},
+            content_type=MERGE_PATCH,
+        )
+        settle(fake_api)
+        new = {pod["metadata"]["name"] for pod in call(fake_api, "GET", PODS)["items"]}
+        assert len(new) == 2 and not new & old
+
+        scale = call(
+            fake_api, "PATCH", f"{DEPLOYMENTS}/backend/scale", {"spec": {"replicas": 1}}, content_type=MERGE_PATCH
+        )
+        assert scale["spec"] == {"replicas": 1}
+        settle(fake_api)
+        assert len(call(fake_api, "GET", PODS)["items"]) == 1
+        assert call(fake_api, "GET", f"{DEPLOYMENTS}/backend/scale")["status"]["replicas"] == 1
+
+    def test_pods_not_ready_when_scripted(self, fake_api):
+        fake_api.script_pods("stuck", None)
+        call(fake_api, "POST", DEPLOYMENTS, deployment_body("stuck", 1))
+        settle(fake_api)
+        pods = call(fake_api, "GET", PODS)["items"]
+        assert len(pods) == 1 and not is_ready(pods[0])
+        assert "readyReplicas" not in call(fake_api, "GET", f"{DEPLOYMENTS}/stuck")["status"]
+
+
+class TestNamespaceTermination:
+    def test_namespace_is_terminating_until_empty(self):
+        api = FakeKubeApi(pod_ready_delay=0, pod_termination_delay=60, namespace_deletion_delay=0)
+        try:
+            call(api, "POST", "/api/v1/namespaces", {"metadata": {"name": "test"}})
+            call(api, "POST", "/apis/apps/v1/namespaces/test/deployments", deployment_body("backend", 1))
+            call(api, "POST", "/api/v1/namespaces/test/configmaps", {"metadata": {"name": "cm"}})
+            settle(api)
+
+            call(api, "DELETE", "/api/v1/namespaces/test")
+            settle(api)
+            namespace = call(api, "GET", "/api/v1/namespaces/test")
+            assert namespace["status"]["phase"] == "Terminating"
+            assert namespace["metadata"]["deletionTimestamp"]
+            assert get_error(api, "GET", "/api/v1/namespaces/test/configmaps/cm").code == 404
+            pods = call(api, "GET", "/api/v1/namespaces/test/pods")["items"]
+            assert len(pods) == 1 and pods[0]["metadata"]["deletionTimestamp"], "the pod must be Terminating"
+            created = get_error(api, "POST", "/api/v1/namespaces/test/configmaps", {"metadata": {"name": "new"}})
+            assert created.code == 403
+
+            for key in list(api.deadlines):
+                api.deadlines[key] = 0
+            settle(api)
+            assert get_error(api, "GET", "/api/v1/namespaces/test").code == 404
+            assert not [key for key in api.objects if key[2] == "test"]
+        finally:
+            api.stop()
+
+
+class TestServer:
+    def test_http_round_trip(self, fake_api):
+        fake_api.start()
+        with urllib.request.urlopen(f"{fake_api.url}/api/v1/namespaces") as resp:
+            assert resp.status == 200
+            names = [item["metadata"]["name"] for item in json.loads(resp.read())["items"]]
+        assert "default" in names
+        with pytest.raises(urllib.error.HTTPError) as ex:
+            urllib.request.urlopen(f"{fake_api.url}/api/v1/namespaces/missing")
+        status = json.loads(ex.value.read())
+        assert ex.value.code == 404 and status["reason"] == "NotFound"
+        assert fake_api.count_requests() == 2
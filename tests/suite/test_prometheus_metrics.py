@@ -25,6 +25,7 @@ from suite.resources_utils import (
     create_secret_from_yaml,
 )
 from suite.yaml_utils import get_first_ingress_host_from_yaml
+from suite.worker_utils import isolate_metric
 from settings import TEST_DATA
 
 
@@ -43,14 +44,14 @@ class IngressSetup:
 
 
 @pytest.fixture(scope="class")
-def prometheus_secret_setup(request, kube_apis, test_namespace):
+def prometheus_secret_setup(request, kube_apis, ingress_controller_prerequisites, test_namespace):
     print("------------------------- Deploy Prometheus Secret -----------------------------------")
     prometheus_secret_name = create_secret_from_yaml(
-        kube_apis.v1, "nginx-ingress", f"{TEST_DATA}/prometheus/secret.yaml"
+        kube_apis.v1, ingress_controller_prerequisites.namespace, f"{TEST_DATA}/prometheus/secret.yaml"
     )
 
     def fin():
-        delete_secret(kube_apis.v1, prometheus_secret_name, "nginx-ingress")
+        delete_secret(kube_apis.v1, prometheus_secret_name, ingress_controller_prerequisites.namespace)
 
     request.addfinalizer(fin)
 
@@ -97,7 +98,8 @@ class TestPrometheusExporter:
         "ingress_controller, expected_metrics",
         [
             pytest.param(
-                {"extra_args": ["-enable-prometheus-metrics"]},
+                # the counters of a reused IC carry the reloads and the errors of the previous classes
+                {"extra_args": ["-enable-prometheus-metrics"], "restart": True},
                 [
                     'nginx_ingress_controller_nginx_reload_errors_total{class="nginx"} 0',
                     'nginx_ingress_controller_ingress_resources_total{class="nginx",type="master"} 0',
@@ -133,7 +135,7 @@ class TestPrometheusExporter:
         assert resp.status_code == 200, f"Expected 200 code for /metrics but got {resp.status_code}"
         resp_content = resp.content.decode("utf-8")
         for item in expected_metrics:
-            assert item in resp_content
+            assert isolate_metric(item) in resp_content
 
     @pytest.mark.parametrize(
         "ingress_controller, expected_metrics",
@@ -166,7 +168,7 @@ class TestPrometheusExporter:
         assert resp.status_code == 200, f"Expected 200 code for /metrics but got {resp.status_code}"
         resp_content = resp.content.decode("utf-8")
         for item in expected_metrics:
-            assert item in resp_content
+            assert isolate_metric(item) in resp_content
 
     @pytest.mark.parametrize(
         "ingress_controller, expected_metrics",
@@ -207,17 +209,19 @@ class TestPrometheusExporter:
 
         resp_content = resp.content.decode("utf-8")
         for item in expected_metrics:
-            assert item in resp_content
+            assert isolate_metric(item) in resp_content
 
 
 @pytest.fixture(scope="class")
-def ts_setup(request, kube_apis, crd_ingress_controller):
+def ts_setup(request, kube_apis, ingress_controller_prerequisites, crd_ingress_controller):
     global_config_file = f"{TEST_DATA}/prometheus/transport-server/global-configuration.yaml"
 
-    gc_resource = create_gc_from_yaml(kube_apis.custom_objects, global_config_file, "nginx-ingress")
+    gc_resource = create_gc_from_yaml(
+        kube_apis.custom_objects, global_config_file, ingress_controller_prerequisites.namespace
+    )
 
     def fin():
-        delete_gc(kube_apis.custom_objects, gc_resource, "nginx-ingress")
+        delete_gc(kube_apis.custom_objects, gc_resource, ingress_controller_prerequisites.namespace)
 
     request.addfinalizer(fin)
 
@@ -228,7 +232,9 @@ def assert_ts_total_metric(ingress_controller_endpoint, ts_type, value):
     resp_content = resp.content.decode("utf-8")
 
     assert resp.status_code == 200, f"Expected 200 code for /metrics but got {resp.status_code}"
-    assert f'nginx_ingress_controller_transportserver_resources_total{{class="nginx",type="{ts_type}"}} {value}' in resp_content
+    assert isolate_metric(
+        f'nginx_ingress_controller_transportserver_resources_total{{class="nginx",type="{ts_type}"}} {value}'
+    ) in resp_content
 
 
 @pytest.mark.ts
@@ -0,0 +1,105 @@
+import pytest
+
+from suite.reload_churn_utils import ChurnTarget, build_churn_virtual_server, run_rate_sweep
+from suite.vs_vsr_resources_utils import create_virtual_server, delete_virtual_server
+
+# patches per second across all the targets
+CHURN_RATES = [1.0, 5.0, 10.0, 20.0]
+# seconds of patching at every rate
+CHURN_DURATION = 30
+
+
+@pytest.fixture(scope="class")
+def churn_virtual_servers(request, kube_apis, ingress_controller_endpoint, test_namespace) -> [ChurnTarget]:
+    """
+    Deploy VSes that return a marker without a backend.
+
+    :param request: pytest fixture to parametrize this method
+        {count: number of the VSes}
+    :param kube_apis: client apis
+    :param ingress_controller_endpoint: public endpoint
+    :param test_namespace:
+    :return: [ChurnTarget]
+    """
+    targets = []
+    for i in range(request.param["count"]):
+        host = f"churn-{i}.example.com"
+        name = create_virtual_server(
+            kube_apis.custom_objects, build_churn_virtual_server(f"churn-{i}", host), test_namespace
+        )
+        url = f"http://{ingress_controller_endpoint.public_ip}:{ingress_controller_endpoint.port}/churn"
+        targets.append(ChurnTarget("virtualserver", name, test_namespace, host, "/churn", url))
+
+    def fin():
+        print("Clean up the churn VirtualServers:")
+        for target in targets:
+            delete_virtual_server(kube_apis.custom_objects, target.name, test_namespace)
+
+    request.addfinalizer(fin)
+
+    return targets
+
+
+def assert_churn_served(reports) -> None:
+    for report in reports:
+        assert not report.lost, f"{len(report.lost)} changes at {report.rate}/s were never served"
+        last = {change.target.name: change for change in report.changes}
+        for name, change in last.items():
+            assert change.served_at is not None, f"{name} did not serve its last change at {report.rate}/s"
+
+
+@pytest.mark.perf
+@pytest.mark.vs
+@pytest.mark.parametrize(
+    "crd_ingress_controller",
+    [{"type": "complete", "extra_args": ["-enable-custom-resources", "-enable-prometheus-metrics"]}],
+    indirect=True,
+)
+class TestVirtualServerReloadChurn:
+    @pytest.mark.parametrize("churn_virtual_servers", [{"count": 1}, {"count": 20}], indirect=True)
+    def test_reload_churn(self, kube_apis, crd_ingress_controller, ingress_controller_endpoint,
+                          churn_virtual_servers):
+        """
+        Patch one or many VSes at rising rates and measure the reloads and the latency until NGINX serves a change.
+        """
+        metrics_url = (
+            f"http://{ingress_controller_endpoint.public_ip}:{ingress_controller_endpoint.metrics_port}/metrics"
+        )
+        reports = run_rate_sweep(
+            kube_apis.custom_objects, churn_virtual_servers, CHURN_RATES, CHURN_DURATION, metrics_url
+        )
+
+        assert_churn_served(reports)
+
+
+@pytest.mark.perf
+@pytest.mark.vsr
+@pytest.mark.parametrize(
+    "crd_ingress_controller, v_s_route_setup",
+    [
+        (
+            {"type": "complete", "extra_args": ["-enable-custom-resources", "-enable-prometheus-metrics"]},
+            {"example": "virtual-server-route-canned-responses"},
+        )
+    ],
+    indirect=True,
+)
+class TestVirtualServerRouteReloadChurn:
+    def test_reload_churn(self, kube_apis, crd_ingress_controller, v_s_route_setup):
+        """
+        Patch a VSR at rising rates and measure the reloads and the latency until NGINX serves a change.
+        """
+        endpoint = v_s_route_setup.public_endpoint
+        route = v_s_route_setup.route_s
+        target = ChurnTarget(
+            "virtualserverroute",
+            route.name,
+            route.namespace,
+            v_s_route_setup.vs_host,
+            route.paths[0],
+            f"http://{endpoint.public_ip}:{endpoint.port}{route.paths[0]}",
+        )
+        metrics_url = f"http://{endpoint.public_ip}:{endpoint.metrics_port}/metrics"
+        reports = run_rate_sweep(kube_apis.custom_objects, [target], CHURN_RATES, CHURN_DURATION, metrics_url)
+
+        assert_churn_served(reports)
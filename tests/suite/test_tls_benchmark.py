@@ -0,0 +1,177 @@
+import ssl
+
+import pytest
+import yaml
+
+from settings import TEST_DATA
+from suite.fixtures import PublicEndpoint
+from suite.resources_utils import (
+    create_example_app,
+    create_ingress,
+    create_secret,
+    create_secret_from_yaml,
+    delete_common_app,
+    delete_ingress,
+    delete_secret,
+    ensure_connection_to_public_endpoint,
+    is_secret_present,
+    wait_before_test,
+    wait_until_all_pods_are_ready,
+)
+from suite.ssl_utils import get_server_certificate_subject
+from suite.tls_benchmark_utils import run_tls_handshakes
+
+# the CN of the certificates of smoke-secret and wildcard-tls-secret
+HOST_CN = "cafe.example.com"
+WILDCARD_CN = "example.com"
+# the hosts per Ingress
+HOSTS_PER_INGRESS = 100
+
+
+class TlsBenchmarkSetup:
+    """
+    Encapsulate the TLS benchmark details.
+
+    Attributes:
+        public_endpoint (PublicEndpoint):
+        expected_cn (dict): host -> CN of the certificate the IC must serve for it
+        secret_hosts ([str]): hosts with their own secret
+        wildcard_hosts ([str]): hosts served with the wildcard secret
+    """
+
+    def __init__(self, public_endpoint: PublicEndpoint, expected_cn, secret_hosts, wildcard_hosts):
+        self.public_endpoint = public_endpoint
+        self.expected_cn = expected_cn
+        self.secret_hosts = secret_hosts
+        self.wildcard_hosts = wildcard_hosts
+
+
+@pytest.fixture(scope="class")
+def tls_benchmark_setup(
+    request, kube_apis, ingress_controller_prerequisites, ingress_controller_pool, ingress_controller_endpoint,
+    test_namespace
+) -> TlsBenchmarkSetup:
+    """
+    Start the IC with the wildcard secret and deploy Ingresses with many TLS hosts.
+
+    Every other host has its own secret, the rest have no secretName and get the wildcard certificate.
+
+    :param request: pytest fixture
+    :param kube_apis: client apis
+    :param ingress_controller_prerequisites:
+    :param ingress_controller_pool: the pool that keeps the IC between the classes
+    :param ingress_controller_endpoint: public endpoint
+    :param test_namespace:
+    :return: TlsBenchmarkSetup
+    """
+    ic_namespace = ingress_controller_prerequisites.namespace
+    total_hosts = max(2, int(request.config.getoption("--batch-resources")))
+    print("------------------------- Create IC and wildcard secret -----------------------------------")
+    wildcard_secret = create_secret_from_yaml(
+        kube_apis.v1, ic_namespace, f"{TEST_DATA}/wildcard-tls-secret/wildcard-tls-secret.yaml"
+    )
+    ingress_controller_pool.acquire(
+        [f"-wildcard-tls-secret={ic_namespace}/{wildcard_secret}", "-enable-custom-resources=false"]
+    )
+    create_example_app(kube_apis, "simple", test_namespace)
+    wait_until_all_pods_are_ready(kube_apis.v1, test_namespace)
+
+    print(f"------------------------- Deploy {total_hosts} TLS hosts -----------------------------------")
+    with open(f"{TEST_DATA}/smoke/smoke-secret.yaml") as f:
+        secret = yaml.safe_load(f)
+    with open(f"{TEST_DATA}/wildcard-tls-secret/standard/wildcard-secret-ingress.yaml") as f:
+        ingress = yaml.safe_load(f)
+    hosts = [f"tls-bench-{i}.example.com" for i in range(total_hosts)]
+    secrets = []
+    ingresses = []
+    tls = []
+    for i, host in enumerate(hosts):
+        if i % 2 == 0:
+            secret["metadata"]["name"] = f"tls-bench-{i}"
+            secrets.append(create_secret(kube_apis.v1, test_namespace, secret))
+            tls.append({"hosts": [host], "secretName": f"tls-bench-{i}"})
+        else:
+            tls.append({"hosts": [host]})
+    for start in range(0, total_hosts, HOSTS_PER_INGRESS):
+        ingress["metadata"]["name"] = f"tls-bench-{start // HOSTS_PER_INGRESS}"
+        ingress["spec"]["tls"] = tls[start:start + HOSTS_PER_INGRESS]
+        ingress["spec"]["rules"] = [
+            {"host": host, "http": ingress["spec"]["rules"][0]["http"]}
+            for host in hosts[start:start + HOSTS_PER_INGRESS]
+        ]
+        ingresses.append(create_ingress(kube_apis.networking_v1, test_namespace, ingress))
+    ensure_connection_to_public_endpoint(
+        ingress_controller_endpoint.public_ip, ingress_controller_endpoint.port, ingress_controller_endpoint.port_ssl
+    )
+
+    def fin():
+        print("Clean up the TLS benchmark:")
+        for name in ingresses:
+            delete_ingress(kube_apis.networking_v1, name, test_namespace)
+        for name in secrets:
+            delete_secret(kube_apis.v1, name, test_namespace)
+        delete_common_app(kube_apis, "simple", test_namespace)
+        if is_secret_present(kube_apis.v1, wildcard_secret, ic_namespace):
+            delete_secret(kube_apis.v1, wildcard_secret, ic_namespace)
+
+    request.addfinalizer(fin)
+
+    # the last host with a secret, the ones at an even index, gets its certificate once the whole batch is applied
+    last_host = hosts[(total_hosts - 1) // 2 * 2]
+    retry = 0
+    while retry <= 60:
+        subject = get_server_certificate_subject(
+            ingress_controller_endpoint.public_ip, last_host, ingress_controller_endpoint.port_ssl
+        )
+        if subject[b'CN'] == HOST_CN.encode():
+            break
+        retry += 1
+        wait_before_test(1)
+        print(f"The certificate of {last_host} is not served yet, retrying... #{retry}")
+    else:
+        pytest.fail(f"The certificate of {last_host} was not served after {retry} retries")
+
+    return TlsBenchmarkSetup(
+        ingress_controller_endpoint,
+        {host: HOST_CN if i % 2 == 0 else WILDCARD_CN for i, host in enumerate(hosts)},
+        hosts[::2],
+        hosts[1::2],
+    )
+
+
+@pytest.mark.batch_start
+@pytest.mark.ingresses
+class TestTlsBenchmark:
+    def test_certificate_selection_by_sni(self, tls_benchmark_setup):
+        """
+        Every host gets its own certificate or the wildcard one.
+        """
+        endpoint = tls_benchmark_setup.public_endpoint
+        hosts = list(tls_benchmark_setup.expected_cn)
+        report = run_tls_handshakes(endpoint.public_ip, endpoint.port_ssl, hosts, handshakes=len(hosts))
+
+        mismatches = report.mismatches(tls_benchmark_setup.expected_cn)
+        assert not mismatches, f"{len(mismatches)} hosts got an unexpected certificate: {mismatches}"
+        print(f"Certificate selection: p50={report.handshake_ms(50):.1f}ms p99={report.handshake_ms(99):.1f}ms")
+
+    @pytest.mark.parametrize("max_version", [None, ssl.TLSVersion.TLSv1_2])
+    def test_full_and_resumed_handshakes(self, tls_benchmark_setup, max_version):
+        """
+        The sessions are resumed with tickets, NGINX has no session cache for the session IDs by default.
+        """
+        endpoint = tls_benchmark_setup.public_endpoint
+        hosts = tls_benchmark_setup.secret_hosts[:50] + tls_benchmark_setup.wildcard_hosts[:50]
+        full = run_tls_handshakes(endpoint.public_ip, endpoint.port_ssl, hosts, max_version=max_version)
+        resumed = run_tls_handshakes(endpoint.public_ip, endpoint.port_ssl, hosts, resume=True,
+                                     max_version=max_version)
+        session_ids = run_tls_handshakes(endpoint.public_ip, endpoint.port_ssl, hosts, resume=True, tickets=False,
+                                         max_version=max_version)
+
+        assert not full.errors and not resumed.errors and not session_ids.errors
+        assert full.resumption_rate == 0
+        assert resumed.resumption_rate >= 0.9
+        print(
+            f"Full: {full.handshakes_per_sec:.1f}/s p50={full.handshake_ms(50):.1f}ms, "
+            f"resumed with tickets: {resumed.handshakes_per_sec:.1f}/s p50={resumed.handshake_ms(50):.1f}ms, "
+            f"resumed with session IDs: {session_ids.resumption_rate:.1%}"
+        )
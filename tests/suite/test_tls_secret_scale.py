@@ -0,0 +1,145 @@
+import pytest
+import yaml
+
+from settings import TEST_DATA
+from suite.fixtures import PublicEndpoint
+from suite.resources_utils import (
+    create_example_app,
+    create_ingress,
+    delete_common_app,
+    delete_ingress,
+    ensure_connection_to_public_endpoint,
+    wait_until_all_pods_are_ready,
+)
+from suite.tls_benchmark_utils import run_tls_handshakes
+from suite.tls_secret_utils import (
+    build_tls_secret,
+    create_certificate_authority,
+    create_secrets,
+    delete_secrets,
+    generate_host_certificates,
+    generate_key_pool,
+    rotate_secrets,
+    wait_for_certificate,
+)
+
+# the hosts per Ingress
+HOSTS_PER_INGRESS = 100
+# the share of the secrets the rotation replaces
+ROTATED_SHARE = 0.1
+# replaced secrets per second
+ROTATION_RATE = 5.0
+
+
+class TlsSecretScaleSetup:
+    """
+    Encapsulate the TLS secret scale test details.
+
+    Attributes:
+        public_endpoint (PublicEndpoint):
+        metrics_url (str):
+        ca (CertificateAuthority):
+        key_pool ([bytes]): keys for the rotated certificates
+        certificates (dict): secret name -> HostCertificate
+    """
+
+    def __init__(self, public_endpoint: PublicEndpoint, metrics_url, ca, key_pool, certificates):
+        self.public_endpoint = public_endpoint
+        self.metrics_url = metrics_url
+        self.ca = ca
+        self.key_pool = key_pool
+        self.certificates = certificates
+
+
+@pytest.fixture(scope="class")
+def tls_secret_scale_setup(
+    request, kube_apis, ingress_controller_pool, ingress_controller_endpoint, test_namespace
+) -> TlsSecretScaleSetup:
+    """
+    Deploy Ingresses with many TLS hosts, every host has its own secret with a unique certificate.
+
+    :param request: pytest fixture
+    :param kube_apis: client apis
+    :param ingress_controller_pool: the pool that keeps the IC between the classes
+    :param ingress_controller_endpoint: public endpoint
+    :param test_namespace:
+    :return: TlsSecretScaleSetup
+    """
+    total_hosts = int(request.config.getoption("--batch-resources"))
+    metrics_url = f"http://{ingress_controller_endpoint.public_ip}:{ingress_controller_endpoint.metrics_port}/metrics"
+    ingress_controller_pool.acquire(["-enable-prometheus-metrics", "-enable-custom-resources=false"])
+    create_example_app(kube_apis, "simple", test_namespace)
+    wait_until_all_pods_are_ready(kube_apis.v1, test_namespace)
+
+    print(f"------------------------- Generate {total_hosts} certificates -----------------------------------")
+    ca = create_certificate_authority()
+    hosts = [f"tls-scale-{i}.example.com" for i in range(total_hosts)]
+    certificates = dict(
+        zip([f"tls-scale-{i}" for i in range(total_hosts)], generate_host_certificates(ca, hosts))
+    )
+    key_pool = generate_key_pool(max(1, int(total_hosts * ROTATED_SHARE)))
+
+    print(f"------------------------- Deploy {total_hosts} TLS hosts -----------------------------------")
+    secrets = create_secrets(
+        kube_apis.v1, test_namespace, [build_tls_secret(name, cert) for name, cert in certificates.items()]
+    )
+    with open(f"{TEST_DATA}/wildcard-tls-secret/standard/wildcard-secret-ingress.yaml") as f:
+        ingress = yaml.safe_load(f)
+    http = ingress["spec"]["rules"][0]["http"]
+    names = list(certificates)
+    ingresses = []
+    for start in range(0, total_hosts, HOSTS_PER_INGRESS):
+        chunk = names[start:start + HOSTS_PER_INGRESS]
+        ingress["metadata"]["name"] = f"tls-scale-{start // HOSTS_PER_INGRESS}"
+        ingress["spec"]["tls"] = [{"hosts": [certificates[name].host], "secretName": name} for name in chunk]
+        ingress["spec"]["rules"] = [{"host": certificates[name].host, "http": http} for name in chunk]
+        ingresses.append(create_ingress(kube_apis.networking_v1, test_namespace, ingress))
+    ensure_connection_to_public_endpoint(
+        ingress_controller_endpoint.public_ip, ingress_controller_endpoint.port, ingress_controller_endpoint.port_ssl
+    )
+
+    def fin():
+        print("Clean up the TLS secret scale test:")
+        for name in ingresses:
+            delete_ingress(kube_apis.networking_v1, name, test_namespace)
+        delete_secrets(kube_apis.v1, test_namespace, secrets)
+        delete_common_app(kube_apis, "simple", test_namespace)
+
+    request.addfinalizer(fin)
+
+    last = certificates[names[-1]]
+    assert wait_for_certificate(
+        ingress_controller_endpoint.public_ip, ingress_controller_endpoint.port_ssl, last.host, last.der_cert
+    ), f"The certificate of {last.host} was not served"
+
+    return TlsSecretScaleSetup(ingress_controller_endpoint, metrics_url, ca, key_pool, certificates)
+
+
+@pytest.mark.batch_start
+@pytest.mark.ingresses
+class TestTlsSecretScale:
+    def test_unique_certificate_per_host(self, tls_secret_scale_setup):
+        endpoint = tls_secret_scale_setup.public_endpoint
+        expected = {cert.host: cert.host for cert in tls_secret_scale_setup.certificates.values()}
+        report = run_tls_handshakes(endpoint.public_ip, endpoint.port_ssl, list(expected), handshakes=len(expected))
+
+        mismatches = report.mismatches(expected)
+        assert not mismatches, f"{len(mismatches)} hosts got an unexpected certificate: {mismatches}"
+
+    def test_secret_rotation(self, kube_apis, test_namespace, tls_secret_scale_setup):
+        endpoint = tls_secret_scale_setup.public_endpoint
+        rotated = dict(list(tls_secret_scale_setup.certificates.items())[:len(tls_secret_scale_setup.key_pool)])
+        report = rotate_secrets(
+            kube_apis.v1,
+            test_namespace,
+            rotated,
+            tls_secret_scale_setup.ca,
+            endpoint.public_ip,
+            endpoint.port_ssl,
+            rate=ROTATION_RATE,
+            metrics_url=tls_secret_scale_setup.metrics_url,
+            key_pool=tls_secret_scale_setup.key_pool,
+        )
+
+        assert not report.not_propagated, f"The new certificates were not served: {report.not_propagated}"
+        print(f"{report.reloads} reloads for {len(rotated)} rotated secrets")
@@ -1,10 +1,10 @@
 import pytest
 
-from suite.resources_utils import wait_before_test
 from suite.custom_resources_utils import (
     read_ts,
     patch_ts_from_yaml,
 )
+from suite.status_tracker_utils import wait_for_status_state
 from settings import TEST_DATA
 
 
@@ -71,7 +71,14 @@ class TestTransportServerStatus:
             patch_src,
             transport_server_setup.namespace,
         )
-        wait_before_test()
+        wait_for_status_state(
+            kube_apis.custom_objects,
+            transport_server_setup.namespace,
+            "transportservers",
+            transport_server_setup.name,
+            "Warning",
+            version="v1alpha1",
+        )
         response = read_ts(
             kube_apis.custom_objects,
             transport_server_setup.namespace,
@@ -97,7 +104,14 @@ class TestTransportServerStatus:
             patch_src,
             transport_server_setup.namespace,
         )
-        wait_before_test()
+        wait_for_status_state(
+            kube_apis.custom_objects,
+            transport_server_setup.namespace,
+            "transportservers",
+            transport_server_setup.name,
+            "Invalid",
+            version="v1alpha1",
+        )
         response = read_ts(
             kube_apis.custom_objects,
             transport_server_setup.namespace,
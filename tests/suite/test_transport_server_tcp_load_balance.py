@@ -18,6 +18,8 @@ from suite.custom_resources_utils import (
     delete_ts,
     create_ts_from_yaml,
 )
+from suite.load_balance_utils import assert_balanced
+from suite.tcp_load_utils import run_tcp_load, run_tcp_load_until
 from settings import TEST_DATA
 
 
@@ -115,26 +117,12 @@ class TestTransportServerTcpLoadBalance:
 
         print(f"sending tcp requests to: {host}:{port}")
 
-        endpoints = {}
-        retry = 0
-        while(len(endpoints) is not 3 and retry <= 30):
-            for i in range(20):
-                client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                client.connect((host, port))
-                client.sendall(b'connect')
-                response = client.recv(4096)
-                endpoint = response.decode()
-                print(f' req number {i}; response: {endpoint}')
-                if endpoint not in endpoints:
-                    endpoints[endpoint] = 1
-                else:
-                    endpoints[endpoint] = endpoints[endpoint] + 1
-                client.close()
-            retry += 1
-            wait_before_test(1)
-            print(f"Retry #{retry}")
+        report = run_tcp_load_until(host, port, 3)
+        endpoints = report.distribution
 
+        assert not report.failures
         assert len(endpoints) is 3
+        assert_balanced(endpoints)
 
         result_conf = get_ts_nginx_template_conf(
             kube_apis.v1,
@@ -290,16 +278,6 @@ class TestTransportServerTcpLoadBalance:
 
         self.restore_ts(kube_apis, transport_server_setup)
 
-    def make_holding_connection(self, host, port):
-        print(f"sending tcp requests to: {host}:{port}")
-        client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client.connect((host, port))
-        client.sendall(b'hold')
-        response = client.recv(4096)
-        endpoint = response.decode()
-        print(f'response: {endpoint}')
-        return client
-
     def test_tcp_request_max_connections(
             self, kube_apis, crd_ingress_controller, transport_server_setup, ingress_controller_prerequisites
     ):
@@ -340,21 +318,10 @@ class TestTransportServerTcpLoadBalance:
         port = transport_server_setup.public_endpoint.tcp_server_port
         host = transport_server_setup.public_endpoint.public_ip
 
-        clients = []
-        for i in range(6):
-            c = self.make_holding_connection(host, port)
-            clients.append(c)
-
-        # step 3 - assert the next connection fails
-        try:
-            c = self.make_holding_connection(host, port)
-            # making a connection should fail and throw an exception
-            assert c is None
-        except ConnectionResetError as E:
-            print("The expected exception occurred:", E)
-
-        for c in clients:
-            c.close()
+        # step 3 - assert the connection over the limit fails, the connections are opened concurrently
+        report = run_tcp_load(host, port, connections=0, hold=7)
+        assert len(report.failures) == 1
+        assert sum(report.held_distribution.values()) == 6
 
         # step 4 - revert to config with no max connections
         patch_src = f"{TEST_DATA}/transport-server-tcp-load-balance/standard/transport-server.yaml"
@@ -367,13 +334,8 @@ class TestTransportServerTcpLoadBalance:
         wait_before_test()
 
         # step 5 - confirm making lots of connections doesn't cause an error
-        clients = []
-        for i in range(24):
-            c = self.make_holding_connection(host, port)
-            clients.append(c)
-
-        for c in clients:
-            c.close()
+        report = run_tcp_load(host, port, connections=0, hold=24)
+        assert not report.failures
 
     def test_tcp_request_load_balanced_method(
             self, kube_apis, crd_ingress_controller, transport_server_setup, ingress_controller_prerequisites
@@ -416,25 +378,10 @@ class TestTransportServerTcpLoadBalance:
 
         port = transport_server_setup.public_endpoint.tcp_server_port
         host = transport_server_setup.public_endpoint.public_ip
-        endpoints = {}
-        retry = 0
-        while(len(endpoints) is not 1 and retry <= 30):
-            for i in range(20):
-                client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                client.connect((host, port))
-                client.sendall(b'connect')
-                response = client.recv(4096)
-                endpoint = response.decode()
-                print(f' req number {i}; response: {endpoint}')
-                if endpoint not in endpoints:
-                    endpoints[endpoint] = 1
-                else:
-                    endpoints[endpoint] = endpoints[endpoint] + 1
-                client.close()
-            retry += 1
-            wait_before_test(1)
-            print(f"Retry #{retry}")
+        report = run_tcp_load_until(host, port, 1)
+        endpoints = report.distribution
 
+        assert not report.failures
         assert len(endpoints) is 1
 
         # Step 3 - restore to default load balancing method and confirm requests are balanced.
@@ -442,26 +389,63 @@ class TestTransportServerTcpLoadBalance:
         self.restore_ts(kube_apis, transport_server_setup)
         wait_before_test()
 
-        endpoints = {}
+        report = run_tcp_load_until(host, port, 3)
+        endpoints = report.distribution
+
+        assert not report.failures
+        assert len(endpoints) is 3
+        assert_balanced(endpoints)
+
+    def test_tcp_request_least_conn(
+            self, kube_apis, crd_ingress_controller, transport_server_setup, ingress_controller_prerequisites
+    ):
+        """
+        Update load balancing method to 'least_conn'. While two endpoints hold a connection each,
+        the new connections should go to the third one.
+        """
+
+        # Step 1 - set the load balancing method.
+
+        patch_src = f"{TEST_DATA}/transport-server-tcp-load-balance/least-conn-transport-server.yaml"
+        patch_ts_from_yaml(
+            kube_apis.custom_objects,
+            transport_server_setup.name,
+            patch_src,
+            transport_server_setup.namespace,
+        )
+        wait_before_test()
         retry = 0
-        while(len(endpoints) is not 3 and retry <= 30):
-            for i in range(20):
-                client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                client.connect((host, port))
-                client.sendall(b'connect')
-                response = client.recv(4096)
-                endpoint = response.decode()
-                print(f' req number {i}; response: {endpoint}')
-                if endpoint not in endpoints:
-                    endpoints[endpoint] = 1
-                else:
-                    endpoints[endpoint] = endpoints[endpoint] + 1
-                client.close()
+        result_conf = ""
+        while "least_conn;" not in result_conf and retry <= 30:
+            result_conf = get_ts_nginx_template_conf(
+                kube_apis.v1,
+                transport_server_setup.namespace,
+                transport_server_setup.name,
+                transport_server_setup.ingress_pod_name,
+                ingress_controller_prerequisites.namespace
+            )
             retry += 1
             wait_before_test(1)
             print(f"Retry #{retry}")
 
-        assert len(endpoints) is 3
+        assert "least_conn;" in result_conf
+
+        # Step 2 - hold a connection to two endpoints and confirm the new connections go to the idle one.
+
+        port = transport_server_setup.public_endpoint.tcp_server_port
+        host = transport_server_setup.public_endpoint.public_ip
+        report = run_tcp_load(host, port, connections=100, concurrency=1, hold=2)
+
+        assert not report.failures
+        assert len(report.held_distribution) == 2
+        # a closing connection can still be counted for a moment, so a few may go to a busy endpoint
+        idle_endpoint, count = report.distribution.most_common(1)[0]
+        assert idle_endpoint not in report.held_distribution
+        assert count >= 90
+
+        # Step 3 - restore
+
+        self.restore_ts(kube_apis, transport_server_setup)
 
     @pytest.mark.skip_for_nginx_oss
     def test_tcp_passing_healthcheck_with_match(
@@ -504,25 +488,11 @@ class TestTransportServerTcpLoadBalance:
         port = transport_server_setup.public_endpoint.tcp_server_port
         host = transport_server_setup.public_endpoint.public_ip
 
-        endpoints = {}
-        retry = 0
-        while(len(endpoints) is not 3 and retry <= 30):
-            for i in range(20):
-                client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                client.connect((host, port))
-                client.sendall(b'connect')
-                response = client.recv(4096)
-                endpoint = response.decode()
-                print(f' req number {i}; response: {endpoint}')
-                if endpoint not in endpoints:
-                    endpoints[endpoint] = 1
-                else:
-                    endpoints[endpoint] = endpoints[endpoint] + 1
-                client.close()
-            retry += 1
-            wait_before_test(1)
-            print(f"Retry #{retry}")
+        report = run_tcp_load_until(host, port, 3)
+        endpoints = report.distribution
+        assert not report.failures
         assert len(endpoints) is 3
+        assert_balanced(endpoints)
 
         # Step 3 - restore
 
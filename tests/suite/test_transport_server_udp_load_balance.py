@@ -15,6 +15,8 @@ from suite.custom_resources_utils import (
     delete_ts,
     create_ts_from_yaml,
 )
+from suite.load_balance_utils import assert_balanced
+from suite.udp_load_utils import run_udp_load
 from settings import TEST_DATA
 
 
@@ -113,22 +115,13 @@ class TestTransportServerUdpLoadBalance:
         endpoints = {}
         retry = 0
         while(len(endpoints) is not 3 and retry <= 30):
-            for i in range(20):
-                client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, 0)
-                client.sendto("ping".encode('utf-8'), (host, port))
-                data, address = client.recvfrom(4096)
-                endpoint = data.decode()
-                print(f' req number {i}; response: {endpoint}')
-                if endpoint not in endpoints:
-                    endpoints[endpoint] = 1
-                else:
-                    endpoints[endpoint] = endpoints[endpoint] + 1
-                client.close()
+            endpoints = run_udp_load(host, port).distribution
             retry += 1
             wait_before_test(1)
             print(f"Retry #{retry}")
 
         assert len(endpoints) is 3
+        assert_balanced(endpoints)
 
         result_conf = get_ts_nginx_template_conf(
             kube_apis.v1,
@@ -237,18 +230,9 @@ class TestTransportServerUdpLoadBalance:
         host = transport_server_setup.public_endpoint.public_ip
 
         print(f"sending udp requests to: {host}:{port}")
-        for i in range(3):
-            client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, 0)
-            client.settimeout(2)
-            client.sendto("ping".encode('utf-8'), (host, port))
-            try:
-                client.recvfrom(4096)
-                # it should timeout
-                print(f"incorrect config from {file} should have resulted in an error")
-                assert False
-            except socket.timeout:
-                print("successfully timed out")
-            client.close()
+        # the datagrams are sent together, so they time out within one window
+        report = run_udp_load(host, port, datagrams=3, timeout=2)
+        assert report.errors == {"timeout": 3}, f"incorrect config from {file} should have resulted in timeouts"
 
         self.restore_ts(kube_apis, transport_server_setup)
 
@@ -299,22 +283,13 @@ class TestTransportServerUdpLoadBalance:
         retry = 0
         endpoints = {}
         while(len(endpoints) is not 3 and retry <= 30):
-            for i in range(20):
-                client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, 0)
-                client.sendto("ping".encode('utf-8'), (host, port))
-                data, address = client.recvfrom(4096)
-                endpoint = data.decode()
-                print(f' req number {i}; response: {endpoint}')
-                if endpoint not in endpoints:
-                    endpoints[endpoint] = 1
-                else:
-                    endpoints[endpoint] = endpoints[endpoint] + 1
-                client.close()
+            endpoints = run_udp_load(host, port).distribution
             retry += 1
             wait_before_test(1)
             print(f"Retry #{retry}")
 
         assert len(endpoints) is 3
+        assert_balanced(endpoints)
 
         # Step 3 - restore
 
@@ -360,19 +335,8 @@ class TestTransportServerUdpLoadBalance:
         port = transport_server_setup.public_endpoint.udp_server_port
         host = transport_server_setup.public_endpoint.public_ip
 
-        client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, 0)
-        client.settimeout(2)
-        client.sendto("ping".encode('utf-8'), (host, port))
-        try:
-            # client.recvfrom(4096)
-            data, address = client.recvfrom(4096)
-            endpoint = data.decode()
-            print(f' req number  response: {endpoint}')
-            # it should timeout
-            pytest.fail("expected a timeout")
-        except socket.timeout:
-            print("successfully timed out")
-        client.close()
+        report = run_udp_load(host, port, datagrams=3, timeout=2)
+        assert report.errors == {"timeout": 3}, f"expected a timeout, got {dict(report.errors)}"
 
         # Step 3 - restore
 
@@ -0,0 +1,62 @@
+import pytest
+
+from settings import TEST_DATA
+from suite.nginx_api_utils import NginxPlusApi
+from suite.perf_matrix_utils import MatrixCase, option_combinations, run_options_matrix
+from suite.vs_vsr_resources_utils import patch_virtual_server_from_yaml
+
+# the upstream options that change how NGINX talks to the backends
+UPSTREAM_OPTIONS = {"keepalive": [0, 32], "buffering": [True, False]}
+# seconds of load per case
+LOAD_DURATION = 20.0
+LOAD_CONCURRENCY = 32
+
+
+@pytest.mark.perf
+@pytest.mark.vs
+@pytest.mark.parametrize('crd_ingress_controller, virtual_server_setup',
+                         [({"type": "complete", "extra_args": ["-enable-custom-resources",
+                                                               "-enable-prometheus-metrics"]},
+                           {"example": "virtual-server-upstream-options", "app_type": "simple"})],
+                         indirect=True)
+class TestUpstreamOptionsMatrix:
+    def test_options_matrix(self, request, kube_apis, ingress_controller_prerequisites, crd_ingress_controller,
+                            virtual_server_setup, restore_configmap):
+        """
+        Send the same load through the VS with every combination of the options and compare the throughput.
+        """
+        src = f"{TEST_DATA}/virtual-server-upstream-options/standard/virtual-server.yaml"
+        cases = [MatrixCase("defaults")] + option_combinations(UPSTREAM_OPTIONS) + [
+            MatrixCase("max-fails=3 connect-timeout=5s", {"max-fails": 3, "connect-timeout": "5s"}),
+            MatrixCase("configmap keepalive=64 proxy-buffers=16 8k",
+                       configmap={"keepalive": "64", "proxy-buffers": "16 8k"}),
+        ]
+        api = None
+        if request.config.getoption("--ic-type") == "nginx-plus-ingress":
+            endpoint = virtual_server_setup.public_endpoint
+            api = NginxPlusApi(f"http://{endpoint.public_ip}:{endpoint.api_port}")
+        try:
+            results = run_options_matrix(
+                kube_apis,
+                virtual_server_setup.vs_name,
+                virtual_server_setup.namespace,
+                src,
+                ingress_controller_prerequisites.config_map['metadata']['name'],
+                ingress_controller_prerequisites.namespace,
+                cases,
+                virtual_server_setup.backend_1_url,
+                virtual_server_setup.vs_host,
+                virtual_server_setup.metrics_url,
+                duration=LOAD_DURATION,
+                concurrency=LOAD_CONCURRENCY,
+                api=api,
+                upstream=f"vs_{virtual_server_setup.namespace}_{virtual_server_setup.vs_name}_backend1",
+            )
+        finally:
+            patch_virtual_server_from_yaml(kube_apis.custom_objects, virtual_server_setup.vs_name, src,
+                                           virtual_server_setup.namespace)
+            if api is not None:
+                api.close()
+
+        for result in results:
+            assert not result.report.failures, f"Failed requests with {result.case.name}"
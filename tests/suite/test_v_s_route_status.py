@@ -10,8 +10,14 @@ from suite.vs_vsr_resources_utils import (
     delete_virtual_server,
     create_virtual_server_from_yaml,
 )
+from suite.status_tracker_utils import wait_for_status_state
 from settings import TEST_DATA
 
+
+def wait_for_route_state(kube_apis, route, state, reason=None) -> None:
+    wait_for_status_state(kube_apis.custom_objects, route.namespace, "virtualserverroutes", route.name, state, reason)
+
+
 @pytest.mark.vsr
 @pytest.mark.parametrize(
     "crd_ingress_controller, v_s_route_setup",
@@ -35,7 +41,7 @@ class TestVirtualServerRouteStatus:
             patch_src_m,
             v_s_route_setup.route_m.namespace,
         )
-        wait_before_test()
+        wait_for_route_state(kube_apis, v_s_route_setup.route_m, "Valid")
         patch_src_s = f"{TEST_DATA}/virtual-server-route-status/route-single.yaml"
         patch_v_s_route_from_yaml(
             kube_apis.custom_objects,
@@ -43,7 +49,7 @@ class TestVirtualServerRouteStatus:
             patch_src_s,
             v_s_route_setup.route_s.namespace,
         )
-        wait_before_test()
+        wait_for_route_state(kube_apis, v_s_route_setup.route_s, "Valid")
 
     def patch_valid_vs(self, kube_apis, v_s_route_setup) -> None:
         """
@@ -53,7 +59,9 @@ class TestVirtualServerRouteStatus:
         patch_virtual_server_from_yaml(
             kube_apis.custom_objects, v_s_route_setup.vs_name, patch_src, v_s_route_setup.namespace,
         )
-        wait_before_test()
+        wait_for_status_state(
+            kube_apis.custom_objects, v_s_route_setup.namespace, "virtualservers", v_s_route_setup.vs_name, "Valid"
+        )
 
     @pytest.mark.smoke
     def test_status_valid(
@@ -101,7 +109,7 @@ class TestVirtualServerRouteStatus:
             patch_src_m,
             v_s_route_setup.route_m.namespace,
         )
-        wait_before_test()
+        wait_for_route_state(kube_apis, v_s_route_setup.route_m, "Invalid")
         patch_src_s = f"{TEST_DATA}/virtual-server-route-status/route-single-invalid.yaml"
         patch_v_s_route_from_yaml(
             kube_apis.custom_objects,
@@ -109,7 +117,7 @@ class TestVirtualServerRouteStatus:
             patch_src_s,
             v_s_route_setup.route_s.namespace,
         )
-        wait_before_test()
+        wait_for_route_state(kube_apis, v_s_route_setup.route_s, "Invalid")
 
         response_m = read_custom_resource(
             kube_apis.custom_objects,
@@ -153,6 +161,7 @@ class TestVirtualServerRouteStatus:
             patch_src_m,
             v_s_route_setup.route_m.namespace,
         )
+        # route_m stays Valid and its status has no observedGeneration, there is no change to wait for
         wait_before_test()
         patch_src_s = f"{TEST_DATA}/virtual-server-route-status/route-single-invalid-prefixed-path.yaml"
         patch_v_s_route_from_yaml(
@@ -161,7 +170,7 @@ class TestVirtualServerRouteStatus:
             patch_src_s,
             v_s_route_setup.route_s.namespace,
         )
-        wait_before_test()
+        wait_for_route_state(kube_apis, v_s_route_setup.route_s, "Warning")
 
         response_m = read_custom_resource(
             kube_apis.custom_objects,
@@ -202,7 +211,8 @@ class TestVirtualServerRouteStatus:
         patch_virtual_server_from_yaml(
             kube_apis.custom_objects, v_s_route_setup.vs_name, patch_src, v_s_route_setup.namespace,
         )
-        wait_before_test()
+        wait_for_route_state(kube_apis, v_s_route_setup.route_m, "Warning")
+        wait_for_route_state(kube_apis, v_s_route_setup.route_s, "Warning")
 
         response_m = read_custom_resource(
             kube_apis.custom_objects,
@@ -240,6 +250,8 @@ class TestVirtualServerRouteStatus:
         delete_virtual_server(
             kube_apis.custom_objects, v_s_route_setup.vs_name, v_s_route_setup.namespace,
         )
+        wait_for_route_state(kube_apis, v_s_route_setup.route_m, "Warning", "NoVirtualServerFound")
+        wait_for_route_state(kube_apis, v_s_route_setup.route_s, "Warning", "NoVirtualServerFound")
 
         response_m = read_custom_resource(
             kube_apis.custom_objects,
@@ -1,10 +1,6 @@
 import pytest
-import requests
-import json
 
-from settings import NGINX_API_VERSION
-
-from suite.nginx_api_utils import wait_for_empty_array, wait_for_non_empty_array, get_nginx_generation_value
+from suite.nginx_api_utils import NginxPlusApi
 from suite.resources_utils import scale_deployment
 
 
@@ -18,28 +14,30 @@ from suite.resources_utils import scale_deployment
 class TestVSNginxPlusApi:
     def test_dynamic_configuration(self, kube_apis, ingress_controller_endpoint,
                                    crd_ingress_controller, virtual_server_setup):
-        req_url = f"http://{ingress_controller_endpoint.public_ip}:{ingress_controller_endpoint.api_port}"
+        api = NginxPlusApi(f"http://{ingress_controller_endpoint.public_ip}:{ingress_controller_endpoint.api_port}")
         vs_upstream = f"vs_{virtual_server_setup.namespace}_{virtual_server_setup.vs_name}_backend2"
-        initial_reloads_count = get_nginx_generation_value(req_url)
-        upstream_servers_url = f"{req_url}/api/{NGINX_API_VERSION}/http/upstreams/{vs_upstream}/servers"
-        print("Scale BE deployment")
-        scale_deployment(kube_apis.v1, kube_apis.apps_v1_api, "backend2", virtual_server_setup.namespace, 0)
-        wait_for_empty_array(upstream_servers_url)
-        scale_deployment(kube_apis.v1, kube_apis.apps_v1_api, "backend2", virtual_server_setup.namespace, 1)
-        wait_for_non_empty_array(upstream_servers_url)
+        try:
+            initial_reloads_count = api.generation()
+            print("Scale BE deployment")
+            scale_deployment(kube_apis.v1, kube_apis.apps_v1_api, "backend2", virtual_server_setup.namespace, 0)
+            api.wait_for_upstream_servers(vs_upstream, 0)
+            scale_deployment(kube_apis.v1, kube_apis.apps_v1_api, "backend2", virtual_server_setup.namespace, 1)
+            servers = api.wait_for_upstream_servers(vs_upstream, 1)
 
-        print("Run checks:")
-        resp = json.loads(requests.get(upstream_servers_url).text)
-        new_reloads_count = get_nginx_generation_value(req_url)
-        assert new_reloads_count == initial_reloads_count, "Expected: no new reloads"
-        assert resp[0]['max_conns'] == 32
-        assert resp[0]['max_fails'] == 25
-        assert resp[0]['fail_timeout'] == '15s'
-        assert resp[0]['slow_start'] == '10s'
+            print("Run checks:")
+            api.assert_generation_unchanged(initial_reloads_count)
+        finally:
+            api.close()
+        assert servers[0].max_conns == 32
+        assert servers[0].max_fails == 25
+        assert servers[0].fail_timeout == '15s'
+        assert servers[0].slow_start == '10s'
 
     def test_status_zone_support(self, kube_apis, crd_ingress_controller, virtual_server_setup):
-        req_url = f"http://" \
-            f"{virtual_server_setup.public_endpoint.public_ip}:{virtual_server_setup.public_endpoint.api_port}"
-        status_zone_url = f"{req_url}/api/{NGINX_API_VERSION}/http/server_zones"
-        resp = json.loads(requests.get(status_zone_url).text)
-        assert resp[f"{virtual_server_setup.vs_host}"]
+        api = NginxPlusApi(f"http://"
+                           f"{virtual_server_setup.public_endpoint.public_ip}:"
+                           f"{virtual_server_setup.public_endpoint.api_port}")
+        try:
+            assert virtual_server_setup.vs_host in api.server_zones()
+        finally:
+            api.close()
@@ -2,7 +2,7 @@ import pytest
 
 from settings import TEST_DATA, DEPLOYMENTS
 from suite.resources_utils import wait_before_test, replace_configmap_from_yaml, get_events, get_first_pod_name, \
-    get_file_contents, get_pods_amount
+    get_file_contents, get_pods_amount, restore_configmap_from_yaml
 from suite.vs_vsr_resources_utils import get_vs_nginx_template_conf
 from suite.yaml_utils import get_configmap_fields_from_yaml
 
@@ -130,7 +130,7 @@ def clean_up(request, kube_apis, ingress_controller_prerequisites, test_namespac
     """
 
     def fin():
-        replace_configmap_from_yaml(kube_apis.v1,
+        restore_configmap_from_yaml(kube_apis.v1,
                                     ingress_controller_prerequisites.config_map['metadata']['name'],
                                     ingress_controller_prerequisites.namespace,
                                     f"{DEPLOYMENTS}/common/nginx-config.yaml")
@@ -7,6 +7,7 @@ from suite.custom_assertions import assert_event_starts_with_text_and_contains_e
     assert_vs_conf_not_exists, assert_event
 from suite.grpc.helloworld_pb2 import HelloRequest
 from suite.grpc.helloworld_pb2_grpc import GreeterStub
+from suite.grpc_load_utils import run_grpc_load
 from suite.resources_utils import create_example_app, wait_until_all_pods_are_ready, \
     delete_common_app, create_secret_from_yaml, replace_configmap_from_yaml, \
     delete_items_from_yaml, get_first_pod_name, get_events, wait_before_test, \
@@ -134,6 +135,19 @@ class TestVirtualServerGrpc:
                 print(e.details())
                 pytest.fail("RPC error was not expected during call, exiting...")
 
+    @pytest.mark.parametrize("backend_setup", [{"app_type": "grpc-vs"}], indirect=True)
+    def test_grpc_backend_under_load(self, kube_apis, ingress_controller_prerequisites, crd_ingress_controller,
+                                     backend_setup, virtual_server_setup) -> None:
+        cert = get_certificate(virtual_server_setup.public_endpoint.public_ip,
+                               virtual_server_setup.vs_host,
+                               virtual_server_setup.public_endpoint.port_ssl)
+        target = f'{virtual_server_setup.public_endpoint.public_ip}:{virtual_server_setup.public_endpoint.port_ssl}'
+        report = run_grpc_load(target, cert, virtual_server_setup.vs_host, calls=500, concurrency=50, channels=2,
+                               name=virtual_server_setup.public_endpoint.public_ip)
+
+        assert report.status_codes == {"OK": 500}, f"Unexpected statuses: {dict(report.details)}"
+        assert all("Hello" in result.details for result in report.results)
+
     @pytest.mark.parametrize("backend_setup", [{"app_type": "grpc-vs"}], indirect=True)
     def test_grpc_error_intercept(self, kube_apis, ingress_controller_prerequisites, crd_ingress_controller, 
                                   backend_setup, virtual_server_setup):
@@ -0,0 +1,56 @@
+import pytest
+
+from suite.vs_vsr_topology_utils import TopologyShape, run_topology_sweep
+
+# the shape every dimension is grown from
+BASE_SHAPE = TopologyShape(
+    virtual_servers=10, routes_per_vs=5, namespaces=2, subroutes_per_route=2, matches_per_subroute=1,
+    splits_per_subroute=2,
+)
+# the values of one dimension at a time, the others stay at the base
+DIMENSIONS = {
+    "virtual_servers": [40],
+    "routes_per_vs": [20],
+    "namespaces": [8],
+    "subroutes_per_route": [8],
+    "matches_per_subroute": [4],
+    "splits_per_subroute": [8],
+}
+
+
+@pytest.mark.perf
+@pytest.mark.vsr
+@pytest.mark.parametrize(
+    "crd_ingress_controller",
+    [
+        {
+            "type": "complete",
+            "extra_args": ["-enable-custom-resources", "-enable-prometheus-metrics", "-enable-leader-election=false"],
+        }
+    ],
+    indirect=True,
+)
+class TestVirtualServerRouteTopology:
+    def test_topology_cost(
+        self, kube_apis, ingress_controller_prerequisites, ingress_controller_pool, crd_ingress_controller,
+        ingress_controller_endpoint,
+    ):
+        """
+        Grow one dimension of a VS/VSR topology at a time
+        and measure the convergence, config size, reloads and startup.
+        """
+        metrics_url = (
+            f"http://{ingress_controller_endpoint.public_ip}:{ingress_controller_endpoint.metrics_port}/metrics"
+        )
+        results = run_topology_sweep(
+            kube_apis,
+            BASE_SHAPE,
+            DIMENSIONS,
+            ingress_controller_prerequisites.namespace,
+            ingress_controller_pool.name,
+            metrics_url,
+            startup=True,
+        )
+
+        for result in results:
+            assert not result.missing, f"{result.missing} objects of {result.shape.name} were not Valid"
@@ -1,12 +1,12 @@
 import pytest
 from kubernetes.client.rest import ApiException
-from suite.resources_utils import wait_before_test
 from suite.vs_vsr_resources_utils import (
     patch_virtual_server_from_yaml,
 )
 from suite.custom_resources_utils import (
     read_custom_resource,
 )
+from suite.status_tracker_utils import wait_for_status_state
 from settings import TEST_DATA
 
 @pytest.mark.vs
@@ -66,7 +66,13 @@ class TestVirtualServerStatus:
             patch_src,
             virtual_server_setup.namespace,
         )
-        wait_before_test()
+        wait_for_status_state(
+            kube_apis.custom_objects,
+            virtual_server_setup.namespace,
+            "virtualservers",
+            virtual_server_setup.vs_name,
+            "Invalid",
+        )
         response = read_custom_resource(
             kube_apis.custom_objects,
             virtual_server_setup.namespace,
@@ -95,7 +101,13 @@ class TestVirtualServerStatus:
             patch_src,
             virtual_server_setup.namespace,
         )
-        wait_before_test()
+        wait_for_status_state(
+            kube_apis.custom_objects,
+            virtual_server_setup.namespace,
+            "virtualservers",
+            virtual_server_setup.vs_name,
+            "Warning",
+        )
         response = read_custom_resource(
             kube_apis.custom_objects,
             virtual_server_setup.namespace,
@@ -0,0 +1,102 @@
+import copy
+
+import pytest
+import yaml
+from kubernetes.client.rest import ApiException
+
+from settings import TEST_DATA
+from suite.status_tracker_utils import INVALID, VALID, StatusTracker, run_status_batch
+from suite.vs_vsr_resources_utils import create_virtual_server, patch_virtual_server
+
+
+def build_status_items(yaml_manifest, namespace, count) -> [(str, str, dict)]:
+    """
+    Build VSes with their own names and hosts from a manifest.
+
+    :param yaml_manifest: an absolute path to file
+    :param namespace:
+    :param count: number of the VSes
+    :return: [(namespace, name, body)]
+    """
+    with open(yaml_manifest) as f:
+        template = yaml.safe_load(f)
+    items = []
+    for i in range(1, count + 1):
+        doc = copy.deepcopy(template)
+        doc["metadata"]["name"] = f"status-latency-{i}"
+        doc["spec"]["host"] = f"status-latency-{i}.example.com"
+        items.append((namespace, doc["metadata"]["name"], doc))
+    return items
+
+
+@pytest.fixture(scope="class")
+def virtual_server_status_tracker(request, kube_apis, test_namespace) -> StatusTracker:
+    """
+    Watch the status of the VSes and delete the ones of the batch at the end.
+
+    :param request: pytest fixture
+    :param kube_apis: client apis
+    :param test_namespace:
+    :return: StatusTracker
+    """
+    tracker = StatusTracker(kube_apis.custom_objects, "virtualservers")
+    tracker.start()
+
+    def fin():
+        print("Clean up:")
+        tracker.stop()
+        for i in range(1, int(request.config.getoption("--batch-resources")) + 1):
+            try:
+                kube_apis.custom_objects.delete_namespaced_custom_object(
+                    "k8s.nginx.org", "v1", test_namespace, "virtualservers", f"status-latency-{i}"
+                )
+            except ApiException as ex:
+                # the test failed before it created this one
+                if ex.status != 404:
+                    raise
+
+    request.addfinalizer(fin)
+
+    return tracker
+
+
+@pytest.mark.batch_start
+@pytest.mark.vs
+@pytest.mark.parametrize(
+    "crd_ingress_controller, virtual_server_setup",
+    [
+        (
+            {"type": "complete", "extra_args": ["-enable-custom-resources", "-enable-leader-election=false"]},
+            {"example": "virtual-server-status", "app_type": "simple"},
+        )
+    ],
+    indirect=True,
+)
+class TestVirtualServerStatusLatency:
+    def test_status_latency(
+        self, request, kube_apis, crd_ingress_controller, virtual_server_setup, virtual_server_status_tracker,
+    ):
+        """
+        Create many VSes, then make them invalid, and measure the latency until the IC publishes their status
+        """
+        count = int(request.config.getoption("--batch-resources"))
+        custom_objects = kube_apis.custom_objects
+        created = run_status_batch(
+            virtual_server_status_tracker,
+            build_status_items(
+                f"{TEST_DATA}/virtual-server-status/standard/virtual-server.yaml", virtual_server_setup.namespace, count
+            ),
+            lambda namespace, name, body: create_virtual_server(custom_objects, body, namespace),
+            VALID,
+        )
+        invalidated = run_status_batch(
+            virtual_server_status_tracker,
+            build_status_items(
+                f"{TEST_DATA}/virtual-server-status/invalid-state.yaml", virtual_server_setup.namespace, count
+            ),
+            lambda namespace, name, body: patch_virtual_server(custom_objects, name, namespace, body),
+            INVALID,
+        )
+
+        assert not created.missing, f"VSes without the {VALID} status: {created.missing[:10]}"
+        assert not invalidated.missing, f"VSes without the {INVALID} status: {invalidated.missing[:10]}"
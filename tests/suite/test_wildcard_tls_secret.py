@@ -5,8 +5,7 @@ from suite.fixtures import PublicEndpoint
 from suite.ssl_utils import get_server_certificate_subject
 from suite.resources_utils import create_items_from_yaml, delete_items_from_yaml,\
     create_secret_from_yaml, delete_secret, create_example_app, delete_common_app,\
-    is_secret_present, wait_until_all_pods_are_ready, create_ingress_controller,\
-    delete_ingress_controller, wait_before_test, ensure_connection_to_public_endpoint
+    is_secret_present, wait_until_all_pods_are_ready, wait_before_test, ensure_connection_to_public_endpoint
 from suite.yaml_utils import get_first_ingress_host_from_yaml
 
 paths = ["backend1", "backend2"]
@@ -63,12 +62,14 @@ def wildcard_tls_secret_setup(request, kube_apis,
 
 @pytest.fixture(scope="class")
 def wildcard_tls_secret_ingress_controller(cli_arguments, kube_apis, ingress_controller_prerequisites,
-                                           wildcard_tls_secret_setup, request) -> IngressControllerWithSecret:
+                                           ingress_controller_pool, wildcard_tls_secret_setup,
+                                           request) -> IngressControllerWithSecret:
     """
     Create a Wildcard Ingress Controller according to the installation type
     :param cli_arguments: pytest context
     :param kube_apis: client apis
     :param ingress_controller_prerequisites
+    :param ingress_controller_pool: the pool that keeps the IC between the classes
     :param wildcard_tls_secret_setup: test-class prerequisites
     :param request: pytest fixture
     :return: IngressController object
@@ -78,14 +79,13 @@ def wildcard_tls_secret_ingress_controller(cli_arguments, kube_apis, ingress_con
     secret_name = create_secret_from_yaml(kube_apis.v1, namespace,
                                           f"{TEST_DATA}/wildcard-tls-secret/wildcard-tls-secret.yaml")
     extra_args = [f"-wildcard-tls-secret={namespace}/{secret_name}", "-enable-custom-resources=false"]
-    name = create_ingress_controller(kube_apis.v1, kube_apis.apps_v1_api, cli_arguments, namespace, extra_args)
+    ingress_controller_pool.acquire(extra_args)
     ensure_connection_to_public_endpoint(wildcard_tls_secret_setup.public_endpoint.public_ip,
                                          wildcard_tls_secret_setup.public_endpoint.port,
                                          wildcard_tls_secret_setup.public_endpoint.port_ssl)
 
     def fin():
-        print("Remove IC and wildcard secret:")
-        delete_ingress_controller(kube_apis.apps_v1_api, name, cli_arguments['deployment-type'], namespace)
+        print("Remove wildcard secret:")
         if is_secret_present(kube_apis.v1, secret_name, namespace):
             delete_secret(kube_apis.v1, secret_name, namespace)
 
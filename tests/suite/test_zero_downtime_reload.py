@@ -0,0 +1,129 @@
+import base64
+
+import pytest
+import yaml
+
+from settings import TEST_DATA, DEPLOYMENTS
+from suite.policy_resources_utils import create_policy_from_yaml, delete_policy
+from suite.resources_utils import create_example_app, wait_until_all_pods_are_ready, \
+    delete_common_app, create_secret_from_yaml, replace_configmap_from_yaml, replace_secret, \
+    delete_items_from_yaml
+from suite.ssl_utils import get_certificate
+from suite.vs_vsr_resources_utils import patch_virtual_server_from_yaml
+from suite.zero_downtime_utils import GrpcTrafficStream, HttpTrafficStream, Mutation, RESET_ERRORS, \
+    run_reload_scenario
+
+src_cm_yaml = f"{TEST_DATA}/zero-downtime-reload/nginx-config.yaml"
+src_sec_yaml = f"{TEST_DATA}/virtual-server-grpc-mixed/tls-secret.yaml"
+new_sec_yaml = f"{TEST_DATA}/zero-downtime-reload/new-tls-secret.yaml"
+src_pol_yaml = f"{TEST_DATA}/zero-downtime-reload/allow-all-policy.yaml"
+# seconds between the mutations
+MUTATION_INTERVAL = 10.0
+
+
+@pytest.fixture(scope="function")
+def backend_setup(request, kube_apis, ingress_controller_prerequisites, test_namespace):
+    """
+    Replace the ConfigMap with HTTP2, deploy the secret and the app.
+
+    :param request: pytest fixture
+    :param kube_apis: client apis
+    :param ingress_controller_prerequisites:
+    :param test_namespace:
+    """
+    app_name = request.param.get("app_type")
+    print("------------------------- Replace ConfigMap with HTTP2 -------------------------")
+    replace_configmap_from_yaml(kube_apis.v1,
+                                ingress_controller_prerequisites.config_map['metadata']['name'],
+                                ingress_controller_prerequisites.namespace,
+                                f"{TEST_DATA}/virtual-server-grpc-mixed/nginx-config.yaml")
+    print("------------------------- Deploy Secret and App -----------------------------")
+    create_secret_from_yaml(kube_apis.v1, test_namespace, src_sec_yaml)
+    create_example_app(kube_apis, app_name, test_namespace)
+    wait_until_all_pods_are_ready(kube_apis.v1, test_namespace)
+
+    def fin():
+        print("Clean up:")
+        delete_items_from_yaml(kube_apis, src_sec_yaml, test_namespace)
+        replace_configmap_from_yaml(kube_apis.v1,
+                                    ingress_controller_prerequisites.config_map['metadata']['name'],
+                                    ingress_controller_prerequisites.namespace,
+                                    f"{DEPLOYMENTS}/common/nginx-config.yaml")
+        delete_common_app(kube_apis, app_name, test_namespace)
+
+    request.addfinalizer(fin)
+
+
+def get_secret_certificate(yaml_manifest) -> str:
+    """
+    Get the PEM certificate of a TLS secret manifest.
+
+    :param yaml_manifest: an absolute path to file
+    :return: str
+    """
+    with open(yaml_manifest) as f:
+        secret = yaml.safe_load(f)
+    return base64.b64decode(secret["data"]["tls.crt"]).decode()
+
+
+@pytest.mark.perf
+@pytest.mark.vs
+@pytest.mark.parametrize('crd_ingress_controller, virtual_server_setup',
+                         [({"type": "complete", "extra_args": ["-enable-custom-resources",
+                                                               "-enable-preview-policies",
+                                                               "-enable-prometheus-metrics"]},
+                           {"example": "virtual-server-grpc-mixed"})],
+                         indirect=True)
+class TestZeroDowntimeReload:
+    @pytest.mark.parametrize("backend_setup", [{"app_type": "grpc-vs-mixed"}], indirect=True)
+    def test_traffic_during_reloads(self, kube_apis, ingress_controller_prerequisites, crd_ingress_controller,
+                                    backend_setup, virtual_server_setup):
+        """
+        Keep HTTP, HTTPS and gRPC traffic running while the VS, the ConfigMap, the secret and the policies change.
+        Every reload must keep the requests on new connections and the in-flight requests successful.
+        """
+        endpoint = virtual_server_setup.public_endpoint
+        host = virtual_server_setup.vs_host
+        old_cert = get_certificate(endpoint.public_ip, host, endpoint.port_ssl)
+        streams = [
+            HttpTrafficStream("http", virtual_server_setup.backend_2_url, host, keepalive=False),
+            HttpTrafficStream("http-keepalive", virtual_server_setup.backend_2_url, host),
+            HttpTrafficStream("https-keepalive", virtual_server_setup.backend_2_url_ssl, host),
+            GrpcTrafficStream("grpc-keepalive", f"{endpoint.public_ip}:{endpoint.port_ssl}",
+                              [old_cert, get_secret_certificate(new_sec_yaml)], host),
+        ]
+        vs_args = (kube_apis.custom_objects, virtual_server_setup.vs_name)
+        namespace = virtual_server_setup.namespace
+        policies = []
+
+        def add_policy():
+            policies.append(create_policy_from_yaml(kube_apis.custom_objects, src_pol_yaml, namespace))
+            patch_virtual_server_from_yaml(*vs_args, f"{TEST_DATA}/zero-downtime-reload/virtual-server-policy.yaml",
+                                           namespace)
+
+        config_map_name = ingress_controller_prerequisites.config_map["metadata"]["name"]
+        mutations = [
+            Mutation("add a policy to the VS", 0, add_policy),
+            Mutation("replace the ConfigMap", MUTATION_INTERVAL,
+                     lambda: replace_configmap_from_yaml(kube_apis.v1, config_map_name,
+                                                         ingress_controller_prerequisites.namespace, src_cm_yaml)),
+            Mutation("replace the TLS secret", 2 * MUTATION_INTERVAL,
+                     lambda: replace_secret(kube_apis.v1, "virtual-server-tls-grpc-secret", namespace, new_sec_yaml)),
+            Mutation("patch the VS upstreams and remove the policy", 3 * MUTATION_INTERVAL,
+                     lambda: patch_virtual_server_from_yaml(
+                         *vs_args, f"{TEST_DATA}/zero-downtime-reload/virtual-server-updated.yaml", namespace)),
+        ]
+        try:
+            report = run_reload_scenario(streams, mutations, virtual_server_setup.metrics_url,
+                                         settle=MUTATION_INTERVAL)
+        finally:
+            for name in policies:
+                delete_policy(kube_apis.custom_objects, name, namespace)
+
+        # a reload may close an idle keep-alive connection under a new request, a new connection must not fail
+        failures = [(name, s) for name, s in report.failures() if name == "http" or s.error not in RESET_ERRORS]
+        print(f"{len(report.failures()) - len(failures)} requests on keep-alive connections were reset")
+        assert report.reloads, "Expected: the mutations reload NGINX"
+        assert not failures, f"Failed requests: {[(name, s.error) for name, s in failures]}"
+        for stream in streams:
+            assert not stream.samples[-1].error, f"{stream.name} did not recover after the reloads"
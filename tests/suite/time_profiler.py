@@ -0,0 +1,336 @@
+"""Describe a pytest plugin that shows where the wall-clock time of the tests goes."""
+
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+import requests
+from kubernetes.client import ApiClient
+
+from settings import PROJECT_ROOT
+
+FIXED_SLEEP = "fixed sleep"
+CONDITION_WAIT = "condition wait"
+API_LATENCY = "API latency"
+TRAFFIC = "traffic"
+IDLE = "idle"
+CATEGORIES = [FIXED_SLEEP, CONDITION_WAIT, API_LATENCY, TRAFFIC]
+# the helpers that wait, a wait for a condition unless listed in FIXED_SLEEP_FUNCTIONS
+WAIT_FUNCTIONS = {
+    "suite.resources_utils": [
+        "scale_deployment",
+        "restart_ingress_controller",
+        "wait_until_all_pods_are_ready",
+        "wait_for_public_ip",
+        "ensure_item_removal",
+        "wait_before_test",
+        "wait_for_event_increment",
+        "wait_until_ingress_controller_rolled_out",
+        "ensure_connection",
+        "ensure_response_from_backend",
+        "get_service_endpoint",
+        "wait_for_reload_metrics",
+    ],
+    "suite.custom_assertions": ["wait_for_event_count_increases", "wait_and_assert_status_code"],
+    "suite.nginx_api_utils": ["wait_for_condition"],
+    "suite.custom_resources_utils": ["wait_until_crd_established", "delete_custom_objects"],
+}
+FIXED_SLEEP_FUNCTIONS = ["wait_before_test"]
+OUTPUT_DIR = f"{PROJECT_ROOT}/time_profile"
+
+
+class TimeProfiler:
+    """
+    Attribute the wall-clock time of the tests to categories.
+
+    The time of nested tracked calls goes to the innermost one only: an API call made from a polling loop
+    is API latency, the rest of the loop is a condition wait. A sleep is a fixed sleep only if it is not
+    a part of another tracked call, e.g. the sleeps of a polling loop belong to the condition wait.
+    Only the main thread is tracked.
+
+    Attributes:
+        totals (dict): category -> seconds spent so far
+        stack ([]): the tracked calls in progress, [category, time the call was (re)started]
+        events ([]): Chrome trace events
+        tests (dict): nodeid -> phase -> breakdown
+        fixtures (dict): fixture name -> setup|teardown -> summed breakdown
+    """
+
+    def __init__(self):
+        self.totals = dict.fromkeys(CATEGORIES, 0.0)
+        self.stack = []
+        self.events = []
+        self.tests = {}
+        self.fixtures = {}
+        self.origin = time.perf_counter()
+        self.patched = []
+        self.teardown_starts = {}
+
+    @contextmanager
+    def track(self, category, name):
+        """
+        Track a call, its time goes to the category unless a nested tracked call takes it.
+
+        :param category: one of CATEGORIES
+        :param name: the name of the call in the trace
+        :return:
+        """
+        if threading.current_thread() is not threading.main_thread():
+            yield
+            return
+        start = time.perf_counter()
+        if self.stack:
+            self.totals[self.stack[-1][0]] += start - self.stack[-1][1]
+        self.stack.append([category, start])
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.totals[category] += end - self.stack.pop()[1]
+            if self.stack:
+                self.stack[-1][1] = end
+            self.add_event(name, category, start, end)
+
+    def snapshot(self) -> dict:
+        """
+        Get the category totals including the call in progress.
+
+        :return: dict
+        """
+        totals = dict(self.totals)
+        if self.stack:
+            totals[self.stack[-1][0]] += time.perf_counter() - self.stack[-1][1]
+        return totals
+
+    @staticmethod
+    def breakdown(before, after, duration) -> dict:
+        """
+        Get the time spent by category between two snapshots, the time nothing was tracked is idle.
+
+        :param before: a snapshot
+        :param after: a snapshot
+        :param duration: seconds between the snapshots
+        :return: dict
+        """
+        result = {category: after[category] - before[category] for category in CATEGORIES}
+        result[IDLE] = max(duration - sum(result.values()), 0.0)
+        result["total"] = duration
+        return result
+
+    def add_event(self, name, category, start, end) -> None:
+        self.events.append(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": round((start - self.origin) * 1e6),
+                "dur": round((end - start) * 1e6),
+                "pid": os.getpid(),
+                "tid": os.environ.get("PYTEST_XDIST_WORKER", "main"),
+            }
+        )
+
+    @contextmanager
+    def span(self, name, category):
+        """
+        Measure a test phase or a fixture.
+
+        :param name: the name in the trace
+        :param category: the category in the trace
+        :return: a dict that gets the breakdown of the span on exit
+        """
+        result = {}
+        before, start = self.snapshot(), time.perf_counter()
+        try:
+            yield result
+        finally:
+            end = time.perf_counter()
+            result.update(self.breakdown(before, self.snapshot(), end - start))
+            self.add_event(name, category, start, end)
+
+    def add_fixture_breakdown(self, name, phase, breakdown) -> None:
+        summary = self.fixtures.setdefault(name, {}).setdefault(phase, {"count": 0})
+        summary["count"] += 1
+        for key, value in breakdown.items():
+            summary[key] = summary.get(key, 0.0) + value
+
+    def wrap(self, func, category):
+        """
+        Get a wrapper that tracks the calls of a function.
+
+        :param func: a function
+        :param category: one of CATEGORIES
+        :return: function
+        """
+        profiler = self
+
+        def wrapper(*args, **kwargs):
+            if category == FIXED_SLEEP and profiler.stack:
+                return func(*args, **kwargs)
+            with profiler.track(category, func.__name__):
+                return func(*args, **kwargs)
+
+        wrapper.__wrapped__ = func
+        wrapper.__name__ = func.__name__
+        return wrapper
+
+    def patch(self, owner, attr, wrapper) -> None:
+        self.patched.append((owner, attr, getattr(owner, attr)))
+        setattr(owner, attr, wrapper)
+
+    def install(self) -> None:
+        """
+        Wrap the sleeps, the wait helpers, the kubernetes client and the requests library.
+
+        The helpers are replaced in every suite module that imported them.
+
+        :return:
+        """
+        profiler = self
+        originals = {}
+        for module_name, names in WAIT_FUNCTIONS.items():
+            module = sys.modules.get(module_name)
+            if module is None:
+                continue
+            for name in names:
+                category = FIXED_SLEEP if name in FIXED_SLEEP_FUNCTIONS else CONDITION_WAIT
+                originals[getattr(module, name)] = self.wrap(getattr(module, name), category)
+        for module in list(sys.modules.values()):
+            module_name = getattr(module, "__name__", "")
+            if not (module_name.startswith("suite.") or module_name == "conftest"):
+                continue
+            for name, value in list(vars(module).items()):
+                if inspect.isfunction(value) and value in originals:
+                    self.patch(module, name, originals[value])
+
+        self.patch(time, "sleep", self.wrap(time.sleep, FIXED_SLEEP))
+
+        call_api = ApiClient.call_api
+
+        def traced_call_api(client, resource_path, method, *args, **kwargs):
+            with profiler.track(API_LATENCY, f"{method} {resource_path}"):
+                return call_api(client, resource_path, method, *args, **kwargs)
+
+        self.patch(ApiClient, "call_api", traced_call_api)
+
+        request = requests.Session.request
+
+        def traced_request(session, method, url, *args, **kwargs):
+            with profiler.track(TRAFFIC, f"{method} {url}"):
+                return request(session, method, url, *args, **kwargs)
+
+        self.patch(requests.Session, "request", traced_request)
+
+    def uninstall(self) -> None:
+        for owner, attr, original in reversed(self.patched):
+            setattr(owner, attr, original)
+        self.patched = []
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_finish(self, session) -> None:
+        # the test modules are imported by now, their bindings of the helpers can be replaced
+        self.install()
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_setup(self, item):
+        with self.span(f"{item.nodeid} setup", "test") as result:
+            yield
+        self.tests.setdefault(item.nodeid, {})["setup"] = result
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item):
+        with self.span(f"{item.nodeid} call", "test") as result:
+            yield
+        self.tests.setdefault(item.nodeid, {})["call"] = result
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_teardown(self, item):
+        with self.span(f"{item.nodeid} teardown", "test") as result:
+            yield
+        self.tests.setdefault(item.nodeid, {})["teardown"] = result
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_fixture_setup(self, fixturedef, request):
+        with self.span(f"{fixturedef.argname} setup", "fixture") as result:
+            outcome = yield
+        self.add_fixture_breakdown(fixturedef.argname, "setup", result)
+        if outcome.excinfo is None:
+            # the finalizers run in the reverse order, this one runs before the ones of the fixture
+            fixturedef.addfinalizer(lambda: self.start_fixture_teardown(fixturedef))
+
+    def start_fixture_teardown(self, fixturedef) -> None:
+        self.teardown_starts[fixturedef] = (self.snapshot(), time.perf_counter())
+
+    def pytest_fixture_post_finalizer(self, fixturedef, request) -> None:
+        if fixturedef not in self.teardown_starts:
+            return
+        before, start = self.teardown_starts.pop(fixturedef)
+        end = time.perf_counter()
+        self.add_fixture_breakdown(
+            fixturedef.argname, "teardown", self.breakdown(before, self.snapshot(), end - start)
+        )
+        self.add_event(f"{fixturedef.argname} teardown", "fixture", start, end)
+
+    def pytest_sessionfinish(self, session) -> None:
+        self.uninstall()
+        worker = os.environ.get("PYTEST_XDIST_WORKER", "")
+        suffix = f"-{worker}" if worker else ""
+        if not os.path.isdir(OUTPUT_DIR):
+            os.makedirs(OUTPUT_DIR, exist_ok=True)
+        with open(f"{OUTPUT_DIR}/trace{suffix}.json", "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+        with open(f"{OUTPUT_DIR}/summary{suffix}.txt", "w") as f:
+            f.write("\n".join(self.format_summary()) + "\n")
+
+    def pytest_terminal_summary(self, terminalreporter) -> None:
+        terminalreporter.section("wall-clock profile")
+        for line in self.format_summary(limit=20):
+            terminalreporter.write_line(line)
+        terminalreporter.write_line(f"Full summary and Chrome trace (chrome://tracing) are in {OUTPUT_DIR}")
+
+    def format_summary(self, limit=None) -> []:
+        """
+        Format the totals, the tests and the fixtures as tables sorted by the total time.
+
+        The columns are separated by whitespace, so the tables can be re-sorted with 'sort -k'.
+
+        :param limit: the max number of rows in a table
+        :return: [str]
+        """
+        columns = CATEGORIES + [IDLE, "total"]
+        tests = {}
+        for nodeid, phases in self.tests.items():
+            tests[nodeid] = {key: sum(phase.get(key, 0.0) for phase in phases.values()) for key in columns}
+        fixtures = {}
+        for name, phases in self.fixtures.items():
+            for phase, summary in phases.items():
+                fixtures[f"{name}[{phase}]x{summary['count']}"] = summary
+        totals = {key: sum(test[key] for test in tests.values()) for key in columns}
+
+        def table(title, rows):
+            header = f"{'seconds':>9}" + "".join(f"{key.replace(' ', '_'):>16}" for key in columns[:-1])
+            lines = [f"--- {title} ---", f"{header}  name"]
+            ordered = sorted(rows.items(), key=lambda row: row[1]["total"], reverse=True)
+            for name, row in ordered[:limit]:
+                lines.append(
+                    f"{row['total']:9.1f}" + "".join(f"{row.get(key, 0.0):16.1f}" for key in columns[:-1]) + f"  {name}"
+                )
+            return lines
+
+        return table("totals", {"all tests": totals}) + table("tests", tests) + table("fixtures", fixtures)
+
+
+def pytest_configure(config) -> None:
+    """
+    Register the profiler if it is enabled with the '--time-profile' cli argument.
+
+    :param config: pytest config
+    :return:
+    """
+    if config.getoption("--time-profile", "no") == "yes":
+        config.pluginmanager.register(TimeProfiler(), "time_profiler")
@@ -0,0 +1,165 @@
+"""Describe methods to measure the TLS handshakes and the certificate selection by SNI of the Ingress Controller."""
+
+import itertools
+import ssl
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import OpenSSL
+
+from suite.ssl_utils import create_client_context, tls_handshake
+from suite.stats_utils import get_percentile
+
+
+class TlsHandshakeResult:
+    """
+    Encapsulate the result of a TLS handshake.
+
+    Attributes:
+        host (str): SNI
+        connect_ms (float): time of the TCP connect
+        handshake_ms (float): time of the TLS handshake
+        resumed (bool): the session was resumed
+        subject_cn (str): CN of the served certificate
+        version (str): e.g. 'TLSv1.3'
+        error (str): the error or an empty string
+    """
+
+    def __init__(self, host, connect_ms=0.0, handshake_ms=0.0, resumed=False, subject_cn="", version="", error=""):
+        self.host = host
+        self.connect_ms = connect_ms
+        self.handshake_ms = handshake_ms
+        self.resumed = resumed
+        self.subject_cn = subject_cn
+        self.version = version
+        self.error = error
+
+
+class TlsBenchmarkReport:
+    """
+    Encapsulate the results of a TLS handshake run.
+
+    Attributes:
+        results ([TlsHandshakeResult]):
+        duration (float): seconds
+    """
+
+    def __init__(self, results, duration):
+        self.results = results
+        self.duration = duration
+
+    @property
+    def errors(self) -> Counter:
+        return Counter(result.error for result in self.results if result.error)
+
+    @property
+    def handshakes_per_sec(self) -> float:
+        completed = sum(1 for result in self.results if not result.error)
+        return completed / self.duration if self.duration else 0.0
+
+    @property
+    def resumption_rate(self) -> float:
+        completed = [result for result in self.results if not result.error]
+        if not completed:
+            return 0.0
+        return sum(1 for result in completed if result.resumed) / len(completed)
+
+    def handshake_ms(self, percentile, resumed=None) -> float:
+        """
+        Get a percentile of the handshake latency.
+
+        :param percentile: 0-100
+        :param resumed: True or False for the resumed or full handshakes only, None for all of them
+        :return: float
+        """
+        return get_percentile(
+            [
+                result.handshake_ms
+                for result in self.results
+                if not result.error and (resumed is None or result.resumed == resumed)
+            ],
+            percentile,
+        )
+
+    def mismatches(self, expected) -> {}:
+        """
+        Get the hosts that were served an unexpected certificate.
+
+        :param expected: host -> expected CN
+        :return: host -> served CN or the error
+        """
+        return {
+            result.host: result.error or result.subject_cn
+            for result in self.results
+            if result.host in expected and (result.error or result.subject_cn != expected[result.host])
+        }
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.results)} handshakes in {self.duration:.2f}s ({self.handshakes_per_sec:.1f}/s), "
+            f"errors: {dict(self.errors)}, resumed {self.resumption_rate:.1%}, "
+            f"full p50={self.handshake_ms(50, False):.1f}ms p99={self.handshake_ms(99, False):.1f}ms, "
+            f"resumed p50={self.handshake_ms(50, True):.1f}ms p99={self.handshake_ms(99, True):.1f}ms"
+        )
+
+
+def run_tls_handshakes(ip_address, port, hosts, handshakes=500, concurrency=20, resume=False, tickets=True,
+                       max_version=None, timeout=10) -> TlsBenchmarkReport:
+    """
+    Make TLS handshakes with bounded concurrency, cycling through the SNI hosts.
+
+    With resume, one full handshake per host gets a session first, it is not in the report,
+    and the measured handshakes resume it.
+
+    :param ip_address:
+    :param port: e.g. port_ssl of the public endpoint
+    :param hosts: [SNI]
+    :param handshakes: number of measured handshakes
+    :param concurrency: number of parallel connections
+    :param resume: resume the sessions
+    :param tickets: resume with session tickets, otherwise with session IDs
+    :param max_version: ssl.TLSVersion, the highest version to negotiate
+    :param timeout: seconds for the connect and the handshake
+    :return: TlsBenchmarkReport
+    """
+    mode = ("resumed with " + ("tickets" if tickets else "session IDs")) if resume else "full"
+    print(f"Make {handshakes} {mode} TLS handshakes with {ip_address}:{port} for {len(hosts)} hosts "
+          f"({concurrency} at a time)")
+    context = create_client_context(tickets, max_version)
+    sessions = {}
+    subjects = {}
+    lock = threading.Lock()
+
+    def get_subject_cn(der_cert):
+        # most hosts share a certificate, parse each one once
+        with lock:
+            if der_cert not in subjects:
+                x509 = OpenSSL.crypto.load_certificate(OpenSSL.crypto.FILETYPE_ASN1, der_cert)
+                subjects[der_cert] = x509.get_subject().CN or ""
+            return subjects[der_cert]
+
+    def handshake(host, session=None, read_ticket=False):
+        try:
+            res = tls_handshake(ip_address, host, port, context, session, read_ticket, timeout)
+        except (OSError, ssl.SSLError) as ex:
+            return TlsHandshakeResult(host, error=f"{type(ex).__name__}: {ex}"), None
+        result = TlsHandshakeResult(host, res["connect_ms"], res["handshake_ms"], res["resumed"],
+                                    get_subject_cn(res["der_cert"]), res["version"])
+        return result, res["session"]
+
+    def prime(host):
+        _, session = handshake(host, read_ticket=True)
+        sessions[host] = session
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        if resume:
+            list(executor.map(prime, hosts))
+        start = time.perf_counter()
+        hosts_cycle = itertools.islice(itertools.cycle(hosts), handshakes)
+        results = list(executor.map(lambda host: handshake(host, sessions.get(host))[0], hosts_cycle))
+        duration = time.perf_counter() - start
+    report = TlsBenchmarkReport(results, duration)
+    print(report.summary())
+    return report
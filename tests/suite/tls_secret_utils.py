@@ -0,0 +1,344 @@
+"""Describe methods to generate, create and rotate many unique TLS secrets."""
+
+import base64
+import random
+import ssl
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from kubernetes.client import CoreV1Api
+from kubernetes.client.rest import ApiException
+from OpenSSL import crypto
+
+from suite.resources_utils import get_reload_count
+from suite.ssl_utils import create_client_context, tls_handshake
+from suite.stats_utils import get_percentile
+from suite.worker_utils import isolate_manifest
+
+
+class CertificateAuthority:
+    """
+    Encapsulate the CA that signs the generated host certificates.
+
+    Attributes:
+        cert_pem (bytes):
+        key_pem (bytes):
+    """
+
+    def __init__(self, cert_pem, key_pem):
+        self.cert_pem = cert_pem
+        self.key_pem = key_pem
+
+
+class HostCertificate:
+    """
+    Encapsulate a generated host certificate.
+
+    Attributes:
+        host (str): CN and the DNS name of the certificate
+        cert_pem (bytes):
+        key_pem (bytes):
+    """
+
+    def __init__(self, host, cert_pem, key_pem):
+        self.host = host
+        self.cert_pem = cert_pem
+        self.key_pem = key_pem
+
+    @property
+    def der_cert(self) -> bytes:
+        return ssl.PEM_cert_to_DER_cert(self.cert_pem.decode())
+
+
+class RotationResult:
+    """
+    Encapsulate the result of a secret rotation.
+
+    Attributes:
+        name (str): secret name
+        host (str):
+        propagation_s (float): time from the replace call until the IC served the new certificate
+        error (str): the error or an empty string
+    """
+
+    def __init__(self, name, host, propagation_s=0.0, error=""):
+        self.name = name
+        self.host = host
+        self.propagation_s = propagation_s
+        self.error = error
+
+
+class RotationReport:
+    """
+    Encapsulate the results of a rotation run.
+
+    Attributes:
+        results ([RotationResult]):
+        reloads (int): the NGINX reloads during the run or None without the metrics
+        duration (float): seconds
+    """
+
+    def __init__(self, results, reloads, duration):
+        self.results = results
+        self.reloads = reloads
+        self.duration = duration
+
+    @property
+    def not_propagated(self) -> {}:
+        return {result.name: result.error for result in self.results if result.error}
+
+    def propagation_s(self, percentile) -> float:
+        """
+        Get a percentile of the time until the new certificates were served.
+
+        :param percentile: 0-100
+        :return: float
+        """
+        return get_percentile([result.propagation_s for result in self.results if not result.error], percentile)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.results)} secrets rotated in {self.duration:.2f}s, {self.reloads} reloads, "
+            f"{len(self.not_propagated)} not served, propagation p50={self.propagation_s(50):.2f}s "
+            f"p99={self.propagation_s(99):.2f}s max={self.propagation_s(100):.2f}s"
+        )
+
+
+def generate_key(bits) -> bytes:
+    key = crypto.PKey()
+    key.generate_key(crypto.TYPE_RSA, bits)
+    return crypto.dump_privatekey(crypto.FILETYPE_PEM, key)
+
+
+def create_certificate_authority(cn="NGINX Ingress Test CA", bits=2048) -> CertificateAuthority:
+    """
+    Create a self-signed CA.
+
+    :param cn: common name
+    :param bits: RSA key size
+    :return: CertificateAuthority
+    """
+    key = crypto.load_privatekey(crypto.FILETYPE_PEM, generate_key(bits))
+    cert = crypto.X509()
+    cert.set_version(2)
+    cert.set_serial_number(random.getrandbits(63))
+    cert.get_subject().CN = cn
+    cert.gmtime_adj_notBefore(-3600)
+    cert.gmtime_adj_notAfter(30 * 24 * 3600)
+    cert.set_issuer(cert.get_subject())
+    cert.set_pubkey(key)
+    cert.add_extensions([crypto.X509Extension(b"basicConstraints", True, b"CA:TRUE")])
+    cert.sign(key, "sha256")
+    return CertificateAuthority(
+        crypto.dump_certificate(crypto.FILETYPE_PEM, cert), crypto.dump_privatekey(crypto.FILETYPE_PEM, key)
+    )
+
+
+def sign_host_certificates(ca_cert_pem, ca_key_pem, hosts_and_keys) -> [bytes]:
+    """
+    Sign a chunk of host certificates, it runs in a worker process, so everything is passed as PEM.
+
+    :param ca_cert_pem:
+    :param ca_key_pem:
+    :param hosts_and_keys: [(host, key PEM)]
+    :return: [cert PEM]
+    """
+    ca_cert = crypto.load_certificate(crypto.FILETYPE_PEM, ca_cert_pem)
+    ca_key = crypto.load_privatekey(crypto.FILETYPE_PEM, ca_key_pem)
+    certs = []
+    for host, key_pem in hosts_and_keys:
+        cert = crypto.X509()
+        cert.set_version(2)
+        # the serials must differ, or a rotated certificate would look like the old one
+        cert.set_serial_number(random.getrandbits(63))
+        cert.get_subject().CN = host
+        cert.gmtime_adj_notBefore(-3600)
+        cert.gmtime_adj_notAfter(30 * 24 * 3600)
+        cert.set_issuer(ca_cert.get_subject())
+        cert.set_pubkey(crypto.load_privatekey(crypto.FILETYPE_PEM, key_pem))
+        cert.add_extensions([crypto.X509Extension(b"subjectAltName", False, f"DNS:{host}".encode())])
+        cert.sign(ca_key, "sha256")
+        certs.append(crypto.dump_certificate(crypto.FILETYPE_PEM, cert))
+    return certs
+
+
+def generate_key_pool(size, bits=2048, processes=None) -> [bytes]:
+    """
+    Generate RSA keys in parallel, the key generation is the slowest part of making a certificate.
+
+    :param size: number of keys
+    :param bits: RSA key size
+    :param processes: number of worker processes, the number of CPUs by default
+    :return: [key PEM]
+    """
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        keys = list(executor.map(generate_key, [bits] * size, chunksize=max(1, size // 64)))
+    print(f"Generated {size} {bits}-bit keys in {time.perf_counter() - start:.2f}s")
+    return keys
+
+
+def generate_host_certificates(ca, hosts, key_pool=None, bits=2048, processes=None,
+                               chunk_size=100) -> [HostCertificate]:
+    """
+    Generate a unique certificate signed by the CA for every host.
+
+    The keys are taken from the pool in turn, without a pool every host gets its own key.
+
+    :param ca: CertificateAuthority
+    :param hosts: [host]
+    :param key_pool: [key PEM]
+    :param bits: RSA key size of the generated keys
+    :param processes: number of worker processes, the number of CPUs by default
+    :param chunk_size: certificates a worker signs at a time
+    :return: [HostCertificate]
+    """
+    key_pool = key_pool or generate_key_pool(len(hosts), bits, processes)
+    hosts_and_keys = [(host, key_pool[i % len(key_pool)]) for i, host in enumerate(hosts)]
+    chunks = [hosts_and_keys[i:i + chunk_size] for i in range(0, len(hosts_and_keys), chunk_size)]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        signed = executor.map(
+            sign_host_certificates, [ca.cert_pem] * len(chunks), [ca.key_pem] * len(chunks), chunks
+        )
+        certs = [cert for chunk in signed for cert in chunk]
+    print(f"Signed {len(hosts)} certificates in {time.perf_counter() - start:.2f}s")
+    return [HostCertificate(host, cert, key) for (host, key), cert in zip(hosts_and_keys, certs)]
+
+
+def build_tls_secret(name, certificate) -> dict:
+    """
+    Build a kubernetes.io/tls secret.
+
+    :param name: secret name
+    :param certificate: HostCertificate
+    :return: dict
+    """
+    return {
+        "apiVersion": "v1",
+        "kind": "Secret",
+        "metadata": {"name": name},
+        "type": "kubernetes.io/tls",
+        "data": {
+            "tls.crt": base64.b64encode(certificate.cert_pem).decode(),
+            "tls.key": base64.b64encode(certificate.key_pem).decode(),
+        },
+    }
+
+
+def create_secrets(v1: CoreV1Api, namespace, bodies, concurrency=20) -> [str]:
+    """
+    Create secrets with parallel API calls.
+
+    :param v1: CoreV1Api
+    :param namespace: namespace
+    :param bodies: [dict]
+    :param concurrency: number of parallel calls
+    :return: [str]
+    """
+    print(f"Create {len(bodies)} secrets ({concurrency} at a time):")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda body: v1.create_namespaced_secret(namespace, isolate_manifest(body)), bodies))
+    print(f"Secrets created in {time.perf_counter() - start:.2f}s")
+    return [body["metadata"]["name"] for body in bodies]
+
+
+def delete_secrets(v1: CoreV1Api, namespace, names, concurrency=20) -> None:
+    """
+    Delete secrets with parallel API calls, the missing ones are skipped.
+
+    :param v1: CoreV1Api
+    :param namespace: namespace
+    :param names: [str]
+    :param concurrency: number of parallel calls
+    :return:
+    """
+    print(f"Delete {len(names)} secrets ({concurrency} at a time)")
+
+    def delete(name):
+        try:
+            v1.delete_namespaced_secret(name, namespace)
+        except ApiException as ex:
+            if ex.status != 404:
+                raise
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(delete, names))
+
+
+def wait_for_certificate(ip_address, port, host, der_cert, timeout=60, interval=0.2) -> bool:
+    """
+    Wait until the IC serves the certificate for the host.
+
+    :param ip_address:
+    :param port: e.g. port_ssl of the public endpoint
+    :param host: SNI
+    :param der_cert: the expected certificate
+    :param timeout: seconds
+    :param interval: seconds between the handshakes
+    :return: bool
+    """
+    context = create_client_context()
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if tls_handshake(ip_address, host, port, context)["der_cert"] == der_cert:
+                return True
+        except (OSError, ssl.SSLError):
+            pass
+        time.sleep(interval)
+    return False
+
+
+def rotate_secrets(v1: CoreV1Api, namespace, certificates, ca, ip_address, port, rate=5.0, metrics_url=None,
+                   key_pool=None, processes=None, concurrency=50, timeout=60) -> RotationReport:
+    """
+    Replace the secrets with new certificates at a controlled rate and wait until the IC serves every one of them.
+
+    The new certificates are generated before the run, so only the replace calls are paced.
+
+    :param v1: CoreV1Api
+    :param namespace: namespace
+    :param certificates: secret name -> the HostCertificate it has now
+    :param ca: CertificateAuthority
+    :param ip_address: public IP of the IC
+    :param port: e.g. port_ssl of the public endpoint
+    :param rate: replaced secrets per second
+    :param metrics_url: IC /metrics url to count the reloads
+    :param key_pool: [key PEM] for the new certificates
+    :param processes: number of worker processes of the certificate generation
+    :param concurrency: max number of secrets waited for at a time
+    :param timeout: seconds to wait for each new certificate
+    :return: RotationReport
+    """
+    hosts = [certificate.host for certificate in certificates.values()]
+    new_certificates = dict(
+        zip(certificates, generate_host_certificates(ca, hosts, key_pool, processes=processes))
+    )
+    reloads_before = get_reload_count(metrics_url) if metrics_url else None
+    print(f"Rotate {len(certificates)} secrets at {rate}/s")
+    semaphore = threading.BoundedSemaphore(concurrency)
+
+    def wait_for_rotation(name, certificate, replaced_at):
+        try:
+            if wait_for_certificate(ip_address, port, certificate.host, certificate.der_cert, timeout):
+                return RotationResult(name, certificate.host, time.perf_counter() - replaced_at)
+            return RotationResult(name, certificate.host, error=f"the new certificate was not served in {timeout}s")
+        finally:
+            semaphore.release()
+
+    start = time.perf_counter()
+    futures = []
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for i, (name, certificate) in enumerate(new_certificates.items()):
+            time.sleep(max(0.0, start + i / rate - time.perf_counter()))
+            semaphore.acquire()
+            v1.replace_namespaced_secret(name, namespace, isolate_manifest(build_tls_secret(name, certificate)))
+            futures.append(executor.submit(wait_for_rotation, name, certificate, time.perf_counter()))
+        results = [future.result() for future in futures]
+    reloads = get_reload_count(metrics_url) - reloads_before if metrics_url else None
+    report = RotationReport(results, reloads, time.perf_counter() - start)
+    print(report.summary())
+    return report
@@ -0,0 +1,147 @@
+"""Describe methods to send concurrent UDP datagrams to the UDP test server behind a TransportServer."""
+
+import asyncio
+import time
+from collections import Counter
+
+from suite.stats_utils import get_percentile
+
+
+class UdpRequestResult:
+    """
+    Encapsulate the result of a datagram sent to the UDP test server.
+
+    Attributes:
+        endpoint (str): the address of the backend pod the test server returned
+        rtt_ms (float): time from sending the datagram to receiving the reply
+        error (str): 'timeout', a socket error or an empty string if the reply came
+    """
+
+    def __init__(self, endpoint="", rtt_ms=0.0, error=""):
+        self.endpoint = endpoint
+        self.rtt_ms = rtt_ms
+        self.error = error
+
+
+class UdpLoadReport:
+    """
+    Encapsulate the results of a UDP load run.
+
+    Attributes:
+        results ([UdpRequestResult]):
+        duration (float): seconds
+    """
+
+    def __init__(self, results, duration):
+        self.results = results
+        self.duration = duration
+
+    @property
+    def distribution(self) -> Counter:
+        return Counter(result.endpoint for result in self.results if not result.error)
+
+    @property
+    def loss_rate(self) -> float:
+        if not self.results:
+            return 0.0
+        return sum(1 for result in self.results if result.error) / len(self.results)
+
+    @property
+    def errors(self) -> Counter:
+        return Counter(result.error for result in self.results if result.error)
+
+    def rtt_ms(self, percentile) -> float:
+        """
+        Get a percentile of the round-trip time of the answered datagrams.
+
+        :param percentile: 0-100
+        :return: float
+        """
+        return get_percentile([result.rtt_ms for result in self.results if not result.error], percentile)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.results)} datagrams in {self.duration:.2f}s, loss {self.loss_rate:.1%} {dict(self.errors)}, "
+            f"rtt p50={self.rtt_ms(50):.1f}ms p99={self.rtt_ms(99):.1f}ms, distribution: {dict(self.distribution)}"
+        )
+
+
+class UdpRequestProtocol(asyncio.DatagramProtocol):
+    """
+    Resolve a future with the first reply that comes to the socket.
+
+    Attributes:
+        reply (asyncio.Future): (data, receive time) or an exception
+    """
+
+    def __init__(self, reply):
+        self.reply = reply
+
+    def datagram_received(self, data, addr) -> None:
+        if not self.reply.done():
+            self.reply.set_result((data, time.perf_counter()))
+
+    def error_received(self, exc) -> None:
+        if not self.reply.done():
+            self.reply.set_exception(exc)
+
+
+async def send_datagram(host, port, payload, timeout) -> UdpRequestResult:
+    """
+    Send a datagram from a new source port and wait for the reply.
+
+    :param host: host
+    :param port: port
+    :param payload: datagram
+    :param timeout: seconds to wait for the reply
+    :return: UdpRequestResult
+    """
+    loop = asyncio.get_running_loop()
+    reply = loop.create_future()
+    transport, _ = await loop.create_datagram_endpoint(lambda: UdpRequestProtocol(reply), remote_addr=(host, port))
+    try:
+        start = time.perf_counter()
+        transport.sendto(payload)
+        data, received = await asyncio.wait_for(reply, timeout)
+        return UdpRequestResult(data.decode(), (received - start) * 1000)
+    except asyncio.TimeoutError:
+        return UdpRequestResult(error="timeout")
+    except OSError as ex:
+        return UdpRequestResult(error=type(ex).__name__)
+    finally:
+        transport.close()
+
+
+async def run_udp_load_async(host, port, datagrams, concurrency, payload, timeout, rate) -> UdpLoadReport:
+    semaphore = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+
+    async def send_one(index):
+        if rate:
+            await asyncio.sleep(index / rate)
+        async with semaphore:
+            return await send_datagram(host, port, payload, timeout)
+
+    results = await asyncio.gather(*(send_one(i) for i in range(datagrams)))
+    return UdpLoadReport(list(results), time.perf_counter() - start)
+
+
+def run_udp_load(host, port, datagrams=300, concurrency=100, payload=b"ping", timeout=2.0, rate=None) -> UdpLoadReport:
+    """
+    Send datagrams concurrently, each from its own source port, and correlate the replies by the source port.
+
+    The lost datagrams time out together, so a run takes about one timeout instead of one per datagram.
+
+    :param host: host
+    :param port: port, e.g. udp_server_port of the public endpoint
+    :param datagrams: number of datagrams
+    :param concurrency: max number of datagrams waiting for a reply
+    :param payload: datagram
+    :param timeout: seconds to wait for a reply
+    :param rate: datagrams per second or None to send them as fast as the concurrency allows
+    :return: UdpLoadReport
+    """
+    print(f"Send {datagrams} UDP datagrams to {host}:{port} ({concurrency} at a time)")
+    report = asyncio.run(run_udp_load_async(host, port, datagrams, concurrency, payload, timeout, rate))
+    print(report.summary())
+    return report
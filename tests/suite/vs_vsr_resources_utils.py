@@ -7,6 +7,7 @@ from kubernetes.client import CoreV1Api, CustomObjectsApi
 from kubernetes.client.rest import ApiException
 from suite.custom_resources_utils import read_custom_resource
 from suite.resources_utils import ensure_item_removal, get_file_contents
+from suite.worker_utils import isolate_manifest
 
 
 def read_vs(custom_objects: CustomObjectsApi, namespace, name) -> object:
@@ -53,7 +54,7 @@ def create_virtual_server(custom_objects: CustomObjectsApi, vs, namespace) -> st
     print("Create a VirtualServer:")
     try:
         custom_objects.create_namespaced_custom_object(
-            "k8s.nginx.org", "v1", namespace, "virtualservers", vs
+            "k8s.nginx.org", "v1", namespace, "virtualservers", isolate_manifest(vs)
         )
         print(f"VirtualServer created with name '{vs['metadata']['name']}'")
         return vs["metadata"]["name"]
@@ -107,7 +108,7 @@ def patch_virtual_server_from_yaml(
     try:
         print(f"Try to patch VirtualServer: {dep}")
         custom_objects.patch_namespaced_custom_object(
-            "k8s.nginx.org", "v1", namespace, "virtualservers", name, dep
+            "k8s.nginx.org", "v1", namespace, "virtualservers", name, isolate_manifest(dep)
         )
         print(f"VirtualServer updated with name '{dep['metadata']['name']}'")
     except ApiException:
@@ -150,7 +151,7 @@ def patch_virtual_server(custom_objects: CustomObjectsApi, name, namespace, body
     """
     print("Update a VirtualServer:")
     custom_objects.patch_namespaced_custom_object(
-        "k8s.nginx.org", "v1", namespace, "virtualservers", name, body
+        "k8s.nginx.org", "v1", namespace, "virtualservers", name, isolate_manifest(body)
     )
     print(f"VirtualServer updated with a name '{body['metadata']['name']}'")
     return body["metadata"]["name"]
@@ -174,7 +175,7 @@ def patch_v_s_route_from_yaml(
     try:
         print(f"Try to patch VirtualServerRoute: {dep}")
         custom_objects.patch_namespaced_custom_object(
-            "k8s.nginx.org", "v1", namespace, "virtualserverroutes", name, dep
+            "k8s.nginx.org", "v1", namespace, "virtualserverroutes", name, isolate_manifest(dep)
         )
         print(f"VirtualServerRoute updated with name '{dep['metadata']['name']}'")
     except ApiException:
@@ -230,7 +231,7 @@ def create_v_s_route(custom_objects: CustomObjectsApi, vsr, namespace) -> str:
     """
     print("Create a VirtualServerRoute:")
     custom_objects.create_namespaced_custom_object(
-        "k8s.nginx.org", "v1", namespace, "virtualserverroutes", vsr
+        "k8s.nginx.org", "v1", namespace, "virtualserverroutes", isolate_manifest(vsr)
     )
     print(f"VirtualServerRoute created with a name '{vsr['metadata']['name']}'")
     return vsr["metadata"]["name"]
@@ -248,7 +249,7 @@ def patch_v_s_route(custom_objects: CustomObjectsApi, name, namespace, body) ->
     """
     print("Update a VirtualServerRoute:")
     custom_objects.patch_namespaced_custom_object(
-        "k8s.nginx.org", "v1", namespace, "virtualserverroutes", name, body
+        "k8s.nginx.org", "v1", namespace, "virtualserverroutes", name, isolate_manifest(body)
     )
     print(f"VirtualServerRoute updated with a name '{body['metadata']['name']}'")
     return body["metadata"]["name"]
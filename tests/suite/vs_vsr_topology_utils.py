@@ -0,0 +1,410 @@
+"""Describe methods to generate VS/VSR routing topologies of any shape and measure what they cost the IC."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from kubernetes.client import CustomObjectsApi
+from kubernetes.client.rest import ApiException
+
+from settings import TEST_DATA
+from suite.resources_utils import (
+    create_namespace_with_name_from_yaml,
+    delete_namespace,
+    get_config_size,
+    get_first_pod_name,
+    get_reload_metrics,
+    restart_ingress_controller,
+    wait_for_reload_metrics,
+)
+from suite.status_tracker_utils import VALID, StatusTracker
+from suite.vs_vsr_resources_utils import create_v_s_route, create_virtual_server
+from suite.worker_utils import get_worker_name
+
+
+class TopologyShape:
+    """
+    Encapsulate the shape of a routing topology.
+
+    Attributes:
+        virtual_servers (int): number of the VSes
+        routes_per_vs (int): VSRs every VS delegates to
+        namespaces (int): the VSes and the VSRs are spread over them
+        subroutes_per_route (int): subroutes of every VSR
+        matches_per_subroute (int): header matches of every subroute
+        splits_per_subroute (int): traffic splits of the default action of every subroute, 1 for a plain pass
+    """
+
+    def __init__(self, virtual_servers=1, routes_per_vs=1, namespaces=1, subroutes_per_route=1,
+                 matches_per_subroute=0, splits_per_subroute=1):
+        self.virtual_servers = virtual_servers
+        self.routes_per_vs = routes_per_vs
+        self.namespaces = namespaces
+        self.subroutes_per_route = subroutes_per_route
+        self.matches_per_subroute = matches_per_subroute
+        self.splits_per_subroute = splits_per_subroute
+
+    @property
+    def name(self) -> str:
+        return (
+            f"vs={self.virtual_servers} vsr={self.routes_per_vs} ns={self.namespaces} "
+            f"sub={self.subroutes_per_route} match={self.matches_per_subroute} split={self.splits_per_subroute}"
+        )
+
+    @property
+    def total_vsr(self) -> int:
+        return self.virtual_servers * self.routes_per_vs
+
+    def with_dimension(self, dimension, value):
+        """
+        Copy the shape with one dimension changed.
+
+        :param dimension: the name of an attribute, e.g. routes_per_vs
+        :param value: int
+        :return: TopologyShape
+        """
+        shape = TopologyShape(**self.__dict__)
+        setattr(shape, dimension, value)
+        return shape
+
+
+def split_weights(count) -> [int]:
+    weights = [100 // count] * count
+    weights[0] += 100 - sum(weights)
+    return weights
+
+
+def build_subroute(path, shape) -> dict:
+    """
+    Build a subroute with the matches and the splits of the shape.
+
+    :param path: the path of the subroute
+    :param shape: TopologyShape
+    :return: dict
+    """
+    upstreams = max(1, shape.splits_per_subroute)
+    subroute = {"path": path}
+    if shape.splits_per_subroute > 1:
+        subroute["splits"] = [
+            {"weight": weight, "action": {"pass": f"backend-{i}"}}
+            for i, weight in enumerate(split_weights(shape.splits_per_subroute))
+        ]
+    else:
+        subroute["action"] = {"pass": "backend-0"}
+    if shape.matches_per_subroute:
+        subroute["matches"] = [
+            {
+                "conditions": [{"header": "x-version", "value": f"v{m}"}],
+                "action": {"pass": f"backend-{m % upstreams}"},
+            }
+            for m in range(shape.matches_per_subroute)
+        ]
+    return subroute
+
+
+def build_topology(shape, namespaces, service="backend1-svc") -> ([(str, dict)], [(str, dict)]):
+    """
+    Generate the VSes and the VSRs of a shape, VS i and its VSR j are placed in different namespaces round-robin.
+
+    :param shape: TopologyShape
+    :param namespaces: the names of shape.namespaces namespaces
+    :param service: the service of all the upstreams, it does not need to exist
+    :return: ([(namespace, VirtualServer)], [(namespace, VirtualServerRoute)])
+    """
+    virtual_servers = []
+    routes = []
+    upstreams = [
+        {"name": f"backend-{i}", "service": service, "port": 80} for i in range(max(1, shape.splits_per_subroute))
+    ]
+    for i in range(shape.virtual_servers):
+        vs_namespace = namespaces[i % len(namespaces)]
+        host = f"{get_worker_name(f'topology-{i}')}.example.com"
+        vs_routes = []
+        for j in range(shape.routes_per_vs):
+            vsr_namespace = namespaces[(i + j) % len(namespaces)]
+            name = f"vs-{i}-route-{j}"
+            routes.append((vsr_namespace, {
+                "apiVersion": "k8s.nginx.org/v1",
+                "kind": "VirtualServerRoute",
+                "metadata": {"name": name},
+                "spec": {
+                    "host": host,
+                    "upstreams": upstreams,
+                    "subroutes": [
+                        build_subroute(f"/route-{j}/sub-{k}", shape) for k in range(shape.subroutes_per_route)
+                    ],
+                },
+            }))
+            vs_routes.append({"path": f"/route-{j}", "route": f"{vsr_namespace}/{name}"})
+        virtual_servers.append((vs_namespace, {
+            "apiVersion": "k8s.nginx.org/v1",
+            "kind": "VirtualServer",
+            "metadata": {"name": f"topology-{i}"},
+            "spec": {"host": host, "routes": vs_routes},
+        }))
+    return virtual_servers, routes
+
+
+def create_topology_namespaces(v1, shape, prefix="topology", workers=16) -> [str]:
+    """
+    Create the namespaces of a shape concurrently.
+
+    :param v1: CoreV1Api
+    :param shape: TopologyShape
+    :param prefix: the prefix of the namespace names
+    :param workers: number of the concurrent API clients
+    :return: [str]
+    """
+    names = [get_worker_name(f"{prefix}-{k}") for k in range(shape.namespaces)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(
+            lambda name: create_namespace_with_name_from_yaml(v1, name, f"{TEST_DATA}/common/ns.yaml"), names
+        ))
+    return names
+
+
+def delete_topology(kube_apis, virtual_servers, routes, namespaces, workers=16) -> None:
+    """
+    Delete the objects of a topology and its namespaces concurrently.
+
+    :param kube_apis: client apis
+    :param virtual_servers: [(namespace, VirtualServer)]
+    :param routes: [(namespace, VirtualServerRoute)]
+    :param namespaces: [str]
+    :param workers: number of the concurrent API clients
+    :return:
+    """
+
+    def delete(plural, namespace, body):
+        try:
+            kube_apis.custom_objects.delete_namespaced_custom_object(
+                "k8s.nginx.org", "v1", namespace, plural, body["metadata"]["name"]
+            )
+        except ApiException as ex:
+            if ex.status != 404:
+                raise
+
+    print(f"Delete {len(virtual_servers)} VSes, {len(routes)} VSRs and {len(namespaces)} namespaces")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda item: delete("virtualservers", *item), virtual_servers))
+        list(executor.map(lambda item: delete("virtualserverroutes", *item), routes))
+        list(executor.map(lambda namespace: delete_namespace(kube_apis.v1, namespace), namespaces))
+
+
+def submit_topology(custom_objects: CustomObjectsApi, trackers, virtual_servers, routes, workers=16) -> float:
+    """
+    Create the VSRs and then the VSes concurrently, every object is marked in its tracker right before.
+
+    :param custom_objects: CustomObjectsApi
+    :param trackers: {plural: StatusTracker}
+    :param virtual_servers: [(namespace, VirtualServer)]
+    :param routes: [(namespace, VirtualServerRoute)]
+    :param workers: number of the concurrent API clients
+    :return: seconds it took to submit all the objects
+    """
+
+    def create_route(item):
+        namespace, body = item
+        trackers["virtualserverroutes"].mark(namespace, body["metadata"]["name"])
+        create_v_s_route(custom_objects, body, namespace)
+
+    def create_vs(item):
+        namespace, body = item
+        trackers["virtualservers"].mark(namespace, body["metadata"]["name"])
+        create_virtual_server(custom_objects, body, namespace)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(create_route, routes))
+        list(executor.map(create_vs, virtual_servers))
+    return time.perf_counter() - start
+
+
+class TopologyResult:
+    """
+    Encapsulate the cost of a topology.
+
+    Attributes:
+        shape (TopologyShape):
+        submit_s (float): seconds to submit all the objects
+        converge_s (float): seconds from the first API call until every VS and VSR was Valid
+        missing (int): the objects that were not Valid after the timeout
+        reloads (int):
+        reload_ms (float): the duration of the last reload
+        config_bytes (int): the size of the conf.d files of the IC
+        config_files (int):
+        startup_s (float): seconds until the IC pod was ready with the topology present, None if not measured
+        startup_reload_ms (float): the duration of the reload at the startup, None if not measured
+    """
+
+    def __init__(self, shape, submit_s, converge_s, missing, reloads, reload_ms, config_bytes, config_files,
+                 startup_s=None, startup_reload_ms=None):
+        self.shape = shape
+        self.submit_s = submit_s
+        self.converge_s = converge_s
+        self.missing = missing
+        self.reloads = reloads
+        self.reload_ms = reload_ms
+        self.config_bytes = config_bytes
+        self.config_files = config_files
+        self.startup_s = startup_s
+        self.startup_reload_ms = startup_reload_ms
+
+    @property
+    def generation_s(self) -> float:
+        """
+        Estimate the config generation time: the convergence without the time spent in the reloads.
+        """
+        return max(0.0, self.converge_s - self.reloads * self.reload_ms / 1000)
+
+
+def wait_for_topology(trackers, virtual_servers, routes, start, timeout=600) -> (float, int):
+    """
+    Wait until every VS and VSR of a topology is Valid.
+
+    :param trackers: {plural: StatusTracker}
+    :param virtual_servers: [(namespace, VirtualServer)]
+    :param routes: [(namespace, VirtualServerRoute)]
+    :param start: time.perf_counter() of the first API call
+    :param timeout: seconds
+    :return: (seconds from the start until the last one was Valid, number of the objects that were not)
+    """
+    last = start
+    missing = 0
+    for plural, items in [("virtualserverroutes", routes), ("virtualservers", virtual_servers)]:
+        for namespace, body in items:
+            change = trackers[plural].wait_for_state(
+                namespace, body["metadata"]["name"], VALID, max(0.0, start + timeout - time.perf_counter())
+            )
+            if change is None:
+                missing += 1
+            else:
+                last = max(last, change.observed_at)
+    return last - start, missing
+
+
+def measure_topology(kube_apis, shape, ic_namespace, ic_name, metrics_url, timeout=600, startup=False,
+                     prefix="topology") -> TopologyResult:
+    """
+    Generate and submit a topology, measure its cost and delete it.
+
+    :param kube_apis: client apis
+    :param shape: TopologyShape
+    :param ic_namespace: namespace of the IC
+    :param ic_name: name of the IC deployment
+    :param metrics_url: IC /metrics url
+    :param timeout: seconds to wait until the topology is Valid
+    :param startup: restart the IC with the topology present
+    :param prefix: the prefix of the namespace names
+    :return: TopologyResult
+    """
+    print(f"------------------------- Topology: {shape.name} -----------------------------------")
+    namespaces = create_topology_namespaces(kube_apis.v1, shape, prefix)
+    virtual_servers, routes = build_topology(shape, namespaces)
+    trackers = {
+        "virtualservers": StatusTracker(kube_apis.custom_objects, "virtualservers"),
+        "virtualserverroutes": StatusTracker(kube_apis.custom_objects, "virtualserverroutes"),
+    }
+    for tracker in trackers.values():
+        tracker.start()
+    try:
+        count, _ = get_reload_metrics(metrics_url)
+        start = time.perf_counter()
+        submit_s = submit_topology(kube_apis.custom_objects, trackers, virtual_servers, routes)
+        converge_s, missing = wait_for_topology(trackers, virtual_servers, routes, start, timeout)
+        current, reload_ms = get_reload_metrics(metrics_url)
+        pod_name = get_first_pod_name(kube_apis.v1, ic_namespace)
+        config_bytes, config_files = get_config_size(kube_apis.v1, pod_name, ic_namespace)
+        result = TopologyResult(
+            shape, submit_s, converge_s, missing, current - count, reload_ms, config_bytes, config_files
+        )
+        if startup:
+            result.startup_s = restart_ingress_controller(kube_apis.v1, kube_apis.apps_v1_api, ic_namespace, ic_name)
+            # the new pod may be Ready before its metrics show the reload at the startup
+            result.startup_reload_ms = wait_for_reload_metrics(metrics_url)[1]
+    finally:
+        for tracker in trackers.values():
+            tracker.stop()
+        delete_topology(kube_apis, virtual_servers, routes, namespaces)
+    print(
+        f"{shape.name}: Valid after {result.converge_s:.1f}s ({result.missing} missing), {result.reloads} reloads, "
+        f"last reload {result.reload_ms:.0f}ms, config {result.config_bytes} bytes in {result.config_files} files"
+    )
+    return result
+
+
+def run_topology_sweep(kube_apis, base, dimensions, ic_namespace, ic_name, metrics_url, timeout=600,
+                       startup=False) -> [TopologyResult]:
+    """
+    Measure the base shape and the shapes with one dimension grown at a time.
+
+    :param kube_apis: client apis
+    :param base: TopologyShape
+    :param dimensions: dimension -> [values], e.g. {'routes_per_vs': [5, 20]}
+    :param ic_namespace: namespace of the IC
+    :param ic_name: name of the IC deployment
+    :param metrics_url: IC /metrics url
+    :param timeout: seconds to wait until a topology is Valid
+    :param startup: restart the IC with every topology present
+    :return: [TopologyResult], the base first
+    """
+    results = [measure_topology(kube_apis, base, ic_namespace, ic_name, metrics_url, timeout, startup)]
+    for dimension, values in dimensions.items():
+        for value in values:
+            results.append(measure_topology(
+                kube_apis, base.with_dimension(dimension, value), ic_namespace, ic_name, metrics_url, timeout, startup
+            ))
+    print(topology_table(results))
+    print(dimension_costs(base, results))
+    return results
+
+
+def topology_table(results) -> str:
+    """
+    Format the results as a table.
+
+    :param results: [TopologyResult]
+    :return: str
+    """
+    width = max([len(r.shape.name) for r in results] + [5])
+    lines = [
+        f"{'shape':<{width}} {'submit':>7} {'valid':>7} {'gen~':>7} {'reloads':>7} {'reload':>8} "
+        f"{'config':>10} {'startup':>8} {'missing':>7}"
+    ]
+    for r in results:
+        startup = f"{r.startup_s:.1f}s" if r.startup_s is not None else "n/a"
+        lines.append(
+            f"{r.shape.name:<{width}} {r.submit_s:>6.1f}s {r.converge_s:>6.1f}s {r.generation_s:>6.1f}s "
+            f"{r.reloads:>7} {r.reload_ms:>6.0f}ms {r.config_bytes // 1024:>8}Ki {startup:>8} {r.missing:>7}"
+        )
+    return "\n".join(lines)
+
+
+def dimension_costs(base, results) -> str:
+    """
+    Compare how much every dimension grows the cost: the growth of the cost divided by the growth of the dimension.
+
+    A ratio near 1 means the cost grows linearly with the dimension, near 0 the dimension does not matter.
+
+    :param base: TopologyShape
+    :param results: [TopologyResult], the base first
+    :return: str
+    """
+    first = results[0]
+    lines = [f"{'dimension':<22} {'value':>6} {'valid':>7} {'reload':>7} {'config':>7}"]
+    for r in results[1:]:
+        changed = [d for d in base.__dict__ if getattr(r.shape, d) != getattr(base, d)]
+        if not changed:
+            continue
+        dimension = changed[0]
+        growth = getattr(r.shape, dimension) / max(1, getattr(base, dimension))
+        if growth == 1:
+            continue
+
+        def ratio(value, base_value):
+            return (value / base_value - 1) / (growth - 1) if base_value else 0.0
+
+        lines.append(
+            f"{dimension:<22} {getattr(r.shape, dimension):>6} {ratio(r.converge_s, first.converge_s):>7.2f} "
+            f"{ratio(r.reload_ms, first.reload_ms):>7.2f} {ratio(r.config_bytes, first.config_bytes):>7.2f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,263 @@
+"""Describe methods to isolate pytest-xdist workers sharing one cluster."""
+
+import fcntl
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+# the names from the deployments manifests that every worker gets its own copy of
+IC_NAMESPACE = "nginx-ingress"
+INGRESS_CLASS = "nginx"
+CLUSTER_SCOPED_NAMES = ["nginx-ingress", "nginx-ingress-app-protect"]
+CLASS_ANNOTATION = "kubernetes.io/ingress.class"
+
+
+def get_worker_id() -> str:
+    """
+    Get the id of the pytest-xdist worker running the tests.
+
+    :return: str, e.g. 'gw0', or an empty string if the tests run in a single process
+    """
+    return os.environ.get("PYTEST_XDIST_WORKER", "")
+
+
+def get_worker_name(name) -> str:
+    """
+    Get the name of a cluster item owned by the current worker.
+
+    :param name: the name from the manifest
+    :return: str
+    """
+    worker = get_worker_id()
+    return f"{name}-{worker}" if worker else name
+
+
+def get_worker_ingress_class() -> str:
+    """
+    Get the ingress class the IC of the current worker handles.
+
+    :return: str
+    """
+    return get_worker_name(INGRESS_CLASS)
+
+
+def get_worker_ic_namespace() -> str:
+    """
+    Get the namespace of the IC of the current worker.
+
+    :return: str
+    """
+    return get_worker_name(IC_NAMESPACE)
+
+
+def is_worker_namespace(namespace) -> bool:
+    """
+    Check if a namespace is owned by the current worker: its IC namespace or one of its test namespaces.
+
+    :param namespace: namespace name
+    :return: bool
+    """
+    return namespace == get_worker_ic_namespace() or namespace.startswith(f"{get_worker_name('test-namespace')}-")
+
+
+def isolate_ic_arg(arg) -> str:
+    """
+    Point a 'namespace/name' value of an IC cli argument to the IC namespace of the current worker.
+
+    :param arg: an IC cli argument, e.g. '-global-configuration=nginx-ingress/nginx-configuration'
+    :return: str
+    """
+    name, sep, value = arg.partition("=")
+    if sep and value.startswith(f"{IC_NAMESPACE}/"):
+        return f"{name}={get_worker_ic_namespace()}/{value[len(IC_NAMESPACE) + 1:]}"
+    return arg
+
+
+def isolate_ingress_class(ingress_class) -> str:
+    """
+    Get the ingress class of the current worker instead of the default one.
+
+    :param ingress_class: ingress class name
+    :return: str
+    """
+    return get_worker_ingress_class() if ingress_class == INGRESS_CLASS else ingress_class
+
+
+def isolate_metric(metric) -> str:
+    """
+    Get a Prometheus metric of the default ingress class with the class label of the current worker.
+
+    :param metric: a metric line, e.g. 'nginx_ingress_controller_nginx_last_reload_status{class="nginx"} 1'
+    :return: str
+    """
+    return metric.replace(f'class="{INGRESS_CLASS}"', f'class="{get_worker_ingress_class()}"')
+
+
+def isolate_namespace(body) -> None:
+    """
+    Rename the IC namespace.
+
+    :param body: a dict
+    :return:
+    """
+    if body["metadata"].get("name") == IC_NAMESPACE:
+        body["metadata"]["name"] = get_worker_ic_namespace()
+
+
+def isolate_cluster_role(body) -> None:
+    """
+    Rename a cluster role of the IC.
+
+    :param body: a dict
+    :return:
+    """
+    if body["metadata"].get("name") in CLUSTER_SCOPED_NAMES:
+        body["metadata"]["name"] = get_worker_name(body["metadata"]["name"])
+
+
+def isolate_cluster_role_binding(body) -> None:
+    """
+    Rename a cluster role binding of the IC, its role and the namespace of its subjects.
+
+    :param body: a dict
+    :return:
+    """
+    if body["metadata"].get("name") not in CLUSTER_SCOPED_NAMES:
+        return
+    body["metadata"]["name"] = get_worker_name(body["metadata"]["name"])
+    body["roleRef"]["name"] = get_worker_name(body["roleRef"]["name"])
+    for subject in body.get("subjects", []):
+        if subject.get("namespace") == IC_NAMESPACE:
+            subject["namespace"] = get_worker_ic_namespace()
+
+
+def isolate_ingress_class_resource(body) -> None:
+    """
+    Rename the 'nginx' IngressClass.
+
+    :param body: a dict
+    :return:
+    """
+    if body["metadata"].get("name") == INGRESS_CLASS:
+        body["metadata"]["name"] = get_worker_ingress_class()
+
+
+def isolate_ingress(body) -> None:
+    """
+    Set the ingress class of the worker in the annotation and the spec of an Ingress.
+
+    :param body: a dict
+    :return:
+    """
+    annotations = body["metadata"].get("annotations") or {}
+    if annotations.get(CLASS_ANNOTATION) == INGRESS_CLASS:
+        annotations[CLASS_ANNOTATION] = get_worker_ingress_class()
+    if (body.get("spec") or {}).get("ingressClassName") == INGRESS_CLASS:
+        body["spec"]["ingressClassName"] = get_worker_ingress_class()
+
+
+def isolate_custom_resource(body) -> None:
+    """
+    Set the ingress class of the worker in a custom resource with the default or the empty one.
+
+    :param body: a dict
+    :return:
+    """
+    spec = body.setdefault("spec", {})
+    if spec.get("ingressClassName", "") in ["", INGRESS_CLASS]:
+        spec["ingressClassName"] = get_worker_ingress_class()
+
+
+ISOLATE_BY_KIND = {
+    "Namespace": isolate_namespace,
+    "ClusterRole": isolate_cluster_role,
+    "ClusterRoleBinding": isolate_cluster_role_binding,
+    "IngressClass": isolate_ingress_class_resource,
+    "Ingress": isolate_ingress,
+    "VirtualServer": isolate_custom_resource,
+    "VirtualServerRoute": isolate_custom_resource,
+    "TransportServer": isolate_custom_resource,
+    "Policy": isolate_custom_resource,
+}
+
+
+def isolate_manifest(body) -> dict:
+    """
+    Rename the items of a manifest shared by the workers to the ones owned by the current worker.
+
+    The IC namespace, the cluster roles and bindings, the 'nginx' IngressClass are renamed,
+    Ingress, VirtualServer, VirtualServerRoute, TransportServer and Policy resources get the ingress class
+    of the worker instead of the default or the empty one.
+    Does nothing if the tests run in a single process.
+
+    :param body: a dict
+    :return: the same dict
+    """
+    if not get_worker_id() or not body:
+        return body
+    metadata = body.setdefault("metadata", {})
+    if metadata.get("namespace") == IC_NAMESPACE:
+        metadata["namespace"] = get_worker_ic_namespace()
+    isolate = ISOLATE_BY_KIND.get(body.get("kind"))
+    if isolate is not None:
+        isolate(body)
+    return body
+
+
+@contextmanager
+def cluster_lock(name):
+    """
+    Serialize the work with a cluster-global item between the workers.
+
+    The workers of a run share a lock file in the temp directory, the file keeps a json state of the item
+    the caller can update, e.g. the list of the workers using it.
+
+    :param name: the name of the item
+    :return: dict
+    """
+    run_id = os.environ.get("PYTEST_XDIST_TESTRUNUID", f"pid{os.getpid()}")
+    path = os.path.join(tempfile.gettempdir(), f"nginx-ingress-tests-{run_id}-{name}.lock")
+    with open(path, "a+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.seek(0)
+            content = f.read()
+            state = json.loads(content) if content else {"users": []}
+            yield state
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(state))
+            f.flush()
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def acquire_cluster_item(name) -> bool:
+    """
+    Register the current worker as a user of a cluster-global item.
+
+    :param name: the name of the item
+    :return: True if the worker is the first user and has to create the item
+    """
+    worker = get_worker_id() or "single"
+    with cluster_lock(name) as state:
+        first = not state["users"]
+        if worker not in state["users"]:
+            state["users"].append(worker)
+    return first
+
+
+def release_cluster_item(name) -> bool:
+    """
+    Unregister the current worker as a user of a cluster-global item.
+
+    :param name: the name of the item
+    :return: True if the worker was the last user and has to delete the item
+    """
+    worker = get_worker_id() or "single"
+    with cluster_lock(name) as state:
+        if worker in state["users"]:
+            state["users"].remove(worker)
+        last = not state["users"]
+    return last
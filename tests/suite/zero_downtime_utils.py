@@ -0,0 +1,358 @@
+"""Describe methods to keep traffic going through the IC during configuration changes and to record what clients see."""
+
+import abc
+import http.client
+import time
+from collections import Counter
+
+import grpc
+import requests
+
+from suite.grpc.helloworld_pb2 import HelloRequest
+from suite.grpc.helloworld_pb2_grpc import GreeterStub
+from suite.grpc_load_utils import create_grpc_channel
+from suite.resources_utils import get_reload_metrics
+from suite.ssl_utils import create_sni_session
+from suite.stats_utils import PeriodicSampler, get_percentile
+
+# the errors of a connection that was closed under an in-flight request
+RESET_ERRORS = ["reset", "UNAVAILABLE"]
+
+
+class TrafficSample:
+    """
+    Encapsulate the result of a request of a traffic stream.
+
+    Attributes:
+        at (float): time.perf_counter() when the request was sent
+        latency_ms (float):
+        status (str): HTTP status code or gRPC status code name, empty if there was no response
+        error (str): 'reset', 'truncated', 'timeout', 'status <code>', a gRPC code name, an exception name
+            or an empty string
+    """
+
+    def __init__(self, at, latency_ms, status="", error=""):
+        self.at = at
+        self.latency_ms = latency_ms
+        self.status = status
+        self.error = error
+
+
+class TrafficStream(PeriodicSampler):
+    """
+    Send requests one after another in a background thread and keep every result.
+
+    An exception that send does not handle is recorded as an error sample with the exception name.
+
+    Attributes:
+        name (str):
+        interval (float): seconds between the requests
+        samples ([TrafficSample]):
+    """
+
+    def __init__(self, name, interval=0.05):
+        super().__init__(interval)
+        self.name = name
+        self.samples = []
+
+    @abc.abstractmethod
+    def send(self) -> (str, str):
+        """
+        Send a request.
+
+        :return: (status, error)
+        """
+
+    def sample(self) -> None:
+        at = time.perf_counter()
+        try:
+            status, error = self.send()
+        except Exception as ex:
+            status, error = "", type(ex).__name__
+        self.samples.append(TrafficSample(at, (time.perf_counter() - at) * 1000, status, error))
+
+
+class HttpTrafficStream(TrafficStream):
+    """
+    Send HTTP or HTTPS requests, either over one keep-alive connection or over a new connection every time.
+
+    Attributes:
+        url (str):
+        host (str): the host header and the SNI
+        keepalive (bool): reuse the connection
+        timeout (float): seconds
+        expected_status (int):
+    """
+
+    def __init__(self, name, url, host, keepalive=True, interval=0.05, timeout=5.0, expected_status=200):
+        super().__init__(name, interval)
+        self.url = url
+        self.host = host
+        self.keepalive = keepalive
+        self.timeout = timeout
+        self.expected_status = expected_status
+        self.session = create_sni_session() if url.startswith("https") else requests.Session()
+
+    def send(self) -> (str, str):
+        headers = {"host": self.host}
+        if not self.keepalive:
+            headers["connection"] = "close"
+        try:
+            resp = self.session.get(self.url, headers=headers, timeout=self.timeout, verify=False)
+        except requests.exceptions.Timeout:
+            return "", "timeout"
+        except requests.exceptions.ConnectionError as ex:
+            return "", classify_connection_error(ex)
+        except requests.exceptions.ChunkedEncodingError:
+            # the connection was closed in the middle of the response body
+            return "", "truncated"
+        except requests.RequestException as ex:
+            return "", type(ex).__name__
+        error = "" if resp.status_code == self.expected_status else f"status {resp.status_code}"
+        return str(resp.status_code), error
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class GrpcTrafficStream(TrafficStream):
+    """
+    Send SayHello calls over one long-lived channel.
+
+    Attributes:
+        target (str): 'ip:port'
+        host (str): SNI
+        timeout (float): seconds
+    """
+
+    def __init__(self, name, target, certs, host, interval=0.05, timeout=5.0):
+        super().__init__(name, interval)
+        self.target = target
+        self.host = host
+        self.timeout = timeout
+        # several certificates let the channel reconnect after the TLS secret is replaced
+        self.channel = create_grpc_channel(target, "".join(certs), host)
+        self.stub = GreeterStub(self.channel)
+
+    def send(self) -> (str, str):
+        try:
+            self.stub.SayHello(HelloRequest(name=self.name), timeout=self.timeout)
+        except grpc.RpcError as ex:
+            return ex.code().name, ex.code().name
+        return "OK", ""
+
+    def close(self) -> None:
+        self.channel.close()
+
+
+def classify_connection_error(ex) -> str:
+    """
+    Tell a reset of an established connection from the other connection errors.
+
+    :param ex: requests.exceptions.ConnectionError
+    :return: 'reset' or the name of the innermost exception
+    """
+    cause = ex
+    while cause is not None:
+        if isinstance(cause, (ConnectionResetError, BrokenPipeError, http.client.RemoteDisconnected)):
+            return "reset"
+        inner = cause.args[0] if cause.args and isinstance(cause.args[0], BaseException) else None
+        if inner is None:
+            inner = cause.__cause__ or cause.__context__
+        if inner is None:
+            return type(cause).__name__
+        cause = inner
+    return type(ex).__name__
+
+
+class ReloadSampler(PeriodicSampler):
+    """
+    Poll the IC metrics in a background thread and record when the reload count goes up.
+
+    Attributes:
+        metrics_url (str):
+        interval (float): seconds between the polls
+        reloads ([float]): time.perf_counter() of the polls that saw new reloads, once per reload
+        durations_ms ([float]): nginx_last_reload_milliseconds of the polls that saw new reloads,
+            the reloads between two polls share one value
+        count (int): the reload count of the last poll, None before the first one
+    """
+
+    def __init__(self, metrics_url, interval=0.25):
+        super().__init__(interval)
+        self.metrics_url = metrics_url
+        self.reloads = []
+        self.durations_ms = []
+        self.count = None
+        self.session = requests.Session()
+
+    def read(self) -> (int, float):
+        """
+        Read the reload count and the duration of the last reload.
+
+        :return: (count, milliseconds)
+        """
+        return get_reload_metrics(self.metrics_url, self.session)
+
+    def sample(self) -> None:
+        try:
+            current, duration = self.read()
+        except requests.RequestException as ex:
+            print(f"Failed to read the reloads: {ex}")
+            return
+        if self.count is not None and current > self.count:
+            self.reloads.extend([time.perf_counter()] * (current - self.count))
+            self.durations_ms.extend([duration] * (current - self.count))
+        self.count = current
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class Mutation:
+    """
+    Encapsulate a configuration change of a scenario.
+
+    Attributes:
+        name (str):
+        at (float): seconds from the start of the scenario
+        action (function): a function without arguments that makes the change
+    """
+
+    def __init__(self, name, at, action):
+        self.name = name
+        self.at = at
+        self.action = action
+
+
+class ReloadScenarioReport:
+    """
+    Encapsulate what the traffic streams saw during a scenario.
+
+    Attributes:
+        streams ([TrafficStream]):
+        applied ([(str, float)]): mutation name and time.perf_counter() it was applied
+        reloads ([float]): time.perf_counter() the reloads were seen
+        start (float): time.perf_counter() of the start
+        warmup_end (float): the samples before this time are the latency baseline
+        spike_factor (float): a latency above spike_factor * the baseline p99 is a spike
+        spike_min_ms (float): and it must be above this too
+    """
+
+    def __init__(self, streams, applied, reloads, start, warmup_end, spike_factor, spike_min_ms):
+        self.streams = streams
+        self.applied = applied
+        self.reloads = reloads
+        self.start = start
+        self.warmup_end = warmup_end
+        self.spike_factor = spike_factor
+        self.spike_min_ms = spike_min_ms
+
+    def failures(self, exclude=()) -> [(str, TrafficSample)]:
+        """
+        Get the failed requests.
+
+        :param exclude: the errors to skip, e.g. RESET_ERRORS
+        :return: [(stream name, TrafficSample)]
+        """
+        return [
+            (stream.name, sample)
+            for stream in self.streams
+            for sample in stream.samples
+            if sample.error and sample.error not in exclude
+        ]
+
+    def baseline_ms(self, stream) -> float:
+        return get_percentile([s.latency_ms for s in stream.samples if s.at < self.warmup_end and not s.error], 99)
+
+    def spikes(self) -> [(str, TrafficSample)]:
+        """
+        Get the successful requests that were much slower than the baseline.
+
+        :return: [(stream name, TrafficSample)]
+        """
+        spikes = []
+        for stream in self.streams:
+            threshold = max(self.spike_min_ms, self.spike_factor * self.baseline_ms(stream))
+            spikes.extend(
+                (stream.name, sample)
+                for sample in stream.samples
+                if not sample.error and sample.at >= self.warmup_end and sample.latency_ms > threshold
+            )
+        return spikes
+
+    def nearest_reload(self, at) -> str:
+        if not self.reloads:
+            return "no reloads"
+        reload_at = min(self.reloads, key=lambda r: abs(r - at))
+        return f"{at - reload_at:+.2f}s from the reload at +{reload_at - self.start:.2f}s"
+
+    def timeline(self) -> [str]:
+        """
+        Get the mutations, the reloads, the failures and the spikes in the order of time.
+
+        :return: [str]
+        """
+        events = [(at, f"mutation: {name}") for name, at in self.applied]
+        events.extend((at, f"reload #{i + 1}") for i, at in enumerate(self.reloads))
+        events.extend(
+            (sample.at, f"{name}: {sample.error} after {sample.latency_ms:.0f}ms, {self.nearest_reload(sample.at)}")
+            for name, sample in self.failures()
+        )
+        events.extend(
+            (sample.at, f"{name}: {sample.latency_ms:.0f}ms spike, {self.nearest_reload(sample.at)}")
+            for name, sample in self.spikes()
+        )
+        return [f"+{at - self.start:7.2f}s {text}" for at, text in sorted(events, key=lambda event: event[0])]
+
+    def summary(self) -> str:
+        lines = [f"{len(self.applied)} mutations, {len(self.reloads)} reloads"]
+        for stream in self.streams:
+            latencies = [s.latency_ms for s in stream.samples if not s.error] or [0.0]
+            errors = Counter(s.error for s in stream.samples if s.error)
+            lines.append(
+                f"{stream.name}: {len(stream.samples)} requests, errors {dict(errors)}, "
+                f"latency p50={get_percentile(latencies, 50):.1f}ms p99={get_percentile(latencies, 99):.1f}ms "
+                f"max={max(latencies):.1f}ms, baseline p99={self.baseline_ms(stream):.1f}ms"
+            )
+        return "\n".join(lines)
+
+
+def run_reload_scenario(streams, mutations, metrics_url, warmup=5.0, settle=10.0, spike_factor=5.0,
+                        spike_min_ms=200.0) -> ReloadScenarioReport:
+    """
+    Keep the traffic streams running, apply the mutations on schedule and record what the streams saw.
+
+    :param streams: [TrafficStream]
+    :param mutations: [Mutation], the 'at' offsets count from the end of the warmup
+    :param metrics_url: IC /metrics url
+    :param warmup: seconds of traffic before the first mutation, they make the latency baseline
+    :param settle: seconds of traffic after the last mutation
+    :param spike_factor: a latency above spike_factor * the baseline p99 is a spike
+    :param spike_min_ms: and it must be above this too
+    :return: ReloadScenarioReport
+    """
+    print(f"Run {len(streams)} traffic streams through {len(mutations)} mutations")
+    sampler = ReloadSampler(metrics_url)
+    applied = []
+    start = time.perf_counter()
+    sampler.start()
+    for stream in streams:
+        stream.start()
+    try:
+        time.sleep(warmup)
+        warmup_end = time.perf_counter()
+        for mutation in sorted(mutations, key=lambda m: m.at):
+            time.sleep(max(0.0, warmup_end + mutation.at - time.perf_counter()))
+            print(f"Apply the mutation: {mutation.name}")
+            applied.append((mutation.name, time.perf_counter()))
+            mutation.action()
+        time.sleep(settle)
+    finally:
+        for stream in streams:
+            stream.stop()
+        sampler.stop()
+    report = ReloadScenarioReport(streams, applied, sampler.reloads, start, warmup_end, spike_factor, spike_min_ms)
+    print(report.summary())
+    print("\n".join(report.timeline()))
+    return report